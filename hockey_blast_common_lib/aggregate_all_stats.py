@@ -1,12 +1,20 @@
+import argparse
 import os
 import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
 
 # Add the package directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import text
+
+from hockey_blast_common_lib.aggregate_division_team_standings import (
+    run_aggregate_division_team_standings,
+)
 from hockey_blast_common_lib.aggregate_goalie_stats import run_aggregate_goalie_stats
-from hockey_blast_common_lib.process_hb_claims import process_hb_claims
 from hockey_blast_common_lib.aggregate_human_stats import run_aggregate_human_stats
 from hockey_blast_common_lib.aggregate_referee_stats import run_aggregate_referee_stats
 from hockey_blast_common_lib.aggregate_scorekeeper_stats import (
@@ -16,14 +24,19 @@ from hockey_blast_common_lib.aggregate_skater_stats import run_aggregate_skater_
 from hockey_blast_common_lib.aggregate_team_goalie_stats import (
     run_aggregate_team_goalie_stats,
 )
-from hockey_blast_common_lib.aggregate_division_team_standings import (
-    run_aggregate_division_team_standings,
-)
 from hockey_blast_common_lib.aggregate_team_skater_stats import (
     run_aggregate_team_skater_stats,
 )
+from hockey_blast_common_lib.aggregation_metrics import configure_metrics, measure_stage
 from hockey_blast_common_lib.db_connection import create_session
-from sqlalchemy import text
+from hockey_blast_common_lib.game_ordinals import refresh_game_ordinals
+from hockey_blast_common_lib.options import (
+    AGGREGATION_METRICS_FILE,
+    AGGREGATION_STAGE_WORKERS,
+    PERSIST_AGGREGATION_METRICS,
+)
+from hockey_blast_common_lib.parallel_utils import create_process_pool
+from hockey_blast_common_lib.process_hb_claims import process_hb_claims
 
 
 def populate_human_games_fresh(session):
@@ -37,8 +50,14 @@ def populate_human_games_fresh(session):
 
     start_time = datetime.now()
 
-    # Truncate and repopulate in one transaction
+    # Truncate and repopulate in one transaction. last_processed_games_count is
+    # carried over so the skater aggregator can still tell which humans have
+    # new games since the previous run.
     populate_query = text("""
+        -- Remember how far each human was processed
+        CREATE TEMP TABLE human_games_processed ON COMMIT DROP AS
+        SELECT human_id, last_processed_games_count FROM human_games;
+
         -- First, truncate the table
         TRUNCATE TABLE human_games;
 
@@ -49,9 +68,10 @@ def populate_human_games_fresh(session):
             ARRAY_AGG(DISTINCT gr.game_id ORDER BY gr.game_id) as game_ids,
             COUNT(DISTINCT gr.game_id) as games_count,
             NOW() as last_updated_at,
-            0 as last_processed_games_count
+            COALESCE(MAX(p.last_processed_games_count), 0) as last_processed_games_count
         FROM game_rosters gr
         JOIN games g ON gr.game_id = g.id
+        LEFT JOIN human_games_processed p ON p.human_id = gr.human_id
         WHERE g.status_id IN (3, 4, 5, 6, 7)
         GROUP BY gr.human_id;
     """)
@@ -79,42 +99,241 @@ def populate_human_games_fresh(session):
     print()
 
 
-if __name__ == "__main__":
-    print("Processing HB profile claim merges...", flush=True)
+def run_process_hb_claims():
+    """Merge claimed HB profiles. Failures are reported but never block the run."""
+    process_hb_claims()
+
+
+def run_populate_human_games():
+    session = create_session("boss")
+    try:
+        populate_human_games_fresh(session)
+    finally:
+        session.close()
+
+
+def run_refresh_game_ordinals():
+    session = create_session("boss")
     try:
-        process_hb_claims()
-    except Exception as e:
-        print(f"WARNING: HB claim processing failed: {e}", flush=True)
-        print("Continuing with stats aggregation...\n", flush=True)
-
-    print("Running aggregate_skater_stats...", flush=True)
-    run_aggregate_skater_stats()
-    print("Finished running aggregate_skater_stats\n")
-
-    print("Running aggregate_goalie_stats...", flush=True)
-    run_aggregate_goalie_stats()
-    print("Finished running aggregate_goalie_stats\n")
-
-    print("Running aggregate_referee_stats...", flush=True)
-    run_aggregate_referee_stats()
-    print("Finished running aggregate_referee_stats\n")
-
-    print("Running aggregate_scorekeeper_stats...", flush=True)
-    run_aggregate_scorekeeper_stats()
-    print("Finished running aggregate_scorekeeper_stats\n")
-
-    print("Running aggregate_human_stats...", flush=True)
-    run_aggregate_human_stats()
-    print("Finished running aggregate_human_stats\n")
-
-    print("Running aggregate_team_skater_stats...", flush=True)
-    run_aggregate_team_skater_stats()
-    print("Finished running aggregate_team_skater_stats\n")
-
-    print("Running aggregate_team_goalie_stats...", flush=True)
-    run_aggregate_team_goalie_stats()
-    print("Finished running aggregate_team_goalie_stats\n")
-
-    print("Running aggregate_division_team_standings...", flush=True)
-    run_aggregate_division_team_standings()
-    print("Finished running aggregate_division_team_standings\n")
+        updated = refresh_game_ordinals(session)
+        print(f"Refreshed chronological ordinals of {updated:,} games", flush=True)
+    finally:
+        session.close()
+
+
+# Nightly aggregation stages and the stages each one depends on.
+# Game ordinals are renumbered before anything else, on every run, so that
+# rescheduled games get their new position and no stage reads or writes
+# games while they are being renumbered. Claims are merged next so that every
+# aggregator sees the final humans, and human_games is rebuilt before the
+# skater stats consult it for changed humans.
+# The per-role aggregators only read game data and write their own tables, so
+# they are independent of each other and run concurrently.
+# "required": False marks stages whose failure is logged but does not prevent
+# dependent stages from running.
+AGGREGATION_STAGES = {
+    "refresh_game_ordinals": {
+        "run": run_refresh_game_ordinals,
+        "depends_on": [],
+    },
+    "process_hb_claims": {
+        "run": run_process_hb_claims,
+        "depends_on": ["refresh_game_ordinals"],
+        "required": False,
+    },
+    "populate_human_games": {
+        "run": run_populate_human_games,
+        "depends_on": ["process_hb_claims", "refresh_game_ordinals"],
+    },
+    "aggregate_skater_stats": {
+        "run": run_aggregate_skater_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_goalie_stats": {
+        "run": run_aggregate_goalie_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_referee_stats": {
+        "run": run_aggregate_referee_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_scorekeeper_stats": {
+        "run": run_aggregate_scorekeeper_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_human_stats": {
+        "run": run_aggregate_human_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_team_skater_stats": {
+        "run": run_aggregate_team_skater_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_team_goalie_stats": {
+        "run": run_aggregate_team_goalie_stats,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+    "aggregate_division_team_standings": {
+        "run": run_aggregate_division_team_standings,
+        "depends_on": ["populate_human_games", "refresh_game_ordinals"],
+    },
+}
+
+
+def get_stage_order(stages):
+    """
+    Validate the stage graph and return stage names in dependency order.
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage or the graph has a cycle
+    """
+    order = []
+    state = {}  # stage name -> "visiting" | "done"
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(
+                f"Cycle in aggregation stages: {' -> '.join(path + [name])}"
+            )
+        state[name] = "visiting"
+        for dependency in stages[name]["depends_on"]:
+            if dependency not in stages:
+                raise ValueError(
+                    f"Stage {name} depends on unknown stage {dependency}"
+                )
+            visit(dependency, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in stages:
+        visit(name, [])
+    return order
+
+
+def run_stage(stage_name, run):
+    """Run a single stage and return its wall time in seconds.
+
+    *run* must be a module-level function so it can be sent to a worker
+    process; each stage opens its own sessions there."""
+    start_time = time.time()
+    print(f"Running {stage_name}...", flush=True)
+    with measure_stage(stage_name):
+        run()
+    duration = time.time() - start_time
+    print(f"Finished running {stage_name} ({duration:.1f}s)\n", flush=True)
+    return duration
+
+
+def run_stages(stages=None, max_workers=AGGREGATION_STAGE_WORKERS):
+    """
+    Run aggregation stages, starting each one as soon as its dependencies finish.
+
+    Args:
+        stages: Stage graph (defaults to AGGREGATION_STAGES)
+        max_workers: Number of stages to run concurrently. 1 runs every
+            stage serially in the current process.
+
+    Returns:
+        Dict of stage name -> "ok", "failed" or "skipped"
+    """
+    if stages is None:
+        stages = AGGREGATION_STAGES
+    order = get_stage_order(stages)
+    results = {}
+
+    def ready_stages():
+        ready = []
+        for name in order:
+            if name in results or name in running.values():
+                continue
+            dependency_results = [results.get(d) for d in stages[name]["depends_on"]]
+            if any(r is None for r in dependency_results):
+                continue
+            blocked_by = [
+                d
+                for d in stages[name]["depends_on"]
+                if results[d] != "ok" and stages[d].get("required", True)
+            ]
+            if blocked_by:
+                print(
+                    f"Skipping {name}: dependency {', '.join(blocked_by)} did not complete",
+                    flush=True,
+                )
+                results[name] = "skipped"
+                continue
+            ready.append(name)
+        return ready
+
+    def record_failure(name, error):
+        results[name] = "failed"
+        level = "ERROR" if stages[name].get("required", True) else "WARNING"
+        print(f"{level}: {name} failed: {error}", flush=True)
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    running = {}  # future -> stage name
+    if max_workers <= 1:
+        while len(results) < len(stages):
+            for name in ready_stages():
+                try:
+                    run_stage(name, stages[name]["run"])
+                    results[name] = "ok"
+                except Exception as e:
+                    record_failure(name, e)
+        return results
+
+    with create_process_pool(max_workers) as pool:
+        while len(results) < len(stages):
+            for name in ready_stages():
+                running[pool.submit(run_stage, name, stages[name]["run"])] = name
+            if not running:
+                continue  # everything left was just skipped
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    results[name] = "ok"
+                except Exception as e:
+                    record_failure(name, e)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the nightly stats aggregation.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=AGGREGATION_STAGE_WORKERS,
+        help="Number of aggregation stages to run concurrently (1 = serial).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=AGGREGATION_METRICS_FILE,
+        help="Append per-stage and per-scope metrics to this file as JSON lines.",
+    )
+    parser.add_argument(
+        "--persist-metrics",
+        action="store_true",
+        default=PERSIST_AGGREGATION_METRICS,
+        help="Also store the metrics in the aggregation_runs table.",
+    )
+    args = parser.parse_args()
+
+    if args.metrics_file or args.persist_metrics:
+        run_id = configure_metrics(args.metrics_file, args.persist_metrics)
+        print(f"Recording aggregation metrics for run {run_id}", flush=True)
+
+    run_start = time.time()
+    results = run_stages(max_workers=args.workers)
+    print(f"Aggregation finished in {time.time() - run_start:.1f}s", flush=True)
+    for name in get_stage_order(AGGREGATION_STAGES):
+        print(f"  {name}: {results[name]}", flush=True)
+
+    failed = [
+        name
+        for name, result in results.items()
+        if result != "ok" and AGGREGATION_STAGES[name].get("required", True)
+    ]
+    sys.exit(1 if failed else 0)
@@ -9,7 +9,12 @@ from datetime import datetime, timedelta
 import sqlalchemy
 from sqlalchemy.sql import func
 
+from hockey_blast_common_lib.aggregation_metrics import record_scope_metrics
 from hockey_blast_common_lib.db_connection import create_session
+from hockey_blast_common_lib.game_fact_cache import (
+    get_game_fact_cache,
+    load_game_fact_cache,
+)
 from hockey_blast_common_lib.models import (
     Division,
     Game,
@@ -18,10 +23,14 @@ from hockey_blast_common_lib.models import (
     Organization,
 )
 from hockey_blast_common_lib.options import (
+    DIVISION_AGGREGATION_WORKERS,
     MIN_GAMES_FOR_DIVISION_STATS,
     MIN_GAMES_FOR_LEVEL_STATS,
     MIN_GAMES_FOR_ORG_STATS,
+    ROLLUP_SCOPE_STATS,
+    USE_GAME_FACT_CACHE,
 )
+from hockey_blast_common_lib.parallel_utils import run_division_aggregations
 from hockey_blast_common_lib.progress_utils import create_progress_tracker
 from hockey_blast_common_lib.stats_models import (
     DivisionStatsDailyGoalie,
@@ -32,20 +41,28 @@ from hockey_blast_common_lib.stats_models import (
     OrgStatsGoalie,
     OrgStatsWeeklyGoalie,
 )
+from hockey_blast_common_lib.game_ordinals import resolve_first_last_games
 from hockey_blast_common_lib.game_status import StatusId, FINAL_STATUS_IDS, PARTICIPATED_STATUS_IDS
-from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+from hockey_blast_common_lib.stats_rollup import ScopePartials
+from hockey_blast_common_lib.stats_utils import (
+    ALL_ORGS_ID,
+    assign_rank_columns,
+    compute_percentile_values,
+)
 from hockey_blast_common_lib.utils import (
-    assign_ranks,
-    calculate_percentile_value,
+    AGGREGATION_WINDOWS,
     get_all_division_ids_for_org,
+    get_game_window_condition,
     get_non_human_ids,
-    get_percentile_human,
-    get_start_datetime,
+    get_percentile_human_ids,
+    get_window_starts,
+    in_window,
+    windowed,
 )
 
 
 def insert_percentile_markers_goalie(
-    session, stats_dict, aggregation_id, total_in_rank, StatsModel
+    session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel
 ):
     """Insert percentile marker records for goalie stats.
 
@@ -71,18 +88,11 @@ def insert_percentile_markers_goalie(
         "win_percentage",
     ]
 
-    percentiles = [25, 50, 75, 90, 95]
-
-    for percentile in percentiles:
-        percentile_human_id = get_percentile_human(session, "Goalie", percentile)
+    percentile_human_ids = get_percentile_human_ids(session, "Goalie")
+    values_by_percentile = compute_percentile_values(stats_dict, stat_fields)
 
-        percentile_values = {}
-        for field in stat_fields:
-            values = [stat[field] for stat in stats_dict.values() if field in stat]
-            if values:
-                percentile_values[field] = calculate_percentile_value(values, percentile)
-            else:
-                percentile_values[field] = 0
+    for percentile, percentile_human_id in percentile_human_ids.items():
+        percentile_values = values_by_percentile[percentile]
 
         goalie_stat = StatsModel(
             aggregation_id=aggregation_id,
@@ -116,18 +126,331 @@ def insert_percentile_markers_goalie(
             first_game_id=None,
             last_game_id=None,
         )
-        session.add(goalie_stat)
+        writer.add(goalie_stat)
+
+
+# Additive per-goalie counters of the goalie stats
+GOALIE_COUNTERS = (
+    "games_played",
+    "goals_allowed",
+    "shots_faced",
+    "wins",
+    "losses",
+    "ties",
+    "ot_losses",
+    "shutouts",
+)
 
-    session.commit()
+# Columns of the per-game rows count_goalie_decision() reads
+GOALIE_DECISION_COLUMNS = (
+    GoalieSaves.goalie_id.label("human_id"),
+    GoalieSaves.game_id,
+    Game.home_goalie_id,
+    Game.visitor_goalie_id,
+    Game.home_final_score,
+    Game.visitor_final_score,
+    Game.went_to_ot,
+    Game.status_id,
+    GoalieSaves.goals_allowed,
+)
 
 
-def aggregate_goalie_stats(
+def count_goalie_decision(counters, row):
+    """Add the win, loss, tie or OT loss (and shutout) of one goalie game."""
+    if row.home_final_score is None or row.visitor_final_score is None:
+        return
+
+    is_home = (row.human_id == row.home_goalie_id)
+    is_visitor = (row.human_id == row.visitor_goalie_id)
+
+    if is_home:
+        my_score, opp_score = row.home_final_score, row.visitor_final_score
+    elif is_visitor:
+        my_score, opp_score = row.visitor_final_score, row.home_final_score
+    else:
+        return  # Cannot determine side
+
+    is_ot = bool(row.went_to_ot) or row.status_id in (StatusId.FINAL_OT, StatusId.FINAL_SO)
+
+    if my_score > opp_score:
+        counters["wins"] += 1
+    elif my_score < opp_score:
+        if is_ot:
+            counters["ot_losses"] += 1
+        else:
+            counters["losses"] += 1
+    else:
+        counters["ties"] += 1
+
+    if row.goals_allowed == 0:
+        counters["shutouts"] += 1
+
+
+def build_goalie_stats(counters_by_human, aggregation_id, human_ids_to_filter, min_games):
+    """Build aggregate_goalie_stats' stats_dict from per-goalie counters.
+
+    Args:
+        counters_by_human: Dict human_id -> GOALIE_COUNTERS plus the goalie's
+            first and last game, either as first_game_id/last_game_id or as
+            first_ordinal/last_ordinal for the caller to resolve
+
+    win_percentage is filled in by the caller.
+    """
+    stats_dict = {}
+    for human_id, counters in counters_by_human.items():
+        games_played = counters["games_played"]
+        if (
+            human_id is None
+            or human_id in human_ids_to_filter
+            or not games_played
+            or games_played < min_games
+        ):
+            continue
+        stat = {
+            "games_played": games_played,  # DEPRECATED - for backward compatibility
+            "games_participated": games_played,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+            "games_with_stats": games_played,  # Same as games_played after filtering
+            "goals_allowed": counters["goals_allowed"],
+            "shots_faced": counters["shots_faced"],
+            "goals_allowed_per_game": counters["goals_allowed"] / games_played,
+            "save_percentage": (
+                (counters["shots_faced"] - counters["goals_allowed"])
+                / counters["shots_faced"]
+                if counters["shots_faced"] > 0
+                else 0.0
+            ),
+            "wins": counters["wins"],
+            "losses": counters["losses"],
+            "ties": counters["ties"],
+            "ot_losses": counters["ot_losses"],
+            "shutouts": counters["shutouts"],
+            "win_percentage": 0.0,
+        }
+        for bound in ("first_game_id", "last_game_id", "first_ordinal", "last_ordinal"):
+            if bound in counters:
+                stat[bound] = counters[bound]
+        stats_dict[(aggregation_id, human_id)] = stat
+    return stats_dict
+
+
+def build_goalie_stats_from_cache(
+    view, aggregation_id, human_ids_to_filter, min_games, debug_human_id=None
+):
+    """Build aggregate_goalie_stats' stats_dict from a GameFactView of the scope.
+
+    Produces the same counters, per-game rates and decisions as the SQL path,
+    with first_game_id/last_game_id already resolved.
+    win_percentage is filled in by the caller.
+    """
+    return build_goalie_stats(
+        view.goalie_stats(debug_human_id), aggregation_id, human_ids_to_filter, min_games
+    )
+
+
+def query_goalie_partials(session):
+    """
+    All-time goalie counters and decisions of every goalie per (org,
+    division, level), for rolling up org stats. Level stats only cover
+    recent games and are not rolled up.
+    """
+    partials = ScopePartials(GOALIE_COUNTERS, scope_types=("org",))
+    partition_columns = (Game.org_id, Game.division_id, Division.level_id)
+    goalie_stats = (
+        session.query(
+            *partition_columns,
+            GoalieSaves.goalie_id.label("human_id"),
+            func.count(GoalieSaves.game_id).label("games_played"),
+            func.sum(GoalieSaves.goals_allowed).label("goals_allowed"),
+            func.sum(GoalieSaves.shots_against).label("shots_faced"),
+            func.min(Game.chronological_ordinal).label("first_ordinal"),
+            func.max(Game.chronological_ordinal).label("last_ordinal"),
+        )
+        .join(Game, GoalieSaves.game_id == Game.id)
+        .join(Division, Game.division_id == Division.id)
+        .filter(Game.status_id.in_(PARTICIPATED_STATUS_IDS))
+        .group_by(*partition_columns, GoalieSaves.goalie_id)
+        .all()
+    )
+    counters_by_partition = {}
+    for row in goalie_stats:
+        counters_by_partition[(row.org_id, row.division_id, row.level_id, row.human_id)] = {
+            "games_played": row.games_played,
+            "goals_allowed": row.goals_allowed or 0,
+            "shots_faced": row.shots_faced or 0,
+            "wins": 0,
+            "losses": 0,
+            "ties": 0,
+            "ot_losses": 0,
+            "shutouts": 0,
+            "first_ordinal": row.first_ordinal,
+            "last_ordinal": row.last_ordinal,
+        }
+
+    decision_rows = (
+        session.query(*partition_columns, *GOALIE_DECISION_COLUMNS)
+        .join(Game, GoalieSaves.game_id == Game.id)
+        .join(Division, Game.division_id == Division.id)
+        .filter(Game.status_id.in_(PARTICIPATED_STATUS_IDS))
+        .all()
+    )
+    for row in decision_rows:
+        count_goalie_decision(
+            counters_by_partition[(row.org_id, row.division_id, row.level_id, row.human_id)],
+            row,
+        )
+
+    for (org_id, division_id, level_id, human_id), counters in counters_by_partition.items():
+        partials.add(org_id, division_id, level_id, human_id, counters)
+    return partials
+
+
+def query_goalie_window_stats(
+    session,
+    aggregation_id,
+    filter_condition,
+    window_conditions,
+    human_ids_to_filter,
+    min_games,
+    debug_human_id=None,
+):
+    """
+    Goalie counters and decisions of several windows of a scope in one scan.
+
+    Args:
+        filter_condition: The scope's games
+        window_conditions: {aggregation_window: condition on the games of the
+            window, None for all of the scope's games}
+
+    Returns:
+        {aggregation_window: stats_dict}
+    """
+    windows = list(window_conditions.items())
+    # Games outside every window are not needed (there are none as soon as
+    # one window covers the whole scope)
+    if all(condition is not None for _, condition in windows):
+        scan_filter = [sqlalchemy.or_(*(condition for _, condition in windows))]
+    else:
+        scan_filter = []
+
+    # Aggregate games played, goals allowed, and shots faced for each goalie using GoalieSaves table
+    # Filter games by status upfront for performance (avoid CASE statements)
+    # Only count games with these statuses: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+    columns = []
+    for i, (_, condition) in enumerate(windows):
+        columns += [
+            windowed(func.count(GoalieSaves.game_id), condition).label(f"games_played_{i}"),
+            windowed(func.sum(GoalieSaves.goals_allowed), condition).label(
+                f"goals_allowed_{i}"
+            ),
+            windowed(func.sum(GoalieSaves.shots_against), condition).label(
+                f"shots_faced_{i}"
+            ),
+            windowed(func.min(Game.chronological_ordinal), condition).label(
+                f"first_ordinal_{i}"
+            ),
+            windowed(func.max(Game.chronological_ordinal), condition).label(
+                f"last_ordinal_{i}"
+            ),
+        ]
+    query = (
+        session.query(GoalieSaves.goalie_id.label("human_id"), *columns)
+        .join(Game, GoalieSaves.game_id == Game.id)
+        .filter(
+            Game.status_id.in_(PARTICIPATED_STATUS_IDS)
+        )
+        .join(Division, Game.division_id == Division.id)
+        .filter(filter_condition, *scan_filter)
+    )
+
+    # Filter for specific human_id if provided
+    if debug_human_id:
+        query = query.filter(GoalieSaves.goalie_id == debug_human_id)
+
+    # Ordered by goalie like the fact cache, so that ranks break ties the
+    # same way in every window and on both paths
+    goalie_stats = query.group_by(GoalieSaves.goalie_id).order_by(GoalieSaves.goalie_id).all()
+
+    # Compute win/loss/tie/ot_loss/shutout counts per goalie
+    # Query per-game data to determine results
+    win_loss_query = (
+        session.query(
+            *GOALIE_DECISION_COLUMNS,
+            *(
+                in_window(condition).label(f"in_window_{i}")
+                for i, (_, condition) in enumerate(windows)
+            ),
+        )
+        .join(Game, GoalieSaves.game_id == Game.id)
+        .filter(
+            Game.status_id.in_(PARTICIPATED_STATUS_IDS)
+        )
+        .join(Division, Game.division_id == Division.id)
+        .filter(filter_condition, *scan_filter)
+    )
+
+    if debug_human_id:
+        win_loss_query = win_loss_query.filter(GoalieSaves.goalie_id == debug_human_id)
+
+    win_loss_results = win_loss_query.all()
+
+    stats_by_window = {}
+    for i, (aggregation_window, _) in enumerate(windows):
+        counters_by_human = {}
+        for stat in goalie_stats:
+            goals_allowed = getattr(stat, f"goals_allowed_{i}")
+            shots_faced = getattr(stat, f"shots_faced_{i}")
+            counters_by_human[stat.human_id] = {
+                "games_played": getattr(stat, f"games_played_{i}"),
+                "goals_allowed": goals_allowed if goals_allowed is not None else 0,
+                "shots_faced": shots_faced if shots_faced is not None else 0,
+                "wins": 0,
+                "losses": 0,
+                "ties": 0,
+                "ot_losses": 0,
+                "shutouts": 0,
+                "first_ordinal": getattr(stat, f"first_ordinal_{i}"),
+                "last_ordinal": getattr(stat, f"last_ordinal_{i}"),
+            }
+
+        for row in win_loss_results:
+            if getattr(row, f"in_window_{i}"):
+                count_goalie_decision(counters_by_human[row.human_id], row)
+
+        stats_by_window[aggregation_window] = build_goalie_stats(
+            counters_by_human, aggregation_id, human_ids_to_filter, min_games
+        )
+
+    # Turn first/last ordinals of every window into game ids with a single query
+    resolve_first_last_games(
+        session,
+        [stat for stats_dict in stats_by_window.values() for stat in stats_dict.values()],
+    )
+    return stats_by_window
+
+
+@record_scope_metrics
+def aggregate_goalie_scope(
     session,
     aggregation_type,
     aggregation_id,
     debug_human_id=None,
-    aggregation_window=None,
+    aggregation_windows=AGGREGATION_WINDOWS,
+    fact_cache=None,
+    partials=None,
 ):
+    """
+    Aggregate the all-time, weekly and daily goalie stats of one scope.
+
+    The games are scanned once for all windows (FILTER (WHERE ...)
+    aggregates, or one mask per window with the fact cache) and the windows'
+    tables are written in one transaction. Level scopes only have all-time
+    stats.
+
+    Args:
+        partials: ScopePartials from query_goalie_partials(); on the SQL path
+            the all-time counters of org scopes are rolled up from them
+            instead of scanning the scope's games
+    """
     # Capture start time for aggregation tracking
     aggregation_start_time = datetime.utcnow()
 
@@ -147,26 +470,24 @@ def aggregate_goalie_stats(
             )
             filter_condition = Game.org_id == aggregation_id
         print(
-            f"Aggregating goalie stats for {aggregation_name} with window {aggregation_window}..."
+            f"Aggregating goalie stats for {aggregation_name} with windows {list(aggregation_windows)}..."
         )
-        if aggregation_window == "Daily":
-            StatsModel = OrgStatsDailyGoalie
-        elif aggregation_window == "Weekly":
-            StatsModel = OrgStatsWeeklyGoalie
-        else:
-            StatsModel = OrgStatsGoalie
+        stats_models = {
+            None: OrgStatsGoalie,
+            "Weekly": OrgStatsWeeklyGoalie,
+            "Daily": OrgStatsDailyGoalie,
+        }
         min_games = MIN_GAMES_FOR_ORG_STATS
     elif aggregation_type == "division":
-        if aggregation_window == "Daily":
-            StatsModel = DivisionStatsDailyGoalie
-        elif aggregation_window == "Weekly":
-            StatsModel = DivisionStatsWeeklyGoalie
-        else:
-            StatsModel = DivisionStatsGoalie
+        stats_models = {
+            None: DivisionStatsGoalie,
+            "Weekly": DivisionStatsWeeklyGoalie,
+            "Daily": DivisionStatsDailyGoalie,
+        }
         min_games = MIN_GAMES_FOR_DIVISION_STATS
         filter_condition = Game.division_id == aggregation_id
     elif aggregation_type == "level":
-        StatsModel = LevelStatsGoalie
+        stats_models = {None: LevelStatsGoalie}
         min_games = MIN_GAMES_FOR_LEVEL_STATS
         filter_condition = Division.level_id == aggregation_id
         # Add filter to only include games for the last 5 years
@@ -180,317 +501,284 @@ def aggregate_goalie_stats(
         filter_condition = filter_condition & level_window_filter
     else:
         raise ValueError("Invalid aggregation type")
+    aggregation_windows = [
+        window for window in aggregation_windows if window in stats_models
+    ]
 
-    # Apply aggregation window filter BEFORE deleting, so we don't wipe stats
-    # if the window turns out to be stale (no recent games).
-    if aggregation_window:
-        last_game_datetime_str = (
-            session.query(func.max(func.concat(Game.date, " ", Game.time)))
-            .filter(filter_condition, Game.status_id.in_(FINAL_STATUS_IDS))
-            .scalar()
+    # The same scope as filter_condition, as a mask over the cached games
+    if fact_cache is not None:
+        game_mask = fact_cache.scope_mask(
+            aggregation_type,
+            aggregation_id,
+            since=five_years_ago if aggregation_type == "level" else None,
         )
-        start_datetime = get_start_datetime(last_game_datetime_str, aggregation_window)
-        if start_datetime:
-            game_window_filter = func.cast(
-                func.concat(Game.date, " ", Game.time), sqlalchemy.types.TIMESTAMP
-            ).between(start_datetime, last_game_datetime_str)
-            filter_condition = filter_condition & game_window_filter
+
+    # Resolve the windows BEFORE deleting, so we don't wipe stats
+    # if a window turns out to be stale (no recent games).
+    last_game_datetime_str = None
+    if any(aggregation_windows):
+        if fact_cache is not None:
+            last_game_datetime_str = fact_cache.last_game_datetime_str(
+                game_mask, FINAL_STATUS_IDS
+            )
         else:
-            # No recent games — keep existing stats so the section isn't empty.
-            return
+            last_game_datetime_str = (
+                session.query(func.max(func.concat(Game.date, " ", Game.time)))
+                .filter(filter_condition, Game.status_id.in_(FINAL_STATUS_IDS))
+                .scalar()
+            )
+    # No recent games — stale windows keep their existing stats so the section isn't empty.
+    window_starts = get_window_starts(last_game_datetime_str, aggregation_windows)
+    if not window_starts:
+        return
 
-    # Delete existing items from the stats table (only after confirming we have data to replace)
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).delete()
-    session.commit()
+    if fact_cache is not None:
+        stats_by_window = {}
+        for aggregation_window, start_datetime in window_starts.items():
+            mask = game_mask
+            if start_datetime is not None:
+                mask = fact_cache.window_mask(
+                    game_mask, start_datetime, last_game_datetime_str
+                )
+            stats_by_window[aggregation_window] = build_goalie_stats_from_cache(
+                fact_cache.view(mask),
+                aggregation_id,
+                human_ids_to_filter,
+                min_games,
+                debug_human_id,
+            )
+    else:
+        window_conditions = {
+            aggregation_window: get_game_window_condition(
+                start_datetime, last_game_datetime_str
+            )
+            for aggregation_window, start_datetime in window_starts.items()
+        }
+        stats_by_window = {}
+        if (
+            partials is not None
+            and partials.covers(aggregation_type)
+            and None in window_conditions
+        ):
+            # All-time counters summed from the scope's division partials
+            del window_conditions[None]
+            stats_dict = build_goalie_stats(
+                partials.rollup(aggregation_type, aggregation_id),
+                aggregation_id,
+                human_ids_to_filter,
+                min_games,
+            )
+            resolve_first_last_games(session, stats_dict.values())
+            stats_by_window[None] = stats_dict
+        if window_conditions:
+            stats_by_window.update(
+                query_goalie_window_stats(
+                    session,
+                    aggregation_id,
+                    filter_condition,
+                    window_conditions,
+                    human_ids_to_filter,
+                    min_games,
+                    debug_human_id,
+                )
+            )
 
-    # Aggregate games played, goals allowed, and shots faced for each goalie using GoalieSaves table
-    # Filter games by status upfront for performance (avoid CASE statements)
-    # Only count games with these statuses: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-    query = (
-        session.query(
-            GoalieSaves.goalie_id.label("human_id"),
-            func.count(GoalieSaves.game_id).label("games_played"),
-            func.count(GoalieSaves.game_id).label(
-                "games_participated"
-            ),  # Same as games_played after filtering
-            func.count(GoalieSaves.game_id).label(
-                "games_with_stats"
-            ),  # Same as games_played after filtering
-            func.sum(GoalieSaves.goals_allowed).label("goals_allowed"),
-            func.sum(GoalieSaves.shots_against).label("shots_faced"),
-            func.array_agg(GoalieSaves.game_id).label("game_ids"),
+    for aggregation_window, stats_dict in stats_by_window.items():
+        StatsModel = stats_models[aggregation_window]
+        # The window's existing rows are replaced by writer.commit(), all
+        # windows in one transaction
+        writer = StatsModel.bulk_writer(session, aggregation_id, aggregation_start_time)
+
+        # Compute win_percentage
+        for key, stat in stats_dict.items():
+            total_decisions = stat["wins"] + stat["losses"] + stat["ot_losses"] + stat["ties"]
+            if total_decisions > 0:
+                stat["win_percentage"] = stat["wins"] / total_decisions
+
+        # Calculate total_in_rank
+        total_in_rank = len(stats_dict)
+
+        # Assign ranks within each level
+        assign_rank_columns(
+            stats_dict,
+            [
+                "games_played",
+                "games_participated",  # Rank by total participation
+                "games_with_stats",  # Rank by games with full stats
+                "shots_faced",
+                "save_percentage",
+                "wins",
+                "shutouts",
+                "win_percentage",
+            ],
+            ascending_fields=["goals_allowed", "goals_allowed_per_game", "losses", "ot_losses"],
         )
-        .join(Game, GoalieSaves.game_id == Game.id)
-        .filter(
-            Game.status_id.in_(PARTICIPATED_STATUS_IDS)
-        )
-        .join(Division, Game.division_id == Division.id)
-        .filter(filter_condition)
-    )
-
-    # Filter for specific human_id if provided
-    if debug_human_id:
-        query = query.filter(GoalieSaves.goalie_id == debug_human_id)
-
-    goalie_stats = query.group_by(GoalieSaves.goalie_id).all()
 
-    # Combine the results
-    stats_dict = {}
-    for stat in goalie_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_played": 0,  # DEPRECATED - for backward compatibility
-                "games_participated": 0,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-                "games_with_stats": 0,  # Games with full stats: FINAL, FINAL_SO only
-                "goals_allowed": 0,
-                "shots_faced": 0,
-                "goals_allowed_per_game": 0.0,
-                "save_percentage": 0.0,
-                "wins": 0,
-                "losses": 0,
-                "ties": 0,
-                "ot_losses": 0,
-                "shutouts": 0,
-                "win_percentage": 0.0,
-                "game_ids": [],
-                "first_game_id": None,
-                "last_game_id": None,
-            }
-        stats_dict[key]["games_played"] += stat.games_played
-        stats_dict[key]["games_participated"] += stat.games_participated
-        stats_dict[key]["games_with_stats"] += stat.games_with_stats
-        stats_dict[key]["goals_allowed"] += (
-            stat.goals_allowed if stat.goals_allowed is not None else 0
+        # Calculate and insert percentile marker records
+        insert_percentile_markers_goalie(
+            session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel
         )
-        stats_dict[key]["shots_faced"] += (
-            stat.shots_faced if stat.shots_faced is not None else 0
-        )
-        stats_dict[key]["game_ids"].extend(stat.game_ids)
-
-    # Filter out entries with games_played less than min_games
-    stats_dict = {
-        key: value
-        for key, value in stats_dict.items()
-        if value["games_played"] >= min_games
-    }
-
-    # Calculate per game stats (using games_with_stats as denominator for accuracy)
-    for key, stat in stats_dict.items():
-        if stat["games_with_stats"] > 0:
-            stat["goals_allowed_per_game"] = (
-                stat["goals_allowed"] / stat["games_with_stats"]
+
+        # Debug output for specific human
+        if debug_human_id:
+            if any(key[1] == debug_human_id for key in stats_dict):
+                human = session.query(Human).filter(Human.id == debug_human_id).first()
+                human_name = f"{human.first_name} {human.last_name}" if human else "Unknown"
+                print(
+                    f"For Human {debug_human_id} ({human_name}) for {aggregation_type} {aggregation_id} ({aggregation_name}) , total_in_rank {total_in_rank} and window {aggregation_window}:"
+                )
+                for key, stat in stats_dict.items():
+                    if key[1] == debug_human_id:
+                        for k, v in stat.items():
+                            print(f"{k}: {v}")
+
+        # Insert aggregated stats into the appropriate table with progress output
+        for key, stat in stats_dict.items():
+            human_id = key[1]
+            goals_allowed_per_game = (
+                stat["goals_allowed"] / stat["games_played"]
+                if stat["games_played"] > 0
+                else 0.0
             )
-            stat["save_percentage"] = (
+            save_percentage = (
                 (stat["shots_faced"] - stat["goals_allowed"]) / stat["shots_faced"]
                 if stat["shots_faced"] > 0
                 else 0.0
             )
+            goalie_stat = StatsModel(
+                aggregation_id=aggregation_id,
+                human_id=human_id,
+                games_played=stat[
+                    "games_played"
+                ],  # DEPRECATED - for backward compatibility
+                games_participated=stat[
+                    "games_participated"
+                ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+                games_participated_rank=stat["games_participated_rank"],
+                games_with_stats=stat[
+                    "games_with_stats"
+                ],  # Games with full stats: FINAL, FINAL_SO only
+                games_with_stats_rank=stat["games_with_stats_rank"],
+                goals_allowed=stat["goals_allowed"],
+                shots_faced=stat["shots_faced"],
+                goals_allowed_per_game=goals_allowed_per_game,
+                save_percentage=save_percentage,
+                wins=stat["wins"],
+                wins_rank=stat["wins_rank"],
+                losses=stat["losses"],
+                losses_rank=stat["losses_rank"],
+                ties=stat["ties"],
+                ot_losses=stat["ot_losses"],
+                ot_losses_rank=stat["ot_losses_rank"],
+                shutouts=stat["shutouts"],
+                shutouts_rank=stat["shutouts_rank"],
+                win_percentage=stat["win_percentage"],
+                win_percentage_rank=stat["win_percentage_rank"],
+                games_played_rank=stat["games_played_rank"],
+                goals_allowed_rank=stat["goals_allowed_rank"],
+                shots_faced_rank=stat["shots_faced_rank"],
+                goals_allowed_per_game_rank=stat["goals_allowed_per_game_rank"],
+                save_percentage_rank=stat["save_percentage_rank"],
+                total_in_rank=total_in_rank,
+                first_game_id=stat["first_game_id"],
+                last_game_id=stat["last_game_id"],
+            )
+            writer.add(goalie_stat)
 
-    # Ensure all keys have valid human_id values
-    stats_dict = {key: value for key, value in stats_dict.items() if key[1] is not None}
-
-    # Compute win/loss/tie/ot_loss/shutout counts per goalie
-    # Query per-game data to determine results
-    win_loss_query = (
-        session.query(
-            GoalieSaves.goalie_id.label("human_id"),
-            GoalieSaves.game_id,
-            Game.home_goalie_id,
-            Game.visitor_goalie_id,
-            Game.home_final_score,
-            Game.visitor_final_score,
-            Game.went_to_ot,
-            Game.status_id,
-            GoalieSaves.goals_allowed,
-        )
-        .join(Game, GoalieSaves.game_id == Game.id)
-        .filter(
-            Game.status_id.in_(PARTICIPATED_STATUS_IDS)
-        )
-        .join(Division, Game.division_id == Division.id)
-        .filter(filter_condition)
-    )
-
-    if debug_human_id:
-        win_loss_query = win_loss_query.filter(GoalieSaves.goalie_id == debug_human_id)
-
-    win_loss_results = win_loss_query.all()
-
-    for row in win_loss_results:
-        key = (aggregation_id, row.human_id)
-        if key not in stats_dict:
-            continue
-
-        if row.home_final_score is None or row.visitor_final_score is None:
-            continue
-
-        is_home = (row.human_id == row.home_goalie_id)
-        is_visitor = (row.human_id == row.visitor_goalie_id)
+        # Replace the window's rows, stamping aggregation_completed_at
+        writer.commit(autocommit=False)
 
-        if is_home:
-            my_score, opp_score = row.home_final_score, row.visitor_final_score
-        elif is_visitor:
-            my_score, opp_score = row.visitor_final_score, row.home_final_score
-        else:
-            continue  # Cannot determine side
+    session.commit()
 
-        is_ot = bool(row.went_to_ot) or row.status_id in (StatusId.FINAL_OT, StatusId.FINAL_SO)
 
-        if my_score > opp_score:
-            stats_dict[key]["wins"] += 1
-        elif my_score < opp_score:
-            if is_ot:
-                stats_dict[key]["ot_losses"] += 1
-            else:
-                stats_dict[key]["losses"] += 1
-        else:
-            stats_dict[key]["ties"] += 1
-
-        if row.goals_allowed == 0:
-            stats_dict[key]["shutouts"] += 1
-
-    # Compute win_percentage
-    for key, stat in stats_dict.items():
-        total_decisions = stat["wins"] + stat["losses"] + stat["ot_losses"] + stat["ties"]
-        if total_decisions > 0:
-            stat["win_percentage"] = stat["wins"] / total_decisions
-
-    # Populate first_game_id and last_game_id
-    for key, stat in stats_dict.items():
-        all_game_ids = stat["game_ids"]
-        if all_game_ids:
-            first_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id"] = first_game.id if first_game else None
-            stat["last_game_id"] = last_game.id if last_game else None
-
-    # Calculate total_in_rank
-    total_in_rank = len(stats_dict)
-
-    # Assign ranks within each level
-    assign_ranks(stats_dict, "games_played")
-    assign_ranks(stats_dict, "games_participated")  # Rank by total participation
-    assign_ranks(stats_dict, "games_with_stats")  # Rank by games with full stats
-    assign_ranks(stats_dict, "goals_allowed", reverse_rank=True)
-    assign_ranks(stats_dict, "shots_faced")
-    assign_ranks(stats_dict, "goals_allowed_per_game", reverse_rank=True)
-    assign_ranks(stats_dict, "save_percentage")
-    assign_ranks(stats_dict, "wins")
-    assign_ranks(stats_dict, "losses", reverse_rank=True)
-    assign_ranks(stats_dict, "ot_losses", reverse_rank=True)
-    assign_ranks(stats_dict, "shutouts")
-    assign_ranks(stats_dict, "win_percentage")
-
-    # Calculate and insert percentile marker records
-    insert_percentile_markers_goalie(
-        session, stats_dict, aggregation_id, total_in_rank, StatsModel
+def aggregate_goalie_stats(
+    session,
+    aggregation_type,
+    aggregation_id,
+    debug_human_id=None,
+    aggregation_window=None,
+    fact_cache=None,
+):
+    """Aggregate a single window of a goalie stats scope (see aggregate_goalie_scope)."""
+    aggregate_goalie_scope(
+        session,
+        aggregation_type,
+        aggregation_id,
+        debug_human_id=debug_human_id,
+        aggregation_windows=(aggregation_window,),
+        fact_cache=fact_cache,
     )
 
-    # Debug output for specific human
-    if debug_human_id:
-        if any(key[1] == debug_human_id for key in stats_dict):
-            human = session.query(Human).filter(Human.id == debug_human_id).first()
-            human_name = f"{human.first_name} {human.last_name}" if human else "Unknown"
-            print(
-                f"For Human {debug_human_id} ({human_name}) for {aggregation_type} {aggregation_id} ({aggregation_name}) , total_in_rank {total_in_rank} and window {aggregation_window}:"
-            )
-            for key, stat in stats_dict.items():
-                if key[1] == debug_human_id:
-                    for k, v in stat.items():
-                        print(f"{k}: {v}")
-
-    # Insert aggregated stats into the appropriate table with progress output
-    batch_size = 1000
-    for i, (key, stat) in enumerate(stats_dict.items(), 1):
-        aggregation_id, human_id = key
-        goals_allowed_per_game = (
-            stat["goals_allowed"] / stat["games_played"]
-            if stat["games_played"] > 0
-            else 0.0
-        )
-        save_percentage = (
-            (stat["shots_faced"] - stat["goals_allowed"]) / stat["shots_faced"]
-            if stat["shots_faced"] > 0
-            else 0.0
-        )
-        goalie_stat = StatsModel(
-            aggregation_id=aggregation_id,
-            human_id=human_id,
-            games_played=stat[
-                "games_played"
-            ],  # DEPRECATED - for backward compatibility
-            games_participated=stat[
-                "games_participated"
-            ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-            games_participated_rank=stat["games_participated_rank"],
-            games_with_stats=stat[
-                "games_with_stats"
-            ],  # Games with full stats: FINAL, FINAL_SO only
-            games_with_stats_rank=stat["games_with_stats_rank"],
-            goals_allowed=stat["goals_allowed"],
-            shots_faced=stat["shots_faced"],
-            goals_allowed_per_game=goals_allowed_per_game,
-            save_percentage=save_percentage,
-            wins=stat["wins"],
-            wins_rank=stat["wins_rank"],
-            losses=stat["losses"],
-            losses_rank=stat["losses_rank"],
-            ties=stat["ties"],
-            ot_losses=stat["ot_losses"],
-            ot_losses_rank=stat["ot_losses_rank"],
-            shutouts=stat["shutouts"],
-            shutouts_rank=stat["shutouts_rank"],
-            win_percentage=stat["win_percentage"],
-            win_percentage_rank=stat["win_percentage_rank"],
-            games_played_rank=stat["games_played_rank"],
-            goals_allowed_rank=stat["goals_allowed_rank"],
-            shots_faced_rank=stat["shots_faced_rank"],
-            goals_allowed_per_game_rank=stat["goals_allowed_per_game_rank"],
-            save_percentage_rank=stat["save_percentage_rank"],
-            total_in_rank=total_in_rank,
-            first_game_id=stat["first_game_id"],
-            last_game_id=stat["last_game_id"],
-            aggregation_started_at=aggregation_start_time,
-        )
-        session.add(goalie_stat)
-        # Commit in batches
-        if i % batch_size == 0:
-            session.commit()
-    session.commit()
 
-    # Update all records with completion timestamp
-    aggregation_end_time = datetime.utcnow()
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).update({StatsModel.aggregation_completed_at: aggregation_end_time})
-    session.commit()
+def aggregate_goalie_division(
+    session, division_id, debug_human_id=None, use_fact_cache=False
+):
+    """Aggregate all-time, weekly and daily goalie stats for one division."""
+    fact_cache = get_game_fact_cache(session) if use_fact_cache else None
+    aggregate_goalie_scope(
+        session,
+        aggregation_type="division",
+        aggregation_id=division_id,
+        debug_human_id=debug_human_id,
+        fact_cache=fact_cache,
+    )
 
 
-def run_aggregate_goalie_stats():
+def run_aggregate_goalie_stats(
+    workers=DIVISION_AGGREGATION_WORKERS,
+    use_fact_cache=USE_GAME_FACT_CACHE,
+    rollup=ROLLUP_SCOPE_STATS,
+):
+    """
+    Aggregate goalie stats for every division, organization and level.
+
+    Args:
+        workers: Number of processes aggregating divisions concurrently
+            (1 = serial). Org and level scopes run once all divisions are done.
+        use_fact_cache: Compute the stats from an in-memory GameFactCache
+            instead of querying the database for every scope.
+        rollup: Without the fact cache, roll all-time org stats up from
+            per-division partials.
+    """
     session = create_session("boss")
     human_id_to_debug = None
+    if human_id_to_debug is not None:
+        workers = 1
+
+    # Loaded once here; the division workers memory-map a saved copy
+    fact_cache = load_game_fact_cache(session) if use_fact_cache else None
 
     # Get all org_id present in the Organization table
     org_ids = session.query(Organization.id).all()
     org_ids = [org_id[0] for org_id in org_ids]
 
+    # Divisions are independent of each other, so fan them out first
+    division_ids = []
+    for org_id in org_ids:
+        division_ids.extend(get_all_division_ids_for_org(session, org_id))
+    run_division_aggregations(
+        session,
+        aggregate_goalie_division,
+        division_ids,
+        workers=workers,
+        description=(
+            f"Processing {len(division_ids)} divisions"
+            if human_id_to_debug is None
+            else None
+        ),
+        debug_human_id=human_id_to_debug,
+        use_fact_cache=use_fact_cache,
+        fact_cache=fact_cache,
+    )
+
+    # Org counters come from one pass over all games
+    partials = (
+        query_goalie_partials(session)
+        if rollup and fact_cache is None and human_id_to_debug is None
+        else None
+    )
+
     for org_id in org_ids:
-        division_ids = get_all_division_ids_for_org(session, org_id)
         org_name = (
             session.query(Organization.organization_name)
             .filter(Organization.id == org_id)
@@ -498,107 +786,21 @@ def run_aggregate_goalie_stats():
             or f"org_id {org_id}"
         )
 
-        if human_id_to_debug is None and division_ids:
-            # Process divisions with progress tracking
-            progress = create_progress_tracker(
-                len(division_ids),
-                f"Processing {len(division_ids)} divisions for {org_name}",
-            )
-            for i, division_id in enumerate(division_ids):
-                aggregate_goalie_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                )
-                aggregate_goalie_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Weekly",
-                )
-                aggregate_goalie_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Daily",
-                )
-                progress.update(i + 1)
-        else:
-            # Debug mode or no divisions - process without progress tracking
-            for division_id in division_ids:
-                aggregate_goalie_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                )
-                aggregate_goalie_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Weekly",
-                )
-                aggregate_goalie_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Daily",
-                )
-
-        # Process org-level stats with progress tracking
+        # Process org-level stats (all windows in one pass) with progress tracking
         if human_id_to_debug is None:
             org_progress = create_progress_tracker(
-                3, f"Processing org-level stats for {org_name}"
-            )
-            aggregate_goalie_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
+                1, f"Processing org-level stats for {org_name}"
             )
+        aggregate_goalie_scope(
+            session,
+            aggregation_type="org",
+            aggregation_id=org_id,
+            debug_human_id=human_id_to_debug,
+            fact_cache=fact_cache,
+            partials=partials,
+        )
+        if human_id_to_debug is None:
             org_progress.update(1)
-            aggregate_goalie_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Weekly",
-            )
-            org_progress.update(2)
-            aggregate_goalie_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Daily",
-            )
-            org_progress.update(3)
-        else:
-            aggregate_goalie_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-            )
-            aggregate_goalie_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Weekly",
-            )
-            aggregate_goalie_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Daily",
-            )
 
     # Aggregate by level
     level_ids = session.query(Division.level_id).distinct().all()
@@ -615,6 +817,7 @@ def run_aggregate_goalie_stats():
                 aggregation_type="level",
                 aggregation_id=level_id,
                 debug_human_id=human_id_to_debug,
+                fact_cache=fact_cache,
             )
             level_progress.update(i + 1)
     else:
@@ -625,6 +828,7 @@ def run_aggregate_goalie_stats():
                 aggregation_type="level",
                 aggregation_id=level_id,
                 debug_human_id=human_id_to_debug,
+                fact_cache=fact_cache,
             )
 
 
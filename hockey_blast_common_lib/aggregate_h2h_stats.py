@@ -1,262 +1,563 @@
+import argparse
 import os
 import sys
+import time
 from datetime import datetime
 
 # Add the package directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import types
-from sqlalchemy.sql import func
+from sqlalchemy import text
 
 from hockey_blast_common_lib.db_connection import create_session
 from hockey_blast_common_lib.h2h_models import H2HStats, H2HStatsMeta
-from hockey_blast_common_lib.models import Game, GameRoster, Goal, Penalty
-from hockey_blast_common_lib.progress_utils import create_progress_tracker
+from hockey_blast_common_lib.options import (
+    H2H_COLD_PAIR_DAYS,
+    H2H_COLD_PAIR_MAX_GAMES,
+    H2H_MIN_GAMES_TOGETHER,
+    PAIR_STATS_SHARDS,
+)
+from hockey_blast_common_lib.pair_stats_ledger import (
+    create_rebuild_table,
+    drop_rebuild_table,
+    full_rebuild_reason,
+    get_pair_stats_game_ids,
+    has_processed_games,
+    record_processed_games,
+    reset_processed_games,
+    swap_rebuild_table,
+)
+from hockey_blast_common_lib.parallel_utils import run_shards
 
 # Max games to process (set to None to process all)
 MAX_GAMES_TO_PROCESS = None  # Set to None to process all games
 
+# New games merged into h2h_stats per INSERT ... ON CONFLICT statement
+# (and transaction) in incremental runs
+H2H_INCREMENTAL_BATCH_GAMES = 500
 
-def aggregate_h2h_stats():
-    session = create_session("boss")
-    meta = None  # session.query(H2HStatsMeta).order_by(H2HStatsMeta.id.desc()).first()
-    h2h_stats_dict = {}  # (h1, h2) -> H2HStats instance
-    if (
-        meta is None
-        or meta.last_run_timestamp is None
-        or meta.last_processed_game_id is None
-    ):
-        # Full run: delete all existing stats and process all games
-        session.query(H2HStats).delete()
-        session.commit()
-        games_query = session.query(Game).order_by(Game.date, Game.time, Game.id)
-        print(
-            "No previous run found, deleted all existing H2H stats, processing all games..."
+H2H_TABLE = H2HStats.__tablename__
+
+# Everyone present in a game: rostered players plus the goalies and referees
+# recorded on the game itself, one row per (game, human). A human's team is
+# the roster team (NULL for referees and unrostered goalies); won/lost/tie
+# follow the old _is_win/_is_loss/_is_tie helpers (missing scores count as 0,
+# a tie needs both scores).
+H2H_PARTICIPANTS_CTE = """
+    selected_games AS (
+        SELECT id, home_team_id, visitor_team_id,
+               home_final_score, visitor_final_score,
+               home_goalie_id, visitor_goalie_id, referee_1_id, referee_2_id,
+               (home_final_score IS NOT NULL AND visitor_final_score IS NOT NULL
+                AND home_final_score = visitor_final_score) AS is_tie
+        FROM games
+        {game_filter}
+    ),
+    appearances AS (
+        SELECT r.game_id, r.human_id, r.team_id, r.role
+        FROM game_rosters r
+        JOIN selected_games g ON g.id = r.game_id
+        UNION ALL
+        SELECT g.id, x.human_id, NULL, x.role
+        FROM selected_games g
+        CROSS JOIN LATERAL (
+            VALUES (g.home_goalie_id, 'G'), (g.visitor_goalie_id, 'G'),
+                   (g.referee_1_id, 'R'), (g.referee_2_id, 'R')
+        ) AS x (human_id, role)
+        WHERE x.human_id IS NOT NULL
+    ),
+    penalty_counts AS (
+        SELECT p.game_id, p.penalized_player_id AS human_id,
+               COUNT(*) AS penalties,
+               COUNT(*) FILTER (WHERE p.penalty_minutes LIKE '%GM%') AS gm_penalties
+        FROM penalties p
+        JOIN selected_games g ON g.id = p.game_id
+        GROUP BY p.game_id, p.penalized_player_id
+    ),
+    participants AS (
+        SELECT a.game_id, a.human_id, a.team_id,
+               a.team_id IS NOT NULL AND (
+                   (a.team_id = g.home_team_id
+                    AND COALESCE(g.home_final_score, 0) > COALESCE(g.visitor_final_score, 0))
+                   OR (a.team_id = g.visitor_team_id
+                       AND COALESCE(g.visitor_final_score, 0) > COALESCE(g.home_final_score, 0))
+               ) AS won,
+               a.team_id IS NOT NULL AND (
+                   (a.team_id = g.home_team_id
+                    AND COALESCE(g.home_final_score, 0) < COALESCE(g.visitor_final_score, 0))
+                   OR (a.team_id = g.visitor_team_id
+                       AND COALESCE(g.visitor_final_score, 0) < COALESCE(g.home_final_score, 0))
+               ) AS lost,
+               g.is_tie, a.is_goalie, a.is_ref,
+               COALESCE(pc.penalties, 0) AS penalties,
+               COALESCE(pc.gm_penalties, 0) AS gm_penalties
+        FROM (
+            SELECT game_id, human_id, MAX(team_id) AS team_id,
+                   COALESCE(BOOL_OR(role = 'G'), FALSE) AS is_goalie,
+                   COALESCE(BOOL_OR(role = 'R'), FALSE) AS is_ref
+            FROM appearances
+            GROUP BY game_id, human_id
+        ) a
+        JOIN selected_games g ON g.id = a.game_id
+        LEFT JOIN penalty_counts pc
+               ON pc.game_id = a.game_id AND pc.human_id = a.human_id
+    ),
+    assisted_goals AS (
+        -- Goals per (game, scorer, assistant); a goal counts once per assistant
+        SELECT gl.game_id, gl.goal_scorer_id AS scorer_id, a.assistant_id, COUNT(*) AS goals
+        FROM goals gl
+        JOIN selected_games g ON g.id = gl.game_id
+        CROSS JOIN LATERAL (
+            SELECT DISTINCT assistant_id
+            FROM unnest(ARRAY[gl.assist_1_id, gl.assist_2_id]) AS assistant_id
+            WHERE assistant_id IS NOT NULL
+        ) a
+        GROUP BY gl.game_id, gl.goal_scorer_id, a.assistant_id
+    ),
+    goalie_games AS (
+        -- The game's goalies with the team they played for and their saves
+        SELECT g.id AS game_id, x.goalie_id, x.team_id,
+               COALESCE(gs.shots_against, 0) AS shots_faced,
+               COALESCE(gs.goals_allowed, 0) AS goals_allowed
+        FROM selected_games g
+        CROSS JOIN LATERAL (
+            VALUES (g.home_goalie_id, g.home_team_id), (g.visitor_goalie_id, g.visitor_team_id)
+        ) AS x (goalie_id, team_id)
+        LEFT JOIN goalie_saves gs ON gs.game_id = g.id AND gs.goalie_id = x.goalie_id
+        WHERE x.goalie_id IS NOT NULL
+    ),
+    goalie_scorer_goals AS (
+        SELECT gl.game_id, gl.goalie_id, gl.goal_scorer_id AS scorer_id, COUNT(*) AS goals
+        FROM goals gl
+        JOIN selected_games g ON g.id = gl.game_id
+        WHERE gl.goalie_id IS NOT NULL
+        GROUP BY gl.game_id, gl.goalie_id, gl.goal_scorer_id
+    ),
+    shootout_attempts AS (
+        SELECT so.game_id, so.shooter_id, so.goalie_id,
+               COUNT(*) AS attempts, COUNT(*) FILTER (WHERE so.has_scored) AS goals
+        FROM shootout so
+        JOIN selected_games g ON g.id = so.game_id
+        GROUP BY so.game_id, so.shooter_id, so.goalie_id
+    ),
+    game_penalties AS (
+        SELECT game_id, SUM(penalties) AS penalties, SUM(gm_penalties) AS gm_penalties
+        FROM penalty_counts
+        GROUP BY game_id
+    )
+"""
+
+# H2H counters per pair of humans present in the same game (human1_id < human2_id)
+H2H_PAIR_COLUMNS = {
+    "first_game_id": "MIN(p1.game_id)",
+    "last_game_id": "MAX(p1.game_id)",
+    "games_together": "COUNT(*)",
+    "games_against": "COUNT(*) FILTER (WHERE p1.team_id <> p2.team_id)",
+    "games_tied_together": "COUNT(*) FILTER (WHERE p1.team_id = p2.team_id AND p1.is_tie)",
+    "games_tied_against": "COUNT(*) FILTER (WHERE p1.team_id <> p2.team_id AND p1.is_tie)",
+    "wins_together": "COUNT(*) FILTER (WHERE p1.team_id = p2.team_id AND p1.won)",
+    "losses_together": "COUNT(*) FILTER (WHERE p1.team_id = p2.team_id AND p1.lost)",
+    "h1_wins_vs_h2": "COUNT(*) FILTER (WHERE p1.team_id <> p2.team_id AND p1.won)",
+    "h2_wins_vs_h1": "COUNT(*) FILTER (WHERE p1.team_id <> p2.team_id AND p2.won)",
+    "games_h1_goalie": "COUNT(*) FILTER (WHERE p1.is_goalie)",
+    "games_h2_goalie": "COUNT(*) FILTER (WHERE p2.is_goalie)",
+    "games_h1_ref": "COUNT(*) FILTER (WHERE p1.is_ref)",
+    "games_h2_ref": "COUNT(*) FILTER (WHERE p2.is_ref)",
+    "games_both_referees": "COUNT(*) FILTER (WHERE p1.is_ref AND p2.is_ref)",
+    "goals_h1_when_together": "COALESCE(SUM(g12.goals), 0)",
+    "goals_h2_when_together": "COALESCE(SUM(g21.goals), 0)",
+    "penalties_h1_when_together": "SUM(p1.penalties)",
+    "penalties_h2_when_together": "SUM(p2.penalties)",
+    "gm_penalties_h1_when_together": "SUM(p1.gm_penalties)",
+    "gm_penalties_h2_when_together": "SUM(p2.gm_penalties)",
+    # Goalie vs skater: the other one skated for the team the goalie faced
+    "h1_goalie_h2_scorer_goals": "COALESCE(SUM(gs12.goals), 0)",
+    "h2_goalie_h1_scorer_goals": "COALESCE(SUM(gs21.goals), 0)",
+    "shots_faced_h1_goalie_vs_h2": "COALESCE(SUM(gg1.shots_faced) FILTER (WHERE {h2_faced_h1}), 0)",
+    "shots_faced_h2_goalie_vs_h1": "COALESCE(SUM(gg2.shots_faced) FILTER (WHERE {h1_faced_h2}), 0)",
+    "goals_allowed_h1_goalie_vs_h2": "COALESCE(SUM(gg1.goals_allowed) FILTER (WHERE {h2_faced_h1}), 0)",
+    "goals_allowed_h2_goalie_vs_h1": "COALESCE(SUM(gg2.goals_allowed) FILTER (WHERE {h1_faced_h2}), 0)",
+    "save_percentage_h1_goalie_vs_h2": (
+        "COALESCE((SUM(gg1.shots_faced - gg1.goals_allowed) FILTER (WHERE {h2_faced_h1}))::float"
+        " / NULLIF(SUM(gg1.shots_faced) FILTER (WHERE {h2_faced_h1}), 0), 0.0)"
+    ),
+    "save_percentage_h2_goalie_vs_h1": (
+        "COALESCE((SUM(gg2.shots_faced - gg2.goals_allowed) FILTER (WHERE {h1_faced_h2}))::float"
+        " / NULLIF(SUM(gg2.shots_faced) FILTER (WHERE {h1_faced_h2}), 0), 0.0)"
+    ),
+    # Referee vs player: penalties carry no referee, so every penalty on the
+    # player in a game the other one refereed counts
+    "h1_ref_h2_player_games": "COUNT(*) FILTER (WHERE p1.is_ref AND p2.team_id IS NOT NULL)",
+    "h2_ref_h1_player_games": "COUNT(*) FILTER (WHERE p2.is_ref AND p1.team_id IS NOT NULL)",
+    "h1_ref_penalties_on_h2": "COALESCE(SUM(p2.penalties) FILTER (WHERE p1.is_ref), 0)",
+    "h2_ref_penalties_on_h1": "COALESCE(SUM(p1.penalties) FILTER (WHERE p2.is_ref), 0)",
+    "h1_ref_gm_penalties_on_h2": "COALESCE(SUM(p2.gm_penalties) FILTER (WHERE p1.is_ref), 0)",
+    "h2_ref_gm_penalties_on_h1": "COALESCE(SUM(p1.gm_penalties) FILTER (WHERE p2.is_ref), 0)",
+    "penalties_given_both_refs": (
+        "COALESCE(SUM(gp.penalties) FILTER (WHERE p1.is_ref AND p2.is_ref), 0)"
+    ),
+    "gm_penalties_given_both_refs": (
+        "COALESCE(SUM(gp.gm_penalties) FILTER (WHERE p1.is_ref AND p2.is_ref), 0)"
+    ),
+    # Shootouts
+    "h1_shootout_attempts_vs_h2_goalie": "COALESCE(SUM(so12.attempts), 0)",
+    "h1_shootout_goals_vs_h2_goalie": "COALESCE(SUM(so12.goals), 0)",
+    "h2_shootout_attempts_vs_h1_goalie": "COALESCE(SUM(so21.attempts), 0)",
+    "h2_shootout_goals_vs_h1_goalie": "COALESCE(SUM(so21.goals), 0)",
+}
+
+# Conditions used in H2H_PAIR_COLUMNS: the second human skated against the
+# first one's goalie (and the other way around)
+H2H_PAIR_CONDITIONS = {
+    "h2_faced_h1": "p2.team_id <> gg1.team_id AND NOT p2.is_goalie",
+    "h1_faced_h2": "p1.team_id <> gg2.team_id AND NOT p1.is_goalie",
+}
+
+H2H_PAIRS_QUERY = """
+    WITH {participants}
+    SELECT p1.human_id AS human1_id, p2.human_id AS human2_id, {columns}
+    FROM participants p1
+    JOIN participants p2
+      ON p2.game_id = p1.game_id AND p2.human_id > p1.human_id{pair_filter}
+    LEFT JOIN assisted_goals g12
+      ON g12.game_id = p1.game_id AND g12.scorer_id = p1.human_id
+     AND g12.assistant_id = p2.human_id
+    LEFT JOIN assisted_goals g21
+      ON g21.game_id = p1.game_id AND g21.scorer_id = p2.human_id
+     AND g21.assistant_id = p1.human_id
+    LEFT JOIN goalie_games gg1 ON gg1.game_id = p1.game_id AND gg1.goalie_id = p1.human_id
+    LEFT JOIN goalie_games gg2 ON gg2.game_id = p1.game_id AND gg2.goalie_id = p2.human_id
+    LEFT JOIN goalie_scorer_goals gs12
+      ON gs12.game_id = p1.game_id AND gs12.goalie_id = p1.human_id
+     AND gs12.scorer_id = p2.human_id
+    LEFT JOIN goalie_scorer_goals gs21
+      ON gs21.game_id = p1.game_id AND gs21.goalie_id = p2.human_id
+     AND gs21.scorer_id = p1.human_id
+    LEFT JOIN shootout_attempts so12
+      ON so12.game_id = p1.game_id AND so12.shooter_id = p1.human_id
+     AND so12.goalie_id = p2.human_id
+    LEFT JOIN shootout_attempts so21
+      ON so21.game_id = p1.game_id AND so21.shooter_id = p2.human_id
+     AND so21.goalie_id = p1.human_id
+    LEFT JOIN game_penalties gp ON gp.game_id = p1.game_id
+    GROUP BY p1.human_id, p2.human_id
+    {having}
+"""
+
+
+def h2h_pairs_query(game_filter="", pair_filter="", having=""):
+    """
+    SELECT returning one h2h_stats row (without id) per pair of humans who
+    were present in the same game, over the games matched by game_filter.
+    pair_filter is appended to the p1/p2 join condition (e.g. " AND ..."),
+    having (e.g. "HAVING ...") is applied to the grouped pairs.
+
+    Columns not computed here get their model default (0).
+    """
+    expressions = []
+    for column in H2HStats.__table__.columns:
+        if column.primary_key or column.name in ("human1_id", "human2_id"):
+            continue
+        if column.name in H2H_PAIR_COLUMNS:
+            expression = H2H_PAIR_COLUMNS[column.name].format(**H2H_PAIR_CONDITIONS)
+            expressions.append(f"{expression} AS {column.name}")
+        else:
+            expressions.append(f"{column.default.arg!r} AS {column.name}")
+    return H2H_PAIRS_QUERY.format(
+        participants=H2H_PARTICIPANTS_CTE.format(game_filter=game_filter),
+        pair_filter=pair_filter,
+        having=having,
+        columns=",\n           ".join(expressions),
+    )
+
+
+# Save % recomputed from the merged shots and goals allowed
+H2H_MERGED_SAVE_PERCENTAGE = (
+    "COALESCE((h2h_stats.{shots} + EXCLUDED.{shots} - h2h_stats.{goals} - EXCLUDED.{goals})::float"
+    " / NULLIF(h2h_stats.{shots} + EXCLUDED.{shots}, 0), 0.0)"
+)
+
+# How a pair's stored value and its value over new games (EXCLUDED) combine;
+# every other column is a counter and is summed
+H2H_MERGE_COLUMNS = {
+    "first_game_id": "LEAST(h2h_stats.first_game_id, EXCLUDED.first_game_id)",
+    "last_game_id": "GREATEST(h2h_stats.last_game_id, EXCLUDED.last_game_id)",
+    "save_percentage_h1_goalie_vs_h2": H2H_MERGED_SAVE_PERCENTAGE.format(
+        shots="shots_faced_h1_goalie_vs_h2", goals="goals_allowed_h1_goalie_vs_h2"
+    ),
+    "save_percentage_h2_goalie_vs_h1": H2H_MERGED_SAVE_PERCENTAGE.format(
+        shots="shots_faced_h2_goalie_vs_h1", goals="goals_allowed_h2_goalie_vs_h1"
+    ),
+}
+
+
+def h2h_column_list():
+    return ", ".join(
+        column.name for column in H2HStats.__table__.columns if not column.primary_key
+    )
+
+
+def h2h_merge_clause():
+    """ON CONFLICT clause adding a batch's pair counters to the stored ones."""
+    assignments = []
+    for column in H2HStats.__table__.columns:
+        if column.primary_key or column.name in ("human1_id", "human2_id"):
+            continue
+        merged = H2H_MERGE_COLUMNS.get(
+            column.name, f"h2h_stats.{column.name} + EXCLUDED.{column.name}"
         )
-    else:
-        # Incremental: only process games after last processed
-        # Load all existing stats into memory
-        for stat in session.query(H2HStats).all():
-            h2h_stats_dict[(stat.human1_id, stat.human2_id)] = stat
-        last_game = (
-            session.query(Game).filter(Game.id == meta.last_processed_game_id).first()
+        assignments.append(f"{column.name} = {merged}")
+    return "ON CONFLICT (human1_id, human2_id) DO UPDATE SET " + ", ".join(assignments)
+
+
+# Restricts the p1/p2 join to pairs (not) stored in h2h_stats
+H2H_STORED_PAIR_FILTER = """ AND {negate}EXISTS (
+        SELECT 1 FROM h2h_stats h
+        WHERE h.human1_id = p1.human_id AND h.human2_id = p2.human_id
+    )"""
+
+# Every game counted so far plus the new ones
+H2H_HISTORY_GAME_FILTER = """
+    WHERE id = ANY(:game_ids)
+       OR id IN (
+           SELECT game_id FROM pair_stats_processed_games
+           WHERE stats_table = 'h2h_stats'
+       )
+"""
+
+# Both humans took part in one of the new games
+H2H_NEW_GAMES_PAIR_FILTER = """
+      AND p1.human_id IN (SELECT human_id FROM appearances WHERE game_id = ANY(:game_ids))
+      AND p2.human_id IN (SELECT human_id FROM appearances WHERE game_id = ANY(:game_ids))"""
+
+
+def insert_h2h_pairs(
+    session,
+    game_ids,
+    merge=False,
+    shard=0,
+    shards=1,
+    min_games=H2H_MIN_GAMES_TOGETHER,
+    table=H2H_TABLE,
+):
+    """
+    Insert the pair stats of the given games into table (h2h_stats or the
+    rebuild table of a sharded full rebuild), keeping pairs with at least
+    min_games games together. With shards > 1 only pairs whose
+    human1_id % shards == shard are written.
+
+    With merge, the games are new games on top of those in the processed
+    games ledger: stored pairs get the new games' counters added, and pairs
+    that are not stored (new, below min_games so far, or pruned) are
+    computed from their whole history and inserted if they reach min_games.
+
+    Returns the number of pairs written.
+    """
+    params = {
+        "game_ids": game_ids,
+        "shard": shard,
+        "shards": shards,
+        "min_games": min_games,
+    }
+    shard_filter = " AND p1.human_id % :shards = :shard" if shards > 1 else ""
+    min_games_having = "HAVING COUNT(*) >= :min_games" if min_games > 1 else ""
+    columns = h2h_column_list()
+    if not merge:
+        query = h2h_pairs_query(
+            "WHERE id = ANY(:game_ids)", shard_filter, min_games_having
         )
-        if last_game:
-            last_dt = datetime.combine(last_game.date, last_game.time)
-            games_query = (
-                session.query(Game)
-                .filter(
-                    func.cast(func.concat(Game.date, " ", Game.time), types.TIMESTAMP())
-                    > last_dt
-                )
-                .order_by(Game.date, Game.time, Game.id)
-            )
-            print(
-                f"Resuming from game after id {meta.last_processed_game_id} ({last_dt})..."
-            )
-        else:
-            games_query = session.query(Game).order_by(Game.date, Game.time, Game.id)
-            print("Previous game id not found, processing all games...")
-
-    total_games = games_query.count()
-    print(f"Total games to process: {total_games}")
-
-    # Create progress tracker
-    progress = create_progress_tracker(total_games, "Processing H2H stats")
-    processed = 0
-    latest_game_id = None
-    for game in games_query:
-        if MAX_GAMES_TO_PROCESS is not None and processed >= MAX_GAMES_TO_PROCESS:
-            break
-        # --- Gather all relevant data for this game ---
-        # Get all GameRoster entries for this game
-        rosters = session.query(GameRoster).filter(GameRoster.game_id == game.id).all()
-        # Map: team_id -> set of human_ids (players)
-        team_to_players = {}
-        human_roles = {}  # human_id -> set of roles in this game
-        for roster in rosters:
-            team_to_players.setdefault(roster.team_id, set()).add(roster.human_id)
-            human_roles.setdefault(roster.human_id, set()).add(roster.role)
-        # Get all human_ids in this game
-        all_humans = set(human_roles.keys())
-        # Add goalies from Game table (home/visitor)
-        if game.home_goalie_id:
-            all_humans.add(game.home_goalie_id)
-            human_roles.setdefault(game.home_goalie_id, set()).add("G")
-        if game.visitor_goalie_id:
-            all_humans.add(game.visitor_goalie_id)
-            human_roles.setdefault(game.visitor_goalie_id, set()).add("G")
-        # Add referees from Game table (NOT from roster!)
-        if game.referee_1_id:
-            all_humans.add(game.referee_1_id)
-            human_roles.setdefault(game.referee_1_id, set()).add("R")
-        if game.referee_2_id:
-            all_humans.add(game.referee_2_id)
-            human_roles.setdefault(game.referee_2_id, set()).add("R")
-        # --- Build all pairs of humans in this game ---
-        all_humans = list(all_humans)
-        for i in range(len(all_humans)):
-            for j in range(i + 1, len(all_humans)):
-                h1, h2 = sorted([all_humans[i], all_humans[j]])
-                key = (h1, h2)
-                h2h = h2h_stats_dict.get(key)
-                if not h2h:
-                    h2h = H2HStats(
-                        human1_id=h1,
-                        human2_id=h2,
-                        first_game_id=game.id,
-                        last_game_id=game.id,
-                        games_together=0,
-                        games_against=0,
-                        games_tied_together=0,
-                        games_tied_against=0,
-                        wins_together=0,
-                        losses_together=0,
-                        h1_wins_vs_h2=0,
-                        h2_wins_vs_h1=0,
-                        games_h1_goalie=0,
-                        games_h2_goalie=0,
-                        games_h1_ref=0,
-                        games_h2_ref=0,
-                        games_both_referees=0,
-                        goals_h1_when_together=0,
-                        goals_h2_when_together=0,
-                        assists_h1_when_together=0,
-                        assists_h2_when_together=0,
-                        penalties_h1_when_together=0,
-                        penalties_h2_when_together=0,
-                        gm_penalties_h1_when_together=0,
-                        gm_penalties_h2_when_together=0,
-                        h1_goalie_h2_scorer_goals=0,
-                        h2_goalie_h1_scorer_goals=0,
-                        shots_faced_h1_goalie_vs_h2=0,
-                        shots_faced_h2_goalie_vs_h1=0,
-                        goals_allowed_h1_goalie_vs_h2=0,
-                        goals_allowed_h2_goalie_vs_h1=0,
-                        save_percentage_h1_goalie_vs_h2=0.0,
-                        save_percentage_h2_goalie_vs_h1=0.0,
-                        h1_ref_h2_player_games=0,
-                        h2_ref_h1_player_games=0,
-                        h1_ref_penalties_on_h2=0,
-                        h2_ref_penalties_on_h1=0,
-                        h1_ref_gm_penalties_on_h2=0,
-                        h2_ref_gm_penalties_on_h1=0,
-                        penalties_given_both_refs=0,
-                        gm_penalties_given_both_refs=0,
-                        h1_shootout_attempts_vs_h2_goalie=0,
-                        h1_shootout_goals_vs_h2_goalie=0,
-                        h2_shootout_attempts_vs_h1_goalie=0,
-                        h2_shootout_goals_vs_h1_goalie=0,
-                    )
-                    h2h_stats_dict[key] = h2h
-                # Update first/last game ids
-                if game.id < h2h.first_game_id:
-                    h2h.first_game_id = game.id
-                if game.id > h2h.last_game_id:
-                    h2h.last_game_id = game.id
-                # --- Determine roles and teams ---
-                h1_roles = human_roles.get(h1, set())
-                h2_roles = human_roles.get(h2, set())
-                h1_team = None
-                h2_team = None
-                for team_id, players in team_to_players.items():
-                    if h1 in players:
-                        h1_team = team_id
-                    if h2 in players:
-                        h2_team = team_id
-                # --- General stats ---
-                h2h.games_together += 1  # Both present in this game
-                if h1_team and h2_team:
-                    if h1_team == h2_team:
-                        h2h.wins_together += int(_is_win(game, h1_team))
-                        h2h.losses_together += int(_is_loss(game, h1_team))
-                        if _is_tie(game):
-                            h2h.games_tied_together += 1
-                    else:
-                        h2h.games_against += 1
-                        if _is_win(game, h1_team):
-                            h2h.h1_wins_vs_h2 += 1
-                        if _is_win(game, h2_team):
-                            h2h.h2_wins_vs_h1 += 1
-                        if _is_tie(game):
-                            h2h.games_tied_against += 1
-                # --- Role-specific stats ---
-                if "G" in h1_roles:
-                    h2h.games_h1_goalie += 1
-                if "G" in h2_roles:
-                    h2h.games_h2_goalie += 1
-                if "R" in h1_roles:
-                    h2h.games_h1_ref += 1
-                if "R" in h2_roles:
-                    h2h.games_h2_ref += 1
-                if "R" in h1_roles and "R" in h2_roles:
-                    h2h.games_both_referees += 1
-                # --- Goals, assists, penalties ---
-                # Goals
-                goals = session.query(Goal).filter(Goal.game_id == game.id).all()
-                for goal in goals:
-                    if goal.goal_scorer_id == h1 and (
-                        goal.assist_1_id == h2 or goal.assist_2_id == h2
-                    ):
-                        h2h.goals_h1_when_together += 1
-                    if goal.goal_scorer_id == h2 and (
-                        goal.assist_1_id == h1 or goal.assist_2_id == h1
-                    ):
-                        h2h.goals_h2_when_together += 1
-                # Penalties
-                penalties = (
-                    session.query(Penalty).filter(Penalty.game_id == game.id).all()
-                )
-                for pen in penalties:
-                    if pen.penalized_player_id == h1:
-                        h2h.penalties_h1_when_together += 1
-                        if pen.penalty_minutes and "GM" in pen.penalty_minutes:
-                            h2h.gm_penalties_h1_when_together += 1
-                    if pen.penalized_player_id == h2:
-                        h2h.penalties_h2_when_together += 1
-                        if pen.penalty_minutes and "GM" in pen.penalty_minutes:
-                            h2h.gm_penalties_h2_when_together += 1
-                # --- TODO: Add more detailed logic for goalie/skater, referee/player, shootouts, etc. ---
-        latest_game_id = game.id
-        processed += 1
-        progress.update(processed)
-    # Commit all stats at once
-    session.query(H2HStats).delete()
-    session.add_all(list(h2h_stats_dict.values()))
-    session.commit()
-    # Save/update meta
-    meta = H2HStatsMeta(
-        last_run_timestamp=datetime.utcnow(), last_processed_game_id=latest_game_id
+        return session.execute(
+            text(f"INSERT INTO {table} ({columns}) {query}"), params
+        ).rowcount
+
+    stored_pairs = h2h_pairs_query(
+        "WHERE id = ANY(:game_ids)",
+        shard_filter + H2H_STORED_PAIR_FILTER.format(negate=""),
+    )
+    pairs_written = session.execute(
+        text(f"INSERT INTO h2h_stats ({columns}) {stored_pairs} {h2h_merge_clause()}"),
+        params,
+    ).rowcount
+    missing_pairs = h2h_pairs_query(
+        H2H_HISTORY_GAME_FILTER,
+        shard_filter
+        + H2H_STORED_PAIR_FILTER.format(negate="NOT ")
+        + H2H_NEW_GAMES_PAIR_FILTER,
+        "HAVING COUNT(*) >= :min_games AND BOOL_OR(p1.game_id = ANY(:game_ids))",
     )
-    session.add(meta)
+    pairs_written += session.execute(
+        text(f"INSERT INTO h2h_stats ({columns}) {missing_pairs}"), params
+    ).rowcount
+    return pairs_written
+
+
+def _insert_h2h_shard(shard, shards, game_ids, min_games, rebuild_table):
+    """Worker entry point: insert and commit one shard of a full rebuild."""
+    session = create_session("boss")
+    try:
+        pairs_written = insert_h2h_pairs(
+            session,
+            game_ids,
+            shard=shard,
+            shards=shards,
+            min_games=min_games,
+            table=rebuild_table,
+        )
+        session.commit()
+    finally:
+        session.close()
+    return pairs_written
+
+
+def prune_cold_h2h_pairs(
+    session, max_games=H2H_COLD_PAIR_MAX_GAMES, inactive_days=H2H_COLD_PAIR_DAYS
+):
+    """
+    Delete pairs with at most max_games games together whose last game is
+    older than inactive_days days. They are still served by
+    h2h_lookup.get_pair_stats, and incremental runs rebuild a pruned pair
+    from its whole history when the two meet again.
+
+    Returns the number of pairs deleted.
+    """
+    deleted = session.execute(
+        text(
+            """
+            DELETE FROM h2h_stats h
+            USING games g
+            WHERE g.id = h.last_game_id
+              AND h.games_together <= :max_games
+              AND g.date < CURRENT_DATE - :inactive_days
+        """
+        ),
+        {"max_games": max_games, "inactive_days": inactive_days},
+    ).rowcount
     session.commit()
-    print("H2H aggregation complete.")
+    return deleted
 
 
-# --- Helper functions for win/loss/tie ---
-def _is_win(game, team_id):
-    if team_id == game.home_team_id:
-        return (game.home_final_score or 0) > (game.visitor_final_score or 0)
-    if team_id == game.visitor_team_id:
-        return (game.visitor_final_score or 0) > (game.home_final_score or 0)
-    return False
+def aggregate_h2h_stats(
+    full=False, shards=PAIR_STATS_SHARDS, min_games=H2H_MIN_GAMES_TOGETHER, prune=False
+):
+    """
+    Update h2h_stats for every pair of humans who shared a played game.
 
+    All pair counters are computed by one set-based query over a self-join
+    of each game's participants, instead of querying goals and penalties
+    for every pair of every game.
+
+    The first run (or full=True) rebuilds the table in one transaction, so
+    readers see the old pairs until the new ones are committed. With
+    shards > 1 the pairs are split by human1_id % shards across worker
+    processes, each inserting and committing its shard into a rebuild table
+    that then replaces the stored pairs (see swap_rebuild_table); if a shard
+    fails, h2h_stats and the ledger are left as they were. Later runs only
+    process played games missing from the processed games ledger,
+    H2H_INCREMENTAL_BATCH_GAMES games per transaction: stored pairs get
+    their counters added with INSERT ... ON CONFLICT DO UPDATE, pairs not
+    stored yet are computed from their whole history (see
+    insert_h2h_pairs). They rebuild in full instead when a counted game
+    changed or the last full rebuild is too old (see full_rebuild_reason).
+
+    Only pairs with at least min_games games together are stored; prune
+    also deletes cold pairs (see prune_cold_h2h_pairs) afterwards.
+
+    Args:
+        full: Rebuild from scratch even if earlier runs were recorded
+        shards: Number of worker processes for a full rebuild (1 = one
+            transaction in this process)
+        min_games: Minimum games together for a pair to be stored
+        prune: Delete cold pairs after the update
+    """
+    session = create_session("boss")
+    start_time = time.time()
+    incremental = not full and has_processed_games(session, H2H_TABLE)
+    if incremental:
+        reason = full_rebuild_reason(session, H2H_TABLE)
+        if reason:
+            print(f"Rebuilding {H2H_TABLE} in full: {reason}", flush=True)
+            incremental = False
 
-def _is_loss(game, team_id):
-    if team_id == game.home_team_id:
-        return (game.home_final_score or 0) < (game.visitor_final_score or 0)
-    if team_id == game.visitor_team_id:
-        return (game.visitor_final_score or 0) < (game.home_final_score or 0)
-    return False
+    game_ids = get_pair_stats_game_ids(
+        session, H2H_TABLE if incremental else None, MAX_GAMES_TO_PROCESS
+    )
+    print(
+        f"{'New' if incremental else 'Total'} games to process: {len(game_ids)}",
+        flush=True,
+    )
 
+    pairs_written = 0
+    if not incremental:
+        if game_ids and shards > 1:
+            columns = h2h_column_list()
+            rebuild_table = create_rebuild_table(session, H2H_TABLE, columns)
+            try:
+                run_shards(
+                    _insert_h2h_shard, shards, game_ids, min_games, rebuild_table
+                )
+            except Exception:
+                drop_rebuild_table(session, rebuild_table)
+                raise
+            pairs_written = swap_rebuild_table(
+                session, H2H_TABLE, rebuild_table, columns
+            )
+        else:
+            session.execute(text("DELETE FROM h2h_stats"))
+            if game_ids:
+                pairs_written = insert_h2h_pairs(session, game_ids, min_games=min_games)
+        reset_processed_games(session, H2H_TABLE)
+        record_processed_games(session, H2H_TABLE, game_ids)
+        session.commit()
+    else:
+        for start in range(0, len(game_ids), H2H_INCREMENTAL_BATCH_GAMES):
+            batch = game_ids[start : start + H2H_INCREMENTAL_BATCH_GAMES]
+            pairs_written += insert_h2h_pairs(
+                session, batch, merge=True, min_games=min_games
+            )
+            record_processed_games(session, H2H_TABLE, batch)
+            session.commit()
 
-def _is_tie(game):
-    return (
-        game.home_final_score is not None
-        and game.visitor_final_score is not None
-        and game.home_final_score == game.visitor_final_score
+    if game_ids:
+        session.add(
+            H2HStatsMeta(
+                last_run_timestamp=datetime.utcnow(),
+                last_processed_game_id=game_ids[-1],
+            )
+        )
+        session.commit()
+    if prune:
+        print(f"Pruned {prune_cold_h2h_pairs(session):,} cold pairs", flush=True)
+    print(
+        f"H2H aggregation complete: {pairs_written:,} pairs written "
+        f"({time.time() - start_time:.1f}s)."
     )
 
 
 if __name__ == "__main__":
-    aggregate_h2h_stats()
+    parser = argparse.ArgumentParser(description="Aggregate head-to-head stats.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild h2h_stats from scratch instead of adding new games.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=PAIR_STATS_SHARDS,
+        help="Worker processes for a full rebuild (1 = single process).",
+    )
+    parser.add_argument(
+        "--min-games",
+        type=int,
+        default=H2H_MIN_GAMES_TOGETHER,
+        help="Minimum games together for a pair to be stored.",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete cold pairs after the update.",
+    )
+    args = parser.parse_args()
+    aggregate_h2h_stats(
+        full=args.full, shards=args.shards, min_games=args.min_games, prune=args.prune
+    )
@@ -10,13 +10,21 @@ from datetime import datetime, timedelta
 import sqlalchemy
 from sqlalchemy.sql import func
 
+from hockey_blast_common_lib.aggregation_metrics import record_scope_metrics
 from hockey_blast_common_lib.db_connection import create_session
+from hockey_blast_common_lib.game_fact_cache import load_game_fact_cache
+from hockey_blast_common_lib.game_ordinals import (
+    earliest,
+    latest,
+    resolve_first_last_games,
+)
 from hockey_blast_common_lib.game_status import PARTICIPATED_STATUS_IDS
 from hockey_blast_common_lib.models import Division, Game, GameRoster, Organization
 from hockey_blast_common_lib.options import (
     MIN_GAMES_FOR_DIVISION_STATS,
     MIN_GAMES_FOR_LEVEL_STATS,
     MIN_GAMES_FOR_ORG_STATS,
+    USE_GAME_FACT_CACHE,
 )
 from hockey_blast_common_lib.progress_utils import create_progress_tracker
 from hockey_blast_common_lib.stats_models import (
@@ -28,23 +36,213 @@ from hockey_blast_common_lib.stats_models import (
     OrgStatsHuman,
     OrgStatsWeeklyHuman,
 )
-from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID, assign_rank_columns
 from hockey_blast_common_lib.utils import (
-    assign_ranks,
+    AGGREGATION_WINDOWS,
     get_all_division_ids_for_org,
     get_fake_human_for_stats,
+    get_game_window_condition,
     get_non_human_ids,
-    get_start_datetime,
+    get_window_starts,
+    windowed,
 )
 
+HUMAN_ROLES = ("skater", "goalie", "referee", "scorekeeper")
 
-def aggregate_human_stats(
+
+def build_human_stats_from_cache(view, aggregation_id, human_ids_to_filter):
+    """Build aggregate_human_stats' stats_dict from a GameFactView of the scope.
+
+    Produces the same per-role game counts as the SQL path, with all first and
+    last game ids already resolved.
+    """
+    stats_dict = {}
+    for human_id, counters in view.human_stats().items():
+        if human_id in human_ids_to_filter:
+            continue
+        stat = {
+            "games_total": counters["games_skater"]
+            + counters["games_goalie"]
+            + counters["games_referee"]
+            + counters["games_scorekeeper"],
+            "first_game_id": counters["first_game_id"],
+            "last_game_id": counters["last_game_id"],
+        }
+        for role in HUMAN_ROLES:
+            stat[f"games_{role}"] = counters[f"games_{role}"]
+            stat[f"first_game_id_{role}"] = counters.get(f"first_game_id_{role}")
+            stat[f"last_game_id_{role}"] = counters.get(f"last_game_id_{role}")
+        stats_dict[(aggregation_id, human_id)] = stat
+    return stats_dict
+
+
+def query_human_window_stats(
+    session,
+    aggregation_id,
+    filter_condition,
+    window_conditions,
+    human_ids_to_filter,
+    human_id_filter=None,
+):
+    """
+    Per-role game counts of several windows of a scope in one scan per role.
+
+    Args:
+        filter_condition: The scope's games
+        window_conditions: {aggregation_window: condition on the games of the
+            window, None for all of the scope's games}
+
+    Returns:
+        {aggregation_window: stats_dict} with first/last ordinals per role and
+        overall
+    """
+    windows = list(window_conditions.items())
+    # Games outside every window are not needed (there are none as soon as
+    # one window covers the whole scope)
+    if all(condition is not None for _, condition in windows):
+        filter_condition = filter_condition & sqlalchemy.or_(
+            *(condition for _, condition in windows)
+        )
+
+    # Filter for specific human_id if provided
+    human_filter = []
+    if human_id_filter:
+        human_filter = [GameRoster.human_id == human_id_filter]
+
+    # Filter games by status - include both Final and NOEVENTS games
+    game_status_filter = Game.status_id.in_(PARTICIPATED_STATUS_IDS)
+
+    def window_columns():
+        columns = []
+        for i, (_, condition) in enumerate(windows):
+            columns += [
+                windowed(func.count(func.distinct(Game.id)), condition).label(
+                    f"games_{i}"
+                ),
+                windowed(func.min(Game.chronological_ordinal), condition).label(
+                    f"first_ordinal_{i}"
+                ),
+                windowed(func.max(Game.chronological_ordinal), condition).label(
+                    f"last_ordinal_{i}"
+                ),
+            ]
+        return columns
+
+    # Aggregate skater and goalie games played
+    def roster_stats(role_filter):
+        return (
+            session.query(GameRoster.human_id, *window_columns())
+            .join(Game, GameRoster.game_id == Game.id)
+            .join(Division, Game.division_id == Division.id)
+            .filter(filter_condition, game_status_filter, role_filter, *human_filter)
+            .group_by(GameRoster.human_id)
+            .order_by(GameRoster.human_id)
+            .all()
+        )
+
+    # Aggregate referee and scorekeeper games from Game table
+    def official_stats(official_id):
+        return (
+            session.query(official_id.label("human_id"), *window_columns())
+            .join(Division, Game.division_id == Division.id)
+            .filter(
+                filter_condition,
+                game_status_filter,
+                official_id.isnot(None),
+                *human_filter,
+            )
+            .group_by(official_id)
+            .order_by(official_id)
+            .all()
+        )
+
+    # Ordered by human per role like the fact cache (both referee columns
+    # merged), so that ranks break ties the same way in every window and on
+    # both paths
+    role_stats = [
+        ("skater", roster_stats(~GameRoster.role.ilike("G"))),
+        ("goalie", roster_stats(GameRoster.role.ilike("G"))),
+        (
+            "referee",
+            sorted(
+                official_stats(Game.referee_1_id) + official_stats(Game.referee_2_id),
+                key=lambda stat: stat.human_id,
+            ),
+        ),
+        ("scorekeeper", official_stats(Game.scorekeeper_id)),
+    ]
+
+    stats_by_window = {}
+    for i, (aggregation_window, _) in enumerate(windows):
+        # Combine the results
+        stats_dict = {}
+        for role, rows in role_stats:
+            for stat in rows:
+                games = getattr(stat, f"games_{i}")
+                if stat.human_id in human_ids_to_filter or not games:
+                    continue
+                key = (aggregation_id, stat.human_id)
+                if key not in stats_dict:
+                    stats_dict[key] = {
+                        "games_total": 0,
+                        "games_skater": 0,
+                        "games_goalie": 0,
+                        "games_referee": 0,
+                        "games_scorekeeper": 0,
+                        "first_ordinal_skater": None,
+                        "last_ordinal_skater": None,
+                        "first_ordinal_goalie": None,
+                        "last_ordinal_goalie": None,
+                        "first_ordinal_referee": None,
+                        "last_ordinal_referee": None,
+                        "first_ordinal_scorekeeper": None,
+                        "last_ordinal_scorekeeper": None,
+                    }
+                stats_dict[key]["games_total"] += games
+                stats_dict[key][f"games_{role}"] += games
+                stats_dict[key][f"first_ordinal_{role}"] = earliest(
+                    stats_dict[key][f"first_ordinal_{role}"],
+                    getattr(stat, f"first_ordinal_{i}"),
+                )
+                stats_dict[key][f"last_ordinal_{role}"] = latest(
+                    stats_dict[key][f"last_ordinal_{role}"],
+                    getattr(stat, f"last_ordinal_{i}"),
+                )
+
+        # Ensure all keys have valid human_id values
+        stats_dict = {
+            key: value for key, value in stats_dict.items() if key[1] is not None
+        }
+
+        # A human's overall first and last game span all of their roles
+        for stat in stats_dict.values():
+            stat["first_ordinal"] = earliest(
+                *(stat[f"first_ordinal_{role}"] for role in HUMAN_ROLES)
+            )
+            stat["last_ordinal"] = latest(
+                *(stat[f"last_ordinal_{role}"] for role in HUMAN_ROLES)
+            )
+        stats_by_window[aggregation_window] = stats_dict
+    return stats_by_window
+
+
+@record_scope_metrics
+def aggregate_human_scope(
     session,
     aggregation_type,
     aggregation_id,
     human_id_filter=None,
-    aggregation_window=None,
+    aggregation_windows=AGGREGATION_WINDOWS,
+    fact_cache=None,
 ):
+    """
+    Aggregate the all-time, weekly and daily human stats of one scope.
+
+    The games are scanned once for all windows (FILTER (WHERE ...)
+    aggregates, or one mask per window with the fact cache) and the windows'
+    tables are written in one transaction. Level scopes only have all-time
+    stats.
+    """
     # Capture start time for aggregation tracking
     aggregation_start_time = datetime.utcnow()
 
@@ -63,26 +261,24 @@ def aggregate_human_stats(
             )
             filter_condition = Game.org_id == aggregation_id
         print(
-            f"Aggregating human stats for {aggregation_name} with window {aggregation_window}..."
+            f"Aggregating human stats for {aggregation_name} with windows {list(aggregation_windows)}..."
         )
-        if aggregation_window == "Daily":
-            StatsModel = OrgStatsDailyHuman
-        elif aggregation_window == "Weekly":
-            StatsModel = OrgStatsWeeklyHuman
-        else:
-            StatsModel = OrgStatsHuman
+        stats_models = {
+            None: OrgStatsHuman,
+            "Weekly": OrgStatsWeeklyHuman,
+            "Daily": OrgStatsDailyHuman,
+        }
         min_games = MIN_GAMES_FOR_ORG_STATS
     elif aggregation_type == "division":
-        if aggregation_window == "Daily":
-            StatsModel = DivisionStatsDailyHuman
-        elif aggregation_window == "Weekly":
-            StatsModel = DivisionStatsWeeklyHuman
-        else:
-            StatsModel = DivisionStatsHuman
+        stats_models = {
+            None: DivisionStatsHuman,
+            "Weekly": DivisionStatsWeeklyHuman,
+            "Daily": DivisionStatsDailyHuman,
+        }
         min_games = MIN_GAMES_FOR_DIVISION_STATS
         filter_condition = Game.division_id == aggregation_id
     elif aggregation_type == "level":
-        StatsModel = LevelStatsHuman
+        stats_models = {None: LevelStatsHuman}
         min_games = MIN_GAMES_FOR_LEVEL_STATS
         filter_condition = Division.level_id == aggregation_id
         # Add filter to only include games for the last 5 years
@@ -96,540 +292,283 @@ def aggregate_human_stats(
         filter_condition = filter_condition & level_window_filter
     else:
         raise ValueError("Invalid aggregation type")
+    aggregation_windows = [
+        window for window in aggregation_windows if window in stats_models
+    ]
 
-    # Apply aggregation window filter BEFORE deleting, so we don't wipe stats
-    # if the window turns out to be stale (no recent games).
-    if aggregation_window:
-        last_game_datetime_str = (
-            session.query(func.max(func.concat(Game.date, " ", Game.time)))
-            .filter(
-                filter_condition,
-                Game.status_id.in_(PARTICIPATED_STATUS_IDS),
-            )
-            .scalar()
+    # The same scope as filter_condition, as a mask over the cached games
+    if fact_cache is not None:
+        game_mask = fact_cache.scope_mask(
+            aggregation_type,
+            aggregation_id,
+            since=five_years_ago if aggregation_type == "level" else None,
         )
-        start_datetime = get_start_datetime(last_game_datetime_str, aggregation_window)
-        if start_datetime:
-            game_window_filter = func.cast(
-                func.concat(Game.date, " ", Game.time), sqlalchemy.types.TIMESTAMP
-            ).between(start_datetime, last_game_datetime_str)
-            filter_condition = filter_condition & game_window_filter
-        else:
-            # No recent games — keep existing stats so the section isn't empty.
-            return
-
-    # Delete existing items from the stats table (only after confirming we have data to replace)
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).delete()
-    session.commit()
-
-    # Filter for specific human_id if provided
-    human_filter = []
-    if human_id_filter:
-        human_filter = [GameRoster.human_id == human_id_filter]
-
-    # Filter games by status - include both Final and NOEVENTS games
-    game_status_filter = Game.status_id.in_(PARTICIPATED_STATUS_IDS)
 
-    # Aggregate skater games played
-    skater_stats = (
-        session.query(
-            GameRoster.human_id,
-            func.count(func.distinct(Game.id)).label("games_skater"),
-            func.array_agg(func.distinct(Game.id)).label("skater_game_ids"),
-        )
-        .join(Game, GameRoster.game_id == Game.id)
-        .join(Division, Game.division_id == Division.id)
-        .filter(
+    # Resolve the windows BEFORE deleting, so we don't wipe stats
+    # if a window turns out to be stale (no recent games).
+    last_game_datetime_str = None
+    if any(aggregation_windows):
+        if fact_cache is not None:
+            last_game_datetime_str = fact_cache.last_game_datetime_str(
+                game_mask, PARTICIPATED_STATUS_IDS
+            )
+        else:
+            last_game_datetime_str = (
+                session.query(func.max(func.concat(Game.date, " ", Game.time)))
+                .filter(
+                    filter_condition,
+                    Game.status_id.in_(PARTICIPATED_STATUS_IDS),
+                )
+                .scalar()
+            )
+    # No recent games — stale windows keep their existing stats so the section isn't empty.
+    window_starts = get_window_starts(last_game_datetime_str, aggregation_windows)
+    if not window_starts:
+        return
+
+    if fact_cache is not None:
+        stats_by_window = {}
+        for aggregation_window, start_datetime in window_starts.items():
+            mask = game_mask
+            if start_datetime is not None:
+                mask = fact_cache.window_mask(
+                    game_mask, start_datetime, last_game_datetime_str
+                )
+            stats_by_window[aggregation_window] = build_human_stats_from_cache(
+                fact_cache.view(mask), aggregation_id, human_ids_to_filter
+            )
+    else:
+        stats_by_window = query_human_window_stats(
+            session,
+            aggregation_id,
             filter_condition,
-            game_status_filter,
-            ~GameRoster.role.ilike("G"),
-            *human_filter,
+            {
+                aggregation_window: get_game_window_condition(
+                    start_datetime, last_game_datetime_str
+                )
+                for aggregation_window, start_datetime in window_starts.items()
+            },
+            human_ids_to_filter,
+            human_id_filter,
         )
-        .group_by(GameRoster.human_id)
-        .all()
-    )
 
-    # Aggregate goalie games played
-    goalie_stats = (
-        session.query(
-            GameRoster.human_id,
-            func.count(func.distinct(Game.id)).label("games_goalie"),
-            func.array_agg(func.distinct(Game.id)).label("goalie_game_ids"),
+    # {aggregation_window: (stats_dict, overall_stats)}
+    window_stats = {}
+    for aggregation_window, stats_dict in stats_by_window.items():
+        # Calculate total_in_rank
+        total_in_rank = len(stats_dict)
+
+        # Calculate number of items in rank per role
+        skaters_in_rank = len(
+            [stat for stat in stats_dict.values() if stat["games_skater"] > 0]
         )
-        .join(Game, GameRoster.game_id == Game.id)
-        .join(Division, Game.division_id == Division.id)
-        .filter(
-            filter_condition,
-            game_status_filter,
-            GameRoster.role.ilike("G"),
-            *human_filter,
+        goalies_in_rank = len(
+            [stat for stat in stats_dict.values() if stat["games_goalie"] > 0]
         )
-        .group_by(GameRoster.human_id)
-        .all()
-    )
-
-    # Aggregate referee and scorekeeper games from Game table
-    referee_stats = (
-        session.query(
-            Game.referee_1_id.label("human_id"),
-            func.count(func.distinct(Game.id)).label("games_referee"),
-            func.array_agg(func.distinct(Game.id)).label("referee_game_ids"),
+        referees_in_rank = len(
+            [stat for stat in stats_dict.values() if stat["games_referee"] > 0]
         )
-        .join(Division, Game.division_id == Division.id)
-        .filter(filter_condition, game_status_filter, *human_filter)
-        .group_by(Game.referee_1_id)
-        .all()
-    )
-
-    referee_stats_2 = (
-        session.query(
-            Game.referee_2_id.label("human_id"),
-            func.count(func.distinct(Game.id)).label("games_referee"),
-            func.array_agg(func.distinct(Game.id)).label("referee_game_ids"),
+        scorekeepers_in_rank = len(
+            [stat for stat in stats_dict.values() if stat["games_scorekeeper"] > 0]
         )
-        .join(Division, Game.division_id == Division.id)
-        .filter(filter_condition, game_status_filter, *human_filter)
-        .group_by(Game.referee_2_id)
-        .all()
-    )
 
-    scorekeeper_stats = (
-        session.query(
-            Game.scorekeeper_id.label("human_id"),
-            func.count(func.distinct(Game.id)).label("games_scorekeeper"),
-            func.array_agg(func.distinct(Game.id)).label("scorekeeper_game_ids"),
+        # Filter out humans with less than min_games
+        stats_dict = {
+            key: value
+            for key, value in stats_dict.items()
+            if value["games_total"] >= min_games
+        }
+
+        # Assign ranks
+        assign_rank_columns(
+            stats_dict,
+            [
+                "games_total",
+                "games_skater",
+                "games_goalie",
+                "games_referee",
+                "games_scorekeeper",
+            ],
         )
-        .join(Division, Game.division_id == Division.id)
-        .filter(filter_condition, game_status_filter, *human_filter)
-        .group_by(Game.scorekeeper_id)
-        .all()
-    )
 
-    # Combine the results
-    stats_dict = {}
-    for stat in skater_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_total": 0,
-                "games_skater": 0,
-                "games_goalie": 0,
-                "games_referee": 0,
-                "games_scorekeeper": 0,
-                "skater_game_ids": [],
-                "goalie_game_ids": [],
-                "referee_game_ids": [],
-                "scorekeeper_game_ids": [],
-                "first_game_id_skater": None,
-                "last_game_id_skater": None,
-                "first_game_id_goalie": None,
-                "last_game_id_goalie": None,
-                "first_game_id_referee": None,
-                "last_game_id_referee": None,
-                "first_game_id_scorekeeper": None,
-                "last_game_id_scorekeeper": None,
-            }
-        stats_dict[key]["games_total"] += stat.games_skater
-        stats_dict[key]["games_skater"] += stat.games_skater
-        stats_dict[key]["skater_game_ids"].extend(stat.skater_game_ids)
-
-    for stat in goalie_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_total": 0,
-                "games_skater": 0,
-                "games_goalie": 0,
-                "games_referee": 0,
-                "games_scorekeeper": 0,
-                "skater_game_ids": [],
-                "goalie_game_ids": [],
-                "referee_game_ids": [],
-                "scorekeeper_game_ids": [],
-                "first_game_id_skater": None,
-                "last_game_id_skater": None,
-                "first_game_id_goalie": None,
-                "last_game_id_goalie": None,
-                "first_game_id_referee": None,
-                "last_game_id_referee": None,
-                "first_game_id_scorekeeper": None,
-                "last_game_id_scorekeeper": None,
-            }
-        stats_dict[key]["games_total"] += stat.games_goalie
-        stats_dict[key]["games_goalie"] += stat.games_goalie
-        stats_dict[key]["goalie_game_ids"].extend(stat.goalie_game_ids)
-
-    for stat in referee_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_total": 0,
-                "games_skater": 0,
-                "games_goalie": 0,
-                "games_referee": 0,
-                "games_scorekeeper": 0,
-                "skater_game_ids": [],
-                "goalie_game_ids": [],
-                "referee_game_ids": [],
-                "scorekeeper_game_ids": [],
-                "first_game_id_skater": None,
-                "last_game_id_skater": None,
-                "first_game_id_goalie": None,
-                "last_game_id_goalie": None,
-                "first_game_id_referee": None,
-                "last_game_id_referee": None,
-                "first_game_id_scorekeeper": None,
-                "last_game_id_scorekeeper": None,
-            }
-        stats_dict[key]["games_total"] += stat.games_referee
-        stats_dict[key]["games_referee"] += stat.games_referee
-        stats_dict[key]["referee_game_ids"].extend(stat.referee_game_ids)
-
-    for stat in referee_stats_2:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_total": 0,
-                "games_skater": 0,
-                "games_goalie": 0,
-                "games_referee": 0,
-                "games_scorekeeper": 0,
-                "skater_game_ids": [],
-                "goalie_game_ids": [],
-                "referee_game_ids": [],
-                "scorekeeper_game_ids": [],
-                "first_game_id_skater": None,
-                "last_game_id_skater": None,
-                "first_game_id_goalie": None,
-                "last_game_id_goalie": None,
-                "first_game_id_referee": None,
-                "last_game_id_referee": None,
-                "first_game_id_scorekeeper": None,
-                "last_game_id_scorekeeper": None,
-            }
-        stats_dict[key]["games_total"] += stat.games_referee
-        stats_dict[key]["games_referee"] += stat.games_referee
-        stats_dict[key]["referee_game_ids"].extend(stat.referee_game_ids)
-
-    for stat in scorekeeper_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_total": 0,
-                "games_skater": 0,
-                "games_goalie": 0,
-                "games_referee": 0,
-                "games_scorekeeper": 0,
-                "skater_game_ids": [],
-                "goalie_game_ids": [],
-                "referee_game_ids": [],
-                "scorekeeper_game_ids": [],
-                "first_game_id_skater": None,
-                "last_game_id_skater": None,
-                "first_game_id_goalie": None,
-                "last_game_id_goalie": None,
-                "first_game_id_referee": None,
-                "last_game_id_referee": None,
-                "first_game_id_scorekeeper": None,
-                "last_game_id_scorekeeper": None,
-            }
-        stats_dict[key]["games_total"] += stat.games_scorekeeper
-        stats_dict[key]["games_scorekeeper"] += stat.games_scorekeeper
-        stats_dict[key]["scorekeeper_game_ids"].extend(stat.scorekeeper_game_ids)
-
-    # Ensure all keys have valid human_id values
-    stats_dict = {key: value for key, value in stats_dict.items() if key[1] is not None}
-
-    # Calculate total_in_rank
-    total_in_rank = len(stats_dict)
-
-    # Calculate number of items in rank per role
-    skaters_in_rank = len(
-        [stat for stat in stats_dict.values() if stat["games_skater"] > 0]
-    )
-    goalies_in_rank = len(
-        [stat for stat in stats_dict.values() if stat["games_goalie"] > 0]
-    )
-    referees_in_rank = len(
-        [stat for stat in stats_dict.values() if stat["games_referee"] > 0]
-    )
-    scorekeepers_in_rank = len(
-        [stat for stat in stats_dict.values() if stat["games_scorekeeper"] > 0]
-    )
-
-    # Filter out humans with less than min_games
-    stats_dict = {
-        key: value
-        for key, value in stats_dict.items()
-        if value["games_total"] >= min_games
-    }
-
-    # Assign ranks
-    assign_ranks(stats_dict, "games_total")
-    assign_ranks(stats_dict, "games_skater")
-    assign_ranks(stats_dict, "games_goalie")
-    assign_ranks(stats_dict, "games_referee")
-    assign_ranks(stats_dict, "games_scorekeeper")
-
-    # Populate first_game_id and last_game_id for each role
-    for key, stat in stats_dict.items():
-        all_game_ids = (
-            stat["skater_game_ids"]
-            + stat["goalie_game_ids"]
-            + stat["referee_game_ids"]
-            + stat["scorekeeper_game_ids"]
-        )
-        if all_game_ids:
-            first_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id"] = first_game.id if first_game else None
-            stat["last_game_id"] = last_game.id if last_game else None
-
-        if stat["skater_game_ids"]:
-            first_game_skater = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["skater_game_ids"]))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game_skater = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["skater_game_ids"]))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
+        # Calculate overall stats
+        overall_stats = {
+            "games_total": sum(stat["games_total"] for stat in stats_dict.values()),
+            "games_skater": sum(stat["games_skater"] for stat in stats_dict.values()),
+            "games_goalie": sum(stat["games_goalie"] for stat in stats_dict.values()),
+            "games_referee": sum(stat["games_referee"] for stat in stats_dict.values()),
+            "games_scorekeeper": sum(
+                stat["games_scorekeeper"] for stat in stats_dict.values()
+            ),
+            "total_in_rank": total_in_rank,
+            "skaters_in_rank": skaters_in_rank,
+            "goalies_in_rank": goalies_in_rank,
+            "referees_in_rank": referees_in_rank,
+            "scorekeepers_in_rank": scorekeepers_in_rank,
+            "first_game_id": None,
+            "last_game_id": None,
+            "first_game_id_skater": None,
+            "last_game_id_skater": None,
+            "first_game_id_goalie": None,
+            "last_game_id_goalie": None,
+            "first_game_id_referee": None,
+            "last_game_id_referee": None,
+            "first_game_id_scorekeeper": None,
+            "last_game_id_scorekeeper": None,
+        }
+
+        # Populate first_game_id and last_game_id for overall stats
+        if fact_cache is not None:
+            # The cached path resolved every human's first and last game already
+            overall_stats["first_game_id"], overall_stats["last_game_id"] = (
+                fact_cache.first_last_game_ids(
+                    [stat["first_game_id"] for stat in stats_dict.values()]
+                    + [stat["last_game_id"] for stat in stats_dict.values()]
+                )
             )
-            stat["first_game_id_skater"] = (
-                first_game_skater.id if first_game_skater else None
+        else:
+            overall_stats["first_ordinal"] = earliest(
+                *(stat["first_ordinal"] for stat in stats_dict.values())
             )
-            stat["last_game_id_skater"] = (
-                last_game_skater.id if last_game_skater else None
+            overall_stats["last_ordinal"] = latest(
+                *(stat["last_ordinal"] for stat in stats_dict.values())
             )
+        window_stats[aggregation_window] = (stats_dict, overall_stats)
+
+    # Turn the first/last ordinals of every window into game ids with a single
+    # query, together with the bounds of the overall rows
+    if fact_cache is None:
+        resolve_first_last_games(
+            session,
+            [
+                stat
+                for stats_dict, overall_stats in window_stats.values()
+                for stat in [*stats_dict.values(), overall_stats]
+            ],
+            suffixes=[""] + [f"_{role}" for role in HUMAN_ROLES],
+        )
+        for stats_dict, overall_stats in window_stats.values():
+            # The overall row only has an overall first and last game
+            for role in HUMAN_ROLES:
+                overall_stats[f"first_game_id_{role}"] = None
+                overall_stats[f"last_game_id_{role}"] = None
 
-        if stat["goalie_game_ids"]:
-            first_game_goalie = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["goalie_game_ids"]))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game_goalie = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["goalie_game_ids"]))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id_goalie"] = (
-                first_game_goalie.id if first_game_goalie else None
-            )
-            stat["last_game_id_goalie"] = (
-                last_game_goalie.id if last_game_goalie else None
-            )
+    # Fetch fake human ID for overall stats
+    fake_human_id = get_fake_human_for_stats(session)
 
-        if stat["referee_game_ids"]:
-            first_game_referee = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["referee_game_ids"]))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game_referee = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["referee_game_ids"]))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id_referee"] = (
-                first_game_referee.id if first_game_referee else None
-            )
-            stat["last_game_id_referee"] = (
-                last_game_referee.id if last_game_referee else None
+    for aggregation_window, (stats_dict, overall_stats) in window_stats.items():
+        StatsModel = stats_models[aggregation_window]
+        # The window's existing rows are replaced by writer.commit(), all
+        # windows in one transaction
+        writer = StatsModel.bulk_writer(session, aggregation_id, aggregation_start_time)
+        total_in_rank = overall_stats["total_in_rank"]
+
+        # Insert aggregated stats into the appropriate table with progress output
+        for key, stat in stats_dict.items():
+            human_id = key[1]
+            if human_id_filter and human_id != human_id_filter:
+                continue
+
+            human_stat = StatsModel(
+                aggregation_id=aggregation_id,
+                human_id=human_id,
+                games_total=stat["games_total"],
+                games_total_rank=stat["games_total_rank"],
+                games_skater=stat["games_skater"],
+                games_skater_rank=stat["games_skater_rank"],
+                games_goalie=stat["games_goalie"],
+                games_goalie_rank=stat["games_goalie_rank"],
+                games_referee=stat["games_referee"],
+                games_referee_rank=stat["games_referee_rank"],
+                games_scorekeeper=stat["games_scorekeeper"],
+                games_scorekeeper_rank=stat["games_scorekeeper_rank"],
+                total_in_rank=total_in_rank,
+                skaters_in_rank=overall_stats["skaters_in_rank"],
+                goalies_in_rank=overall_stats["goalies_in_rank"],
+                referees_in_rank=overall_stats["referees_in_rank"],
+                scorekeepers_in_rank=overall_stats["scorekeepers_in_rank"],
+                first_game_id=stat["first_game_id"],
+                last_game_id=stat["last_game_id"],
+                first_game_id_skater=stat["first_game_id_skater"],
+                last_game_id_skater=stat["last_game_id_skater"],
+                first_game_id_goalie=stat["first_game_id_goalie"],
+                last_game_id_goalie=stat["last_game_id_goalie"],
+                first_game_id_referee=stat["first_game_id_referee"],
+                last_game_id_referee=stat["last_game_id_referee"],
+                first_game_id_scorekeeper=stat["first_game_id_scorekeeper"],
+                last_game_id_scorekeeper=stat["last_game_id_scorekeeper"],
             )
+            writer.add(human_stat)
 
-        if stat["scorekeeper_game_ids"]:
-            first_game_scorekeeper = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["scorekeeper_game_ids"]))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game_scorekeeper = (
-                session.query(Game)
-                .filter(Game.id.in_(stat["scorekeeper_game_ids"]))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id_scorekeeper"] = (
-                first_game_scorekeeper.id if first_game_scorekeeper else None
-            )
-            stat["last_game_id_scorekeeper"] = (
-                last_game_scorekeeper.id if last_game_scorekeeper else None
-            )
-
-    # Insert aggregated stats into the appropriate table with progress output
-    batch_size = 1000
-    for i, (key, stat) in enumerate(stats_dict.items(), 1):
-        aggregation_id, human_id = key
-        if human_id_filter and human_id != human_id_filter:
-            continue
-
-        human_stat = StatsModel(
+        # Insert overall stats for the fake human
+        overall_human_stat = StatsModel(
             aggregation_id=aggregation_id,
-            human_id=human_id,
-            games_total=stat["games_total"],
-            games_total_rank=stat["games_total_rank"],
-            games_skater=stat["games_skater"],
-            games_skater_rank=stat["games_skater_rank"],
-            games_goalie=stat["games_goalie"],
-            games_goalie_rank=stat["games_goalie_rank"],
-            games_referee=stat["games_referee"],
-            games_referee_rank=stat["games_referee_rank"],
-            games_scorekeeper=stat["games_scorekeeper"],
-            games_scorekeeper_rank=stat["games_scorekeeper_rank"],
-            total_in_rank=total_in_rank,
-            skaters_in_rank=skaters_in_rank,
-            goalies_in_rank=goalies_in_rank,
-            referees_in_rank=referees_in_rank,
-            scorekeepers_in_rank=scorekeepers_in_rank,
-            first_game_id=stat["first_game_id"],
-            last_game_id=stat["last_game_id"],
-            first_game_id_skater=stat["first_game_id_skater"],
-            last_game_id_skater=stat["last_game_id_skater"],
-            first_game_id_goalie=stat["first_game_id_goalie"],
-            last_game_id_goalie=stat["last_game_id_goalie"],
-            first_game_id_referee=stat["first_game_id_referee"],
-            last_game_id_referee=stat["last_game_id_referee"],
-            first_game_id_scorekeeper=stat["first_game_id_scorekeeper"],
-            last_game_id_scorekeeper=stat["last_game_id_scorekeeper"],
-            aggregation_started_at=aggregation_start_time,
+            human_id=fake_human_id,
+            games_total=overall_stats["games_total"],
+            games_total_rank=0,  # Overall stats do not need a rank
+            games_skater=overall_stats["games_skater"],
+            games_skater_rank=0,  # Overall stats do not need a rank
+            games_goalie=overall_stats["games_goalie"],
+            games_goalie_rank=0,  # Overall stats do not need a rank
+            games_referee=overall_stats["games_referee"],
+            games_referee_rank=0,  # Overall stats do not need a rank
+            games_scorekeeper=overall_stats["games_scorekeeper"],
+            games_scorekeeper_rank=0,  # Overall stats do not need a rank
+            total_in_rank=overall_stats["total_in_rank"],
+            skaters_in_rank=overall_stats["skaters_in_rank"],
+            goalies_in_rank=overall_stats["goalies_in_rank"],
+            referees_in_rank=overall_stats["referees_in_rank"],
+            scorekeepers_in_rank=overall_stats["scorekeepers_in_rank"],
+            first_game_id=overall_stats["first_game_id"],
+            last_game_id=overall_stats["last_game_id"],
+            first_game_id_skater=overall_stats["first_game_id_skater"],
+            last_game_id_skater=overall_stats["last_game_id_skater"],
+            first_game_id_goalie=overall_stats["first_game_id_goalie"],
+            last_game_id_goalie=overall_stats["last_game_id_goalie"],
+            first_game_id_referee=overall_stats["first_game_id_referee"],
+            last_game_id_referee=overall_stats["last_game_id_referee"],
+            first_game_id_scorekeeper=overall_stats["first_game_id_scorekeeper"],
+            last_game_id_scorekeeper=overall_stats["last_game_id_scorekeeper"],
         )
-        session.add(human_stat)
-        # Commit in batches
-        if i % batch_size == 0:
-            session.commit()
-    session.commit()
+        writer.add(overall_human_stat)
 
-    # Fetch fake human ID for overall stats
-    fake_human_id = get_fake_human_for_stats(session)
+        # Replace the window's rows, stamping aggregation_completed_at
+        writer.commit(autocommit=False)
 
-    # Calculate overall stats
-    overall_stats = {
-        "games_total": sum(stat["games_total"] for stat in stats_dict.values()),
-        "games_skater": sum(stat["games_skater"] for stat in stats_dict.values()),
-        "games_goalie": sum(stat["games_goalie"] for stat in stats_dict.values()),
-        "games_referee": sum(stat["games_referee"] for stat in stats_dict.values()),
-        "games_scorekeeper": sum(
-            stat["games_scorekeeper"] for stat in stats_dict.values()
-        ),
-        "total_in_rank": total_in_rank,
-        "skaters_in_rank": skaters_in_rank,
-        "goalies_in_rank": goalies_in_rank,
-        "referees_in_rank": referees_in_rank,
-        "scorekeepers_in_rank": scorekeepers_in_rank,
-        "first_game_id": None,
-        "last_game_id": None,
-        "first_game_id_skater": None,
-        "last_game_id_skater": None,
-        "first_game_id_goalie": None,
-        "last_game_id_goalie": None,
-        "first_game_id_referee": None,
-        "last_game_id_referee": None,
-        "first_game_id_scorekeeper": None,
-        "last_game_id_scorekeeper": None,
-    }
-
-    # Populate first_game_id and last_game_id for overall stats
-    all_game_ids = [
-        game_id
-        for stat in stats_dict.values()
-        for game_id in stat["skater_game_ids"]
-        + stat["goalie_game_ids"]
-        + stat["referee_game_ids"]
-        + stat["scorekeeper_game_ids"]
-    ]
-    if all_game_ids:
-        first_game = (
-            session.query(Game)
-            .filter(Game.id.in_(all_game_ids))
-            .order_by(Game.date, Game.time)
-            .first()
-        )
-        last_game = (
-            session.query(Game)
-            .filter(Game.id.in_(all_game_ids))
-            .order_by(Game.date.desc(), Game.time.desc())
-            .first()
-        )
-        overall_stats["first_game_id"] = first_game.id if first_game else None
-        overall_stats["last_game_id"] = last_game.id if last_game else None
-
-    # Insert overall stats for the fake human
-    overall_human_stat = StatsModel(
-        aggregation_id=aggregation_id,
-        human_id=fake_human_id,
-        games_total=overall_stats["games_total"],
-        games_total_rank=0,  # Overall stats do not need a rank
-        games_skater=overall_stats["games_skater"],
-        games_skater_rank=0,  # Overall stats do not need a rank
-        games_goalie=overall_stats["games_goalie"],
-        games_goalie_rank=0,  # Overall stats do not need a rank
-        games_referee=overall_stats["games_referee"],
-        games_referee_rank=0,  # Overall stats do not need a rank
-        games_scorekeeper=overall_stats["games_scorekeeper"],
-        games_scorekeeper_rank=0,  # Overall stats do not need a rank
-        total_in_rank=overall_stats["total_in_rank"],
-        skaters_in_rank=overall_stats["skaters_in_rank"],
-        goalies_in_rank=overall_stats["goalies_in_rank"],
-        referees_in_rank=overall_stats["referees_in_rank"],
-        scorekeepers_in_rank=overall_stats["scorekeepers_in_rank"],
-        first_game_id=overall_stats["first_game_id"],
-        last_game_id=overall_stats["last_game_id"],
-        first_game_id_skater=overall_stats["first_game_id_skater"],
-        last_game_id_skater=overall_stats["last_game_id_skater"],
-        first_game_id_goalie=overall_stats["first_game_id_goalie"],
-        last_game_id_goalie=overall_stats["last_game_id_goalie"],
-        first_game_id_referee=overall_stats["first_game_id_referee"],
-        last_game_id_referee=overall_stats["last_game_id_referee"],
-        first_game_id_scorekeeper=overall_stats["first_game_id_scorekeeper"],
-        last_game_id_scorekeeper=overall_stats["last_game_id_scorekeeper"],
-        aggregation_started_at=aggregation_start_time,
-    )
-    session.add(overall_human_stat)
     session.commit()
 
-    # Update all records with completion timestamp
-    aggregation_end_time = datetime.utcnow()
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).update({StatsModel.aggregation_completed_at: aggregation_end_time})
-    session.commit()
+
+def aggregate_human_stats(
+    session,
+    aggregation_type,
+    aggregation_id,
+    human_id_filter=None,
+    aggregation_window=None,
+    fact_cache=None,
+):
+    """Aggregate a single window of a human stats scope (see aggregate_human_scope)."""
+    aggregate_human_scope(
+        session,
+        aggregation_type,
+        aggregation_id,
+        human_id_filter=human_id_filter,
+        aggregation_windows=(aggregation_window,),
+        fact_cache=fact_cache,
+    )
 
 
-def run_aggregate_human_stats():
+def run_aggregate_human_stats(use_fact_cache=USE_GAME_FACT_CACHE):
     session = create_session("boss")
     human_id_to_debug = None
 
+    # human_id_filter narrows the SQL queries themselves, so debugging a
+    # single human always takes the SQL path
+    fact_cache = (
+        load_game_fact_cache(session)
+        if use_fact_cache and human_id_to_debug is None
+        else None
+    )
+
     # Aggregate by Org and Division inside Org
     org_ids = session.query(Organization.id).all()
     org_ids = [org_id[0] for org_id in org_ids]
@@ -650,100 +589,39 @@ def run_aggregate_human_stats():
                 f"Processing {len(division_ids)} divisions for {org_name}",
             )
             for i, division_id in enumerate(division_ids):
-                aggregate_human_stats(
+                aggregate_human_scope(
                     session,
                     aggregation_type="division",
                     aggregation_id=division_id,
                     human_id_filter=human_id_to_debug,
-                )
-                aggregate_human_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    human_id_filter=human_id_to_debug,
-                    aggregation_window="Weekly",
-                )
-                aggregate_human_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    human_id_filter=human_id_to_debug,
-                    aggregation_window="Daily",
+                    fact_cache=fact_cache,
                 )
                 progress.update(i + 1)
         else:
             # Debug mode or no divisions - process without progress tracking
             for division_id in division_ids:
-                aggregate_human_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    human_id_filter=human_id_to_debug,
-                )
-                aggregate_human_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    human_id_filter=human_id_to_debug,
-                    aggregation_window="Weekly",
-                )
-                aggregate_human_stats(
+                aggregate_human_scope(
                     session,
                     aggregation_type="division",
                     aggregation_id=division_id,
                     human_id_filter=human_id_to_debug,
-                    aggregation_window="Daily",
+                    fact_cache=fact_cache,
                 )
 
-        # Process org-level stats with progress tracking
+        # Process org-level stats (all windows in one pass) with progress tracking
         if human_id_to_debug is None:
             org_progress = create_progress_tracker(
-                3, f"Processing org-level stats for {org_name}"
-            )
-            aggregate_human_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                human_id_filter=human_id_to_debug,
+                1, f"Processing org-level stats for {org_name}"
             )
+        aggregate_human_scope(
+            session,
+            aggregation_type="org",
+            aggregation_id=org_id,
+            human_id_filter=human_id_to_debug,
+            fact_cache=fact_cache,
+        )
+        if human_id_to_debug is None:
             org_progress.update(1)
-            aggregate_human_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                human_id_filter=human_id_to_debug,
-                aggregation_window="Weekly",
-            )
-            org_progress.update(2)
-            aggregate_human_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                human_id_filter=human_id_to_debug,
-                aggregation_window="Daily",
-            )
-            org_progress.update(3)
-        else:
-            aggregate_human_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                human_id_filter=human_id_to_debug,
-            )
-            aggregate_human_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                human_id_filter=human_id_to_debug,
-                aggregation_window="Weekly",
-            )
-            aggregate_human_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                human_id_filter=human_id_to_debug,
-                aggregation_window="Daily",
-            )
 
     # Aggregate by level
     level_ids = session.query(Division.level_id).distinct().all()
@@ -760,6 +638,7 @@ def run_aggregate_human_stats():
                 aggregation_type="level",
                 aggregation_id=level_id,
                 human_id_filter=human_id_to_debug,
+                fact_cache=fact_cache,
             )
             level_progress.update(i + 1)
     else:
@@ -770,6 +649,7 @@ def run_aggregate_human_stats():
                 aggregation_type="level",
                 aggregation_id=level_id,
                 human_id_filter=human_id_to_debug,
+                fact_cache=fact_cache,
             )
 
 
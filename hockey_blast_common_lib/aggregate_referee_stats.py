@@ -10,13 +10,22 @@ from datetime import datetime
 import sqlalchemy
 from sqlalchemy.sql import case, func
 
+from hockey_blast_common_lib.aggregation_metrics import record_scope_metrics
 from hockey_blast_common_lib.db_connection import create_session
+from hockey_blast_common_lib.game_fact_cache import (
+    get_game_fact_cache,
+    load_game_fact_cache,
+)
 from hockey_blast_common_lib.models import Division, Game, Organization, Penalty
 from hockey_blast_common_lib.options import (
+    DIVISION_AGGREGATION_WORKERS,
     MIN_GAMES_FOR_DIVISION_STATS,
     MIN_GAMES_FOR_LEVEL_STATS,
     MIN_GAMES_FOR_ORG_STATS,
+    ROLLUP_SCOPE_STATS,
+    USE_GAME_FACT_CACHE,
 )
+from hockey_blast_common_lib.parallel_utils import run_division_aggregations
 from hockey_blast_common_lib.progress_utils import create_progress_tracker
 from hockey_blast_common_lib.stats_models import (
     DivisionStatsDailyReferee,
@@ -27,20 +36,32 @@ from hockey_blast_common_lib.stats_models import (
     OrgStatsReferee,
     OrgStatsWeeklyReferee,
 )
+from hockey_blast_common_lib.game_ordinals import (
+    earliest,
+    latest,
+    resolve_first_last_games,
+)
 from hockey_blast_common_lib.game_status import FINAL_STATUS_IDS, PARTICIPATED_STATUS_IDS
-from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+from hockey_blast_common_lib.stats_rollup import ScopePartials
+from hockey_blast_common_lib.stats_utils import (
+    ALL_ORGS_ID,
+    assign_rank_columns,
+    compute_percentile_values,
+)
 from hockey_blast_common_lib.utils import (
-    assign_ranks,
-    calculate_percentile_value,
+    AGGREGATION_WINDOWS,
     get_all_division_ids_for_org,
+    get_game_window_condition,
     get_non_human_ids,
-    get_percentile_human,
-    get_start_datetime,
+    get_percentile_human_ids,
+    get_window_starts,
+    in_window,
+    windowed,
 )
 
 
 def insert_percentile_markers_referee(
-    session, stats_dict, aggregation_id, total_in_rank, StatsModel
+    session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel
 ):
     """Insert percentile marker records for referee stats."""
     if not stats_dict:
@@ -56,18 +77,11 @@ def insert_percentile_markers_referee(
         "gm_per_game",
     ]
 
-    percentiles = [25, 50, 75, 90, 95]
+    percentile_human_ids = get_percentile_human_ids(session, "Ref")
+    values_by_percentile = compute_percentile_values(stats_dict, stat_fields)
 
-    for percentile in percentiles:
-        percentile_human_id = get_percentile_human(session, "Ref", percentile)
-
-        percentile_values = {}
-        for field in stat_fields:
-            values = [stat[field] for stat in stats_dict.values() if field in stat]
-            if values:
-                percentile_values[field] = calculate_percentile_value(values, percentile)
-            else:
-                percentile_values[field] = 0
+    for percentile, percentile_human_id in percentile_human_ids.items():
+        percentile_values = values_by_percentile[percentile]
 
         referee_stat = StatsModel(
             aggregation_id=aggregation_id,
@@ -90,14 +104,365 @@ def insert_percentile_markers_referee(
             first_game_id=None,
             last_game_id=None,
         )
-        session.add(referee_stat)
+        writer.add(referee_stat)
 
-    session.commit()
 
+def build_referee_stats(counters_by_human, aggregation_id, human_ids_to_filter, min_games):
+    """Build aggregate_referee_stats' stats_dict from per-referee counters.
 
-def aggregate_referee_stats(
-    session, aggregation_type, aggregation_id, aggregation_window=None
+    Args:
+        counters_by_human: Dict human_id -> games_reffed, penalties_given,
+            gm_given plus the referee's first and last game, either as
+            first_game_id/last_game_id or as first_ordinal/last_ordinal for
+            the caller to resolve
+    """
+    stats_dict = {}
+    for human_id, counters in counters_by_human.items():
+        games_reffed = counters["games_reffed"]
+        if (
+            human_id is None
+            or human_id in human_ids_to_filter
+            or not games_reffed
+            or games_reffed < min_games
+        ):
+            continue
+        stat = {
+            "games_reffed": games_reffed,  # DEPRECATED - for backward compatibility
+            "games_participated": games_reffed,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+            "games_with_stats": games_reffed,  # Games with full stats: FINAL, FINAL_SO only
+            "penalties_given": counters["penalties_given"],
+            "gm_given": counters["gm_given"],
+            "penalties_per_game": counters["penalties_given"] / games_reffed,
+            "gm_per_game": counters["gm_given"] / games_reffed,
+        }
+        for bound in ("first_game_id", "last_game_id", "first_ordinal", "last_ordinal"):
+            if bound in counters:
+                stat[bound] = counters[bound]
+        stats_dict[(aggregation_id, human_id)] = stat
+    return stats_dict
+
+
+def build_referee_stats_from_cache(view, aggregation_id, human_ids_to_filter, min_games):
+    """Build aggregate_referee_stats' stats_dict from a GameFactView of the scope.
+
+    Produces the same counters and per-game rates as the SQL path, with
+    first_game_id/last_game_id already resolved.
+    """
+    return build_referee_stats(
+        view.referee_stats(), aggregation_id, human_ids_to_filter, min_games
+    )
+
+
+def query_referee_partials(session):
+    """
+    All-time referee counters of every referee per (org, division, level),
+    for rolling up org and level stats.
+
+    Games reffed are kept per referee column and penalty games have their
+    own first/last ordinals: both only matter once a scope's totals are
+    known (see referee_stats_from_partials).
+    """
+    partials = ScopePartials(
+        (
+            "games_reffed_1",
+            "games_reffed_2",
+            "penalties_given",
+            "gm_given",
+        ),
+        min_fields=("first_ordinal", "first_penalty_ordinal"),
+        max_fields=("last_ordinal", "last_penalty_ordinal"),
+    )
+    partition_columns = (Game.org_id, Game.division_id, Division.level_id)
+    counters_by_partition = {}
+
+    def counters(row, referee_id):
+        return counters_by_partition.setdefault(
+            (row.org_id, row.division_id, row.level_id, referee_id),
+            {
+                "games_reffed_1": 0,
+                "games_reffed_2": 0,
+                "penalties_given": 0,
+                "gm_given": 0,
+                "first_ordinal": None,
+                "last_ordinal": None,
+                "first_penalty_ordinal": None,
+                "last_penalty_ordinal": None,
+            },
+        )
+
+    for column, referee_id in (
+        ("games_reffed_1", Game.referee_1_id),
+        ("games_reffed_2", Game.referee_2_id),
+    ):
+        rows = (
+            session.query(
+                *partition_columns,
+                referee_id.label("human_id"),
+                func.count(Game.id).label("games_reffed"),
+                func.min(Game.chronological_ordinal).label("first_ordinal"),
+                func.max(Game.chronological_ordinal).label("last_ordinal"),
+            )
+            .join(Division, Game.division_id == Division.id)
+            .filter(Game.status_id.in_(PARTICIPATED_STATUS_IDS))
+            .group_by(*partition_columns, referee_id)
+            .all()
+        )
+        for row in rows:
+            stat = counters(row, row.human_id)
+            stat[column] = row.games_reffed
+            stat["first_ordinal"] = earliest(stat["first_ordinal"], row.first_ordinal)
+            stat["last_ordinal"] = latest(stat["last_ordinal"], row.last_ordinal)
+
+    # Penalties of every game, whatever its status, split between its referees
+    penalties_given_stats = (
+        session.query(
+            *partition_columns,
+            Game.chronological_ordinal,
+            Game.referee_1_id,
+            Game.referee_2_id,
+            func.count(Penalty.id).label("penalties_given"),
+            func.sum(
+                case((func.lower(Penalty.penalty_minutes) == "gm", 1), else_=0)
+            ).label("gm_given"),
+        )
+        .join(Game, Game.id == Penalty.game_id)
+        .join(Division, Game.division_id == Division.id)
+        .group_by(
+            Game.id,
+            *partition_columns,
+            Game.chronological_ordinal,
+            Game.referee_1_id,
+            Game.referee_2_id,
+        )
+        .all()
+    )
+    for row in penalties_given_stats:
+        for referee_id in (row.referee_1_id, row.referee_2_id):
+            if not referee_id:
+                continue
+            stat = counters(row, referee_id)
+            stat["penalties_given"] += row.penalties_given / 2
+            stat["gm_given"] += row.gm_given / 2
+            stat["first_penalty_ordinal"] = earliest(
+                stat["first_penalty_ordinal"], row.chronological_ordinal
+            )
+            stat["last_penalty_ordinal"] = latest(
+                stat["last_penalty_ordinal"], row.chronological_ordinal
+            )
+
+    for (org_id, division_id, level_id, human_id), stat in counters_by_partition.items():
+        partials.add(org_id, division_id, level_id, human_id, stat)
+    return partials
+
+
+def referee_stats_from_partials(partials, aggregation_type, aggregation_id):
+    """
+    Per-referee counters of a scope rolled up from query_referee_partials(),
+    as build_referee_stats() takes them.
+
+    Referees are ordered like the SQL path and the fact cache order them,
+    which decides how rank ties are broken: referee_1s first, then the
+    others, each by id. Penalty games count towards the first and last game
+    of referees who reffed a game of the scope.
+    """
+    counters_by_human = {}
+    rolled_up = partials.rollup(aggregation_type, aggregation_id)
+    for human_id in sorted(rolled_up, key=lambda h: (not rolled_up[h]["games_reffed_1"], h)):
+        stat = rolled_up[human_id]
+        counters_by_human[human_id] = {
+            "games_reffed": stat["games_reffed_1"] + stat["games_reffed_2"],
+            "penalties_given": stat["penalties_given"],
+            "gm_given": stat["gm_given"],
+            "first_ordinal": earliest(stat["first_ordinal"], stat["first_penalty_ordinal"]),
+            "last_ordinal": latest(stat["last_ordinal"], stat["last_penalty_ordinal"]),
+        }
+    return counters_by_human
+
+
+def query_referee_window_stats(
+    session,
+    aggregation_id,
+    filter_condition,
+    window_conditions,
+    human_ids_to_filter,
+    min_games,
+):
+    """
+    Referee counters of several windows of a scope in one scan per query.
+
+    Args:
+        filter_condition: The scope's games
+        window_conditions: {aggregation_window: condition on the games of the
+            window, None for all of the scope's games}
+
+    Returns:
+        {aggregation_window: stats_dict}
+    """
+    windows = list(window_conditions.items())
+    filter_condition = filter_condition & (Division.id == Game.division_id)
+    # Games outside every window are not needed (there are none as soon as
+    # one window covers the whole scope)
+    if all(condition is not None for _, condition in windows):
+        filter_condition = filter_condition & sqlalchemy.or_(
+            *(condition for _, condition in windows)
+        )
+
+    # Aggregate games reffed for each referee
+    # games_participated: Count FINAL, FINAL_SO, FORFEIT, NOEVENTS
+    # games_with_stats: Count only FINAL, FINAL_SO (for per-game averages)
+    # Filter by game status upfront for performance
+    status_filter = Game.status_id.in_(PARTICIPATED_STATUS_IDS)
+
+    def games_reffed_query(referee_id):
+        columns = []
+        for i, (_, condition) in enumerate(windows):
+            columns += [
+                windowed(func.count(Game.id), condition).label(f"games_reffed_{i}"),
+                windowed(func.min(Game.chronological_ordinal), condition).label(
+                    f"first_ordinal_{i}"
+                ),
+                windowed(func.max(Game.chronological_ordinal), condition).label(
+                    f"last_ordinal_{i}"
+                ),
+            ]
+        # Ordered by referee like the fact cache, so that ranks break ties
+        # the same way in every window
+        return (
+            session.query(referee_id.label("human_id"), *columns)
+            .filter(filter_condition, status_filter)
+            .group_by(referee_id)
+            .order_by(referee_id)
+            .all()
+        )
+
+    games_reffed_stats = games_reffed_query(Game.referee_1_id)
+    games_reffed_stats_2 = games_reffed_query(Game.referee_2_id)
+
+    # Aggregate penalties given for each referee
+    penalties_given_stats = (
+        session.query(
+            Game.id.label("game_id"),
+            Game.chronological_ordinal,
+            Game.referee_1_id,
+            Game.referee_2_id,
+            func.count(Penalty.id).label("penalties_given"),
+            func.sum(
+                case((func.lower(Penalty.penalty_minutes) == "gm", 1), else_=0)
+            ).label("gm_given"),
+            *(
+                in_window(condition).label(f"in_window_{i}")
+                for i, (_, condition) in enumerate(windows)
+            ),
+        )
+        .join(Game, Game.id == Penalty.game_id)
+        .filter(filter_condition)
+        .group_by(
+            Game.id,
+            Game.chronological_ordinal,
+            Game.referee_1_id,
+            Game.referee_2_id,
+        )
+        .all()
+    )
+
+    stats_by_window = {}
+    for i, (aggregation_window, _) in enumerate(windows):
+        # Combine the results
+        stats_dict = {}
+        for stat in games_reffed_stats + games_reffed_stats_2:
+            games_reffed = getattr(stat, f"games_reffed_{i}")
+            if stat.human_id in human_ids_to_filter or not games_reffed:
+                continue
+            key = (aggregation_id, stat.human_id)
+            if key not in stats_dict:
+                stats_dict[key] = {
+                    "games_reffed": 0,  # DEPRECATED - for backward compatibility
+                    "games_participated": 0,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+                    "games_with_stats": 0,  # Games with full stats: FINAL, FINAL_SO only
+                    "penalties_given": 0,
+                    "gm_given": 0,
+                    "penalties_per_game": 0.0,
+                    "gm_per_game": 0.0,
+                    "first_ordinal": None,
+                    "last_ordinal": None,
+                }
+            stats_dict[key]["games_reffed"] += games_reffed
+            stats_dict[key]["games_participated"] += games_reffed
+            stats_dict[key]["games_with_stats"] += games_reffed
+            stats_dict[key]["first_ordinal"] = earliest(
+                stats_dict[key]["first_ordinal"], getattr(stat, f"first_ordinal_{i}")
+            )
+            stats_dict[key]["last_ordinal"] = latest(
+                stats_dict[key]["last_ordinal"], getattr(stat, f"last_ordinal_{i}")
+            )
+
+        # Filter out entries with games_reffed less than min_games
+        stats_dict = {
+            key: value
+            for key, value in stats_dict.items()
+            if value["games_reffed"] >= min_games
+        }
+
+        for stat in penalties_given_stats:
+            if not getattr(stat, f"in_window_{i}"):
+                continue
+            for referee_id in (stat.referee_1_id, stat.referee_2_id):
+                if not referee_id or referee_id in human_ids_to_filter:
+                    continue
+                key = (aggregation_id, referee_id)
+                if key in stats_dict:
+                    stats_dict[key]["penalties_given"] += stat.penalties_given / 2
+                    stats_dict[key]["gm_given"] += stat.gm_given / 2
+                    stats_dict[key]["first_ordinal"] = earliest(
+                        stats_dict[key]["first_ordinal"], stat.chronological_ordinal
+                    )
+                    stats_dict[key]["last_ordinal"] = latest(
+                        stats_dict[key]["last_ordinal"], stat.chronological_ordinal
+                    )
+
+        # Calculate per game stats (using games_with_stats as denominator for accuracy)
+        for key, stat in stats_dict.items():
+            if stat["games_with_stats"] > 0:
+                stat["penalties_per_game"] = (
+                    stat["penalties_given"] / stat["games_with_stats"]
+                )
+                stat["gm_per_game"] = stat["gm_given"] / stat["games_with_stats"]
+
+        # Ensure all keys have valid human_id values
+        stats_by_window[aggregation_window] = {
+            key: value for key, value in stats_dict.items() if key[1] is not None
+        }
+
+    # Turn first/last ordinals of every window into game ids with a single query
+    resolve_first_last_games(
+        session,
+        [stat for stats_dict in stats_by_window.values() for stat in stats_dict.values()],
+    )
+    return stats_by_window
+
+
+@record_scope_metrics
+def aggregate_referee_scope(
+    session,
+    aggregation_type,
+    aggregation_id,
+    aggregation_windows=AGGREGATION_WINDOWS,
+    fact_cache=None,
+    partials=None,
 ):
+    """
+    Aggregate the all-time, weekly and daily referee stats of one scope.
+
+    The games are scanned once for all windows (FILTER (WHERE ...)
+    aggregates, or one mask per window with the fact cache) and the windows'
+    tables are written in one transaction. Level scopes only have all-time
+    stats.
+
+    Args:
+        partials: ScopePartials from query_referee_partials(); on the SQL
+            path the all-time counters of org and level scopes are rolled up
+            from them instead of scanning the scope's games
+    """
     # Capture start time for aggregation tracking
     aggregation_start_time = datetime.utcnow()
 
@@ -116,26 +481,24 @@ def aggregate_referee_stats(
             )
             filter_condition = Game.org_id == aggregation_id
         print(
-            f"Aggregating referee stats for {aggregation_name} with window {aggregation_window}..."
+            f"Aggregating referee stats for {aggregation_name} with windows {list(aggregation_windows)}..."
         )
-        if aggregation_window == "Daily":
-            StatsModel = OrgStatsDailyReferee
-        elif aggregation_window == "Weekly":
-            StatsModel = OrgStatsWeeklyReferee
-        else:
-            StatsModel = OrgStatsReferee
+        stats_models = {
+            None: OrgStatsReferee,
+            "Weekly": OrgStatsWeeklyReferee,
+            "Daily": OrgStatsDailyReferee,
+        }
         min_games = MIN_GAMES_FOR_ORG_STATS
     elif aggregation_type == "division":
-        if aggregation_window == "Daily":
-            StatsModel = DivisionStatsDailyReferee
-        elif aggregation_window == "Weekly":
-            StatsModel = DivisionStatsWeeklyReferee
-        else:
-            StatsModel = DivisionStatsReferee
+        stats_models = {
+            None: DivisionStatsReferee,
+            "Weekly": DivisionStatsWeeklyReferee,
+            "Daily": DivisionStatsDailyReferee,
+        }
         min_games = MIN_GAMES_FOR_DIVISION_STATS
         filter_condition = Game.division_id == aggregation_id
     elif aggregation_type == "level":
-        StatsModel = LevelStatsReferee
+        stats_models = {None: LevelStatsReferee}
         min_games = MIN_GAMES_FOR_LEVEL_STATS
         filter_condition = Division.level_id == aggregation_id
         # Add filter to only include games for the last 5 years
@@ -144,261 +507,223 @@ def aggregate_referee_stats(
         # filter_condition = filter_condition & level_window_filter
     else:
         raise ValueError("Invalid aggregation type")
+    aggregation_windows = [
+        window for window in aggregation_windows if window in stats_models
+    ]
 
-    # Apply aggregation window filter BEFORE deleting, so we don't wipe stats
-    # if the window turns out to be stale (no recent games).
-    if aggregation_window:
-        last_game_datetime_str = (
-            session.query(func.max(func.concat(Game.date, " ", Game.time)))
-            .filter(filter_condition, Game.status_id.in_(FINAL_STATUS_IDS))
-            .scalar()
-        )
-        start_datetime = get_start_datetime(last_game_datetime_str, aggregation_window)
-        if start_datetime:
-            game_window_filter = func.cast(
-                func.concat(Game.date, " ", Game.time), sqlalchemy.types.TIMESTAMP
-            ).between(start_datetime, last_game_datetime_str)
-            filter_condition = filter_condition & game_window_filter
+    # The same scope as filter_condition, as a mask over the cached games
+    if fact_cache is not None:
+        game_mask = fact_cache.scope_mask(aggregation_type, aggregation_id)
+
+    # Resolve the windows BEFORE deleting, so we don't wipe stats
+    # if a window turns out to be stale (no recent games).
+    last_game_datetime_str = None
+    if any(aggregation_windows):
+        if fact_cache is not None:
+            last_game_datetime_str = fact_cache.last_game_datetime_str(
+                game_mask, FINAL_STATUS_IDS
+            )
         else:
-            # No recent games — keep existing stats so the section isn't empty.
-            return
-
-    # Delete existing items from the stats table (only after confirming we have data to replace)
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).delete()
-    session.commit()
-
-    filter_condition = filter_condition & (Division.id == Game.division_id)
-    # Aggregate games reffed for each referee
-    # games_participated: Count FINAL, FINAL_SO, FORFEIT, NOEVENTS
-    # games_with_stats: Count only FINAL, FINAL_SO (for per-game averages)
-    # Filter by game status upfront for performance
-    status_filter = Game.status_id.in_(PARTICIPATED_STATUS_IDS)
+            last_game_datetime_str = (
+                session.query(func.max(func.concat(Game.date, " ", Game.time)))
+                .filter(filter_condition, Game.status_id.in_(FINAL_STATUS_IDS))
+                .scalar()
+            )
+    # No recent games — stale windows keep their existing stats so the section isn't empty.
+    window_starts = get_window_starts(last_game_datetime_str, aggregation_windows)
+    if not window_starts:
+        return
 
-    games_reffed_stats = (
-        session.query(
-            Game.referee_1_id.label("human_id"),
-            func.count(Game.id).label("games_reffed"),
-            func.count(Game.id).label(
-                "games_participated"
-            ),  # Same as games_reffed after filtering
-            func.count(Game.id).label(
-                "games_with_stats"
-            ),  # Same as games_reffed after filtering
-            func.array_agg(Game.id).label("game_ids"),
-        )
-        .filter(filter_condition, status_filter)
-        .group_by(Game.referee_1_id)
-        .all()
-    )
+    if fact_cache is not None:
+        stats_by_window = {}
+        for aggregation_window, start_datetime in window_starts.items():
+            mask = game_mask
+            if start_datetime is not None:
+                mask = fact_cache.window_mask(
+                    game_mask, start_datetime, last_game_datetime_str
+                )
+            stats_by_window[aggregation_window] = build_referee_stats_from_cache(
+                fact_cache.view(mask), aggregation_id, human_ids_to_filter, min_games
+            )
+    else:
+        window_conditions = {
+            aggregation_window: get_game_window_condition(
+                start_datetime, last_game_datetime_str
+            )
+            for aggregation_window, start_datetime in window_starts.items()
+        }
+        stats_by_window = {}
+        if (
+            partials is not None
+            and partials.covers(aggregation_type)
+            and None in window_conditions
+        ):
+            # All-time counters summed from the scope's division partials
+            del window_conditions[None]
+            stats_dict = build_referee_stats(
+                referee_stats_from_partials(partials, aggregation_type, aggregation_id),
+                aggregation_id,
+                human_ids_to_filter,
+                min_games,
+            )
+            resolve_first_last_games(session, stats_dict.values())
+            stats_by_window[None] = stats_dict
+        if window_conditions:
+            stats_by_window.update(
+                query_referee_window_stats(
+                    session,
+                    aggregation_id,
+                    filter_condition,
+                    window_conditions,
+                    human_ids_to_filter,
+                    min_games,
+                )
+            )
 
-    games_reffed_stats_2 = (
-        session.query(
-            Game.referee_2_id.label("human_id"),
-            func.count(Game.id).label("games_reffed"),
-            func.count(Game.id).label(
-                "games_participated"
-            ),  # Same as games_reffed after filtering
-            func.count(Game.id).label(
-                "games_with_stats"
-            ),  # Same as games_reffed after filtering
-            func.array_agg(Game.id).label("game_ids"),
+    for aggregation_window, stats_dict in stats_by_window.items():
+        StatsModel = stats_models[aggregation_window]
+        # The window's existing rows are replaced by writer.commit(), all
+        # windows in one transaction
+        writer = StatsModel.bulk_writer(session, aggregation_id, aggregation_start_time)
+
+        # Calculate total_in_rank
+        total_in_rank = len(stats_dict)
+
+        # Assign ranks
+        assign_rank_columns(
+            stats_dict,
+            [
+                "games_reffed",
+                "games_participated",  # Rank by total participation
+                "games_with_stats",  # Rank by games with full stats
+                "penalties_given",
+                "penalties_per_game",
+                "gm_given",
+                "gm_per_game",
+            ],
         )
-        .filter(filter_condition, status_filter)
-        .group_by(Game.referee_2_id)
-        .all()
-    )
 
-    # Aggregate penalties given for each referee
-    penalties_given_stats = (
-        session.query(
-            Game.id.label("game_id"),
-            Game.referee_1_id,
-            Game.referee_2_id,
-            func.count(Penalty.id).label("penalties_given"),
-            func.sum(
-                case((func.lower(Penalty.penalty_minutes) == "gm", 1), else_=0)
-            ).label("gm_given"),
+        # Calculate and insert percentile marker records
+        insert_percentile_markers_referee(
+            session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel
         )
-        .join(Game, Game.id == Penalty.game_id)
-        .filter(filter_condition)
-        .group_by(Game.id, Game.referee_1_id, Game.referee_2_id)
-        .all()
-    )
 
-    # Combine the results
-    stats_dict = {}
-    for stat in games_reffed_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_reffed": 0,  # DEPRECATED - for backward compatibility
-                "games_participated": 0,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-                "games_with_stats": 0,  # Games with full stats: FINAL, FINAL_SO only
-                "penalties_given": 0,
-                "gm_given": 0,
-                "penalties_per_game": 0.0,
-                "gm_per_game": 0.0,
-                "game_ids": [],
-                "first_game_id": None,
-                "last_game_id": None,
-            }
-        stats_dict[key]["games_reffed"] += stat.games_reffed
-        stats_dict[key]["games_participated"] += stat.games_participated
-        stats_dict[key]["games_with_stats"] += stat.games_with_stats
-        stats_dict[key]["game_ids"].extend(stat.game_ids)
-
-    for stat in games_reffed_stats_2:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_reffed": 0,  # DEPRECATED - for backward compatibility
-                "games_participated": 0,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-                "games_with_stats": 0,  # Games with full stats: FINAL, FINAL_SO only
-                "penalties_given": 0,
-                "gm_given": 0,
-                "penalties_per_game": 0.0,
-                "gm_per_game": 0.0,
-                "game_ids": [],
-                "first_game_id": None,
-                "last_game_id": None,
-            }
-        stats_dict[key]["games_reffed"] += stat.games_reffed
-        stats_dict[key]["games_participated"] += stat.games_participated
-        stats_dict[key]["games_with_stats"] += stat.games_with_stats
-        stats_dict[key]["game_ids"].extend(stat.game_ids)
-
-    # Filter out entries with games_reffed less than min_games
-    stats_dict = {
-        key: value
-        for key, value in stats_dict.items()
-        if value["games_reffed"] >= min_games
-    }
-
-    for stat in penalties_given_stats:
-        if stat.referee_1_id and stat.referee_1_id not in human_ids_to_filter:
-            key = (aggregation_id, stat.referee_1_id)
-            if key in stats_dict:
-                stats_dict[key]["penalties_given"] += stat.penalties_given / 2
-                stats_dict[key]["gm_given"] += stat.gm_given / 2
-                stats_dict[key]["game_ids"].append(stat.game_id)
-
-        if stat.referee_2_id and stat.referee_2_id not in human_ids_to_filter:
-            key = (aggregation_id, stat.referee_2_id)
-            if key in stats_dict:
-                stats_dict[key]["penalties_given"] += stat.penalties_given / 2
-                stats_dict[key]["gm_given"] += stat.gm_given / 2
-                stats_dict[key]["game_ids"].append(stat.game_id)
-
-    # Calculate per game stats (using games_with_stats as denominator for accuracy)
-    for key, stat in stats_dict.items():
-        if stat["games_with_stats"] > 0:
-            stat["penalties_per_game"] = (
-                stat["penalties_given"] / stat["games_with_stats"]
-            )
-            stat["gm_per_game"] = stat["gm_given"] / stat["games_with_stats"]
-
-    # Ensure all keys have valid human_id values
-    stats_dict = {key: value for key, value in stats_dict.items() if key[1] is not None}
-
-    # Populate first_game_id and last_game_id
-    for key, stat in stats_dict.items():
-        all_game_ids = stat["game_ids"]
-        if all_game_ids:
-            first_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date, Game.time)
-                .first()
+        # Insert aggregated stats into the appropriate table with progress output
+        for key, stat in stats_dict.items():
+            human_id = key[1]
+            referee_stat = StatsModel(
+                aggregation_id=aggregation_id,
+                human_id=human_id,
+                games_reffed=stat[
+                    "games_reffed"
+                ],  # DEPRECATED - for backward compatibility
+                games_participated=stat[
+                    "games_participated"
+                ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+                games_participated_rank=stat["games_participated_rank"],
+                games_with_stats=stat[
+                    "games_with_stats"
+                ],  # Games with full stats: FINAL, FINAL_SO only
+                games_with_stats_rank=stat["games_with_stats_rank"],
+                penalties_given=stat["penalties_given"],
+                penalties_per_game=stat["penalties_per_game"],
+                gm_given=stat["gm_given"],
+                gm_per_game=stat["gm_per_game"],
+                games_reffed_rank=stat["games_reffed_rank"],
+                penalties_given_rank=stat["penalties_given_rank"],
+                penalties_per_game_rank=stat["penalties_per_game_rank"],
+                gm_given_rank=stat["gm_given_rank"],
+                gm_per_game_rank=stat["gm_per_game_rank"],
+                total_in_rank=total_in_rank,
+                first_game_id=stat["first_game_id"],
+                last_game_id=stat["last_game_id"],
             )
-            last_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id"] = first_game.id if first_game else None
-            stat["last_game_id"] = last_game.id if last_game else None
-
-    # Calculate total_in_rank
-    total_in_rank = len(stats_dict)
-
-    # Assign ranks
-    assign_ranks(stats_dict, "games_reffed")
-    assign_ranks(stats_dict, "games_participated")  # Rank by total participation
-    assign_ranks(stats_dict, "games_with_stats")  # Rank by games with full stats
-    assign_ranks(stats_dict, "penalties_given")
-    assign_ranks(stats_dict, "penalties_per_game")
-    assign_ranks(stats_dict, "gm_given")
-    assign_ranks(stats_dict, "gm_per_game")
-
-    # Calculate and insert percentile marker records
-    insert_percentile_markers_referee(
-        session, stats_dict, aggregation_id, total_in_rank, StatsModel
-    )
+            writer.add(referee_stat)
 
-    # Insert aggregated stats into the appropriate table with progress output
-    total_items = len(stats_dict)
-    batch_size = 1000
-    for i, (key, stat) in enumerate(stats_dict.items(), 1):
-        aggregation_id, human_id = key
-        referee_stat = StatsModel(
-            aggregation_id=aggregation_id,
-            human_id=human_id,
-            games_reffed=stat[
-                "games_reffed"
-            ],  # DEPRECATED - for backward compatibility
-            games_participated=stat[
-                "games_participated"
-            ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-            games_participated_rank=stat["games_participated_rank"],
-            games_with_stats=stat[
-                "games_with_stats"
-            ],  # Games with full stats: FINAL, FINAL_SO only
-            games_with_stats_rank=stat["games_with_stats_rank"],
-            penalties_given=stat["penalties_given"],
-            penalties_per_game=stat["penalties_per_game"],
-            gm_given=stat["gm_given"],
-            gm_per_game=stat["gm_per_game"],
-            games_reffed_rank=stat["games_reffed_rank"],
-            penalties_given_rank=stat["penalties_given_rank"],
-            penalties_per_game_rank=stat["penalties_per_game_rank"],
-            gm_given_rank=stat["gm_given_rank"],
-            gm_per_game_rank=stat["gm_per_game_rank"],
-            total_in_rank=total_in_rank,
-            first_game_id=stat["first_game_id"],
-            last_game_id=stat["last_game_id"],
-            aggregation_started_at=aggregation_start_time,
-        )
-        session.add(referee_stat)
-        # Commit in batches
-        if i % batch_size == 0:
-            session.commit()
-    session.commit()
+        # Replace the window's rows, stamping aggregation_completed_at
+        writer.commit(autocommit=False)
 
-    # Update all records with completion timestamp
-    aggregation_end_time = datetime.utcnow()
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).update({StatsModel.aggregation_completed_at: aggregation_end_time})
     session.commit()
 
 
-def run_aggregate_referee_stats():
+def aggregate_referee_stats(
+    session,
+    aggregation_type,
+    aggregation_id,
+    aggregation_window=None,
+    fact_cache=None,
+):
+    """Aggregate a single window of a referee stats scope (see aggregate_referee_scope)."""
+    aggregate_referee_scope(
+        session,
+        aggregation_type,
+        aggregation_id,
+        aggregation_windows=(aggregation_window,),
+        fact_cache=fact_cache,
+    )
+
+
+def aggregate_referee_division(session, division_id, use_fact_cache=False):
+    """Aggregate all-time, weekly and daily referee stats for one division."""
+    fact_cache = get_game_fact_cache(session) if use_fact_cache else None
+    aggregate_referee_scope(
+        session,
+        aggregation_type="division",
+        aggregation_id=division_id,
+        fact_cache=fact_cache,
+    )
+
+
+def run_aggregate_referee_stats(
+    workers=DIVISION_AGGREGATION_WORKERS,
+    use_fact_cache=USE_GAME_FACT_CACHE,
+    rollup=ROLLUP_SCOPE_STATS,
+):
+    """
+    Aggregate referee stats for every division, organization and level.
+
+    Args:
+        workers: Number of processes aggregating divisions concurrently
+            (1 = serial). Org and level scopes run once all divisions are done.
+        use_fact_cache: Compute the stats from an in-memory GameFactCache
+            instead of querying the database for every scope.
+        rollup: Without the fact cache, roll all-time org and level stats up
+            from per-division partials.
+    """
     session = create_session("boss")
     human_id_to_debug = None
 
+    # Loaded once here; the division workers memory-map a saved copy
+    fact_cache = load_game_fact_cache(session) if use_fact_cache else None
+
     # Get all org_id present in the Organization table
     org_ids = session.query(Organization.id).all()
     org_ids = [org_id[0] for org_id in org_ids]
 
+    # Divisions are independent of each other, so fan them out first
+    division_ids = []
+    for org_id in org_ids:
+        division_ids.extend(get_all_division_ids_for_org(session, org_id))
+    run_division_aggregations(
+        session,
+        aggregate_referee_division,
+        division_ids,
+        workers=workers,
+        description=(
+            f"Processing {len(division_ids)} divisions"
+            if human_id_to_debug is None
+            else None
+        ),
+        use_fact_cache=use_fact_cache,
+        fact_cache=fact_cache,
+    )
+
+    # Org and level counters come from one pass over all games
+    partials = (
+        query_referee_partials(session) if rollup and fact_cache is None else None
+    )
+
     for org_id in org_ids:
-        division_ids = get_all_division_ids_for_org(session, org_id)
         org_name = (
             session.query(Organization.organization_name)
             .filter(Organization.id == org_id)
@@ -406,87 +731,20 @@ def run_aggregate_referee_stats():
             or f"org_id {org_id}"
         )
 
-        if human_id_to_debug is None and division_ids:
-            # Process divisions with progress tracking
-            progress = create_progress_tracker(
-                len(division_ids),
-                f"Processing {len(division_ids)} divisions for {org_name}",
-            )
-            for i, division_id in enumerate(division_ids):
-                aggregate_referee_stats(
-                    session, aggregation_type="division", aggregation_id=division_id
-                )
-                aggregate_referee_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    aggregation_window="Weekly",
-                )
-                aggregate_referee_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    aggregation_window="Daily",
-                )
-                progress.update(i + 1)
-        else:
-            # Debug mode or no divisions - process without progress tracking
-            for division_id in division_ids:
-                aggregate_referee_stats(
-                    session, aggregation_type="division", aggregation_id=division_id
-                )
-                aggregate_referee_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    aggregation_window="Weekly",
-                )
-                aggregate_referee_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    aggregation_window="Daily",
-                )
-
-        # Process org-level stats with progress tracking
+        # Process org-level stats (all windows in one pass) with progress tracking
         if human_id_to_debug is None:
             org_progress = create_progress_tracker(
-                3, f"Processing org-level stats for {org_name}"
-            )
-            aggregate_referee_stats(
-                session, aggregation_type="org", aggregation_id=org_id
+                1, f"Processing org-level stats for {org_name}"
             )
+        aggregate_referee_scope(
+            session,
+            aggregation_type="org",
+            aggregation_id=org_id,
+            fact_cache=fact_cache,
+            partials=partials,
+        )
+        if human_id_to_debug is None:
             org_progress.update(1)
-            aggregate_referee_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Weekly",
-            )
-            org_progress.update(2)
-            aggregate_referee_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Daily",
-            )
-            org_progress.update(3)
-        else:
-            aggregate_referee_stats(
-                session, aggregation_type="org", aggregation_id=org_id
-            )
-            aggregate_referee_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Weekly",
-            )
-            aggregate_referee_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Daily",
-            )
 
     # Aggregate by level
     level_ids = session.query(Division.level_id).distinct().all()
@@ -498,15 +756,23 @@ def run_aggregate_referee_stats():
             len(level_ids), f"Processing {len(level_ids)} skill levels"
         )
         for i, level_id in enumerate(level_ids):
-            aggregate_referee_stats(
-                session, aggregation_type="level", aggregation_id=level_id
+            aggregate_referee_scope(
+                session,
+                aggregation_type="level",
+                aggregation_id=level_id,
+                fact_cache=fact_cache,
+                partials=partials,
             )
             level_progress.update(i + 1)
     else:
         # Debug mode or no levels - process without progress tracking
         for level_id in level_ids:
-            aggregate_referee_stats(
-                session, aggregation_type="level", aggregation_id=level_id
+            aggregate_referee_scope(
+                session,
+                aggregation_type="level",
+                aggregation_id=level_id,
+                fact_cache=fact_cache,
+                partials=partials,
             )
 
 
@@ -1,203 +1,428 @@
+import argparse
+import io
 import os
 import sys
+import time
 from datetime import datetime
 
 # Add the package directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import types
-from sqlalchemy.sql import func
+import numpy as np
+from sqlalchemy import text
 
 from hockey_blast_common_lib.db_connection import create_session
 from hockey_blast_common_lib.h2h_models import (
     SkaterToSkaterStats,
     SkaterToSkaterStatsMeta,
 )
-from hockey_blast_common_lib.models import Game, GameRoster, Goal, Penalty
+from hockey_blast_common_lib.options import PAIR_STATS_SHARDS
+from hockey_blast_common_lib.pair_stats_ledger import (
+    create_rebuild_table,
+    drop_rebuild_table,
+    full_rebuild_reason,
+    get_pair_stats_game_ids,
+    has_processed_games,
+    record_processed_games,
+    reset_processed_games,
+    swap_rebuild_table,
+)
+from hockey_blast_common_lib.parallel_utils import run_shards
 
 # Optional: Limit processing to a specific human_id
 LIMIT_HUMAN_ID = None
 
+# Skater rows fetched from the server-side cursor and turned into pairs at a time
+S2S_STREAM_ROWS = 100000
 
-def aggregate_s2s_stats():
-    session = create_session("boss")
-    meta = (
-        session.query(SkaterToSkaterStatsMeta)
-        .order_by(SkaterToSkaterStatsMeta.id.desc())
-        .first()
+S2S_TABLE = SkaterToSkaterStats.__tablename__
+
+# Counters accumulated per (skater1_id, skater2_id), in table column order
+S2S_COUNTER_COLUMNS = [
+    "games_against",
+    "games_tied_against",
+    "skater1_wins_vs_skater2",
+    "skater2_wins_vs_skater1",
+    "skater1_goals_against_skater2",
+    "skater2_goals_against_skater1",
+    "skater1_assists_against_skater2",
+    "skater2_assists_against_skater1",
+    "skater1_penalties_against_skater2",
+    "skater2_penalties_against_skater1",
+]
+
+# Columns of S2S_SKATERS_QUERY
+S2S_SKATER_FIELDS = (
+    "game_id",
+    "human_id",
+    "is_home",
+    "goals",
+    "assists",
+    "penalties",
+    "is_tie",
+    "home_won",
+    "visitor_won",
+)
+
+# Skaters (non-goalie roster entries) of the home and visiting teams with
+# their goals, assists and penalties and the game's result, grouped by game
+# with home skaters first. The result follows the old _is_win/_is_tie
+# helpers: a tie needs both scores, missing scores count as 0 otherwise.
+S2S_SKATERS_QUERY = """
+    WITH selected_games AS (
+        SELECT id, home_team_id, visitor_team_id,
+               home_final_score IS NOT NULL AND visitor_final_score IS NOT NULL
+                   AND home_final_score = visitor_final_score AS is_tie,
+               COALESCE(home_final_score, 0) > COALESCE(visitor_final_score, 0) AS home_won,
+               COALESCE(visitor_final_score, 0) > COALESCE(home_final_score, 0) AS visitor_won
+        FROM games
+        WHERE id = ANY(:game_ids)
+    ),
+    goal_counts AS (
+        SELECT gl.game_id, x.human_id,
+               COUNT(*) FILTER (WHERE x.is_scorer) AS goals,
+               COUNT(DISTINCT gl.id) FILTER (WHERE NOT x.is_scorer) AS assists
+        FROM goals gl
+        JOIN selected_games g ON g.id = gl.game_id
+        CROSS JOIN LATERAL (
+            VALUES (gl.goal_scorer_id, TRUE), (gl.assist_1_id, FALSE), (gl.assist_2_id, FALSE)
+        ) AS x (human_id, is_scorer)
+        WHERE x.human_id IS NOT NULL
+        GROUP BY gl.game_id, x.human_id
+    ),
+    penalty_counts AS (
+        SELECT p.game_id, p.penalized_player_id AS human_id, COUNT(*) AS penalties
+        FROM penalties p
+        JOIN selected_games g ON g.id = p.game_id
+        GROUP BY p.game_id, p.penalized_player_id
     )
-    s2s_stats_dict = {}  # (skater1_id, skater2_id) -> SkaterToSkaterStats instance
-
-    if (
-        meta is None
-        or meta.last_run_timestamp is None
-        or meta.last_processed_game_id is None
-    ):
-        # Full run: delete all existing stats and process all games
-        session.query(SkaterToSkaterStats).delete()
-        session.commit()
-        games_query = session.query(Game).order_by(Game.date, Game.time, Game.id)
-        print(
-            "No previous run found, deleted all existing Skater-to-Skater stats, processing all games..."
+    SELECT r.game_id, r.human_id, r.team_id = g.home_team_id AS is_home,
+           COALESCE(gc.goals, 0), COALESCE(gc.assists, 0), COALESCE(pc.penalties, 0),
+           g.is_tie, g.home_won, g.visitor_won
+    FROM game_rosters r
+    JOIN selected_games g ON g.id = r.game_id
+    LEFT JOIN goal_counts gc ON gc.game_id = r.game_id AND gc.human_id = r.human_id
+    LEFT JOIN penalty_counts pc ON pc.game_id = r.game_id AND pc.human_id = r.human_id
+    WHERE r.team_id IN (g.home_team_id, g.visitor_team_id)
+      AND NOT r.role ILIKE 'g'
+    ORDER BY r.game_id, is_home DESC, r.human_id
+"""
+
+
+class PairAccumulator:
+    """
+    Sparse (skater1_id, skater2_id) -> counters matrix in coalesced COO form.
+
+    Pairs are packed into one int64 key, so memory grows with the number of
+    distinct pairs rather than with the number of pair appearances. Added
+    rows are buffered and only coalesced once the buffer outgrows the
+    coalesced part, so repeated adds cost amortized O(n log n).
+    """
+
+    def __init__(self, num_columns):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, num_columns), dtype=np.int64)
+        self._pending = []
+        self._pending_rows = 0
+
+    def __len__(self):
+        self._coalesce()
+        return len(self.keys)
+
+    def add(self, skater1_ids, skater2_ids, values):
+        """Add counter rows (one per pair appearance)."""
+        keys = (skater1_ids.astype(np.int64) << 32) | skater2_ids.astype(np.int64)
+        self._pending.append((keys, values))
+        self._pending_rows += len(keys)
+        if self._pending_rows >= max(len(self.keys), S2S_STREAM_ROWS):
+            self._coalesce()
+
+    def _coalesce(self):
+        if not self._pending:
+            return
+        keys = np.concatenate([self.keys] + [keys for keys, _ in self._pending])
+        values = np.concatenate([self.values] + [values for _, values in self._pending])
+        self._pending = []
+        self._pending_rows = 0
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.values = np.column_stack(
+            [
+                np.bincount(
+                    inverse, weights=values[:, column], minlength=len(self.keys)
+                )
+                for column in range(values.shape[1])
+            ]
+        ).astype(np.int64)
+
+    def pairs(self):
+        """Return (skater1_ids, skater2_ids, counters) arrays."""
+        self._coalesce()
+        return self.keys >> 32, self.keys & 0xFFFFFFFF, self.values
+
+
+def iter_game_skaters(session, game_ids):
+    """
+    Yield the rows of S2S_SKATERS_QUERY as dicts of column arrays, read
+    S2S_STREAM_ROWS at a time through a server-side cursor. Every yielded
+    block holds whole games.
+    """
+    result = session.execute(
+        text(S2S_SKATERS_QUERY),
+        {"game_ids": game_ids},
+        execution_options={"stream_results": True},
+    )
+    num_fields = len(S2S_SKATER_FIELDS)
+    pending = np.empty((0, num_fields), dtype=np.int64)
+    while True:
+        rows = result.fetchmany(S2S_STREAM_ROWS)
+        block = np.concatenate(
+            [pending, np.array(rows, dtype=np.int64).reshape(-1, num_fields)]
         )
-    else:
-        # Incremental: only process games after last processed
-        for stat in session.query(SkaterToSkaterStats).all():
-            s2s_stats_dict[(stat.skater1_id, stat.skater2_id)] = stat
-        last_game = (
-            session.query(Game).filter(Game.id == meta.last_processed_game_id).first()
+        if not rows:
+            if len(block):
+                yield dict(zip(S2S_SKATER_FIELDS, block.T))
+            return
+        # The block's last game may continue in the next fetch
+        split = np.searchsorted(block[:, 0], block[-1, 0])
+        pending = block[split:]
+        if split:
+            yield dict(zip(S2S_SKATER_FIELDS, block[:split].T))
+
+
+def build_game_pairs(skaters, shard=0, shards=1):
+    """
+    Expand every game's home x away skaters into pair rows, keeping only the
+    pairs whose skater1_id % shards == shard.
+
+    Returns:
+        (skater1_ids, skater2_ids, counters) with skater1_id < skater2_id and
+        counters in S2S_COUNTER_COLUMNS order
+    """
+    if len(skaters["game_id"]) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty((0, len(S2S_COUNTER_COLUMNS)), dtype=np.int64)
+
+    # Rows are grouped by game, home skaters first
+    game_starts = np.flatnonzero(
+        np.r_[True, skaters["game_id"][1:] != skaters["game_id"][:-1]]
+    )
+    game_sizes = np.diff(np.r_[game_starts, len(skaters["game_id"])])
+    home_counts = np.add.reduceat(skaters["is_home"], game_starts)
+    away_counts = game_sizes - home_counts
+    pair_counts = home_counts * away_counts
+
+    # Pair k of a game is (home skater k // away_count, away skater k % away_count)
+    pair_game = np.repeat(np.arange(len(game_starts)), pair_counts)
+    first_pair = np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+    k = np.arange(len(pair_game)) - first_pair
+    away_count = away_counts[pair_game]
+    home_rows = game_starts[pair_game] + k // away_count
+    away_rows = game_starts[pair_game] + home_counts[pair_game] + k % away_count
+
+    result_rows = game_starts[pair_game]
+    is_tie = skaters["is_tie"][result_rows]
+    home_won = skaters["home_won"][result_rows] & (1 - is_tie)
+    visitor_won = skaters["visitor_won"][result_rows] & (1 - is_tie)
+
+    home_ids = skaters["human_id"][home_rows]
+    away_ids = skaters["human_id"][away_rows]
+    home_first = home_ids < away_ids
+    skater1_ids = np.where(home_first, home_ids, away_ids)
+    skater2_ids = np.where(home_first, away_ids, home_ids)
+
+    def oriented(home_values, away_values):
+        return (
+            np.where(home_first, home_values, away_values),
+            np.where(home_first, away_values, home_values),
         )
-        if last_game:
-            last_dt = datetime.combine(last_game.date, last_game.time)
-            games_query = (
-                session.query(Game)
-                .filter(
-                    func.cast(func.concat(Game.date, " ", Game.time), types.TIMESTAMP())
-                    > last_dt
-                )
-                .order_by(Game.date, Game.time, Game.id)
-            )
-            print(
-                f"Resuming from game after id {meta.last_processed_game_id} ({last_dt})..."
-            )
-        else:
-            games_query = session.query(Game).order_by(Game.date, Game.time, Game.id)
-            print("Previous game id not found, processing all games...")
 
-    total_games = games_query.count()
-    print(f"Total games to process: {total_games}")
-    processed = 0
-    latest_game_id = None
-
-    for game in games_query:
-        # Separate skaters into home and away rosters (exclude goalies)
-        home_skaters = [
-            entry.human_id
-            for entry in session.query(GameRoster)
-            .filter(
-                GameRoster.game_id == game.id,
-                GameRoster.team_id == game.home_team_id,
-                ~GameRoster.role.ilike("g"),
-            )
-            .all()
-        ]
-        away_skaters = [
-            entry.human_id
-            for entry in session.query(GameRoster)
-            .filter(
-                GameRoster.game_id == game.id,
-                GameRoster.team_id == game.visitor_team_id,
-                ~GameRoster.role.ilike("g"),
-            )
-            .all()
+    # Each skater is credited with their own team's win
+    wins1, wins2 = oriented(home_won, visitor_won)
+    goals1, goals2 = oriented(skaters["goals"][home_rows], skaters["goals"][away_rows])
+    assists1, assists2 = oriented(
+        skaters["assists"][home_rows], skaters["assists"][away_rows]
+    )
+    penalties1, penalties2 = oriented(
+        skaters["penalties"][home_rows], skaters["penalties"][away_rows]
+    )
+    counters = np.column_stack(
+        [
+            np.ones(len(pair_game), dtype=np.int64),
+            is_tie,
+            wins1,
+            wins2,
+            goals1,
+            goals2,
+            assists1,
+            assists2,
+            penalties1,
+            penalties2,
         ]
+    )
 
-        if (
-            LIMIT_HUMAN_ID is not None
-            and LIMIT_HUMAN_ID not in home_skaters + away_skaters
-        ):
-            continue
-
-        # Create pairs of skaters from different rosters
-        for h_skater in home_skaters:
-            for a_skater in away_skaters:
-                if LIMIT_HUMAN_ID is not None and LIMIT_HUMAN_ID not in [
-                    h_skater,
-                    a_skater,
-                ]:
-                    continue
-
-                s1, s2 = sorted([h_skater, a_skater])
-                key = (s1, s2)
-                s2s = s2s_stats_dict.get(key)
-                if not s2s:
-                    s2s = SkaterToSkaterStats(
-                        skater1_id=s1,
-                        skater2_id=s2,
-                        games_against=0,
-                        games_tied_against=0,
-                        skater1_wins_vs_skater2=0,
-                        skater2_wins_vs_skater1=0,
-                        skater1_goals_against_skater2=0,
-                        skater2_goals_against_skater1=0,
-                        skater1_assists_against_skater2=0,
-                        skater2_assists_against_skater1=0,
-                        skater1_penalties_against_skater2=0,
-                        skater2_penalties_against_skater1=0,
-                    )
-                    s2s_stats_dict[key] = s2s
-
-                # Update stats
-                s2s.games_against += 1
-                if _is_tie(game):
-                    s2s.games_tied_against += 1
-                elif _is_win(game, s1, game.home_team_id):
-                    s2s.skater1_wins_vs_skater2 += 1
-                elif _is_win(game, s2, game.visitor_team_id):
-                    s2s.skater2_wins_vs_skater1 += 1
-
-                # Goals and assists
-                goals_stats = session.query(Goal).filter(Goal.game_id == game.id).all()
-                for goal in goals_stats:
-                    if goal.goal_scorer_id == s1:
-                        s2s.skater1_goals_against_skater2 += 1
-                    if goal.goal_scorer_id == s2:
-                        s2s.skater2_goals_against_skater1 += 1
-                    if goal.assist_1_id == s1 or goal.assist_2_id == s1:
-                        s2s.skater1_assists_against_skater2 += 1
-                    if goal.assist_1_id == s2 or goal.assist_2_id == s2:
-                        s2s.skater2_assists_against_skater1 += 1
-
-                # Penalties
-                penalties_stats = (
-                    session.query(Penalty).filter(Penalty.game_id == game.id).all()
-                )
-                for penalty in penalties_stats:
-                    if penalty.penalized_player_id == s1:
-                        s2s.skater1_penalties_against_skater2 += 1
-                    if penalty.penalized_player_id == s2:
-                        s2s.skater2_penalties_against_skater1 += 1
-
-        latest_game_id = game.id
-        processed += 1
-        if processed % 10 == 0 or processed == total_games:
+    # A human on both rosters of a game would otherwise face themselves
+    keep = skater1_ids != skater2_ids
+    if shards > 1:
+        keep &= skater1_ids % shards == shard
+    if LIMIT_HUMAN_ID is not None:
+        keep &= (skater1_ids == LIMIT_HUMAN_ID) | (skater2_ids == LIMIT_HUMAN_ID)
+    return skater1_ids[keep], skater2_ids[keep], counters[keep]
+
+
+def write_s2s_pairs(session, accumulator, merge=False, table=S2S_TABLE):
+    """
+    COPY the accumulated pairs into table (skater_to_skater_stats or the
+    rebuild table of a sharded full rebuild). With merge, add them to the
+    stored pairs instead of inserting new rows only.
+    Runs in the caller's transaction; returns the number of pairs written.
+    """
+    skater1_ids, skater2_ids, counters = accumulator.pairs()
+    columns = ["skater1_id", "skater2_id"] + S2S_COUNTER_COLUMNS
+    column_list = ", ".join(columns)
+    buffer = io.StringIO()
+    np.savetxt(
+        buffer,
+        np.column_stack([skater1_ids, skater2_ids, counters]),
+        fmt="%d",
+        delimiter="\t",
+    )
+    buffer.seek(0)
+
+    session.execute(
+        text(
+            f"CREATE TEMP TABLE s2s_staging ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {S2S_TABLE} WITH NO DATA"
+        )
+    )
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY s2s_staging ({column_list}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+    statement = (
+        f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM s2s_staging"
+    )
+    if merge:
+        statement += " ON CONFLICT (skater1_id, skater2_id) DO UPDATE SET " + ", ".join(
+            f"{column} = {S2S_TABLE}.{column} + EXCLUDED.{column}"
+            for column in S2S_COUNTER_COLUMNS
+        )
+    return session.execute(text(statement)).rowcount
+
+
+def accumulate_s2s_pairs(session, game_ids, shard=0, shards=1, show_progress=False):
+    """Stream the games' skaters and sum one shard of their pairs."""
+    accumulator = PairAccumulator(len(S2S_COUNTER_COLUMNS))
+    processed = 0
+    for skaters in iter_game_skaters(session, game_ids):
+        accumulator.add(*build_game_pairs(skaters, shard, shards))
+        processed += len(np.unique(skaters["game_id"]))
+        if show_progress:
             print(
-                f"\rProcessed {processed}/{total_games} games ({(processed/total_games)*100:.2f}%)",
+                f"\rProcessed {processed:,} games with skaters",
                 end="",
             )
             sys.stdout.flush()
+    if show_progress:
+        print()
+    return accumulator
 
-    # Commit all stats at once
-    session.query(SkaterToSkaterStats).delete()
-    session.add_all(list(s2s_stats_dict.values()))
-    session.commit()
-    print(f"\rProcessed {processed}/{total_games} games (100.00%)")
 
-    # Save/update meta
-    meta = SkaterToSkaterStatsMeta(
-        last_run_timestamp=datetime.utcnow(), last_processed_game_id=latest_game_id
-    )
-    session.add(meta)
-    session.commit()
-    print("Skater-to-Skater aggregation complete.")
+def _aggregate_s2s_shard(shard, shards, game_ids, rebuild_table):
+    """Worker entry point: accumulate, write and commit one shard of a full rebuild."""
+    session = create_session("boss")
+    try:
+        accumulator = accumulate_s2s_pairs(session, game_ids, shard, shards)
+        pairs_written = write_s2s_pairs(session, accumulator, table=rebuild_table)
+        session.commit()
+    finally:
+        session.close()
+    return pairs_written
+
 
+def aggregate_s2s_stats(full=False, shards=PAIR_STATS_SHARDS):
+    """
+    Update skater_to_skater_stats for every pair of opposing skaters.
 
-# --- Helper functions for win/loss/tie ---
-def _is_win(game, skater_id, team_id):
-    if team_id == game.home_team_id:
-        return (game.home_final_score or 0) > (game.visitor_final_score or 0)
-    if team_id == game.visitor_team_id:
-        return (game.visitor_final_score or 0) > (game.home_final_score or 0)
-    return False
+    Rosters, goals, assists and penalties are streamed through a server-side
+    cursor; each game's home x away skater pairs are expanded with NumPy and
+    summed into a sparse pair accumulator, which is written with COPY.
 
+    The first run (or full=True) rebuilds the table in one transaction, so
+    readers see the old pairs until the new ones are committed. With
+    shards > 1 the pairs are split by skater1_id % shards across worker
+    processes, each streaming every game but only accumulating, writing and
+    committing its own shard into a rebuild table that then replaces the
+    stored pairs (see swap_rebuild_table); if a shard fails, the table and
+    the ledger are left as they were. Later runs add the played games
+    missing from the processed games ledger to the stored pairs in one
+    transaction, or rebuild in full when a counted game changed or the last
+    full rebuild is too old (see full_rebuild_reason).
 
-def _is_tie(game):
-    return (
-        game.home_final_score is not None
-        and game.visitor_final_score is not None
-        and game.home_final_score == game.visitor_final_score
+    Args:
+        full: Rebuild from scratch even if earlier runs were recorded
+        shards: Number of worker processes for a full rebuild (1 = one
+            transaction in this process)
+    """
+    session = create_session("boss")
+    start_time = time.time()
+    incremental = not full and has_processed_games(session, S2S_TABLE)
+    if incremental:
+        reason = full_rebuild_reason(session, S2S_TABLE)
+        if reason:
+            print(f"Rebuilding {S2S_TABLE} in full: {reason}", flush=True)
+            incremental = False
+    game_ids = get_pair_stats_game_ids(session, S2S_TABLE if incremental else None)
+    print(
+        f"{'New' if incremental else 'Total'} games to process: {len(game_ids)}",
+        flush=True,
+    )
+
+    if not incremental and game_ids and shards > 1:
+        columns = ", ".join(["skater1_id", "skater2_id"] + S2S_COUNTER_COLUMNS)
+        rebuild_table = create_rebuild_table(session, S2S_TABLE, columns)
+        try:
+            run_shards(_aggregate_s2s_shard, shards, game_ids, rebuild_table)
+        except Exception:
+            drop_rebuild_table(session, rebuild_table)
+            raise
+        pairs_written = swap_rebuild_table(session, S2S_TABLE, rebuild_table, columns)
+    else:
+        if not incremental:
+            session.execute(text(f"DELETE FROM {S2S_TABLE}"))
+        accumulator = accumulate_s2s_pairs(
+            session, game_ids, show_progress=bool(game_ids)
+        )
+        pairs_written = write_s2s_pairs(session, accumulator, merge=incremental)
+    if not incremental:
+        reset_processed_games(session, S2S_TABLE)
+    record_processed_games(session, S2S_TABLE, game_ids)
+    if game_ids:
+        session.add(
+            SkaterToSkaterStatsMeta(
+                last_run_timestamp=datetime.utcnow(),
+                last_processed_game_id=game_ids[-1],
+            )
+        )
+    session.commit()
+    print(
+        f"Skater-to-Skater aggregation complete: {pairs_written:,} pairs written "
+        f"({time.time() - start_time:.1f}s)."
     )
 
 
 if __name__ == "__main__":
-    aggregate_s2s_stats()
+    parser = argparse.ArgumentParser(description="Aggregate skater-to-skater stats.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild skater_to_skater_stats from scratch instead of adding new games.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=PAIR_STATS_SHARDS,
+        help="Worker processes for a full rebuild (1 = single process).",
+    )
+    args = parser.parse_args()
+    aggregate_s2s_stats(full=args.full, shards=args.shards)
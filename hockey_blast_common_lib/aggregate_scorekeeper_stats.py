@@ -10,7 +10,9 @@ from datetime import datetime
 import sqlalchemy
 from sqlalchemy.sql import func
 
+from hockey_blast_common_lib.aggregation_metrics import record_scope_metrics
 from hockey_blast_common_lib.db_connection import create_session
+from hockey_blast_common_lib.game_ordinals import resolve_first_last_games
 from hockey_blast_common_lib.models import Game, ScorekeeperSaveQuality
 from hockey_blast_common_lib.options import (
     MIN_GAMES_FOR_ORG_STATS,
@@ -21,19 +23,24 @@ from hockey_blast_common_lib.stats_models import (
     OrgStatsScorekeeper,
     OrgStatsWeeklyScorekeeper,
 )
-from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+from hockey_blast_common_lib.stats_utils import (
+    ALL_ORGS_ID,
+    assign_rank_columns,
+    compute_percentile_values,
+)
 from hockey_blast_common_lib.game_status import FINAL_STATUS_IDS, PARTICIPATED_STATUS_IDS
 from hockey_blast_common_lib.utils import (
-    assign_ranks,
-    calculate_percentile_value,
+    AGGREGATION_WINDOWS,
+    get_game_window_condition,
     get_non_human_ids,
-    get_percentile_human,
-    get_start_datetime,
+    get_percentile_human_ids,
+    get_window_starts,
+    windowed,
 )
 
 
 def insert_percentile_markers_scorekeeper(
-    session, stats_dict, aggregation_id, total_in_rank, StatsModel
+    session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel
 ):
     """Insert percentile marker records for scorekeeper stats."""
     if not stats_dict:
@@ -54,18 +61,11 @@ def insert_percentile_markers_scorekeeper(
         "quality_score",
     ]
 
-    percentiles = [25, 50, 75, 90, 95]
-
-    for percentile in percentiles:
-        percentile_human_id = get_percentile_human(session, "Scorekeeper", percentile)
+    percentile_human_ids = get_percentile_human_ids(session, "Scorekeeper")
+    values_by_percentile = compute_percentile_values(stats_dict, stat_fields)
 
-        percentile_values = {}
-        for field in stat_fields:
-            values = [stat[field] for stat in stats_dict.values() if field in stat]
-            if values:
-                percentile_values[field] = calculate_percentile_value(values, percentile)
-            else:
-                percentile_values[field] = 0
+    for percentile, percentile_human_id in percentile_human_ids.items():
+        percentile_values = values_by_percentile[percentile]
 
         scorekeeper_stat = StatsModel(
             aggregation_id=aggregation_id,
@@ -98,9 +98,7 @@ def insert_percentile_markers_scorekeeper(
             first_game_id=None,
             last_game_id=None,
         )
-        session.add(scorekeeper_stat)
-
-    session.commit()
+        writer.add(scorekeeper_stat)
 
 
 def calculate_quality_score(
@@ -140,9 +138,17 @@ def calculate_quality_score(
     return round(score, 2)
 
 
-def aggregate_scorekeeper_stats(
-    session, aggregation_type, aggregation_id, aggregation_window=None
+@record_scope_metrics
+def aggregate_scorekeeper_scope(
+    session, aggregation_type, aggregation_id, aggregation_windows=AGGREGATION_WINDOWS
 ):
+    """
+    Aggregate the all-time, weekly and daily scorekeeper stats of one scope.
+
+    The save quality rows are scanned once, computing every window with
+    FILTER (WHERE ...) aggregates, and the windows' tables are written in one
+    transaction.
+    """
     # Only process scorekeeper stats for ALL_ORGS_ID - skip individual organizations
     # This prevents redundant processing when upstream logic calls with all organization IDs
     if aggregation_type == "org" and aggregation_id != ALL_ORGS_ID:
@@ -157,75 +163,82 @@ def aggregate_scorekeeper_stats(
         aggregation_name = "All Orgs"
         filter_condition = sqlalchemy.true()  # No filter for organization
         print(
-            f"Aggregating scorekeeper stats for {aggregation_name} with window {aggregation_window}..."
+            f"Aggregating scorekeeper stats for {aggregation_name} with windows {list(aggregation_windows)}..."
         )
-        if aggregation_window == "Daily":
-            StatsModel = OrgStatsDailyScorekeeper
-        elif aggregation_window == "Weekly":
-            StatsModel = OrgStatsWeeklyScorekeeper
-        else:
-            StatsModel = OrgStatsScorekeeper
+        stats_models = {
+            None: OrgStatsScorekeeper,
+            "Weekly": OrgStatsWeeklyScorekeeper,
+            "Daily": OrgStatsDailyScorekeeper,
+        }
         min_games = MIN_GAMES_FOR_ORG_STATS
     else:
         raise ValueError("Invalid aggregation type")
 
-    # Apply aggregation window filter BEFORE deleting, so we don't wipe stats
-    # if the window turns out to be stale (no recent games).
-    if aggregation_window:
+    # Resolve the windows BEFORE deleting, so we don't wipe stats
+    # if a window turns out to be stale (no recent games).
+    last_game_datetime_str = None
+    if any(aggregation_windows):
         last_game_datetime_str = (
             session.query(func.max(func.concat(Game.date, " ", Game.time)))
             .filter(filter_condition, Game.status_id.in_(FINAL_STATUS_IDS))
             .scalar()
         )
-        start_datetime = get_start_datetime(last_game_datetime_str, aggregation_window)
-        if start_datetime:
-            game_window_filter = func.cast(
-                func.concat(Game.date, " ", Game.time), sqlalchemy.types.TIMESTAMP
-            ).between(start_datetime, last_game_datetime_str)
-            filter_condition = filter_condition & game_window_filter
-        else:
-            # No recent games — keep existing stats so the section isn't empty.
-            return
-
-    # Delete existing items from the stats table (only after confirming we have data to replace)
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).delete()
-    session.commit()
+    # No recent games — stale windows keep their existing stats so the section isn't empty.
+    window_starts = get_window_starts(last_game_datetime_str, aggregation_windows)
+    if not window_starts:
+        return
+    windows = [
+        (
+            aggregation_window,
+            get_game_window_condition(start_datetime, last_game_datetime_str),
+        )
+        for aggregation_window, start_datetime in window_starts.items()
+    ]
+    # Games outside every window are not needed (there are none as soon as
+    # one window covers the whole scope)
+    if all(condition is not None for _, condition in windows):
+        filter_condition = filter_condition & sqlalchemy.or_(
+            *(condition for _, condition in windows)
+        )
 
     # Aggregate scorekeeper quality data for each human
     # games_participated: Count FINAL, FINAL_SO, FORFEIT, NOEVENTS
     # games_with_stats: Count only FINAL, FINAL_SO (for per-game averages)
     # Filter by game status upfront for performance
-    scorekeeper_quality_stats = (
-        session.query(
-            ScorekeeperSaveQuality.scorekeeper_id.label("human_id"),
-            func.count(ScorekeeperSaveQuality.game_id).label("games_recorded"),
-            func.count(ScorekeeperSaveQuality.game_id).label(
-                "games_participated"
-            ),  # Same as games_recorded after filtering
-            func.count(ScorekeeperSaveQuality.game_id).label(
-                "games_with_stats"
-            ),  # Same as games_recorded after filtering
-            func.sum(ScorekeeperSaveQuality.total_saves_recorded).label(
-                "total_saves_recorded"
+    columns = []
+    for i, (_, condition) in enumerate(windows):
+        columns += [
+            windowed(func.count(ScorekeeperSaveQuality.game_id), condition).label(
+                f"games_recorded_{i}"
+            ),
+            windowed(func.sum(ScorekeeperSaveQuality.total_saves_recorded), condition).label(
+                f"total_saves_recorded_{i}"
+            ),
+            windowed(func.avg(ScorekeeperSaveQuality.total_saves_recorded), condition).label(
+                f"avg_saves_per_game_{i}"
             ),
-            func.avg(ScorekeeperSaveQuality.total_saves_recorded).label(
-                "avg_saves_per_game"
+            windowed(func.avg(ScorekeeperSaveQuality.max_saves_per_5sec), condition).label(
+                f"avg_max_saves_per_5sec_{i}"
             ),
-            func.avg(ScorekeeperSaveQuality.max_saves_per_5sec).label(
-                "avg_max_saves_per_5sec"
+            windowed(func.avg(ScorekeeperSaveQuality.max_saves_per_20sec), condition).label(
+                f"avg_max_saves_per_20sec_{i}"
             ),
-            func.avg(ScorekeeperSaveQuality.max_saves_per_20sec).label(
-                "avg_max_saves_per_20sec"
+            windowed(func.max(ScorekeeperSaveQuality.max_saves_per_5sec), condition).label(
+                f"peak_max_saves_per_5sec_{i}"
             ),
-            func.max(ScorekeeperSaveQuality.max_saves_per_5sec).label(
-                "peak_max_saves_per_5sec"
+            windowed(func.max(ScorekeeperSaveQuality.max_saves_per_20sec), condition).label(
+                f"peak_max_saves_per_20sec_{i}"
             ),
-            func.max(ScorekeeperSaveQuality.max_saves_per_20sec).label(
-                "peak_max_saves_per_20sec"
+            windowed(func.min(Game.chronological_ordinal), condition).label(
+                f"first_ordinal_{i}"
             ),
-            func.array_agg(ScorekeeperSaveQuality.game_id).label("game_ids"),
+            windowed(func.max(Game.chronological_ordinal), condition).label(
+                f"last_ordinal_{i}"
+            ),
+        ]
+    scorekeeper_quality_stats = (
+        session.query(
+            ScorekeeperSaveQuality.scorekeeper_id.label("human_id"), *columns
         )
         .join(Game, Game.id == ScorekeeperSaveQuality.game_id)
         .filter(
@@ -233,159 +246,172 @@ def aggregate_scorekeeper_stats(
         )
     )
 
+    # Ordered by scorekeeper, so that ranks break ties the same way in every window
     scorekeeper_quality_stats = (
         scorekeeper_quality_stats.filter(filter_condition)
         .group_by(ScorekeeperSaveQuality.scorekeeper_id)
+        .order_by(ScorekeeperSaveQuality.scorekeeper_id)
         .all()
     )
 
-    # Combine the results
-    stats_dict = {}
-    for stat in scorekeeper_quality_stats:
-        if stat.human_id in human_ids_to_filter or stat.human_id is None:
-            continue
-        key = (aggregation_id, stat.human_id)
-
-        # Calculate quality score
-        quality_score = calculate_quality_score(
-            stat.avg_max_saves_per_5sec or 0.0,
-            stat.avg_max_saves_per_20sec or 0.0,
-            stat.peak_max_saves_per_5sec or 0,
-            stat.peak_max_saves_per_20sec or 0,
-        )
+    stats_by_window = {}
+    for i, (aggregation_window, _) in enumerate(windows):
+        # Combine the results
+        stats_dict = {}
+        for row in scorekeeper_quality_stats:
+            if row.human_id in human_ids_to_filter or row.human_id is None:
+                continue
+            stat = {
+                field: getattr(row, f"{field}_{i}")
+                for field in (
+                    "games_recorded",
+                    "total_saves_recorded",
+                    "avg_saves_per_game",
+                    "avg_max_saves_per_5sec",
+                    "avg_max_saves_per_20sec",
+                    "peak_max_saves_per_5sec",
+                    "peak_max_saves_per_20sec",
+                    "first_ordinal",
+                    "last_ordinal",
+                )
+            }
+            if not stat["games_recorded"]:
+                continue
+            key = (aggregation_id, row.human_id)
+
+            # Calculate quality score
+            quality_score = calculate_quality_score(
+                stat["avg_max_saves_per_5sec"] or 0.0,
+                stat["avg_max_saves_per_20sec"] or 0.0,
+                stat["peak_max_saves_per_5sec"] or 0,
+                stat["peak_max_saves_per_20sec"] or 0,
+            )
 
-        stats_dict[key] = {
-            "games_recorded": stat.games_recorded,  # DEPRECATED - for backward compatibility
-            "games_participated": stat.games_participated,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-            "games_with_stats": stat.games_with_stats,  # Games with full stats: FINAL, FINAL_SO only
-            "sog_given": stat.total_saves_recorded,  # Legacy field name mapping
-            "sog_per_game": stat.avg_saves_per_game or 0.0,  # Legacy field name mapping
-            "total_saves_recorded": stat.total_saves_recorded,
-            "avg_saves_per_game": stat.avg_saves_per_game or 0.0,
-            "avg_max_saves_per_5sec": stat.avg_max_saves_per_5sec or 0.0,
-            "avg_max_saves_per_20sec": stat.avg_max_saves_per_20sec or 0.0,
-            "peak_max_saves_per_5sec": stat.peak_max_saves_per_5sec or 0,
-            "peak_max_saves_per_20sec": stat.peak_max_saves_per_20sec or 0,
-            "quality_score": quality_score,
-            "game_ids": stat.game_ids,
-            "first_game_id": None,
-            "last_game_id": None,
+            stats_dict[key] = {
+                "games_recorded": stat["games_recorded"],  # DEPRECATED - for backward compatibility
+                "games_participated": stat["games_recorded"],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+                "games_with_stats": stat["games_recorded"],  # Same as games_recorded after filtering
+                "sog_given": stat["total_saves_recorded"],  # Legacy field name mapping
+                "sog_per_game": stat["avg_saves_per_game"] or 0.0,  # Legacy field name mapping
+                "total_saves_recorded": stat["total_saves_recorded"],
+                "avg_saves_per_game": stat["avg_saves_per_game"] or 0.0,
+                "avg_max_saves_per_5sec": stat["avg_max_saves_per_5sec"] or 0.0,
+                "avg_max_saves_per_20sec": stat["avg_max_saves_per_20sec"] or 0.0,
+                "peak_max_saves_per_5sec": stat["peak_max_saves_per_5sec"] or 0,
+                "peak_max_saves_per_20sec": stat["peak_max_saves_per_20sec"] or 0,
+                "quality_score": quality_score,
+                "first_ordinal": stat["first_ordinal"],
+                "last_ordinal": stat["last_ordinal"],
+            }
+
+        # Filter out entries with games_recorded less than min_games
+        stats_by_window[aggregation_window] = {
+            key: value
+            for key, value in stats_dict.items()
+            if value["games_recorded"] >= min_games
         }
 
-    # Filter out entries with games_recorded less than min_games
-    stats_dict = {
-        key: value
-        for key, value in stats_dict.items()
-        if value["games_recorded"] >= min_games
-    }
-
-    # Populate first_game_id and last_game_id
-    for key, stat in stats_dict.items():
-        all_game_ids = stat["game_ids"]
-        if all_game_ids:
-            first_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date, Game.time)
-                .first()
-            )
-            last_game = (
-                session.query(Game)
-                .filter(Game.id.in_(all_game_ids))
-                .order_by(Game.date.desc(), Game.time.desc())
-                .first()
-            )
-            stat["first_game_id"] = first_game.id if first_game else None
-            stat["last_game_id"] = last_game.id if last_game else None
-
-    # Calculate total_in_rank
-    total_in_rank = len(stats_dict)
-
-    # Assign ranks - note: for quality metrics, lower values are better (reverse_rank=True for avg and peak clicking)
-    assign_ranks(stats_dict, "games_recorded")
-    assign_ranks(stats_dict, "games_participated")  # Rank by total participation
-    assign_ranks(stats_dict, "games_with_stats")  # Rank by games with full stats
-    assign_ranks(stats_dict, "sog_given")  # Legacy field
-    assign_ranks(stats_dict, "sog_per_game")  # Legacy field
-    assign_ranks(stats_dict, "total_saves_recorded")
-    assign_ranks(stats_dict, "avg_saves_per_game")
-    assign_ranks(
-        stats_dict, "avg_max_saves_per_5sec", reverse_rank=True
-    )  # Lower is better (less clicking)
-    assign_ranks(
-        stats_dict, "avg_max_saves_per_20sec", reverse_rank=True
-    )  # Lower is better
-    assign_ranks(
-        stats_dict, "peak_max_saves_per_5sec", reverse_rank=True
-    )  # Lower is better
-    assign_ranks(
-        stats_dict, "peak_max_saves_per_20sec", reverse_rank=True
-    )  # Lower is better
-    assign_ranks(
-        stats_dict, "quality_score", reverse_rank=True
-    )  # Lower is better (less problematic)
-
-    # Calculate and insert percentile marker records
-    insert_percentile_markers_scorekeeper(
-        session, stats_dict, aggregation_id, total_in_rank, StatsModel
+    # Turn first/last ordinals of every window into game ids with a single query
+    resolve_first_last_games(
+        session,
+        [stat for stats_dict in stats_by_window.values() for stat in stats_dict.values()],
     )
 
-    # Insert aggregated stats into the appropriate table with progress output
-    batch_size = 1000
-    for i, (key, stat) in enumerate(stats_dict.items(), 1):
-        aggregation_id, human_id = key
-        scorekeeper_stat = StatsModel(
-            aggregation_id=aggregation_id,
-            human_id=human_id,
-            games_recorded=stat[
-                "games_recorded"
-            ],  # DEPRECATED - for backward compatibility
-            games_participated=stat[
-                "games_participated"
-            ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-            games_participated_rank=stat["games_participated_rank"],
-            games_with_stats=stat[
-                "games_with_stats"
-            ],  # Games with full stats: FINAL, FINAL_SO only
-            games_with_stats_rank=stat["games_with_stats_rank"],
-            sog_given=stat["sog_given"],  # Legacy field mapping
-            sog_per_game=stat["sog_per_game"],  # Legacy field mapping
-            total_saves_recorded=stat["total_saves_recorded"],
-            total_saves_recorded_rank=stat["total_saves_recorded_rank"],
-            avg_saves_per_game=stat["avg_saves_per_game"],
-            avg_saves_per_game_rank=stat["avg_saves_per_game_rank"],
-            avg_max_saves_per_5sec=stat["avg_max_saves_per_5sec"],
-            avg_max_saves_per_5sec_rank=stat["avg_max_saves_per_5sec_rank"],
-            avg_max_saves_per_20sec=stat["avg_max_saves_per_20sec"],
-            avg_max_saves_per_20sec_rank=stat["avg_max_saves_per_20sec_rank"],
-            peak_max_saves_per_5sec=stat["peak_max_saves_per_5sec"],
-            peak_max_saves_per_5sec_rank=stat["peak_max_saves_per_5sec_rank"],
-            peak_max_saves_per_20sec=stat["peak_max_saves_per_20sec"],
-            peak_max_saves_per_20sec_rank=stat["peak_max_saves_per_20sec_rank"],
-            quality_score=stat["quality_score"],
-            quality_score_rank=stat["quality_score_rank"],
-            games_recorded_rank=stat["games_recorded_rank"],
-            sog_given_rank=stat["sog_given_rank"],  # Legacy field
-            sog_per_game_rank=stat["sog_per_game_rank"],  # Legacy field
-            total_in_rank=total_in_rank,
-            first_game_id=stat["first_game_id"],
-            last_game_id=stat["last_game_id"],
-            aggregation_started_at=aggregation_start_time,
+    for aggregation_window, stats_dict in stats_by_window.items():
+        StatsModel = stats_models[aggregation_window]
+        # The window's existing rows are replaced by writer.commit(), all
+        # windows in one transaction
+        writer = StatsModel.bulk_writer(session, aggregation_id, aggregation_start_time)
+
+        # Calculate total_in_rank
+        total_in_rank = len(stats_dict)
+
+        # Assign ranks - note: for quality metrics, lower values are better (less clicking)
+        assign_rank_columns(
+            stats_dict,
+            [
+                "games_recorded",
+                "games_participated",  # Rank by total participation
+                "games_with_stats",  # Rank by games with full stats
+                "sog_given",  # Legacy field
+                "sog_per_game",  # Legacy field
+                "total_saves_recorded",
+                "avg_saves_per_game",
+            ],
+            ascending_fields=[
+                "avg_max_saves_per_5sec",
+                "avg_max_saves_per_20sec",
+                "peak_max_saves_per_5sec",
+                "peak_max_saves_per_20sec",
+                "quality_score",  # Lower is better (less problematic)
+            ],
         )
-        session.add(scorekeeper_stat)
-        # Commit in batches
-        if i % batch_size == 0:
-            session.commit()
-    session.commit()
 
-    # Update all records with completion timestamp
-    aggregation_end_time = datetime.utcnow()
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).update({StatsModel.aggregation_completed_at: aggregation_end_time})
+        # Calculate and insert percentile marker records
+        insert_percentile_markers_scorekeeper(
+            session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel
+        )
+
+        # Insert aggregated stats into the appropriate table with progress output
+        for key, stat in stats_dict.items():
+            human_id = key[1]
+            scorekeeper_stat = StatsModel(
+                aggregation_id=aggregation_id,
+                human_id=human_id,
+                games_recorded=stat[
+                    "games_recorded"
+                ],  # DEPRECATED - for backward compatibility
+                games_participated=stat[
+                    "games_participated"
+                ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+                games_participated_rank=stat["games_participated_rank"],
+                games_with_stats=stat[
+                    "games_with_stats"
+                ],  # Games with full stats: FINAL, FINAL_SO only
+                games_with_stats_rank=stat["games_with_stats_rank"],
+                sog_given=stat["sog_given"],  # Legacy field mapping
+                sog_per_game=stat["sog_per_game"],  # Legacy field mapping
+                total_saves_recorded=stat["total_saves_recorded"],
+                total_saves_recorded_rank=stat["total_saves_recorded_rank"],
+                avg_saves_per_game=stat["avg_saves_per_game"],
+                avg_saves_per_game_rank=stat["avg_saves_per_game_rank"],
+                avg_max_saves_per_5sec=stat["avg_max_saves_per_5sec"],
+                avg_max_saves_per_5sec_rank=stat["avg_max_saves_per_5sec_rank"],
+                avg_max_saves_per_20sec=stat["avg_max_saves_per_20sec"],
+                avg_max_saves_per_20sec_rank=stat["avg_max_saves_per_20sec_rank"],
+                peak_max_saves_per_5sec=stat["peak_max_saves_per_5sec"],
+                peak_max_saves_per_5sec_rank=stat["peak_max_saves_per_5sec_rank"],
+                peak_max_saves_per_20sec=stat["peak_max_saves_per_20sec"],
+                peak_max_saves_per_20sec_rank=stat["peak_max_saves_per_20sec_rank"],
+                quality_score=stat["quality_score"],
+                quality_score_rank=stat["quality_score_rank"],
+                games_recorded_rank=stat["games_recorded_rank"],
+                sog_given_rank=stat["sog_given_rank"],  # Legacy field
+                sog_per_game_rank=stat["sog_per_game_rank"],  # Legacy field
+                total_in_rank=total_in_rank,
+                first_game_id=stat["first_game_id"],
+                last_game_id=stat["last_game_id"],
+            )
+            writer.add(scorekeeper_stat)
+
+        # Replace the window's rows, stamping aggregation_completed_at
+        writer.commit(autocommit=False)
+
     session.commit()
 
 
+def aggregate_scorekeeper_stats(
+    session, aggregation_type, aggregation_id, aggregation_window=None
+):
+    """Aggregate a single window of a scorekeeper stats scope (see aggregate_scorekeeper_scope)."""
+    aggregate_scorekeeper_scope(
+        session,
+        aggregation_type,
+        aggregation_id,
+        aggregation_windows=(aggregation_window,),
+    )
+
+
 def run_aggregate_scorekeeper_stats():
     session = create_session("boss")
     human_id_to_debug = None
@@ -411,42 +437,14 @@ def run_aggregate_scorekeeper_stats():
                 or f"org_id {org_id}"
             )
             org_progress = create_progress_tracker(
-                3, f"Processing scorekeeper stats for {org_name}"
-            )
-            aggregate_scorekeeper_stats(
-                session, aggregation_type="org", aggregation_id=org_id
+                1, f"Processing scorekeeper stats for {org_name}"
             )
+        # All windows of the org in one pass
+        aggregate_scorekeeper_scope(
+            session, aggregation_type="org", aggregation_id=org_id
+        )
+        if human_id_to_debug is None:
             org_progress.update(1)
-            aggregate_scorekeeper_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Weekly",
-            )
-            org_progress.update(2)
-            aggregate_scorekeeper_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Daily",
-            )
-            org_progress.update(3)
-        else:
-            aggregate_scorekeeper_stats(
-                session, aggregation_type="org", aggregation_id=org_id
-            )
-            aggregate_scorekeeper_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Weekly",
-            )
-            aggregate_scorekeeper_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                aggregation_window="Daily",
-            )
 
 
 if __name__ == "__main__":
@@ -8,9 +8,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import sqlalchemy
 from datetime import date, datetime, timedelta
 from sqlalchemy import and_, case, func, text
-from sqlalchemy.sql import case, func
 
+from hockey_blast_common_lib.aggregation_metrics import record_scope_metrics
 from hockey_blast_common_lib.db_connection import create_session
+from hockey_blast_common_lib.game_fact_cache import (
+    get_game_fact_cache,
+    load_game_fact_cache,
+)
 from hockey_blast_common_lib.models import (
     Division,
     Game,
@@ -23,11 +27,16 @@ from hockey_blast_common_lib.models import (
     Penalty,
 )
 from hockey_blast_common_lib.options import (
+    DIVISION_AGGREGATION_WORKERS,
+    INCREMENTAL_SKATER_STATS,
     MIN_GAMES_FOR_DIVISION_STATS,
     MIN_GAMES_FOR_LEVEL_STATS,
     MIN_GAMES_FOR_ORG_STATS,
+    ROLLUP_SCOPE_STATS,
     SKIP_STATS_INACTIVE_DIVISION_MONTHS,
+    USE_GAME_FACT_CACHE,
 )
+from hockey_blast_common_lib.parallel_utils import run_division_aggregations
 from hockey_blast_common_lib.progress_utils import create_progress_tracker
 from hockey_blast_common_lib.stats_models import (
     DivisionStatsDailySkater,
@@ -38,14 +47,21 @@ from hockey_blast_common_lib.stats_models import (
     OrgStatsSkater,
     OrgStatsWeeklySkater,
 )
-from hockey_blast_common_lib.game_status import FINAL_STATUS_IDS, PARTICIPATED_STATUS_IDS
-from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+from hockey_blast_common_lib.game_ordinals import resolve_first_last_games
+from hockey_blast_common_lib.game_status import PARTICIPATED_STATUS_IDS
+from hockey_blast_common_lib.stats_rollup import ScopePartials
+from hockey_blast_common_lib.stats_utils import (
+    ALL_ORGS_ID,
+    assign_rank_columns,
+    compute_percentile_values,
+)
 from hockey_blast_common_lib.utils import (
-    calculate_percentile_value,
+    AGGREGATION_WINDOWS,
     get_all_division_ids_for_org,
+    get_game_window_condition,
     get_non_human_ids,
-    get_percentile_human,
-    get_start_datetime,
+    get_percentile_human_ids,
+    get_window_starts,
 )
 
 
@@ -75,6 +91,51 @@ def mark_humans_processed(session, human_ids):
     session.commit()
 
 
+def load_skater_human_ids(session, StatsModel, aggregation_id):
+    """Return the set of human_ids with a stored row in one skater stats scope, markers excluded."""
+    marker_human_ids = set(get_percentile_human_ids(session, "Skater").values())
+    rows = (
+        session.query(StatsModel.human_id)
+        .filter(StatsModel.aggregation_id == aggregation_id)
+        .all()
+    )
+    return set(row[0] for row in rows) - marker_human_ids
+
+
+def load_skater_rows(session, StatsModel, aggregation_id):
+    """
+    Load the stored rows of one skater stats scope, in insertion order.
+
+    Percentile marker rows are left out.
+
+    Returns:
+        {(aggregation_id, human_id): {column name: value}}
+    """
+    marker_human_ids = set(get_percentile_human_ids(session, "Skater").values())
+    rows = (
+        session.query(StatsModel.__table__)
+        .filter(StatsModel.aggregation_id == aggregation_id)
+        .order_by(StatsModel.id)
+        .all()
+    )
+    return {
+        (aggregation_id, row.human_id): dict(row._mapping)
+        for row in rows
+        if row.human_id not in marker_human_ids
+    }
+
+
+def skater_ranks_changed(stored, stat, total_in_rank):
+    """True if a stored row's rank columns differ from the newly assigned ranks."""
+    if stored["total_in_rank"] != total_in_rank:
+        return True
+    return any(
+        stored.get(field) != value
+        for field, value in stat.items()
+        if field.endswith("_rank")
+    )
+
+
 def calculate_current_point_streak(session, human_id, filter_condition):
     """
     Calculate the current point streak for a player.
@@ -140,120 +201,177 @@ def calculate_current_point_streak(session, human_id, filter_condition):
     return current_streak, avg_points_during_streak
 
 
-def calculate_all_point_streaks_batch(session, human_ids, filter_condition):
+def calculate_point_streaks(session, human_ids, filter_condition):
     """
-    Calculate point streaks for ALL players in one batch query.
-    This is MUCH faster than calling calculate_current_point_streak() for each player.
+    Current and longest point streaks of many players in one query.
+
+    A point streak is a run of consecutive games (participated, non-goalie
+    roster entries) with at least one goal or assist. Streaks are found in
+    Postgres as gaps-and-islands: each game is numbered newest first per
+    player, and within a run of scoring games that number minus the game's
+    position among the player's scoring games is constant. Only one row per
+    player comes back instead of one per (player, game).
 
     Args:
         session: Database session
-        human_ids: List of all human_ids to calculate streaks for (e.g., 150 players in a division)
-        filter_condition: SQLAlchemy filter condition (org/division/level + time window)
+        human_ids: Players to calculate streaks for
+        filter_condition: SQLAlchemy filter on Game (org/division/level + time window)
 
     Returns:
-        Dict[human_id] -> (streak_length, avg_points_per_game)
-
-    Performance:
-        - Old: N queries (one per player)
-        - New: 1 query for all players
-        - Speedup: ~150x for typical division
+        Dict[human_id] -> {
+            "current_point_streak", "current_point_streak_avg_points",
+            "longest_point_streak", "longest_point_streak_avg_points",
+            "longest_point_streak_start_date", "longest_point_streak_end_date",
+        }
+        Players without a scoring game get 0 streaks and None dates.
     """
     if not human_ids:
         return {}
 
-    # Single query for ALL players at once
     game_points = (
         session.query(
-            GameRoster.human_id,
-            Game.id.label("game_id"),
-            Game.date,
-            Game.time,
-            func.sum(
-                case((Goal.goal_scorer_id == GameRoster.human_id, 1), else_=0)
-            ).label("goals"),
-            func.sum(
-                case(
-                    (
-                        (Goal.assist_1_id == GameRoster.human_id) |
-                        (Goal.assist_2_id == GameRoster.human_id),
-                        1
-                    ),
-                    else_=0
+            GameRoster.human_id.label("human_id"),
+            Game.date.label("date"),
+            (
+                func.sum(case((Goal.goal_scorer_id == GameRoster.human_id, 1), else_=0))
+                + func.sum(
+                    case(
+                        (
+                            (Goal.assist_1_id == GameRoster.human_id)
+                            | (Goal.assist_2_id == GameRoster.human_id),
+                            1,
+                        ),
+                        else_=0,
+                    )
                 )
-            ).label("assists"),
+            ).label("points"),
+            func.row_number()
+            .over(
+                partition_by=GameRoster.human_id,
+                order_by=(Game.date.desc(), Game.time.desc(), Game.id.desc()),
+            )
+            .label("recency"),
         )
         .join(Game, GameRoster.game_id == Game.id)
         .outerjoin(Goal, Game.id == Goal.game_id)
         .filter(
-            GameRoster.human_id.in_(human_ids),  # ← ALL players at once!
+            GameRoster.human_id.in_(human_ids),
             ~GameRoster.role.ilike("g"),  # Exclude goalie games
             filter_condition,
             Game.status_id.in_(PARTICIPATED_STATUS_IDS),
         )
         .group_by(GameRoster.human_id, Game.id, Game.date, Game.time)
-        .order_by(
-            GameRoster.human_id,  # Group by player first
-            Game.date.desc(),      # Then most recent games first
-            Game.time.desc()
-        )
-        .all()
+        .subquery()
     )
 
-    # Process results in Python to calculate streaks
-    streaks_by_human = {}
-    processed_humans = set()  # Track which humans we've finished processing
-    current_human = None
-    current_streak = 0
-    total_points = 0
+    # Scoring games of one run share the same run_id
+    scored = game_points.c.points > 0
+    game_runs = session.query(
+        game_points,
+        (
+            game_points.c.recency
+            - func.row_number().over(
+                partition_by=(game_points.c.human_id, scored),
+                order_by=game_points.c.recency,
+            )
+        ).label("run_id"),
+    ).subquery()
 
-    for row in game_points:
-        # Skip if we've already processed this human (streak already broken)
-        if row.human_id in processed_humans:
-            continue
+    streaks = (
+        session.query(
+            game_runs.c.human_id,
+            func.count().label("length"),
+            func.sum(game_runs.c.points).label("points"),
+            func.min(game_runs.c.date).label("start_date"),
+            func.max(game_runs.c.date).label("end_date"),
+            func.min(game_runs.c.recency).label("newest"),
+        )
+        .filter(game_runs.c.points > 0)
+        .group_by(game_runs.c.human_id, game_runs.c.run_id)
+        .subquery()
+    )
 
-        # New player?
-        if row.human_id != current_human:
-            # Save previous player's streak (if any)
-            if current_human is not None:
-                avg = total_points / current_streak if current_streak > 0 else 0.0
-                streaks_by_human[current_human] = (current_streak, avg)
-                processed_humans.add(current_human)
+    # The longest streak; the most recent one if several are equally long
+    ranked = session.query(
+        streaks,
+        func.row_number()
+        .over(
+            partition_by=streaks.c.human_id,
+            order_by=(streaks.c.length.desc(), streaks.c.newest),
+        )
+        .label("longest_rank"),
+    ).subquery()
+    is_current = ranked.c.newest == 1
+    is_longest = ranked.c.longest_rank == 1
+    rows = (
+        session.query(
+            ranked.c.human_id,
+            func.max(ranked.c.length).filter(is_current),
+            func.max(ranked.c.points).filter(is_current),
+            func.max(ranked.c.length).filter(is_longest),
+            func.max(ranked.c.points).filter(is_longest),
+            func.max(ranked.c.start_date).filter(is_longest),
+            func.max(ranked.c.end_date).filter(is_longest),
+        )
+        .group_by(ranked.c.human_id)
+        .all()
+    )
 
-            # Reset for new player
-            current_human = row.human_id
-            current_streak = 0
-            total_points = 0
+    streaks_by_human = {
+        human_id: {
+            "current_point_streak": 0,
+            "current_point_streak_avg_points": 0.0,
+            "longest_point_streak": 0,
+            "longest_point_streak_avg_points": 0.0,
+            "longest_point_streak_start_date": None,
+            "longest_point_streak_end_date": None,
+        }
+        for human_id in human_ids
+    }
+    for (
+        human_id,
+        current_length,
+        current_points,
+        longest_length,
+        longest_points,
+        longest_start,
+        longest_end,
+    ) in rows:
+        streak = streaks_by_human[human_id]
+        if current_length:
+            streak["current_point_streak"] = current_length
+            streak["current_point_streak_avg_points"] = float(current_points) / current_length
+        streak["longest_point_streak"] = longest_length
+        streak["longest_point_streak_avg_points"] = float(longest_points) / longest_length
+        streak["longest_point_streak_start_date"] = longest_start
+        streak["longest_point_streak_end_date"] = longest_end
+    return streaks_by_human
 
-        # Calculate points for this game
-        points = (row.goals or 0) + (row.assists or 0)
 
-        if points > 0:
-            # Streak continues
-            current_streak += 1
-            total_points += points
-        else:
-            # Streak broken - save and mark as processed
-            avg = total_points / current_streak if current_streak > 0 else 0.0
-            streaks_by_human[current_human] = (current_streak, avg)
-            processed_humans.add(current_human)
-            # Reset current_human so we skip remaining games for this player
-            current_human = None
-
-    # Don't forget the last player (if still in a streak)
-    if current_human is not None and current_human not in processed_humans:
-        avg = total_points / current_streak if current_streak > 0 else 0.0
-        streaks_by_human[current_human] = (current_streak, avg)
-
-    # Ensure all requested human_ids have a result (even if 0,0)
-    for human_id in human_ids:
-        if human_id not in streaks_by_human:
-            streaks_by_human[human_id] = (0, 0.0)
+def calculate_all_point_streaks_batch(session, human_ids, filter_condition):
+    """
+    Calculate current point streaks for ALL players in one batch query.
+    This is MUCH faster than calling calculate_current_point_streak() for each player.
 
-    return streaks_by_human
+    Args:
+        session: Database session
+        human_ids: List of all human_ids to calculate streaks for (e.g., 150 players in a division)
+        filter_condition: SQLAlchemy filter condition (org/division/level + time window)
 
+    Returns:
+        Dict[human_id] -> (streak_length, avg_points_per_game)
+
+    See calculate_point_streaks() for longest streaks and how they are found.
+    """
+    return {
+        human_id: (streak["current_point_streak"], streak["current_point_streak_avg_points"])
+        for human_id, streak in calculate_point_streaks(
+            session, human_ids, filter_condition
+        ).items()
+    }
 
 def insert_percentile_markers_skater(
-    session, stats_dict, aggregation_id, total_in_rank, StatsModel, aggregation_window
+    session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel, aggregation_window
 ):
     """Insert percentile marker records for skater stats.
 
@@ -287,22 +405,12 @@ def insert_percentile_markers_skater(
             ["current_point_streak", "current_point_streak_avg_points"]
         )
 
-    # For each percentile (25, 50, 75, 90, 95)
-    percentiles = [25, 50, 75, 90, 95]
-
-    for percentile in percentiles:
-        # Get or create the percentile marker human
-        percentile_human_id = get_percentile_human(session, "Skater", percentile)
+    # Percentile values of every field, computed SEPARATELY per field
+    percentile_human_ids = get_percentile_human_ids(session, "Skater")
+    values_by_percentile = compute_percentile_values(stats_dict, stat_fields)
 
-        # Calculate percentile values for each stat field SEPARATELY
-        percentile_values = {}
-        for field in stat_fields:
-            # Extract all values for this field
-            values = [stat[field] for stat in stats_dict.values() if field in stat]
-            if values:
-                percentile_values[field] = calculate_percentile_value(values, percentile)
-            else:
-                percentile_values[field] = 0
+    for percentile, percentile_human_id in percentile_human_ids.items():
+        percentile_values = values_by_percentile[percentile]
 
         # Create the stats record for this percentile marker
         skater_stat = StatsModel(
@@ -346,19 +454,307 @@ def insert_percentile_markers_skater(
             first_game_id=None,  # Percentile markers don't have game references
             last_game_id=None,
         )
-        session.add(skater_stat)
+        writer.add(skater_stat)
 
-    session.commit()
 
+# Additive per-human counters of the skater stats
+SKATER_COUNTERS = ("games_played", "goals", "assists", "penalties", "gm_penalties")
 
-def aggregate_skater_stats(
+
+def build_skater_stats(counters_by_human, aggregation_id, human_ids_to_filter, min_games):
+    """Build aggregate_skater_stats' stats_dict from per-human counters.
+
+    Args:
+        counters_by_human: Dict human_id -> SKATER_COUNTERS plus the human's
+            first and last game, either as first_game_id/last_game_id or as
+            first_ordinal/last_ordinal for the caller to resolve
+    """
+    stats_dict = {}
+    for human_id, counters in counters_by_human.items():
+        games_played = counters["games_played"]
+        if (
+            human_id is None
+            or human_id in human_ids_to_filter
+            or not games_played
+            or games_played < min_games
+        ):
+            continue
+        points = counters["goals"] + counters["assists"]
+        stat = {
+            "games_played": games_played,  # DEPRECATED - for backward compatibility
+            "games_participated": games_played,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+            "games_with_stats": games_played,  # Same as games_played after filtering
+            "goals": counters["goals"],
+            "assists": counters["assists"],
+            "penalties": counters["penalties"],
+            "gm_penalties": counters["gm_penalties"],
+            "points": points,
+            "goals_per_game": counters["goals"] / games_played,
+            "points_per_game": points / games_played,
+            "assists_per_game": counters["assists"] / games_played,
+            "penalties_per_game": counters["penalties"] / games_played,
+            "gm_penalties_per_game": counters["gm_penalties"] / games_played,
+            "current_point_streak": 0,
+            "current_point_streak_avg_points": 0.0,
+        }
+        for bound in ("first_game_id", "last_game_id", "first_ordinal", "last_ordinal"):
+            if bound in counters:
+                stat[bound] = counters[bound]
+        stats_dict[(aggregation_id, human_id)] = stat
+    return stats_dict
+
+
+def build_skater_stats_from_cache(view, aggregation_id, human_ids_to_filter, min_games):
+    """Build aggregate_skater_stats' stats_dict from a GameFactView of the scope.
+
+    Produces the same counters and per-game rates as the SQL path, with
+    first_game_id/last_game_id already resolved.
+    """
+    return build_skater_stats(
+        view.skater_stats(), aggregation_id, human_ids_to_filter, min_games
+    )
+
+
+def skater_event_stream():
+    """
+    Goals, first and second assists and penalties as one stream of
+    (game_id, human_id, event_type, is_gm) rows, so that a single group-by
+    aggregates them.
+    """
+    return sqlalchemy.union_all(
+        sqlalchemy.select(
+            Goal.game_id,
+            Goal.goal_scorer_id.label("human_id"),
+            sqlalchemy.literal("goal").label("event_type"),
+            sqlalchemy.false().label("is_gm"),
+        ),
+        sqlalchemy.select(
+            Goal.game_id,
+            Goal.assist_1_id.label("human_id"),
+            sqlalchemy.literal("assist").label("event_type"),
+            sqlalchemy.false().label("is_gm"),
+        ),
+        sqlalchemy.select(
+            Goal.game_id,
+            Goal.assist_2_id.label("human_id"),
+            sqlalchemy.literal("assist").label("event_type"),
+            sqlalchemy.false().label("is_gm"),
+        ),
+        sqlalchemy.select(
+            Penalty.game_id,
+            Penalty.penalized_player_id.label("human_id"),
+            sqlalchemy.literal("penalty").label("event_type"),
+            (Penalty.penalty_minutes == "GM").label("is_gm"),
+        ),
+    ).subquery("skater_events")
+
+
+def skater_counter_columns(events, condition=None, suffix=""):
+    """
+    SKATER_COUNTERS and first/last ordinal aggregates over roster rows left
+    joined to skater_event_stream(), restricted to condition.
+    """
+
+    def window_filter(*conditions):
+        return and_(*(c for c in conditions if c is not None))
+
+    # Only count games with these statuses: FINAL, FINAL_SO, FORFEIT, NOEVENTS.
+    # Events count in any game of the scope the human was rostered in.
+    games_filter = window_filter(Game.status_id.in_(PARTICIPATED_STATUS_IDS), condition)
+    columns = [
+        # A roster row is repeated once per event of its human in the game
+        func.count(func.distinct(GameRoster.id))
+        .filter(games_filter)
+        .label(f"games_played{suffix}"),
+        func.min(Game.chronological_ordinal)
+        .filter(games_filter)
+        .label(f"first_ordinal{suffix}"),
+        func.max(Game.chronological_ordinal)
+        .filter(games_filter)
+        .label(f"last_ordinal{suffix}"),
+    ]
+    for field, event_type in (
+        ("goals", "goal"),
+        ("assists", "assist"),
+        ("penalties", "penalty"),
+    ):
+        columns.append(
+            func.count(events.c.event_type)
+            .filter(window_filter(events.c.event_type == event_type, condition))
+            .label(f"{field}{suffix}")
+        )
+    columns.append(
+        func.count(events.c.event_type)
+        .filter(window_filter(events.c.is_gm, condition))
+        .label(f"gm_penalties{suffix}")
+    )
+    return columns
+
+
+def skater_counters_query(session, events, *columns):
+    """
+    Query of columns over the non-goalie roster rows, their games and their
+    humans' events in those games.
+
+    Roster rows are the fact source: games played are counted from them and
+    events only count for a human rostered in the game.
+    """
+    return (
+        session.query(*columns)
+        .select_from(GameRoster)
+        .join(Game, Game.id == GameRoster.game_id)
+        .outerjoin(
+            events,
+            and_(
+                events.c.game_id == GameRoster.game_id,
+                events.c.human_id == GameRoster.human_id,
+            ),
+        )
+        .filter(~GameRoster.role.ilike("g"))
+    )
+
+
+def query_skater_partials(session):
+    """
+    All-time skater counters of every human per (org, division, level), in a
+    single query, for rolling up org, level and All Orgs stats.
+    """
+    partials = ScopePartials(SKATER_COUNTERS)
+    events = skater_event_stream()
+    rows = (
+        skater_counters_query(
+            session,
+            events,
+            Game.org_id,
+            Game.division_id,
+            Division.level_id,
+            GameRoster.human_id,
+            *skater_counter_columns(events),
+        )
+        .join(Division, Game.division_id == Division.id)
+        .group_by(Game.org_id, Game.division_id, Division.level_id, GameRoster.human_id)
+        .all()
+    )
+    for row in rows:
+        partials.add(
+            row.org_id,
+            row.division_id,
+            row.level_id,
+            row.human_id,
+            {
+                field: getattr(row, field)
+                for field in SKATER_COUNTERS + ("first_ordinal", "last_ordinal")
+            },
+        )
+    return partials
+
+
+def query_skater_window_stats(
+    session,
+    aggregation_type,
+    aggregation_id,
+    filter_condition,
+    window_conditions,
+    human_ids_to_filter,
+    min_games,
+):
+    """
+    Skater counters of several windows of a scope in a single query.
+
+    Games played, goals, assists and penalties come from one group-by over
+    the scope's roster rows and an event stream, computing every window with
+    FILTER (WHERE ...) aggregates.
+
+    Args:
+        filter_condition: The scope's games
+        window_conditions: {aggregation_window: condition on the games (and
+            roster rows) of the window, None for all of the scope's games}
+
+    Returns:
+        {aggregation_window: stats_dict}
+    """
+    windows = list(window_conditions.items())
+    # Rows outside every window are not needed (there are none as soon as
+    # one window covers the whole scope)
+    if all(condition is not None for _, condition in windows):
+        scan_filter = [sqlalchemy.or_(*(condition for _, condition in windows))]
+    else:
+        scan_filter = []
+
+    events = skater_event_stream()
+    columns = []
+    for i, (_, condition) in enumerate(windows):
+        columns += skater_counter_columns(events, condition, f"_{i}")
+    query = skater_counters_query(session, events, GameRoster.human_id, *columns)
+
+    # Only join Division if not level aggregation (since we filter on Game.division_id directly for levels)
+    if aggregation_type != "level":
+        query = query.join(Division, Game.division_id == Division.id)
+
+    # Ordered by human like the fact cache, so that ranks break ties the same
+    # way in every window and on both paths
+    skater_stats = (
+        query.filter(filter_condition, *scan_filter)
+        .group_by(GameRoster.human_id)
+        .order_by(GameRoster.human_id)
+        .all()
+    )
+
+    stats_by_window = {
+        aggregation_window: build_skater_stats(
+            {
+                stat.human_id: {
+                    field: getattr(stat, f"{field}_{i}")
+                    for field in SKATER_COUNTERS + ("first_ordinal", "last_ordinal")
+                }
+                for stat in skater_stats
+            },
+            aggregation_id,
+            human_ids_to_filter,
+            min_games,
+        )
+        for i, (aggregation_window, _) in enumerate(windows)
+    }
+
+    # Turn first/last ordinals of every window into game ids with a single query
+    resolve_first_last_games(
+        session,
+        [stat for stats_dict in stats_by_window.values() for stat in stats_dict.values()],
+    )
+    return stats_by_window
+
+
+@record_scope_metrics
+def aggregate_skater_scope(
     session,
     aggregation_type,
     aggregation_id,
     debug_human_id=None,
-    aggregation_window=None,
+    aggregation_windows=AGGREGATION_WINDOWS,
     changed_human_ids=None,
+    fact_cache=None,
+    incremental=False,
+    partials=None,
 ):
+    """
+    Aggregate the all-time, weekly and daily skater stats of one scope.
+
+    The scope is resolved and its games scanned once for all windows: the SQL
+    path computes every window with FILTER (WHERE ...) aggregates, the fact
+    cache path with one mask per window. The windows' tables are then written
+    in one transaction.
+
+    Args:
+        aggregation_windows: Windows to aggregate (None for all-time); level
+            scopes only have all-time stats
+        changed_human_ids: Humans with new games; the all-time window is
+            skipped if none of them played in the scope
+        incremental: Recompute all-time stats only for the changed humans and
+            delete the rows of humans who no longer play in the scope
+        partials: ScopePartials from query_skater_partials(); on the SQL path
+            the all-time counters of org and level scopes are rolled up from
+            them instead of scanning the scope's games
+    """
     # Capture start time for aggregation tracking
     aggregation_start_time = datetime.utcnow()
 
@@ -378,7 +774,7 @@ def aggregate_skater_stats(
             )
             filter_condition = Game.org_id == aggregation_id
         print(
-            f"Aggregating skater stats for {aggregation_name} with window {aggregation_window}..."
+            f"Aggregating skater stats for {aggregation_name} with windows {list(aggregation_windows)}..."
         )
 
     elif aggregation_type == "division":
@@ -393,20 +789,18 @@ def aggregate_skater_stats(
         aggregation_name = "Unknown"
 
     if aggregation_type == "org":
-        if aggregation_window == "Daily":
-            StatsModel = OrgStatsDailySkater
-        elif aggregation_window == "Weekly":
-            StatsModel = OrgStatsWeeklySkater
-        else:
-            StatsModel = OrgStatsSkater
+        stats_models = {
+            None: OrgStatsSkater,
+            "Weekly": OrgStatsWeeklySkater,
+            "Daily": OrgStatsDailySkater,
+        }
         min_games = MIN_GAMES_FOR_ORG_STATS
     elif aggregation_type == "division":
-        if aggregation_window == "Daily":
-            StatsModel = DivisionStatsDailySkater
-        elif aggregation_window == "Weekly":
-            StatsModel = DivisionStatsWeeklySkater
-        else:
-            StatsModel = DivisionStatsSkater
+        stats_models = {
+            None: DivisionStatsSkater,
+            "Weekly": DivisionStatsWeeklySkater,
+            "Daily": DivisionStatsDailySkater,
+        }
         min_games = MIN_GAMES_FOR_DIVISION_STATS
         filter_condition = Game.division_id == aggregation_id
 
@@ -425,7 +819,7 @@ def aggregate_skater_stats(
                 if last_game_date < cutoff:
                     return
     elif aggregation_type == "level":
-        StatsModel = LevelStatsSkater
+        stats_models = {None: LevelStatsSkater}
         min_games = MIN_GAMES_FOR_LEVEL_STATS
         # Get division IDs for this level to avoid cartesian product
         division_ids = (
@@ -441,498 +835,406 @@ def aggregate_skater_stats(
         # filter_condition = filter_condition & level_window_filter
     else:
         raise ValueError("Invalid aggregation type")
+    aggregation_windows = [
+        window for window in aggregation_windows if window in stats_models
+    ]
+
+    # The same scope as filter_condition, as a mask over the cached games
+    if fact_cache is not None:
+        game_mask = fact_cache.scope_mask(aggregation_type, aggregation_id)
+
+    # All-time counters summed from the scope's division partials
+    rolled_up = None
+    if (
+        partials is not None
+        and fact_cache is None
+        and partials.covers(aggregation_type)
+        and None in aggregation_windows
+    ):
+        rolled_up = partials.rollup(aggregation_type, aggregation_id)
 
     # Incremental skip: if changed_human_ids provided, check if this aggregation has any
-    if changed_human_ids is not None and aggregation_window is None:
-        agg_human_ids = set(
-            row[0] for row in
-            session.query(GameRoster.human_id)
-            .join(Game, GameRoster.game_id == Game.id)
-            .filter(filter_condition)
-            .filter(~GameRoster.role.ilike("g"))
-            .filter(Game.status_id.in_(PARTICIPATED_STATUS_IDS))
-            .distinct()
-            .all()
-        )
-        if not changed_human_ids.intersection(agg_human_ids):
-            return  # Nothing changed in this aggregation, skip
-
-    # Apply aggregation window filter BEFORE deleting, so we don't wipe stats
-    # if the window turns out to be stale (no recent games).
-    if aggregation_window:
-        last_game_datetime_str = (
-            session.query(func.max(func.concat(Game.date, " ", Game.time)))
-            .filter(
-                filter_condition,
-                Game.status_id.in_(PARTICIPATED_STATUS_IDS),
+    incremental_human_ids = None
+    if changed_human_ids is not None and None in aggregation_windows:
+        if fact_cache is not None:
+            agg_human_ids = fact_cache.skater_human_ids(game_mask)
+        elif rolled_up is not None:
+            agg_human_ids = set(
+                human_id
+                for human_id, counters in rolled_up.items()
+                if counters["games_played"]
             )
-            .scalar()
-        )
-        start_datetime = get_start_datetime(last_game_datetime_str, aggregation_window)
-        if start_datetime:
-            game_window_filter = func.cast(
-                func.concat(Game.date, " ", Game.time), sqlalchemy.types.TIMESTAMP
-            ).between(start_datetime, last_game_datetime_str)
-            filter_condition = filter_condition & game_window_filter
         else:
-            # No recent games — keep existing stats so the section isn't empty.
-            return
-
-    # Delete existing items from the stats table (only after confirming we have data to replace)
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).delete()
-    session.commit()
-
-    # Filter for specific human_id if provided
-    human_filter = []
-    # if debug_human_id:
-    #     human_filter = [GameRoster.human_id == debug_human_id]
-
-    # Aggregate games played for each human in each division, excluding goalies
-    # Filter games by status upfront for performance (avoid CASE statements on 200K+ rows)
-    # Only count games with these statuses: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-    games_played_query = (
-        session.query(
-            GameRoster.human_id,
-            func.count(Game.id).label("games_played"),
-            func.count(Game.id).label(
-                "games_participated"
-            ),  # Same as games_played after filtering
-            func.count(Game.id).label(
-                "games_with_stats"
-            ),  # Same as games_played after filtering
-            func.array_agg(Game.id).label("game_ids"),
-        )
-        .join(Game, Game.id == GameRoster.game_id)
-        .filter(
-            Game.status_id.in_(PARTICIPATED_STATUS_IDS)
-        )
-    )
-
-    # Only join Division if not level aggregation (since we filter on Game.division_id directly for levels)
-    if aggregation_type != "level":
-        games_played_query = games_played_query.join(
-            Division, Game.division_id == Division.id
-        )
-
-    games_played_stats = (
-        games_played_query.filter(
-            filter_condition, ~GameRoster.role.ilike("g"), *human_filter
-        )
-        .group_by(GameRoster.human_id)
-        .all()
-    )
-
-    # Aggregate goals for each human in each division, excluding goalies
-    goals_query = (
-        session.query(
-            Goal.goal_scorer_id.label("human_id"),
-            func.count(Goal.id).label("goals"),
-            func.array_agg(Goal.game_id).label("goal_game_ids"),
-        )
-        .join(Game, Game.id == Goal.game_id)
-        .join(
-            GameRoster,
-            and_(
-                Game.id == GameRoster.game_id,
-                Goal.goal_scorer_id == GameRoster.human_id,
-            ),
-        )
-    )
-
-    if aggregation_type != "level":
-        goals_query = goals_query.join(Division, Game.division_id == Division.id)
-
-    goals_stats = (
-        goals_query.filter(filter_condition, ~GameRoster.role.ilike("g"), *human_filter)
-        .group_by(Goal.goal_scorer_id)
-        .all()
-    )
-
-    # Aggregate assists for each human in each division, excluding goalies
-    assists_query = (
-        session.query(
-            Goal.assist_1_id.label("human_id"),
-            func.count(Goal.id).label("assists"),
-            func.array_agg(Goal.game_id).label("assist_game_ids"),
-        )
-        .join(Game, Game.id == Goal.game_id)
-        .join(
-            GameRoster,
-            and_(
-                Game.id == GameRoster.game_id, Goal.assist_1_id == GameRoster.human_id
-            ),
-        )
-    )
-
-    if aggregation_type != "level":
-        assists_query = assists_query.join(Division, Game.division_id == Division.id)
+            agg_human_ids = set(
+                row[0] for row in
+                session.query(GameRoster.human_id)
+                .join(Game, GameRoster.game_id == Game.id)
+                .filter(filter_condition)
+                .filter(~GameRoster.role.ilike("g"))
+                .filter(Game.status_id.in_(PARTICIPATED_STATUS_IDS))
+                .distinct()
+                .all()
+            )
+        # Humans with a stored row who no longer play in the scope (a game
+        # moved to another division, a roster correction, a merged human)
+        left_human_ids = set()
+        if incremental:
+            left_human_ids = (
+                load_skater_human_ids(session, stats_models[None], aggregation_id)
+                - agg_human_ids
+            )
+        if not changed_human_ids.intersection(agg_human_ids) and not left_human_ids:
+            # Nothing changed in this aggregation, skip its all-time window
+            aggregation_windows.remove(None)
+        elif incremental:
+            # Incremental mode: recompute only the changed humans of this scope and
+            # re-rank them together with the rows already stored for everyone else.
+            # Humans who left are "recomputed" to nothing and their rows deleted.
+            # A scope without stored rows is computed in full.
+            stored_rows = load_skater_rows(session, stats_models[None], aggregation_id)
+            if stored_rows:
+                incremental_human_ids = (
+                    changed_human_ids.intersection(agg_human_ids) | left_human_ids
+                )
 
-    assists_stats = (
-        assists_query.filter(
-            filter_condition, ~GameRoster.role.ilike("g"), *human_filter
-        )
-        .group_by(Goal.assist_1_id)
-        .all()
-    )
+    # Resolve the windows BEFORE deleting, so we don't wipe stats
+    # if a window turns out to be stale (no recent games).
+    last_game_datetime_str = None
+    if any(aggregation_windows):
+        if fact_cache is not None:
+            last_game_datetime_str = fact_cache.last_game_datetime_str(
+                game_mask, PARTICIPATED_STATUS_IDS
+            )
+        else:
+            last_game_datetime_str = (
+                session.query(func.max(func.concat(Game.date, " ", Game.time)))
+                .filter(
+                    filter_condition,
+                    Game.status_id.in_(PARTICIPATED_STATUS_IDS),
+                )
+                .scalar()
+            )
+    # No recent games — stale windows keep their existing stats so the section isn't empty.
+    window_starts = get_window_starts(last_game_datetime_str, aggregation_windows)
+    if not window_starts:
+        return
 
-    assists_query_2 = (
-        session.query(
-            Goal.assist_2_id.label("human_id"),
-            func.count(Goal.id).label("assists"),
-            func.array_agg(Goal.game_id).label("assist_2_game_ids"),
-        )
-        .join(Game, Game.id == Goal.game_id)
-        .join(
-            GameRoster,
-            and_(
-                Game.id == GameRoster.game_id, Goal.assist_2_id == GameRoster.human_id
-            ),
-        )
-    )
+    if fact_cache is not None:
+        window_masks = {
+            aggregation_window: (
+                game_mask
+                if start_datetime is None
+                else fact_cache.window_mask(
+                    game_mask, start_datetime, last_game_datetime_str
+                )
+            )
+            for aggregation_window, start_datetime in window_starts.items()
+        }
+        stats_by_window = {
+            aggregation_window: build_skater_stats_from_cache(
+                fact_cache.view(mask), aggregation_id, human_ids_to_filter, min_games
+            )
+            for aggregation_window, mask in window_masks.items()
+        }
+        if incremental_human_ids is not None:
+            stats_by_window[None] = {
+                key: stat
+                for key, stat in stats_by_window[None].items()
+                if key[1] in incremental_human_ids
+            }
+    else:
+        window_conditions = {
+            aggregation_window: get_game_window_condition(
+                start_datetime, last_game_datetime_str
+            )
+            for aggregation_window, start_datetime in window_starts.items()
+        }
+        stats_by_window = {}
+        if rolled_up is not None and None in window_conditions:
+            del window_conditions[None]
+            stats_dict = build_skater_stats(
+                rolled_up, aggregation_id, human_ids_to_filter, min_games
+            )
+            if incremental_human_ids is not None:
+                stats_dict = {
+                    key: stat
+                    for key, stat in stats_dict.items()
+                    if key[1] in incremental_human_ids
+                }
+            resolve_first_last_games(session, stats_dict.values())
+            stats_by_window[None] = stats_dict
+        elif incremental_human_ids is not None:
+            window_conditions[None] = GameRoster.human_id.in_(incremental_human_ids)
+        if window_conditions:
+            stats_by_window.update(
+                query_skater_window_stats(
+                    session,
+                    aggregation_type,
+                    aggregation_id,
+                    filter_condition,
+                    window_conditions,
+                    human_ids_to_filter,
+                    min_games,
+                )
+            )
 
-    if aggregation_type != "level":
-        assists_query_2 = assists_query_2.join(
-            Division, Game.division_id == Division.id
+    for aggregation_window, stats_dict in stats_by_window.items():
+        StatsModel = stats_models[aggregation_window]
+        # The window's existing rows are replaced by writer.commit(), all
+        # windows in one transaction
+        writer = StatsModel.bulk_writer(session, aggregation_id, aggregation_start_time)
+        window_incremental_human_ids = (
+            incremental_human_ids if aggregation_window is None else None
         )
 
-    assists_stats_2 = (
-        assists_query_2.filter(
-            filter_condition, ~GameRoster.role.ilike("g"), *human_filter
-        )
-        .group_by(Goal.assist_2_id)
-        .all()
-    )
+        # Calculate current point streak (only for all-time stats)
+        # OPTIMIZED: Use batch calculation instead of N+1 queries
+        if aggregation_window is None:
+            total_players = len(stats_dict)
 
-    # Aggregate penalties for each human in each division, excluding goalies
-    penalties_query = (
-        session.query(
-            Penalty.penalized_player_id.label("human_id"),
-            func.count(Penalty.id).label("penalties"),
-            func.sum(case((Penalty.penalty_minutes == "GM", 1), else_=0)).label(
-                "gm_penalties"
-            ),  # New aggregation for GM penalties
-            func.array_agg(Penalty.game_id).label("penalty_game_ids"),
-        )
-        .join(Game, Game.id == Penalty.game_id)
-        .join(
-            GameRoster,
-            and_(
-                Game.id == GameRoster.game_id,
-                Penalty.penalized_player_id == GameRoster.human_id,
-            ),
-        )
-    )
+            # Extract all human_ids from stats_dict
+            all_human_ids = [key[1] for key in stats_dict.keys()]
 
-    if aggregation_type != "level":
-        penalties_query = penalties_query.join(
-            Division, Game.division_id == Division.id
-        )
+            # Calculate all point streaks in ONE batch query (instead of N queries)
+            if fact_cache is not None:
+                all_streaks = fact_cache.view(game_mask).skater_point_streaks(all_human_ids)
+            else:
+                print(f"Calculating point streaks for {total_players} players using batch query...")
+                all_streaks = calculate_point_streaks(
+                    session, all_human_ids, filter_condition
+                )
+            print(f"✓ Point streaks calculated for {len(all_streaks)} players")
 
-    penalties_stats = (
-        penalties_query.filter(
-            filter_condition, ~GameRoster.role.ilike("g"), *human_filter
+            # Assign streak values to stats_dict; longest streaks are not stored
+            for key, stat in stats_dict.items():
+                agg_id, human_id = key
+                streak = all_streaks[human_id]
+                stat["current_point_streak"] = streak["current_point_streak"]
+                stat["current_point_streak_avg_points"] = streak[
+                    "current_point_streak_avg_points"
+                ]
+
+        deleted_keys = []
+        if window_incremental_human_ids is not None:
+            # Unchanged humans keep their stored counters and position; changed
+            # humans replace their row or are appended, or lose it if they no
+            # longer qualify in the scope
+            recomputed = stats_dict
+            stats_dict = {key: dict(row) for key, row in stored_rows.items()}
+            stats_dict.update(recomputed)
+            deleted_keys = [
+                key
+                for key in stored_rows
+                if key[1] in window_incremental_human_ids and key not in recomputed
+            ]
+            for key in deleted_keys:
+                del stats_dict[key]
+
+        # Calculate total_in_rank
+        total_in_rank = len(stats_dict)
+
+        # Assign ranks within each level
+        rank_fields = [
+            "games_played",
+            "games_participated",  # Rank by total participation
+            "games_with_stats",  # Rank by games with full stats
+            "goals",
+            "assists",
+            "points",
+            "penalties",
+            "gm_penalties",
+            "goals_per_game",
+            "points_per_game",
+            "assists_per_game",
+            "penalties_per_game",
+            "gm_penalties_per_game",
+        ]
+        if aggregation_window is None:  # Only rank current_point_streak for all-time stats
+            rank_fields += ["current_point_streak", "current_point_streak_avg_points"]
+        assign_rank_columns(stats_dict, rank_fields)
+
+        # Calculate and insert percentile marker records
+        insert_percentile_markers_skater(
+            session, writer, stats_dict, aggregation_id, total_in_rank, StatsModel, aggregation_window
         )
-        .group_by(Penalty.penalized_player_id)
-        .all()
-    )
 
-    # Combine the results
-    stats_dict = {}
-    for stat in games_played_stats:
-        if stat.human_id in human_ids_to_filter:
-            continue
-        key = (aggregation_id, stat.human_id)
-        if key not in stats_dict:
-            stats_dict[key] = {
-                "games_played": 0,  # DEPRECATED - for backward compatibility
-                "games_participated": 0,  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-                "games_with_stats": 0,  # Games with full stats: FINAL, FINAL_SO only
-                "goals": 0,
-                "assists": 0,
-                "penalties": 0,
-                "gm_penalties": 0,  # Initialize GM penalties
-                "points": 0,  # Initialize points
-                "goals_per_game": 0.0,
-                "points_per_game": 0.0,
-                "assists_per_game": 0.0,
-                "penalties_per_game": 0.0,
-                "gm_penalties_per_game": 0.0,  # Initialize GM penalties per game
-                "current_point_streak": 0,  # Initialize current point streak
-                "current_point_streak_avg_points": 0.0,  # Initialize current point streak average points
-                "game_ids": [],
-                "first_game_id": None,
-                "last_game_id": None,
-            }
-        stats_dict[key]["games_played"] += stat.games_played
-        stats_dict[key]["games_participated"] += stat.games_participated
-        stats_dict[key]["games_with_stats"] += stat.games_with_stats
-        stats_dict[key]["game_ids"].extend(stat.game_ids)
-
-    # Filter out entries with games_played less than min_games
-    stats_dict = {
-        key: value
-        for key, value in stats_dict.items()
-        if value["games_played"] >= min_games
-    }
+        # Debug output for specific human
+        if debug_human_id:
+            if any(key[1] == debug_human_id for key in stats_dict):
+                human = session.query(Human).filter(Human.id == debug_human_id).first()
+                human_name = f"{human.first_name} {human.last_name}" if human else "Unknown"
+                print(
+                    f"For Human {debug_human_id} ({human_name}) for {aggregation_type} {aggregation_id} ({aggregation_name}) , total_in_rank {total_in_rank} and window {aggregation_window}:"
+                )
+                for key, stat in stats_dict.items():
+                    if key[1] == debug_human_id:
+                        for k, v in stat.items():
+                            print(f"{k}: {v}")
 
-    for stat in goals_stats:
-        key = (aggregation_id, stat.human_id)
-        if key in stats_dict:
-            stats_dict[key]["goals"] += stat.goals
-            stats_dict[key]["points"] += stat.goals  # Update points
-
-    for stat in assists_stats:
-        key = (aggregation_id, stat.human_id)
-        if key in stats_dict:
-            stats_dict[key]["assists"] += stat.assists
-            stats_dict[key]["points"] += stat.assists  # Update points
-
-    for stat in assists_stats_2:
-        key = (aggregation_id, stat.human_id)
-        if key in stats_dict:
-            stats_dict[key]["assists"] += stat.assists
-            stats_dict[key]["points"] += stat.assists  # Update points
-
-    for stat in penalties_stats:
-        key = (aggregation_id, stat.human_id)
-        if key in stats_dict:
-            stats_dict[key]["penalties"] += stat.penalties
-            stats_dict[key]["gm_penalties"] += stat.gm_penalties  # Update GM penalties
-
-    # Calculate per game stats (using games_with_stats as denominator for accuracy)
-    for key, stat in stats_dict.items():
-        if stat["games_with_stats"] > 0:
-            stat["goals_per_game"] = stat["goals"] / stat["games_with_stats"]
-            stat["points_per_game"] = stat["points"] / stat["games_with_stats"]
-            stat["assists_per_game"] = stat["assists"] / stat["games_with_stats"]
-            stat["penalties_per_game"] = stat["penalties"] / stat["games_with_stats"]
-            stat["gm_penalties_per_game"] = (
-                stat["gm_penalties"] / stat["games_with_stats"]
+        # Insert aggregated stats into the appropriate table with progress output
+        for key, stat in stats_dict.items():
+            human_id = key[1]
+            if (
+                window_incremental_human_ids is not None
+                and human_id not in window_incremental_human_ids
+                and not skater_ranks_changed(stored_rows[key], stat, total_in_rank)
+            ):
+                continue  # Stored row is already up to date
+            goals_per_game = (
+                stat["goals"] / stat["games_played"] if stat["games_played"] > 0 else 0.0
+            )
+            points_per_game = (
+                (stat["goals"] + stat["assists"]) / stat["games_played"]
+                if stat["games_played"] > 0
+                else 0.0
+            )
+            assists_per_game = (
+                stat["assists"] / stat["games_played"] if stat["games_played"] > 0 else 0.0
+            )
+            penalties_per_game = (
+                stat["penalties"] / stat["games_played"]
+                if stat["games_played"] > 0
+                else 0.0
+            )
+            gm_penalties_per_game = (
+                stat["gm_penalties"] / stat["games_played"]
+                if stat["games_played"] > 0
+                else 0.0
             )  # Calculate GM penalties per game
+            skater_stat = StatsModel(
+                aggregation_id=aggregation_id,
+                human_id=human_id,
+                games_played=stat[
+                    "games_played"
+                ],  # DEPRECATED - for backward compatibility
+                games_participated=stat[
+                    "games_participated"
+                ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
+                games_participated_rank=stat["games_participated_rank"],
+                games_with_stats=stat[
+                    "games_with_stats"
+                ],  # Games with full stats: FINAL, FINAL_SO only
+                games_with_stats_rank=stat["games_with_stats_rank"],
+                goals=stat["goals"],
+                assists=stat["assists"],
+                points=stat["goals"] + stat["assists"],
+                penalties=stat["penalties"],
+                gm_penalties=stat["gm_penalties"],  # Include GM penalties
+                goals_per_game=goals_per_game,
+                points_per_game=points_per_game,
+                assists_per_game=assists_per_game,
+                penalties_per_game=penalties_per_game,
+                gm_penalties_per_game=gm_penalties_per_game,  # Include GM penalties per game
+                games_played_rank=stat["games_played_rank"],
+                goals_rank=stat["goals_rank"],
+                assists_rank=stat["assists_rank"],
+                points_rank=stat["points_rank"],
+                penalties_rank=stat["penalties_rank"],
+                gm_penalties_rank=stat["gm_penalties_rank"],  # Include GM penalties rank
+                goals_per_game_rank=stat["goals_per_game_rank"],
+                points_per_game_rank=stat["points_per_game_rank"],
+                assists_per_game_rank=stat["assists_per_game_rank"],
+                penalties_per_game_rank=stat["penalties_per_game_rank"],
+                gm_penalties_per_game_rank=stat[
+                    "gm_penalties_per_game_rank"
+                ],  # Include GM penalties per game rank
+                total_in_rank=total_in_rank,
+                current_point_streak=stat.get("current_point_streak", 0),
+                current_point_streak_rank=stat.get("current_point_streak_rank", 0),
+                current_point_streak_avg_points=stat.get(
+                    "current_point_streak_avg_points", 0.0
+                ),
+                current_point_streak_avg_points_rank=stat.get(
+                    "current_point_streak_avg_points_rank", 0
+                ),
+                first_game_id=stat["first_game_id"],
+                last_game_id=stat["last_game_id"],
+            )
+            writer.add(skater_stat)
 
-    # Ensure all keys have valid human_id values
-    stats_dict = {key: value for key, value in stats_dict.items() if key[1] is not None}
+        if window_incremental_human_ids is not None:
+            # Only the rows written or deleted here change; the rest of the
+            # scope stays
+            writer.upsert(
+                autocommit=False, delete_human_ids=[key[1] for key in deleted_keys]
+            )
+        else:
+            # Replace the scope's rows, stamping aggregation_completed_at
+            writer.commit(autocommit=False)
 
-    # Populate first_game_id and last_game_id
-    # Only show progress for "All Orgs" with no window (all-time stats) - the slowest case
-    total_players = len(stats_dict)
-    if (
-        aggregation_type == "org"
-        and aggregation_id == ALL_ORGS_ID
-        and aggregation_window is None
-        and total_players > 1000
-    ):
-        progress = create_progress_tracker(
-            total_players, f"Processing {total_players} players for {aggregation_name}"
-        )
-        for idx, (key, stat) in enumerate(stats_dict.items()):
-            all_game_ids = stat["game_ids"]
-            if all_game_ids:
-                first_game = (
-                    session.query(Game)
-                    .filter(Game.id.in_(all_game_ids))
-                    .order_by(Game.date, Game.time)
-                    .first()
-                )
-                last_game = (
-                    session.query(Game)
-                    .filter(Game.id.in_(all_game_ids))
-                    .order_by(Game.date.desc(), Game.time.desc())
-                    .first()
-                )
-                stat["first_game_id"] = first_game.id if first_game else None
-                stat["last_game_id"] = last_game.id if last_game else None
-            if (idx + 1) % 100 == 0 or (
-                idx + 1
-            ) == total_players:  # Update every 100 players
-                progress.update(idx + 1)
-    else:
-        # No progress tracking for all other cases
-        for key, stat in stats_dict.items():
-            all_game_ids = stat["game_ids"]
-            if all_game_ids:
-                first_game = (
-                    session.query(Game)
-                    .filter(Game.id.in_(all_game_ids))
-                    .order_by(Game.date, Game.time)
-                    .first()
-                )
-                last_game = (
-                    session.query(Game)
-                    .filter(Game.id.in_(all_game_ids))
-                    .order_by(Game.date.desc(), Game.time.desc())
-                    .first()
-                )
-                stat["first_game_id"] = first_game.id if first_game else None
-                stat["last_game_id"] = last_game.id if last_game else None
+    session.commit()
 
-    # Calculate current point streak (only for all-time stats)
-    # OPTIMIZED: Use batch calculation instead of N+1 queries
-    if aggregation_window is None:
-        total_players = len(stats_dict)
 
-        # Extract all human_ids from stats_dict
-        all_human_ids = [key[1] for key in stats_dict.keys()]
+def aggregate_skater_stats(
+    session,
+    aggregation_type,
+    aggregation_id,
+    debug_human_id=None,
+    aggregation_window=None,
+    changed_human_ids=None,
+    fact_cache=None,
+    incremental=False,
+):
+    """Aggregate a single window of a skater stats scope (see aggregate_skater_scope)."""
+    aggregate_skater_scope(
+        session,
+        aggregation_type,
+        aggregation_id,
+        debug_human_id=debug_human_id,
+        aggregation_windows=(aggregation_window,),
+        changed_human_ids=changed_human_ids,
+        fact_cache=fact_cache,
+        incremental=incremental,
+    )
 
-        # Calculate all point streaks in ONE batch query (instead of N queries)
-        print(f"Calculating point streaks for {total_players} players using batch query...")
-        all_streaks = calculate_all_point_streaks_batch(
-            session, all_human_ids, filter_condition
-        )
-        print(f"✓ Point streaks calculated for {len(all_streaks)} players")
 
-        # Assign streak values to stats_dict
-        for key, stat in stats_dict.items():
-            agg_id, human_id = key
-            streak_length, avg_points = all_streaks.get(human_id, (0, 0.0))
-            stat["current_point_streak"] = streak_length
-            stat["current_point_streak_avg_points"] = avg_points
-
-    # Calculate total_in_rank
-    total_in_rank = len(stats_dict)
-
-    # Assign ranks within each level
-    def assign_ranks(stats_dict, field):
-        sorted_stats = sorted(
-            stats_dict.items(), key=lambda x: x[1][field], reverse=True
-        )
-        for rank, (key, stat) in enumerate(sorted_stats, start=1):
-            stats_dict[key][f"{field}_rank"] = rank
-
-    assign_ranks(stats_dict, "games_played")
-    assign_ranks(stats_dict, "games_participated")  # Rank by total participation
-    assign_ranks(stats_dict, "games_with_stats")  # Rank by games with full stats
-    assign_ranks(stats_dict, "goals")
-    assign_ranks(stats_dict, "assists")
-    assign_ranks(stats_dict, "points")
-    assign_ranks(stats_dict, "penalties")
-    assign_ranks(stats_dict, "gm_penalties")  # Assign ranks for GM penalties
-    assign_ranks(stats_dict, "goals_per_game")
-    assign_ranks(stats_dict, "points_per_game")
-    assign_ranks(stats_dict, "assists_per_game")
-    assign_ranks(stats_dict, "penalties_per_game")
-    assign_ranks(
-        stats_dict, "gm_penalties_per_game"
-    )  # Assign ranks for GM penalties per game
-    if (
-        aggregation_window is None
-    ):  # Only assign current_point_streak ranks for all-time stats
-        assign_ranks(stats_dict, "current_point_streak")
-        assign_ranks(stats_dict, "current_point_streak_avg_points")
-
-    # Calculate and insert percentile marker records
-    insert_percentile_markers_skater(
-        session, stats_dict, aggregation_id, total_in_rank, StatsModel, aggregation_window
+def aggregate_skater_division(
+    session,
+    division_id,
+    debug_human_id=None,
+    changed_human_ids=None,
+    use_fact_cache=False,
+    incremental=False,
+):
+    """Aggregate all-time, weekly and daily skater stats for one division."""
+    fact_cache = get_game_fact_cache(session) if use_fact_cache else None
+    aggregate_skater_scope(
+        session,
+        aggregation_type="division",
+        aggregation_id=division_id,
+        debug_human_id=debug_human_id,
+        fact_cache=fact_cache,
+        changed_human_ids=changed_human_ids,
+        incremental=incremental,
     )
 
-    # Debug output for specific human
-    if debug_human_id:
-        if any(key[1] == debug_human_id for key in stats_dict):
-            human = session.query(Human).filter(Human.id == debug_human_id).first()
-            human_name = f"{human.first_name} {human.last_name}" if human else "Unknown"
-            print(
-                f"For Human {debug_human_id} ({human_name}) for {aggregation_type} {aggregation_id} ({aggregation_name}) , total_in_rank {total_in_rank} and window {aggregation_window}:"
-            )
-            for key, stat in stats_dict.items():
-                if key[1] == debug_human_id:
-                    for k, v in stat.items():
-                        print(f"{k}: {v}")
-
-    # Insert aggregated stats into the appropriate table with progress output
-    total_items = len(stats_dict)
-    batch_size = 1000
-    for i, (key, stat) in enumerate(stats_dict.items(), 1):
-        aggregation_id, human_id = key
-        goals_per_game = (
-            stat["goals"] / stat["games_played"] if stat["games_played"] > 0 else 0.0
-        )
-        points_per_game = (
-            (stat["goals"] + stat["assists"]) / stat["games_played"]
-            if stat["games_played"] > 0
-            else 0.0
-        )
-        assists_per_game = (
-            stat["assists"] / stat["games_played"] if stat["games_played"] > 0 else 0.0
-        )
-        penalties_per_game = (
-            stat["penalties"] / stat["games_played"]
-            if stat["games_played"] > 0
-            else 0.0
-        )
-        gm_penalties_per_game = (
-            stat["gm_penalties"] / stat["games_played"]
-            if stat["games_played"] > 0
-            else 0.0
-        )  # Calculate GM penalties per game
-        skater_stat = StatsModel(
-            aggregation_id=aggregation_id,
-            human_id=human_id,
-            games_played=stat[
-                "games_played"
-            ],  # DEPRECATED - for backward compatibility
-            games_participated=stat[
-                "games_participated"
-            ],  # Total games: FINAL, FINAL_SO, FORFEIT, NOEVENTS
-            games_participated_rank=stat["games_participated_rank"],
-            games_with_stats=stat[
-                "games_with_stats"
-            ],  # Games with full stats: FINAL, FINAL_SO only
-            games_with_stats_rank=stat["games_with_stats_rank"],
-            goals=stat["goals"],
-            assists=stat["assists"],
-            points=stat["goals"] + stat["assists"],
-            penalties=stat["penalties"],
-            gm_penalties=stat["gm_penalties"],  # Include GM penalties
-            goals_per_game=goals_per_game,
-            points_per_game=points_per_game,
-            assists_per_game=assists_per_game,
-            penalties_per_game=penalties_per_game,
-            gm_penalties_per_game=gm_penalties_per_game,  # Include GM penalties per game
-            games_played_rank=stat["games_played_rank"],
-            goals_rank=stat["goals_rank"],
-            assists_rank=stat["assists_rank"],
-            points_rank=stat["points_rank"],
-            penalties_rank=stat["penalties_rank"],
-            gm_penalties_rank=stat["gm_penalties_rank"],  # Include GM penalties rank
-            goals_per_game_rank=stat["goals_per_game_rank"],
-            points_per_game_rank=stat["points_per_game_rank"],
-            assists_per_game_rank=stat["assists_per_game_rank"],
-            penalties_per_game_rank=stat["penalties_per_game_rank"],
-            gm_penalties_per_game_rank=stat[
-                "gm_penalties_per_game_rank"
-            ],  # Include GM penalties per game rank
-            total_in_rank=total_in_rank,
-            current_point_streak=stat.get("current_point_streak", 0),
-            current_point_streak_rank=stat.get("current_point_streak_rank", 0),
-            current_point_streak_avg_points=stat.get(
-                "current_point_streak_avg_points", 0.0
-            ),
-            current_point_streak_avg_points_rank=stat.get(
-                "current_point_streak_avg_points_rank", 0
-            ),
-            first_game_id=stat["first_game_id"],
-            last_game_id=stat["last_game_id"],
-            aggregation_started_at=aggregation_start_time,
-        )
-        session.add(skater_stat)
-        # Commit in batches
-        if i % batch_size == 0:
-            session.commit()
-    session.commit()
-
-    # Update all records with completion timestamp
-    aggregation_end_time = datetime.utcnow()
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).update({StatsModel.aggregation_completed_at: aggregation_end_time})
-    session.commit()
 
+def run_aggregate_skater_stats(
+    workers=DIVISION_AGGREGATION_WORKERS,
+    use_fact_cache=USE_GAME_FACT_CACHE,
+    incremental=INCREMENTAL_SKATER_STATS,
+    rollup=ROLLUP_SCOPE_STATS,
+):
+    """
+    Aggregate skater stats for every division, organization and level.
 
-def run_aggregate_skater_stats():
+    Args:
+        workers: Number of processes aggregating divisions concurrently
+            (1 = serial). Org and level scopes run once all divisions are done.
+        use_fact_cache: Compute the stats from an in-memory GameFactCache
+            instead of querying the database for every scope.
+        incremental: Recompute all-time stats only for humans with new games
+            and upsert the rows that changed.
+        rollup: Without the fact cache, roll all-time org and level stats up
+            from per-division partials.
+    """
     session = create_session("boss")
     human_id_to_debug = None
+    if human_id_to_debug is not None:
+        workers = 1
+
+    # Loaded once here; the division workers memory-map a saved copy
+    fact_cache = load_game_fact_cache(session) if use_fact_cache else None
 
     # Pre-fetch changed humans once (single query)
     changed_human_ids = get_changed_human_ids(session)
@@ -942,8 +1244,33 @@ def run_aggregate_skater_stats():
     org_ids = session.query(Organization.id).all()
     org_ids = [org_id[0] for org_id in org_ids]
 
+    # Divisions are independent of each other, so fan them out first
+    division_ids = []
+    for org_id in org_ids:
+        division_ids.extend(get_all_division_ids_for_org(session, org_id))
+    run_division_aggregations(
+        session,
+        aggregate_skater_division,
+        division_ids,
+        workers=workers,
+        description=(
+            f"Processing {len(division_ids)} divisions"
+            if human_id_to_debug is None
+            else None
+        ),
+        debug_human_id=human_id_to_debug,
+        changed_human_ids=changed_human_ids,
+        incremental=incremental,
+        use_fact_cache=use_fact_cache,
+        fact_cache=fact_cache,
+    )
+
+    # Org and level counters come from one pass over all games
+    partials = (
+        query_skater_partials(session) if rollup and fact_cache is None else None
+    )
+
     for org_id in org_ids:
-        division_ids = get_all_division_ids_for_org(session, org_id)
         org_name = (
             session.query(Organization.organization_name)
             .filter(Organization.id == org_id)
@@ -951,111 +1278,23 @@ def run_aggregate_skater_stats():
             or f"org_id {org_id}"
         )
 
-        if human_id_to_debug is None and division_ids:
-            # Process divisions with progress tracking
-            progress = create_progress_tracker(
-                len(division_ids),
-                f"Processing {len(division_ids)} divisions for {org_name}",
-            )
-            for i, division_id in enumerate(division_ids):
-                aggregate_skater_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    changed_human_ids=changed_human_ids,
-                )
-                aggregate_skater_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Weekly",
-                )
-                aggregate_skater_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Daily",
-                )
-                progress.update(i + 1)
-        else:
-            # Debug mode or no divisions - process without progress tracking
-            for division_id in division_ids:
-                aggregate_skater_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    changed_human_ids=changed_human_ids,
-                )
-                aggregate_skater_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Weekly",
-                )
-                aggregate_skater_stats(
-                    session,
-                    aggregation_type="division",
-                    aggregation_id=division_id,
-                    debug_human_id=human_id_to_debug,
-                    aggregation_window="Daily",
-                )
-
-        # Process org-level stats with progress tracking
+        # Process org-level stats (all windows in one pass) with progress tracking
         if human_id_to_debug is None:
             org_progress = create_progress_tracker(
-                3, f"Processing org-level stats for {org_name}"
-            )
-            aggregate_skater_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                changed_human_ids=changed_human_ids,
+                1, f"Processing org-level stats for {org_name}"
             )
+        aggregate_skater_scope(
+            session,
+            aggregation_type="org",
+            aggregation_id=org_id,
+            debug_human_id=human_id_to_debug,
+            fact_cache=fact_cache,
+            changed_human_ids=changed_human_ids,
+            incremental=incremental,
+            partials=partials,
+        )
+        if human_id_to_debug is None:
             org_progress.update(1)
-            aggregate_skater_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Weekly",
-            )
-            org_progress.update(2)
-            aggregate_skater_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Daily",
-            )
-            org_progress.update(3)
-        else:
-            aggregate_skater_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                changed_human_ids=changed_human_ids,
-            )
-            aggregate_skater_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Weekly",
-            )
-            aggregate_skater_stats(
-                session,
-                aggregation_type="org",
-                aggregation_id=org_id,
-                debug_human_id=human_id_to_debug,
-                aggregation_window="Daily",
-            )
 
     # Aggregate by level
     level_ids = session.query(Division.level_id).distinct().all()
@@ -1067,23 +1306,29 @@ def run_aggregate_skater_stats():
             len(level_ids), f"Processing {len(level_ids)} skill levels"
         )
         for i, level_id in enumerate(level_ids):
-            aggregate_skater_stats(
+            aggregate_skater_scope(
                 session,
                 aggregation_type="level",
                 aggregation_id=level_id,
                 debug_human_id=human_id_to_debug,
+                fact_cache=fact_cache,
                 changed_human_ids=changed_human_ids,
+                incremental=incremental,
+                partials=partials,
             )
             level_progress.update(i + 1)
     else:
         # Debug mode or no levels - process without progress tracking
         for level_id in level_ids:
-            aggregate_skater_stats(
+            aggregate_skater_scope(
                 session,
                 aggregation_type="level",
                 aggregation_id=level_id,
                 debug_human_id=human_id_to_debug,
+                fact_cache=fact_cache,
                 changed_human_ids=changed_human_ids,
+                incremental=incremental,
+                partials=partials,
             )
 
     # After ALL aggregations complete, mark humans as processed
@@ -20,7 +20,10 @@ from datetime import datetime
 import sqlalchemy
 from sqlalchemy import and_, case, func
 
+from hockey_blast_common_lib.aggregation_metrics import record_scope_metrics
 from hockey_blast_common_lib.db_connection import create_session
+from hockey_blast_common_lib.game_fact_cache import load_game_fact_cache
+from hockey_blast_common_lib.game_ordinals import resolve_first_last_games
 from hockey_blast_common_lib.models import (
     Division,
     Game,
@@ -34,6 +37,7 @@ from hockey_blast_common_lib.models import (
 from hockey_blast_common_lib.options import (
     MIN_GAMES_FOR_DIVISION_STATS,
     MIN_GAMES_FOR_ORG_STATS,
+    USE_GAME_FACT_CACHE,
 )
 from hockey_blast_common_lib.progress_utils import create_progress_tracker
 from hockey_blast_common_lib.stats_models import (
@@ -48,7 +52,118 @@ from hockey_blast_common_lib.utils import (
 )
 
 
-def aggregate_team_skater_stats(session, aggregation_type, aggregation_id):
+def query_team_skater_stats(
+    session, team_id, filter_condition, human_ids_to_filter, min_games
+):
+    """
+    Skater counters of one team's players in a scope, keyed by human_id.
+
+    Only players with at least min_games games for the team are included.
+    """
+    # Aggregate stats for this team
+    # Filter to only games where players were on THIS team
+    games_played_query = (
+        session.query(
+            GameRoster.human_id,
+            func.count(Game.id).label("games_played"),
+            func.count(Game.id).label("games_participated"),
+            func.count(Game.id).label("games_with_stats"),
+            func.min(Game.chronological_ordinal).label("first_ordinal"),
+            func.max(Game.chronological_ordinal).label("last_ordinal"),
+        )
+        .join(Game, Game.id == GameRoster.game_id)
+        .filter(
+            GameRoster.team_id == team_id,  # KEY: Filter by team
+            ~GameRoster.role.ilike("g"),  # Exclude goalies
+            GameRoster.human_id.notin_(human_ids_to_filter),
+            Game.status_id.in_(PARTICIPATED_STATUS_IDS),
+            filter_condition,  # org_id or division_id filter
+        )
+        .group_by(GameRoster.human_id)
+        .having(func.count(Game.id) >= min_games)
+    )
+
+    games_played_data = games_played_query.all()
+    if not games_played_data:
+        return {}
+
+    # Create stats dictionary
+    stats_dict = {}
+    for row in games_played_data:
+        stats_dict[row.human_id] = {
+            "games_played": row.games_played,
+            "games_participated": row.games_participated,
+            "games_with_stats": row.games_with_stats,
+            "first_ordinal": row.first_ordinal,
+            "last_ordinal": row.last_ordinal,
+        }
+    resolve_first_last_games(session, stats_dict.values())
+
+    # Aggregate goals, assists, points
+    goals_assists_query = (
+        session.query(
+            GameRoster.human_id,
+            func.count(func.distinct(case((Goal.goal_scorer_id == GameRoster.human_id, Goal.id)))).label("goals"),
+            func.count(
+                func.distinct(
+                    case(
+                        (
+                            (Goal.assist_1_id == GameRoster.human_id) | (Goal.assist_2_id == GameRoster.human_id),
+                            Goal.id,
+                        )
+                    )
+                )
+            ).label("assists"),
+        )
+        .join(Game, Game.id == GameRoster.game_id)
+        .outerjoin(Goal, Game.id == Goal.game_id)
+        .filter(
+            GameRoster.team_id == team_id,  # KEY: Filter by team
+            ~GameRoster.role.ilike("g"),
+            GameRoster.human_id.in_(stats_dict.keys()),
+            Game.status_id.in_(FINAL_STATUS_IDS),
+            filter_condition,
+        )
+        .group_by(GameRoster.human_id)
+    )
+
+    for row in goals_assists_query.all():
+        if row.human_id in stats_dict:
+            stats_dict[row.human_id]["goals"] = row.goals
+            stats_dict[row.human_id]["assists"] = row.assists
+            stats_dict[row.human_id]["points"] = row.goals + row.assists
+
+    # Aggregate penalties
+    penalties_query = (
+        session.query(
+            GameRoster.human_id,
+            func.count(Penalty.id).label("penalties"),
+            func.sum(case((Penalty.penalty_minutes == "GM", 1), else_=0)).label("gm_penalties"),
+        )
+        .join(Game, Game.id == GameRoster.game_id)
+        .outerjoin(Penalty, and_(Game.id == Penalty.game_id, Penalty.penalized_player_id == GameRoster.human_id))
+        .filter(
+            GameRoster.team_id == team_id,  # KEY: Filter by team
+            ~GameRoster.role.ilike("g"),
+            GameRoster.human_id.in_(stats_dict.keys()),
+            Game.status_id.in_(PARTICIPATED_STATUS_IDS),
+            filter_condition,
+        )
+        .group_by(GameRoster.human_id)
+    )
+
+    for row in penalties_query.all():
+        if row.human_id in stats_dict:
+            stats_dict[row.human_id]["penalties"] = row.penalties
+            stats_dict[row.human_id]["gm_penalties"] = row.gm_penalties
+
+    return stats_dict
+
+
+@record_scope_metrics
+def aggregate_team_skater_stats(
+    session, aggregation_type, aggregation_id, fact_cache=None
+):
     """
     Aggregate skater stats by team for an organization or division.
 
@@ -59,6 +174,8 @@ def aggregate_team_skater_stats(session, aggregation_type, aggregation_id):
         session: Database session
         aggregation_type: "org" or "division"
         aggregation_id: ID of the organization or division
+        fact_cache: Optional GameFactCache to compute the counters of every
+            team from instead of querying each team
     """
     # Capture start time for aggregation tracking
     aggregation_start_time = datetime.utcnow()
@@ -88,9 +205,8 @@ def aggregate_team_skater_stats(session, aggregation_type, aggregation_id):
 
     print(f"Aggregating team skater stats for {aggregation_name}...")
 
-    # Delete existing stats for this aggregation
-    session.query(StatsModel).filter(StatsModel.aggregation_id == aggregation_id).delete()
-    session.commit()
+    # The existing stats for this aggregation are replaced in one transaction by writer.commit()
+    writer = StatsModel.bulk_writer(session, aggregation_id, aggregation_start_time)
 
     # Get all teams in this aggregation scope
     if aggregation_type == "org":
@@ -111,106 +227,30 @@ def aggregate_team_skater_stats(session, aggregation_type, aggregation_id):
     teams = teams_query.all()
     print(f"Found {len(teams)} teams in {aggregation_name}")
 
+    team_stats = (
+        fact_cache.team_view(aggregation_type, aggregation_id).team_skater_stats()
+        if fact_cache is not None
+        else None
+    )
+
     # Process each team
     progress = create_progress_tracker(len(teams), description="Processing teams")
     for team_id, team_name in teams:
         progress.update(1)
 
-        # Aggregate stats for this team
-        # Filter to only games where players were on THIS team
-        games_played_query = (
-            session.query(
-                GameRoster.human_id,
-                func.count(Game.id).label("games_played"),
-                func.count(Game.id).label("games_participated"),
-                func.count(Game.id).label("games_with_stats"),
-                func.array_agg(Game.id).label("game_ids"),
-            )
-            .join(Game, Game.id == GameRoster.game_id)
-            .filter(
-                GameRoster.team_id == team_id,  # KEY: Filter by team
-                ~GameRoster.role.ilike("g"),  # Exclude goalies
-                GameRoster.human_id.notin_(human_ids_to_filter),
-                Game.status_id.in_(PARTICIPATED_STATUS_IDS),
-                filter_condition,  # org_id or division_id filter
+        if team_stats is None:
+            stats_dict = query_team_skater_stats(
+                session, team_id, filter_condition, human_ids_to_filter, min_games
             )
-            .group_by(GameRoster.human_id)
-            .having(func.count(Game.id) >= min_games)
-        )
-
-        games_played_data = games_played_query.all()
-        if not games_played_data:
-            continue  # No players met minimum games for this team
-
-        # Create stats dictionary
-        stats_dict = {}
-        for row in games_played_data:
-            stats_dict[row.human_id] = {
-                "games_played": row.games_played,
-                "games_participated": row.games_participated,
-                "games_with_stats": row.games_with_stats,
-                "game_ids": row.game_ids,
-                "first_game_id": row.game_ids[0] if row.game_ids else None,
-                "last_game_id": row.game_ids[-1] if row.game_ids else None,
+        else:
+            stats_dict = {
+                human_id: stat
+                for human_id, stat in team_stats.get(team_id, {}).items()
+                if human_id not in human_ids_to_filter
+                and stat["games_played"] >= min_games
             }
-
-        # Aggregate goals, assists, points
-        goals_assists_query = (
-            session.query(
-                GameRoster.human_id,
-                func.count(func.distinct(case((Goal.goal_scorer_id == GameRoster.human_id, Goal.id)))).label("goals"),
-                func.count(
-                    func.distinct(
-                        case(
-                            (
-                                (Goal.assist_1_id == GameRoster.human_id) | (Goal.assist_2_id == GameRoster.human_id),
-                                Goal.id,
-                            )
-                        )
-                    )
-                ).label("assists"),
-            )
-            .join(Game, Game.id == GameRoster.game_id)
-            .outerjoin(Goal, Game.id == Goal.game_id)
-            .filter(
-                GameRoster.team_id == team_id,  # KEY: Filter by team
-                ~GameRoster.role.ilike("g"),
-                GameRoster.human_id.in_(stats_dict.keys()),
-                Game.status_id.in_(FINAL_STATUS_IDS),
-                filter_condition,
-            )
-            .group_by(GameRoster.human_id)
-        )
-
-        for row in goals_assists_query.all():
-            if row.human_id in stats_dict:
-                stats_dict[row.human_id]["goals"] = row.goals
-                stats_dict[row.human_id]["assists"] = row.assists
-                stats_dict[row.human_id]["points"] = row.goals + row.assists
-
-        # Aggregate penalties
-        penalties_query = (
-            session.query(
-                GameRoster.human_id,
-                func.count(Penalty.id).label("penalties"),
-                func.sum(case((Penalty.penalty_minutes == "GM", 1), else_=0)).label("gm_penalties"),
-            )
-            .join(Game, Game.id == GameRoster.game_id)
-            .outerjoin(Penalty, and_(Game.id == Penalty.game_id, Penalty.penalized_player_id == GameRoster.human_id))
-            .filter(
-                GameRoster.team_id == team_id,  # KEY: Filter by team
-                ~GameRoster.role.ilike("g"),
-                GameRoster.human_id.in_(stats_dict.keys()),
-                Game.status_id.in_(PARTICIPATED_STATUS_IDS),
-                filter_condition,
-            )
-            .group_by(GameRoster.human_id)
-        )
-
-        for row in penalties_query.all():
-            if row.human_id in stats_dict:
-                stats_dict[row.human_id]["penalties"] = row.penalties
-                stats_dict[row.human_id]["gm_penalties"] = row.gm_penalties
+        if not stats_dict:
+            continue  # No players met minimum games for this team
 
         # Calculate per-game averages
         for human_id, stats in stats_dict.items():
@@ -269,40 +309,41 @@ def aggregate_team_skater_stats(session, aggregation_type, aggregation_id):
                 gm_penalties_per_game_rank=0,
                 current_point_streak_rank=0,
                 current_point_streak_avg_points_rank=0,
-                aggregation_started_at=aggregation_start_time,
             )
-            session.add(skater_stat)
-
-    session.commit()
+            writer.add(skater_stat)
 
-    # Update all records with completion timestamp
-    aggregation_end_time = datetime.utcnow()
-    session.query(StatsModel).filter(
-        StatsModel.aggregation_id == aggregation_id
-    ).update({StatsModel.aggregation_completed_at: aggregation_end_time})
-    session.commit()
+    # Replace the scope's rows, stamping aggregation_completed_at
+    writer.commit()
 
     progress.finish()
     print(f"✓ Team skater stats aggregation complete for {aggregation_name}")
 
 
-def run_aggregate_team_skater_stats():
+def run_aggregate_team_skater_stats(use_fact_cache=USE_GAME_FACT_CACHE):
     """
     Run team skater stats aggregation for all organizations and divisions.
+
+    Args:
+        use_fact_cache: Compute the stats from an in-memory GameFactCache
+            instead of querying the database for every team.
     """
     from hockey_blast_common_lib.utils import get_all_division_ids_for_org
 
     session = create_session("boss")
 
+    fact_cache = load_game_fact_cache(session) if use_fact_cache else None
+
     # Get all org_id present in the Organization table
     org_ids = session.query(Organization.id).all()
     org_ids = [org_id[0] for org_id in org_ids]
 
     for org_id in org_ids:
         # Aggregate for organization level
-        aggregate_team_skater_stats(session, "org", org_id)
+        aggregate_team_skater_stats(session, "org", org_id, fact_cache=fact_cache)
 
         # Aggregate for all divisions in this organization
         division_ids = get_all_division_ids_for_org(session, org_id)
         for division_id in division_ids:
-            aggregate_team_skater_stats(session, "division", division_id)
+            aggregate_team_skater_stats(
+                session, "division", division_id, fact_cache=fact_cache
+            )
@@ -0,0 +1,225 @@
+"""
+Structured metrics for the aggregation pipeline.
+
+Every stage run by aggregate_all_stats.py and every org/division/level scope
+of the stats aggregators is measured: wall time, SQL statements executed,
+rows read, rows written and deleted, and the process's peak RSS. Each
+measurement is emitted as one JSON line to the metrics file and, with
+PERSIST_AGGREGATION_METRICS, inserted into the aggregation_runs table (see
+options.py).
+
+SQL counters are per process: a stage record covers the process that ran the
+stage, while scopes aggregated by division worker processes are reported in
+their own records (with the worker's pid).
+
+Configuration lives in environment variables so that worker processes, forked
+or spawned, inherit it from the process that called configure_metrics().
+"""
+
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE_ENV = "AGGREGATION_METRICS_FILE"
+METRICS_PERSIST_ENV = "AGGREGATION_METRICS_PERSIST"
+RUN_ID_ENV = "AGGREGATION_RUN_ID"
+STAGE_ENV = "AGGREGATION_STAGE"
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "MERGE")
+
+# aggregation_window of a scope record covering several windows at once
+COMBINED_WINDOWS = "Combined"
+
+# SQL counters of this process, updated by the engine event listeners below
+_counters = {"sql_statements": 0, "rows_read": 0, "rows_written": 0, "rows_deleted": 0}
+_paused = False
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if _paused:
+        return
+    _counters["sql_statements"] += 1
+    rowcount = cursor.rowcount if cursor.rowcount is not None else -1
+    if rowcount < 0:
+        return
+    if cursor.description is not None:
+        _counters["rows_read"] += rowcount
+        return
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else ""
+    if verb in WRITE_STATEMENTS:
+        _counters["rows_written"] += rowcount
+    elif verb == "DELETE":
+        _counters["rows_deleted"] += rowcount
+
+
+def configure_metrics(metrics_file=None, persist=False, run_id=None):
+    """
+    Enable metrics for this process and every worker it starts.
+
+    Args:
+        metrics_file: Path of the JSON lines file records are appended to
+        persist: Also insert every record into the aggregation_runs table
+        run_id: Identifier shared by all records of this run (generated if None)
+
+    Returns:
+        The run id
+    """
+    if metrics_file:
+        os.environ[METRICS_FILE_ENV] = metrics_file
+    if persist:
+        os.environ[METRICS_PERSIST_ENV] = "1"
+    os.environ[RUN_ID_ENV] = (
+        run_id or datetime.utcnow().strftime("%Y%m%dT%H%M%S-") + uuid.uuid4().hex[:8]
+    )
+    return os.environ[RUN_ID_ENV]
+
+
+def metrics_enabled():
+    return bool(os.environ.get(METRICS_FILE_ENV) or os.environ.get(METRICS_PERSIST_ENV))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def measure(kind, stage=None, scope_type=None, scope_id=None, aggregation_window=None):
+    """
+    Measure the enclosed block and emit one metrics record when it exits.
+
+    Args:
+        kind: "stage" or "scope"
+        stage: Pipeline stage name (defaults to the stage being run)
+        scope_type: "org", "division", "level", ... for scope records
+        scope_id: Org, division or level id
+        aggregation_window: "Weekly", "Daily", None for all-time or
+            COMBINED_WINDOWS
+    """
+    if not metrics_enabled():
+        yield
+        return
+
+    started_at = datetime.utcnow()
+    start_time = time.time()
+    start_counters = dict(_counters)
+    status = "failed"
+    try:
+        yield
+        status = "ok"
+    finally:
+        record = {
+            "run_id": os.environ.get(RUN_ID_ENV),
+            "kind": kind,
+            "stage": stage or os.environ.get(STAGE_ENV),
+            "scope_type": scope_type,
+            "scope_id": scope_id,
+            "aggregation_window": aggregation_window,
+            "status": status,
+            "started_at": started_at.isoformat(),
+            "wall_time_s": round(time.time() - start_time, 3),
+            **{name: _counters[name] - start_counters[name] for name in _counters},
+            "peak_rss_mb": peak_rss_mb(),
+            "pid": os.getpid(),
+        }
+        emit(record)
+
+
+@contextmanager
+def measure_stage(stage):
+    """Measure a pipeline stage; scopes measured inside it are tagged with it."""
+    previous = os.environ.get(STAGE_ENV)
+    os.environ[STAGE_ENV] = stage
+    try:
+        with measure("stage", stage=stage):
+            yield
+    finally:
+        if previous is None:
+            os.environ.pop(STAGE_ENV, None)
+        else:
+            os.environ[STAGE_ENV] = previous
+
+
+def record_scope_metrics(aggregate):
+    """
+    Decorator measuring each call of an aggregate_*_stats(session,
+    aggregation_type, aggregation_id, ..., aggregation_window=None) function,
+    or of an aggregate_*_scope() function taking aggregation_windows instead.
+    """
+    signature = inspect.signature(aggregate)
+
+    @functools.wraps(aggregate)
+    def wrapper(*args, **kwargs):
+        if not metrics_enabled():
+            return aggregate(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        aggregation_window = arguments.get("aggregation_window")
+        if "aggregation_windows" in arguments:
+            windows = tuple(arguments["aggregation_windows"])
+            aggregation_window = windows[0] if len(windows) == 1 else COMBINED_WINDOWS
+        with measure(
+            "scope",
+            scope_type=arguments.get("aggregation_type"),
+            scope_id=arguments.get("aggregation_id"),
+            aggregation_window=aggregation_window,
+        ):
+            return aggregate(*args, **kwargs)
+
+    return wrapper
+
+
+def emit(record):
+    """Append a record to the metrics file and/or the aggregation_runs table."""
+    metrics_file = os.environ.get(METRICS_FILE_ENV)
+    if metrics_file:
+        with open(metrics_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    if os.environ.get(METRICS_PERSIST_ENV):
+        _persist(record)
+
+
+def _persist(record):
+    """Insert a record into aggregation_runs without counting its own SQL."""
+    # Imported here so that the metrics hooks add no import cycle to models
+    from hockey_blast_common_lib.db_connection import create_session
+    from hockey_blast_common_lib.models import AggregationRun
+
+    global _paused
+    _paused = True
+    session = create_session("boss")
+    try:
+        session.add(
+            AggregationRun(
+                **{key: value for key, value in record.items() if key != "started_at"},
+                started_at=datetime.fromisoformat(record["started_at"]),
+            )
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"WARNING: could not persist aggregation metrics: {e}", flush=True)
+    finally:
+        session.close()
+        _paused = False
@@ -0,0 +1,243 @@
+"""
+COPY-based writer for aggregated stats tables.
+
+Aggregators used to delete a scope's rows, commit, and then add one ORM object
+per row with a commit every 1000 rows, so leaderboards were empty or partial
+until the scope finished. StatsBulkWriter instead buffers the scope's rows,
+streams them with PostgreSQL COPY into a temporary staging table and replaces
+the scope's rows with one DELETE + INSERT ... SELECT in a single transaction.
+Readers see either the old rows or the new ones, never a mix.
+"""
+
+import io
+import math
+from datetime import date, datetime
+
+from sqlalchemy import Integer, UniqueConstraint, text
+
+STAGING_TABLE = "stats_bulk_staging"
+
+
+def _copy_value(value):
+    """Format a value for COPY ... FROM STDIN in PostgreSQL text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        return repr(float(value))
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _round_half_away_from_zero(value):
+    """Round like PostgreSQL's numeric -> integer cast, which INSERT applies."""
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+
+class StatsBulkWriter:
+    """
+    Replace all rows of one aggregation scope of a stats table.
+
+    Rows are buffered with add() and written by commit(), which also stamps
+    aggregation_started_at and aggregation_completed_at on every row.
+    upsert() writes the buffered rows without touching the scope's other rows.
+    With autocommit=False both leave the transaction open, so that several
+    writers (e.g. the all-time, weekly and daily tables of a scope) are
+    committed together by the caller.
+
+    Usage:
+        writer = OrgStatsSkater.bulk_writer(session, org_id, started_at)
+        for stat in stats:
+            writer.add(OrgStatsSkater(org_id=org_id, ...))
+        writer.commit()
+    """
+
+    def __init__(self, session, model, scope, started_at=None):
+        """
+        Args:
+            session: Database session; commit() commits its transaction
+            model: Stats model class (any BaseStats* subclass)
+            scope: {column name: value} identifying the rows to replace,
+                e.g. {"org_id": 1}
+            started_at: Value for aggregation_started_at (defaults to now)
+        """
+        self.session = session
+        self.model = model
+        self.scope = scope
+        self.started_at = started_at or datetime.utcnow()
+        self.columns = [
+            column for column in model.__table__.columns if not column.primary_key
+        ]
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row):
+        """Buffer a row given as a transient model instance or a column dict."""
+        if not isinstance(row, dict):
+            row = {column.key: getattr(row, column.key) for column in self.columns}
+        values = []
+        for column in self.columns:
+            value = row.get(column.key)
+            if (
+                value is None
+                and column.default is not None
+                and column.default.is_scalar
+            ):
+                value = column.default.arg
+            elif isinstance(value, float) and isinstance(column.type, Integer):
+                # COPY rejects fractional input for integer columns
+                # (e.g. referees' penalties_given, credited in halves)
+                value = _round_half_away_from_zero(value)
+            values.append(value)
+        self.rows.append(values)
+
+    def commit(self, autocommit=True):
+        """
+        Replace the scope's rows with the buffered rows in one transaction.
+
+        Args:
+            autocommit: Commit the session's transaction (False leaves it to
+                the caller)
+
+        Returns:
+            Number of rows written
+        """
+        table = self.model.__tablename__
+        column_list = self._column_list()
+        scope_clause = " AND ".join(f"{name} = :{name}" for name in self.scope)
+        return self._load(
+            (text(f"DELETE FROM {table} WHERE {scope_clause}"), self.scope),
+            (
+                text(
+                    f"INSERT INTO {table} ({column_list}) "
+                    f"SELECT {column_list} FROM {STAGING_TABLE}"
+                ),
+                {},
+            ),
+            autocommit=autocommit,
+        )
+
+    def upsert(self, autocommit=True, delete_human_ids=()):
+        """
+        Insert or update the buffered rows, leaving the scope's other rows as they are.
+
+        Rows are matched on the table's unique constraint over the scope
+        columns and human_id.
+
+        Args:
+            autocommit: As for commit()
+            delete_human_ids: Humans whose rows in the scope are deleted in the
+                same transaction
+
+        Returns:
+            Number of rows written
+        """
+        table = self.model.__tablename__
+        column_list = self._column_list()
+        conflict_columns = self._conflict_columns()
+        updates = ", ".join(
+            f"{column.name} = EXCLUDED.{column.name}"
+            for column in self.columns
+            if column.name not in conflict_columns
+        )
+        statements = []
+        if delete_human_ids:
+            scope_clause = " AND ".join(f"{name} = :{name}" for name in self.scope)
+            statements.append(
+                (
+                    text(
+                        f"DELETE FROM {table} "
+                        f"WHERE {scope_clause} AND human_id = ANY(:human_ids)"
+                    ),
+                    {**self.scope, "human_ids": list(delete_human_ids)},
+                )
+            )
+        return self._load(
+            *statements,
+            (
+                text(
+                    f"INSERT INTO {table} ({column_list}) "
+                    f"SELECT {column_list} FROM {STAGING_TABLE} "
+                    f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {updates}"
+                ),
+                {},
+            ),
+            autocommit=autocommit,
+        )
+
+    def _column_list(self):
+        return ", ".join(column.name for column in self.columns)
+
+    def _conflict_columns(self):
+        """Columns of the unique constraint identifying a human's row in the scope."""
+        for constraint in self.model.__table__.constraints:
+            if not isinstance(constraint, UniqueConstraint):
+                continue
+            names = [column.name for column in constraint.columns]
+            if "human_id" in names and set(self.scope) <= set(names):
+                return names
+        raise ValueError(
+            f"{self.model.__tablename__} has no unique constraint on human_id and "
+            f"{', '.join(self.scope)}"
+        )
+
+    def _load(self, *statements, autocommit=True):
+        """COPY the buffered rows into a staging table, run statements and commit."""
+        names = [column.name for column in self.columns]
+        completed_at = datetime.utcnow()
+
+        started_index = names.index("aggregation_started_at")
+        completed_index = names.index("aggregation_completed_at")
+        buffer = io.StringIO()
+        for values in self.rows:
+            values[started_index] = self.started_at
+            values[completed_index] = completed_at
+            buffer.write("\t".join(_copy_value(value) for value in values))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        try:
+            self.session.execute(
+                text(
+                    f"CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+                    f"SELECT {self._column_list()} FROM {self.model.__tablename__} "
+                    f"WITH NO DATA"
+                )
+            )
+            cursor = self.session.connection().connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {STAGING_TABLE} ({self._column_list()}) FROM STDIN", buffer
+                )
+            finally:
+                cursor.close()
+            for statement, params in statements:
+                self.session.execute(statement, params)
+            if autocommit:
+                self.session.commit()
+            else:
+                # The next writer of this transaction creates its own
+                self.session.execute(text(f"DROP TABLE {STAGING_TABLE}"))
+        except Exception:
+            self.session.rollback()
+            raise
+
+        written = len(self.rows)
+        self.rows = []
+        return written
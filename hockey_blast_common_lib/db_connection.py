@@ -1,14 +1,20 @@
+import importlib.util
+import logging
 import os
 import threading
+import time
+from contextlib import contextmanager
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session as _SessionType
 
 # Load environment variables from .env file in the root directory of THE PROJECT (not this library)
 load_dotenv(override=False)
 
+logger = logging.getLogger(__name__)
+
 # Database connection parameters per organization
 DB_PARAMS = {
     "frontend": {
@@ -45,13 +51,140 @@ DB_PARAMS = {
 }
 
 
+# Connection pool and session settings per kind of client. The Flask frontend
+# serves many short concurrent requests, the MCP server a few slower ones,
+# and batch jobs (aggregators, pipeline scripts) hold one or two
+# connections for long-running statements and bulk writes.
+#   pool_size / max_overflow: Connections kept open / extra ones allowed
+#   pool_recycle: Reconnect connections older than this many seconds
+#   connect_timeout: Seconds to wait for a new connection
+#   statement_timeout: Milliseconds before the server cancels a statement
+#       (0 = no limit, the server's default). Off in every profile; opt in by
+#       setting it here or with DB_STATEMENT_TIMEOUT_MS.
+POOL_PROFILES = {
+    "web": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_recycle": 1800,
+        "connect_timeout": 5,
+        "statement_timeout": 0,
+    },
+    "mcp": {
+        "pool_size": 4,
+        "max_overflow": 4,
+        "pool_recycle": 1800,
+        "connect_timeout": 10,
+        "statement_timeout": 0,
+    },
+    "batch": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_recycle": 3600,
+        "connect_timeout": 30,
+        "statement_timeout": 0,
+    },
+}
+
+# Pool profile of each DB_PARAMS config
+CONFIG_POOL_PROFILES = {
+    "frontend": "web",
+    "frontend-sample-db": "web",
+    "mcp": "mcp",
+    "boss": "batch",
+}
+
+# Read replicas. Read-only sessions (create_read_session(), or
+# use_replica=True) of these configs go to the first usable host of
+# DB_REPLICA_HOSTS_<CONFIG> or DB_REPLICA_HOSTS (comma-separated host[:port]
+# list, empty = no replicas) and fall back to DB_HOST when no replica is
+# reachable or all lag behind the primary by more than
+# REPLICA_MAX_LAG_SECONDS. Other sessions, and every "boss" session, use the
+# primary, so writes (e.g. request logging) never reach a read-only replica.
+REPLICA_CONFIGS = ("frontend", "frontend-sample-db", "mcp")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 30))
+# Seconds a replica's health check result is reused before checking again
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 15))
+
+# Replay lag in seconds: 0 on a primary, the age of the last replayed
+# transaction on a standby (NULL if it has not replayed any). Comparing
+# received and replayed WAL instead would report no lag on a standby whose
+# WAL receiver died. While the primary is idle the age grows too, so reads
+# move to the primary until it commits again, which errs on the safe side.
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+
+# Rows fetched per round trip by stream_session() and stream_rows()
+STREAM_YIELD_PER = 10000
+
+
+def get_pool_profile(config_name):
+    """
+    Pool profile settings of *config_name*. DB_POOL_PROFILE_<CONFIG> (e.g.
+    DB_POOL_PROFILE_BOSS=web) picks another profile, and
+    DB_STATEMENT_TIMEOUT_MS overrides the statement timeout of every
+    profile.
+    """
+    env_name = "DB_POOL_PROFILE_" + config_name.upper().replace("-", "_")
+    profile_name = os.getenv(env_name, CONFIG_POOL_PROFILES.get(config_name, "web"))
+    if profile_name not in POOL_PROFILES:
+        raise ValueError(f"Invalid pool profile: {profile_name}")
+    profile = dict(POOL_PROFILES[profile_name])
+    if os.getenv("DB_STATEMENT_TIMEOUT_MS"):
+        profile["statement_timeout"] = int(os.getenv("DB_STATEMENT_TIMEOUT_MS"))
+    return profile
+
+
 def get_db_params(config_name):
     if config_name not in DB_PARAMS:
         raise ValueError(f"Invalid organization: {config_name}")
     return DB_PARAMS[config_name]
 
 
-# Cached engines + sessionmakers, keyed by config_name. Long-running
+def get_replica_hosts(config_name):
+    """
+    (host, port) of each read replica of *config_name*, in order of
+    preference. Empty for configs outside REPLICA_CONFIGS.
+    """
+    if config_name not in REPLICA_CONFIGS:
+        return []
+    env_name = "DB_REPLICA_HOSTS_" + config_name.upper().replace("-", "_")
+    hosts = []
+    for entry in os.getenv(env_name, os.getenv("DB_REPLICA_HOSTS", "")).split(","):
+        host, _, port = entry.strip().partition(":")
+        if host:
+            hosts.append(
+                (host, int(port) if port else get_db_params(config_name)["port"])
+            )
+    return hosts
+
+
+def _get_db_url(config_name, driver="postgresql", replica=None):
+    db_params = get_db_params(config_name)
+    host, port = replica or (db_params["host"], db_params["port"])
+    return (
+        f"{driver}://{db_params['user']}:{db_params['password']}"
+        f"@{host}:{port}/{db_params['dbname']}"
+    )
+
+
+def _engine_key(config_name, replica=None):
+    return (
+        config_name if replica is None else f"{config_name}@{replica[0]}:{replica[1]}"
+    )
+
+
+def _get_application_name(config_name):
+    # Shows up in pg_stat_activity, so slow queries can be traced back to
+    # the service that runs them
+    return os.getenv("DB_APPLICATION_NAME", f"hockey-blast-{config_name}")
+
+
+# Cached engines + sessionmakers, keyed by config_name (or
+# "config_name@host:port" for a replica). Long-running
 # processes (Flask apps, schedulers) call create_session() repeatedly,
 # and previously each call did create_engine() — leaking the engine's
 # connection pool every time. We now build ONE engine per config and
@@ -60,35 +193,121 @@ def get_db_params(config_name):
 _engines: dict[str, Engine] = {}
 _sessionmakers: dict[str, sessionmaker] = {}
 _engine_lock = threading.Lock()
+# Engine key of each replica -> (time.monotonic() of its last health
+# check, whether it was usable)
+_replica_status: dict[str, tuple[float, bool]] = {}
+
 
+def _set_statement_timeout_on_checkout(engine, statement_timeout):
+    """
+    SET statement_timeout (milliseconds) on every connection checked out of
+    *engine*'s pool. Unlike a libpq "-c statement_timeout" startup option,
+    which PgBouncer in transaction pooling mode rejects, the SET opens the
+    transaction that the session's statements then run in.
+    """
 
-def _get_engine(config_name: str) -> Engine:
-    """Return a cached engine for *config_name*, building it on first call."""
-    if config_name in _engines:
-        return _engines[config_name]
+    @event.listens_for(engine, "checkout")
+    def set_statement_timeout(dbapi_connection, connection_record, connection_proxy):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SET statement_timeout = {int(statement_timeout)}")
+        finally:
+            cursor.close()
+
+
+def _get_engine(config_name: str, replica=None) -> Engine:
+    """Return a cached engine for *config_name* (on the *replica* (host,
+    port) if given), building it on first call."""
+    key = _engine_key(config_name, replica)
+    if key in _engines:
+        return _engines[key]
     with _engine_lock:
-        if config_name in _engines:  # another thread built it while we waited
-            return _engines[config_name]
-        db_params = get_db_params(config_name)
-        db_url = (
-            f"postgresql://{db_params['user']}:{db_params['password']}"
-            f"@{db_params['host']}:{db_params['port']}/{db_params['dbname']}"
-        )
+        if key in _engines:  # another thread built it while we waited
+            return _engines[key]
+        db_url = _get_db_url(config_name, replica=replica)
+        profile = get_pool_profile(config_name)
+        connect_args = {
+            "connect_timeout": profile["connect_timeout"],
+            "application_name": _get_application_name(config_name),
+        }
         # pool_pre_ping=True transparently retries a stale connection (e.g.
         # after a DB restart) instead of raising — long-running services
         # otherwise wedge on the first reused connection after an outage.
-        engine = create_engine(db_url, pool_pre_ping=True)
-        _engines[config_name] = engine
-        _sessionmakers[config_name] = sessionmaker(bind=engine)
+        engine = create_engine(
+            db_url,
+            pool_pre_ping=True,
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_recycle=profile["pool_recycle"],
+            connect_args=connect_args,
+            # Batches executemany() INSERTs and UPDATEs into multi-row statements
+            executemany_mode="values_plus_batch",
+        )
+        if profile["statement_timeout"]:
+            _set_statement_timeout_on_checkout(engine, profile["statement_timeout"])
+        _engines[key] = engine
+        _sessionmakers[key] = sessionmaker(bind=engine)
         return engine
 
 
-def create_session(config_name) -> _SessionType:
+def _cached_replica_status(key):
+    """Whether the replica of engine *key* was usable at its last health
+    check, or None if it is due for a new one."""
+    status = _replica_status.get(key)
+    if status is not None and time.monotonic() - status[0] < REPLICA_CHECK_INTERVAL:
+        return status[1]
+    return None
+
+
+def _record_replica_status(key, lag, error=None) -> bool:
+    """Record the health check of the replica of engine *key*: usable if it
+    answered (no *error*) and lags at most REPLICA_MAX_LAG_SECONDS."""
+    if error is not None:
+        logger.warning(f"Skipping unavailable replica {key}: {error}")
+        usable = False
+    else:
+        usable = lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+        if not usable:
+            logger.warning(f"Skipping replica {key} lagging by {lag}s")
+    _replica_status[key] = (time.monotonic(), usable)
+    return usable
+
+
+def _replica_is_usable(config_name, replica) -> bool:
+    """Whether *replica* answers and lags at most REPLICA_MAX_LAG_SECONDS,
+    checked at most once per REPLICA_CHECK_INTERVAL."""
+    key = _engine_key(config_name, replica)
+    usable = _cached_replica_status(key)
+    if usable is not None:
+        return usable
+    try:
+        with _get_engine(config_name, replica).connect() as connection:
+            lag = connection.execute(_REPLICA_LAG_SQL).scalar()
+    except Exception as e:
+        return _record_replica_status(key, None, e)
+    return _record_replica_status(key, lag)
+
+
+def get_read_replica(config_name):
+    """
+    (host, port) of the first usable replica of *config_name*, or None to
+    read from the primary.
+    """
+    for replica in get_replica_hosts(config_name):
+        if _replica_is_usable(config_name, replica):
+            return replica
+    return None
+
+
+def create_session(config_name, use_replica=False) -> _SessionType:
     """
     Create a database session using the specified configuration.
 
     Args:
         config_name: One of "frontend", "frontend-sample-db", "mcp", "boss"
+        use_replica: Read from a replica of *config_name* if one is
+            configured and usable. Only for sessions that never write
+            (replicas are read-only) and tolerate replication lag.
 
     Returns:
         SQLAlchemy session object backed by the cached engine for
@@ -96,19 +315,194 @@ def create_session(config_name) -> _SessionType:
         done (or use it as a context manager); the underlying TCP
         connection is returned to the pool, not destroyed.
     """
-    _get_engine(config_name)  # ensures _sessionmakers[config_name] exists
-    return _sessionmakers[config_name]()
+    replica = get_read_replica(config_name) if use_replica else None
+    _get_engine(config_name, replica)  # ensures the sessionmaker exists
+    return _sessionmakers[_engine_key(config_name, replica)]()
+
+
+def create_read_session(config_name) -> _SessionType:
+    """
+    Create a read-only session on a replica of *config_name* when one is
+    usable (see create_session()), on the primary otherwise.
+    """
+    return create_session(config_name, use_replica=True)
+
+
+@contextmanager
+def stream_session(config_name, yield_per=STREAM_YIELD_PER):
+    """
+    Session whose SELECTs read their rows through server-side cursors,
+    *yield_per* rows per round trip, instead of buffering the whole result
+    set in the client. Iterate results rather than calling .all() on them.
+
+    Usage:
+        with stream_session("boss") as session:
+            for row in session.execute(select(GameRoster)):
+                ...
+    """
+    session = create_session(config_name)
+    try:
+        session.connection(
+            execution_options={"stream_results": True, "yield_per": yield_per}
+        )
+        yield session
+    finally:
+        session.close()
+
+
+def stream_rows(session, statement, params=None, yield_per=STREAM_YIELD_PER):
+    """
+    Execute *statement* on *session* through a server-side cursor and yield
+    its rows, fetching *yield_per* at a time.
+    """
+    result = session.execute(
+        statement,
+        params,
+        execution_options={"stream_results": True, "yield_per": yield_per},
+    )
+    try:
+        yield from result
+    finally:
+        result.close()
 
 
-def dispose_engines() -> None:
+def dispose_engines(close: bool = True) -> None:
     """Release every cached engine's connection pool. For test teardown
     and graceful shutdown only — production code should let engines
-    live for the process lifetime."""
+    live for the process lifetime.
+
+    Pass close=False in a freshly forked child process: the inherited
+    pool is dropped without closing the parent's connections, and the
+    next create_session() builds a new engine owned by the child."""
     with _engine_lock:
         for engine in _engines.values():
-            engine.dispose()
+            engine.dispose(close=close)
         _engines.clear()
         _sessionmakers.clear()
+        _replica_status.clear()
+
+
+# Async engines + sessionmakers for readers that run several queries
+# concurrently (MCP tools, async frontend views), cached per config_name
+# like _engines. They need the optional asyncpg driver
+# (pip install hockey-blast-common-lib[async]), imported on first use only.
+_async_engines: dict = {}
+_async_sessionmakers: dict = {}
+
+
+def _get_async_engine(config_name: str, replica=None):
+    """Return a cached AsyncEngine for *config_name* (on the *replica*
+    (host, port) if given), building it on first call."""
+    key = _engine_key(config_name, replica)
+    if key in _async_engines:
+        return _async_engines[key]
+    with _engine_lock:
+        if key in _async_engines:  # another thread built it while we waited
+            return _async_engines[key]
+        # SQLAlchemy imports the driver itself; only check that it is installed
+        if importlib.util.find_spec("asyncpg") is None:
+            raise ImportError(
+                "Async sessions need asyncpg: pip install hockey-blast-common-lib[async]"
+            )
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        profile = get_pool_profile(config_name)
+        engine = create_async_engine(
+            _get_db_url(config_name, "postgresql+asyncpg", replica),
+            pool_pre_ping=True,
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_recycle=profile["pool_recycle"],
+            connect_args={
+                "timeout": profile["connect_timeout"],
+                "server_settings": {
+                    "application_name": _get_application_name(config_name)
+                },
+            },
+        )
+        if profile["statement_timeout"]:
+            _set_statement_timeout_on_checkout(
+                engine.sync_engine, profile["statement_timeout"]
+            )
+        _async_engines[key] = engine
+        # Loaded attributes stay readable after commit, as there is no
+        # implicit lazy loading in async code
+        _async_sessionmakers[key] = async_sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        return engine
+
+
+def create_async_session(config_name):
+    """
+    Create an asyncio database session using the specified configuration.
+
+    Each session holds its own connection, so independent reads can run
+    concurrently with one session per task:
+
+        async def read(statement):
+            async with create_async_session("mcp") as session:
+                return (await session.execute(statement)).all()
+
+        skaters, goalies = await asyncio.gather(read(q1), read(q2))
+
+    Args:
+        config_name: One of "frontend", "frontend-sample-db", "mcp", "boss"
+
+    Returns:
+        SQLAlchemy AsyncSession backed by the cached async engine for
+        *config_name*. Use it as an async context manager or await
+        .close() when done.
+    """
+    _get_async_engine(config_name)  # ensures _async_sessionmakers[config_name] exists
+    return _async_sessionmakers[config_name]()
+
+
+async def _async_replica_is_usable(config_name, replica) -> bool:
+    """_replica_is_usable() through the async engine, so that the health
+    check does not block the event loop."""
+    key = _engine_key(config_name, replica)
+    usable = _cached_replica_status(key)
+    if usable is not None:
+        return usable
+    try:
+        async with _get_async_engine(config_name, replica).connect() as connection:
+            lag = (await connection.execute(_REPLICA_LAG_SQL)).scalar()
+    except Exception as e:
+        return _record_replica_status(key, None, e)
+    return _record_replica_status(key, lag)
+
+
+async def get_async_read_replica(config_name):
+    """get_read_replica() for asyncio code."""
+    for replica in get_replica_hosts(config_name):
+        if await _async_replica_is_usable(config_name, replica):
+            return replica
+    return None
+
+
+async def create_async_read_session(config_name):
+    """
+    Create a read-only asyncio session on a replica of *config_name* when one
+    is usable, on the primary otherwise (see create_read_session()):
+
+        async with await create_async_read_session("mcp") as session:
+            ...
+    """
+    replica = await get_async_read_replica(config_name)
+    _get_async_engine(config_name, replica)  # ensures the sessionmaker exists
+    return _async_sessionmakers[_engine_key(config_name, replica)]()
+
+
+async def dispose_async_engines(close: bool = True) -> None:
+    """Release every cached async engine's connection pool, like
+    dispose_engines() does for the synchronous ones."""
+    with _engine_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+        _async_sessionmakers.clear()
+    for engine in engines:
+        await engine.dispose(close=close)
 
 
 # Convenience functions for standardized session creation
@@ -128,6 +522,22 @@ def create_session_mcp():
     return create_session("mcp")
 
 
+def create_async_session_frontend():
+    """
+    Create read-only asyncio session for the frontend web application.
+    Uses frontend_user with limited permissions.
+    """
+    return create_async_session("frontend")
+
+
+def create_async_session_mcp():
+    """
+    Create read-only asyncio session for MCP server.
+    Uses frontend_user with limited permissions (same as frontend).
+    """
+    return create_async_session("mcp")
+
+
 def create_session_frontend_sampledb():
     """
     Create read-only session for frontend sample database.
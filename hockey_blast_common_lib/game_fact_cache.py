@@ -0,0 +1,940 @@
+"""
+In-memory columnar cache of the game facts read by the stats aggregators.
+
+The skater, goalie, referee and human aggregators run the same handful of
+queries for every org, division and level scope and every time window, and
+the team skater and goalie aggregators for every team of every scope,
+rescanning games, rosters, goals and penalties thousands of times per
+nightly run. GameFactCache loads those tables once into NumPy arrays; each
+scope then becomes a boolean mask over the games plus in-memory group-bys.
+The scorekeeper stats (one All Orgs scope over scorekeeper_save_quality) and
+the division standings (one narrow games query per division) do not rescan
+these tables and keep querying the database.
+
+The results reproduce the aggregators' SQL exactly (including which game
+statuses count and the Division join), so a cached run writes the same stats
+as an uncached one. Games are kept in chronological order (date, time, id),
+which makes a game's array position its chronological ordinal and turns the
+first/last game lookups into min/max operations.
+
+The cache is a snapshot meant for batch aggregation over a database that is
+not being written to at the same time. Process pools do not rely on workers
+inheriting it (macOS starts them with spawn): the driver saves the arrays to a
+directory once and every worker memory-maps them, see
+parallel_utils.run_division_aggregations().
+"""
+
+import os
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+from sqlalchemy import text
+
+from hockey_blast_common_lib.game_status import (
+    FINAL_STATUS_IDS,
+    PARTICIPATED_STATUS_IDS,
+    StatusId,
+)
+from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+
+# Stand-in for NULL in the integer columns. Database ids are positive, so it
+# never matches a real human, team or game.
+MISSING_ID = -1
+MISSING_DATETIME = np.iinfo(np.int64).min
+
+ROLE_SKATER = 0
+ROLE_GOALIE = 1
+# NULL roster role: neither role.ilike("g") nor ~role.ilike("g") is true in SQL
+ROLE_UNKNOWN = 2
+
+EPOCH = datetime(1970, 1, 1)
+
+# Per-process cache, see get_game_fact_cache()
+_process_cache = None
+
+# Attributes of GameFactCache holding a dict of column name -> array
+FACT_TABLES = ("games", "rosters", "goals", "penalties", "goalie_saves")
+
+
+def _to_epoch(value):
+    return int((value - EPOCH).total_seconds())
+
+
+def _to_date(epoch):
+    return (EPOCH + timedelta(seconds=int(epoch))).date()
+
+
+def _fetch_columns(session, sql, dtypes, chunk_size=200000):
+    """Run an all-integer query and return its columns as NumPy arrays.
+
+    Rows are read chunk_size at a time through a server-side cursor, so only
+    the arrays (not the whole result set) are held in memory.
+    """
+    result = session.execute(
+        text(sql),
+        execution_options={"stream_results": True, "max_row_buffer": chunk_size},
+    )
+    chunks = []
+    while True:
+        rows = result.fetchmany(chunk_size)
+        if not rows:
+            break
+        values = np.fromiter(
+            chain.from_iterable(rows), dtype=np.int64, count=len(rows) * len(dtypes)
+        )
+        chunks.append(values.reshape(len(rows), len(dtypes)))
+    data = (
+        np.concatenate(chunks) if chunks else np.empty((0, len(dtypes)), dtype=np.int64)
+    )
+    return [data[:, i].astype(dtype) for i, dtype in enumerate(dtypes)]
+
+
+def _group_count(keys, weights=None):
+    """Return (sorted unique keys, number of rows or sum of weights per key)."""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+    if weights is None or np.issubdtype(weights.dtype, np.integer):
+        totals = totals.astype(np.int64)
+    return unique_keys, totals
+
+
+def _group_bounds(humans, game_indexes):
+    """Return {human_id: (earliest game index, latest game index)}."""
+    if len(humans) == 0:
+        return {}
+    order = np.lexsort((game_indexes, humans))
+    humans, game_indexes = humans[order], game_indexes[order]
+    starts = np.flatnonzero(np.r_[True, humans[1:] != humans[:-1]])
+    ends = np.r_[starts[1:], len(humans)] - 1
+    return dict(
+        zip(
+            humans[starts].tolist(),
+            zip(game_indexes[starts].tolist(), game_indexes[ends].tolist()),
+        )
+    )
+
+
+def _pack(game_indexes, human_ids):
+    """Combine (game index, human id) pairs into single int64 keys."""
+    return (game_indexes.astype(np.int64) << 32) | human_ids.astype(np.int64)
+
+
+class GameFactCache:
+    """
+    Games, rosters, goals, penalties and goalie saves as NumPy arrays.
+
+    Every fact table references games by their index in self.games (the
+    chronological ordinal) rather than by game id.
+    """
+
+    def __init__(self, games, rosters, goals, penalties, goalie_saves):
+        self.games = games
+        self.rosters = rosters
+        self.goals = goals
+        self.penalties = penalties
+        self.goalie_saves = goalie_saves
+        self.num_games = len(games["id"])
+        self._id_order = np.argsort(games["id"], kind="stable")
+        self._sorted_ids = games["id"][self._id_order]
+        self._participated = np.isin(games["status_id"], list(PARTICIPATED_STATUS_IDS))
+
+    @classmethod
+    def load(cls, session):
+        """Read all game facts from the database into a new cache."""
+        game_columns = {
+            "id": np.int32,
+            "org_id": np.int32,
+            "division_id": np.int32,
+            "level_id": np.int32,
+            "has_division": np.bool_,
+            "status_id": np.int16,
+            "datetime": np.int64,
+            "home_final_score": np.int32,
+            "visitor_final_score": np.int32,
+            "went_to_ot": np.bool_,
+            "home_goalie_id": np.int32,
+            "visitor_goalie_id": np.int32,
+            "referee_1_id": np.int32,
+            "referee_2_id": np.int32,
+            "scorekeeper_id": np.int32,
+        }
+        # The datetime column matches the aggregators'
+        # cast(concat(date, ' ', time) as timestamp), where a NULL time reads
+        # as midnight.
+        game_arrays = _fetch_columns(
+            session,
+            f"""
+            SELECT g.id, g.org_id,
+                   COALESCE(g.division_id, {MISSING_ID}),
+                   COALESCE(d.level_id, {MISSING_ID}),
+                   (d.id IS NOT NULL)::int,
+                   g.status_id,
+                   COALESCE(
+                       EXTRACT(EPOCH FROM g.date + COALESCE(g.time, '00:00'::time))::bigint,
+                       {MISSING_DATETIME}
+                   ),
+                   COALESCE(g.home_final_score, {MISSING_ID}),
+                   COALESCE(g.visitor_final_score, {MISSING_ID}),
+                   COALESCE(g.went_to_ot, false)::int,
+                   COALESCE(g.home_goalie_id, {MISSING_ID}),
+                   COALESCE(g.visitor_goalie_id, {MISSING_ID}),
+                   COALESCE(g.referee_1_id, {MISSING_ID}),
+                   COALESCE(g.referee_2_id, {MISSING_ID}),
+                   COALESCE(g.scorekeeper_id, {MISSING_ID})
+            FROM games g
+            LEFT JOIN divisions d ON d.id = g.division_id
+            ORDER BY g.date, g.time, g.id
+            """,
+            list(game_columns.values()),
+        )
+        games = dict(zip(game_columns, game_arrays))
+        cache = cls(games, {}, {}, {}, {})
+
+        game_ids, human_ids, roles, team_ids = _fetch_columns(
+            session,
+            f"""
+            SELECT game_id, human_id,
+                   CASE WHEN role IS NULL THEN {ROLE_UNKNOWN}
+                        WHEN role ILIKE 'g' THEN {ROLE_GOALIE}
+                        ELSE {ROLE_SKATER} END,
+                   COALESCE(team_id, {MISSING_ID})
+            FROM game_rosters
+            WHERE game_id IS NOT NULL AND human_id IS NOT NULL
+            """,
+            [np.int32, np.int32, np.int8, np.int32],
+        )
+        cache.rosters = {
+            "game": cache.game_indexes(game_ids),
+            "human_id": human_ids,
+            "role": roles,
+            "team_id": team_ids,
+        }
+
+        game_ids, scorers, assists_1, assists_2 = _fetch_columns(
+            session,
+            f"""
+            SELECT game_id, COALESCE(goal_scorer_id, {MISSING_ID}),
+                   COALESCE(assist_1_id, {MISSING_ID}),
+                   COALESCE(assist_2_id, {MISSING_ID})
+            FROM goals
+            WHERE game_id IS NOT NULL
+            """,
+            [np.int32] * 4,
+        )
+        cache.goals = {
+            "game": cache.game_indexes(game_ids),
+            "scorer_id": scorers,
+            "assist_1_id": assists_1,
+            "assist_2_id": assists_2,
+        }
+
+        # The skater aggregator counts penalty_minutes == 'GM' while the
+        # referee aggregator compares lower(penalty_minutes) == 'gm'
+        game_ids, penalized, is_gm, is_gm_any_case = _fetch_columns(
+            session,
+            f"""
+            SELECT game_id, COALESCE(penalized_player_id, {MISSING_ID}),
+                   (penalty_minutes IS NOT DISTINCT FROM 'GM')::int,
+                   (lower(penalty_minutes) IS NOT DISTINCT FROM 'gm')::int
+            FROM penalties
+            WHERE game_id IS NOT NULL
+            """,
+            [np.int32, np.int32, np.bool_, np.bool_],
+        )
+        cache.penalties = {
+            "game": cache.game_indexes(game_ids),
+            "human_id": penalized,
+            "is_gm": is_gm,
+            "is_gm_any_case": is_gm_any_case,
+        }
+
+        game_ids, goalie_ids, goals_allowed, shots_against = _fetch_columns(
+            session,
+            "SELECT game_id, goalie_id, goals_allowed, shots_against FROM goalie_saves",
+            [np.int32] * 4,
+        )
+        cache.goalie_saves = {
+            "game": cache.game_indexes(game_ids),
+            "goalie_id": goalie_ids,
+            "goals_allowed": goals_allowed,
+            "shots_against": shots_against,
+        }
+        return cache
+
+    def save(self, directory):
+        """Write every fact column to directory as <table>.<column>.npy."""
+        for table in FACT_TABLES:
+            for column, values in getattr(self, table).items():
+                np.save(os.path.join(directory, f"{table}.{column}.npy"), values)
+
+    @classmethod
+    def open(cls, directory):
+        """
+        Cache over the columns written by save(). The files are memory-mapped
+        read-only, so processes opening the same directory share their pages.
+        """
+        tables = {table: {} for table in FACT_TABLES}
+        for file_name in os.listdir(directory):
+            table, column, _ = file_name.split(".")
+            tables[table][column] = np.load(
+                os.path.join(directory, file_name), mmap_mode="r"
+            )
+        return cls(**tables)
+
+    def game_indexes(self, game_ids):
+        """Map game ids to chronological indexes (-1 for unknown games)."""
+        game_ids = np.asarray(game_ids, dtype=np.int64)
+        if self.num_games == 0:
+            return np.full(len(game_ids), -1, dtype=np.int32)
+        positions = np.searchsorted(self._sorted_ids, game_ids)
+        positions = np.minimum(positions, self.num_games - 1)
+        found = self._sorted_ids[positions] == game_ids
+        return np.where(found, self._id_order[positions], -1).astype(np.int32)
+
+    def game_id(self, game_index):
+        return int(self.games["id"][game_index])
+
+    def first_last_game_ids(self, game_ids):
+        """Return (earliest, latest) of the given game ids, or (None, None)."""
+        indexes = self.game_indexes([g for g in game_ids if g is not None])
+        indexes = indexes[indexes >= 0]
+        if len(indexes) == 0:
+            return None, None
+        return self.game_id(indexes.min()), self.game_id(indexes.max())
+
+    def scope_mask(self, aggregation_type, aggregation_id, since=None):
+        """
+        Boolean mask over the games of an org, division or level scope.
+
+        Args:
+            aggregation_type: "org", "division" or "level"
+            aggregation_id: Org (or ALL_ORGS_ID), division or level id
+            since: Optional datetime; only games starting at or after it
+        """
+        games = self.games
+        if aggregation_type == "org":
+            if aggregation_id == ALL_ORGS_ID:
+                mask = np.ones(self.num_games, dtype=bool)
+            else:
+                mask = games["org_id"] == aggregation_id
+        elif aggregation_type == "division":
+            mask = games["division_id"] == aggregation_id
+        elif aggregation_type == "level":
+            mask = games["level_id"] == aggregation_id
+        else:
+            raise ValueError("Invalid aggregation type")
+        if since is not None:
+            mask &= games["datetime"] >= _to_epoch(since)
+        return mask
+
+    def last_game_datetime_str(self, mask, status_ids):
+        """
+        Start of the latest masked game with one of status_ids, formatted
+        like the aggregators' max(concat(Game.date, ' ', Game.time)).
+        """
+        datetimes = self.games["datetime"][
+            mask & np.isin(self.games["status_id"], list(status_ids))
+        ]
+        datetimes = datetimes[datetimes != MISSING_DATETIME]
+        if len(datetimes) == 0:
+            return None
+        last_game = EPOCH + timedelta(seconds=int(datetimes.max()))
+        return last_game.strftime("%Y-%m-%d %H:%M:%S")
+
+    def window_mask(self, mask, start_datetime, last_game_datetime_str):
+        """Restrict mask to games between start_datetime and the last game."""
+        end_datetime = datetime.strptime(last_game_datetime_str, "%Y-%m-%d %H:%M:%S")
+        datetimes = self.games["datetime"]
+        return (
+            mask
+            & (datetimes >= _to_epoch(start_datetime))
+            & (datetimes <= _to_epoch(end_datetime))
+        )
+
+    def skater_human_ids(self, mask):
+        """Humans on a participated game's roster in a non-goalie role."""
+        rosters = self.rosters
+        rows = (rosters["game"] >= 0) & (rosters["role"] == ROLE_SKATER)
+        rows[rows] = (mask & self._participated)[rosters["game"][rows]]
+        return set(np.unique(rosters["human_id"][rows]).tolist())
+
+    def view(self, mask):
+        """Group-bys over the masked games that belong to an existing division."""
+        return GameFactView(self, mask & self.games["has_division"])
+
+    def team_view(self, aggregation_type, aggregation_id):
+        """
+        Group-bys over every game of an org or division, which the team
+        aggregators select without joining divisions.
+        """
+        return GameFactView(self, self.scope_mask(aggregation_type, aggregation_id))
+
+
+class GameFactView:
+    """Per-human counters over one aggregation scope of a GameFactCache."""
+
+    def __init__(self, cache, game_mask):
+        self.cache = cache
+        self.game_mask = game_mask
+        self.participated_mask = game_mask & cache._participated
+
+    def _rows_in(self, game_indexes, game_mask):
+        rows = game_indexes >= 0
+        rows[rows] = game_mask[game_indexes[rows]]
+        return rows
+
+    def _roster_rows(self, role, game_mask):
+        rosters = self.cache.rosters
+        rows = self._rows_in(rosters["game"], game_mask) & (rosters["role"] == role)
+        return rosters["game"][rows], rosters["human_id"][rows]
+
+    def _bounds_to_ids(self, bounds):
+        game_ids = self.cache.games["id"]
+        return {
+            human_id: (int(game_ids[first]), int(game_ids[last]))
+            for human_id, (first, last) in bounds.items()
+        }
+
+    def _roster_weighted_counts(
+        self, roster_keys, event_games, event_humans, extra=None
+    ):
+        """
+        Count events per human as if each event were joined to game_rosters on
+        (game_id, human_id): an event counts once per matching roster row.
+        """
+        rows = self._rows_in(event_games, self.game_mask)
+        if extra is not None:
+            rows &= extra
+        event_games, event_humans = event_games[rows], event_humans[rows]
+        keys, roster_counts = np.unique(roster_keys, return_counts=True)
+        if len(keys) == 0 or len(event_games) == 0:
+            return {}
+        event_keys = _pack(event_games, event_humans)
+        positions = np.minimum(np.searchsorted(keys, event_keys), len(keys) - 1)
+        weights = np.where(keys[positions] == event_keys, roster_counts[positions], 0)
+        humans, totals = _group_count(event_humans, weights.astype(np.int64))
+        return {h: t for h, t in zip(humans.tolist(), totals.tolist()) if t}
+
+    def skater_stats(self):
+        """
+        Skater counters as computed by aggregate_skater_stats.
+
+        games_played counts non-goalie roster rows in participated games;
+        goals, assists and penalties count events in every game of the scope
+        in which the human is rostered as a non-goalie.
+
+        Returns:
+            Dict human_id -> {"games_played", "goals", "assists", "penalties",
+            "gm_penalties", "first_game_id", "last_game_id"}
+        """
+        played_games, played_humans = self._roster_rows(
+            ROLE_SKATER, self.participated_mask
+        )
+        humans, games_played = _group_count(played_humans)
+        first_last = self._bounds_to_ids(_group_bounds(played_humans, played_games))
+
+        roster_games, roster_humans = self._roster_rows(ROLE_SKATER, self.game_mask)
+        roster_keys = _pack(roster_games, roster_humans)
+        goals, penalties = self.cache.goals, self.cache.penalties
+        goal_counts = self._roster_weighted_counts(
+            roster_keys, goals["game"], goals["scorer_id"]
+        )
+        assist_counts = self._roster_weighted_counts(
+            roster_keys, goals["game"], goals["assist_1_id"]
+        )
+        for human_id, count in self._roster_weighted_counts(
+            roster_keys, goals["game"], goals["assist_2_id"]
+        ).items():
+            assist_counts[human_id] = assist_counts.get(human_id, 0) + count
+        penalty_counts = self._roster_weighted_counts(
+            roster_keys, penalties["game"], penalties["human_id"]
+        )
+        gm_counts = self._roster_weighted_counts(
+            roster_keys, penalties["game"], penalties["human_id"], penalties["is_gm"]
+        )
+
+        stats = {}
+        for human_id, count in zip(humans.tolist(), games_played.tolist()):
+            stats[human_id] = {
+                "games_played": count,
+                "goals": goal_counts.get(human_id, 0),
+                "assists": assist_counts.get(human_id, 0),
+                "penalties": penalty_counts.get(human_id, 0),
+                "gm_penalties": gm_counts.get(human_id, 0),
+                "first_game_id": first_last[human_id][0],
+                "last_game_id": first_last[human_id][1],
+            }
+        return stats
+
+    def skater_point_streaks(self, human_ids):
+        """
+        Current and longest point streaks, as calculate_point_streaks()
+        computes them: runs of consecutive participated games with at least
+        one goal or assist, newest first; the most recent of equally long
+        runs is the longest.
+
+        Returns:
+            Dict human_id -> same fields as calculate_point_streaks()
+        """
+        streaks = {
+            human_id: {
+                "current_point_streak": 0,
+                "current_point_streak_avg_points": 0.0,
+                "longest_point_streak": 0,
+                "longest_point_streak_avg_points": 0.0,
+                "longest_point_streak_start_date": None,
+                "longest_point_streak_end_date": None,
+            }
+            for human_id in human_ids
+        }
+        roster_games, roster_humans = self._roster_rows(
+            ROLE_SKATER, self.participated_mask
+        )
+        wanted = np.isin(roster_humans, list(streaks))
+        roster_keys, roster_counts = np.unique(
+            _pack(roster_games[wanted], roster_humans[wanted]), return_counts=True
+        )
+        if len(roster_keys) == 0:
+            return streaks
+
+        # Points per (game, human): goal rows where the human scored or
+        # assisted, multiplied by the human's roster rows in that game
+        goals = self.cache.goals
+        rows = self._rows_in(goals["game"], self.participated_mask)
+        goal_games = goals["game"][rows]
+        assists_1, assists_2 = goals["assist_1_id"][rows], goals["assist_2_id"][rows]
+        point_keys = np.concatenate(
+            [
+                _pack(goal_games, goals["scorer_id"][rows]),
+                _pack(goal_games, assists_1),
+                # A goal counts once as an assist even if both assists match
+                _pack(
+                    goal_games[assists_2 != assists_1],
+                    assists_2[assists_2 != assists_1],
+                ),
+            ]
+        )
+        points = np.zeros(len(roster_keys), dtype=np.int64)
+        if len(point_keys):
+            point_keys, point_counts = np.unique(point_keys, return_counts=True)
+            positions = np.minimum(
+                np.searchsorted(point_keys, roster_keys), len(point_keys) - 1
+            )
+            matched = point_keys[positions] == roster_keys
+            points[matched] = point_counts[positions[matched]]
+        points *= roster_counts
+
+        # Newest game first within each human
+        humans = roster_keys & 0xFFFFFFFF
+        games = roster_keys >> 32
+        order = np.lexsort((-games, humans))
+        humans, games, points = humans[order], games[order], points[order]
+        human_starts = np.r_[True, humans[1:] != humans[:-1]]
+
+        # Runs of scoring games: first (newest) game, length and points
+        scored = points > 0
+        run_starts = scored & (human_starts | np.r_[True, ~scored[:-1]])
+        if not run_starts.any():
+            return streaks
+        run_ids = np.cumsum(run_starts)[scored] - 1
+        first = np.flatnonzero(run_starts)
+        lengths = np.bincount(run_ids)
+        totals = np.bincount(run_ids, weights=points[scored]).astype(np.int64)
+        run_humans = humans[first]
+
+        for run in np.flatnonzero(human_starts[first]).tolist():
+            streak = streaks[int(run_humans[run])]
+            streak["current_point_streak"] = int(lengths[run])
+            streak["current_point_streak_avg_points"] = float(
+                totals[run] / lengths[run]
+            )
+
+        # Longest run per human; the newest (smallest first) among equals
+        longest = np.lexsort((first, -lengths, run_humans))
+        longest_humans = run_humans[longest]
+        longest = longest[np.r_[True, longest_humans[1:] != longest_humans[:-1]]]
+        datetimes = self.cache.games["datetime"]
+        for run in longest.tolist():
+            streak = streaks[int(run_humans[run])]
+            length = int(lengths[run])
+            streak["longest_point_streak"] = length
+            streak["longest_point_streak_avg_points"] = float(totals[run] / length)
+            streak["longest_point_streak_start_date"] = _to_date(
+                datetimes[games[first[run] + length - 1]]
+            )
+            streak["longest_point_streak_end_date"] = _to_date(
+                datetimes[games[first[run]]]
+            )
+        return streaks
+
+    def goalie_stats(self, goalie_id=None):
+        """
+        Goalie counters as computed by aggregate_goalie_stats, from goalie
+        saves in participated games.
+
+        Args:
+            goalie_id: Optional goalie to restrict the result to
+
+        Returns:
+            Dict human_id -> {"games_played", "goals_allowed", "shots_faced",
+            "wins", "losses", "ot_losses", "ties", "shutouts",
+            "first_game_id", "last_game_id"}
+        """
+        saves, games = self.cache.goalie_saves, self.cache.games
+        rows = self._rows_in(saves["game"], self.participated_mask)
+        if goalie_id is not None:
+            rows &= saves["goalie_id"] == goalie_id
+        game_indexes = saves["game"][rows]
+        goalie_ids = saves["goalie_id"][rows]
+        goals_allowed = saves["goals_allowed"][rows].astype(np.int64)
+
+        humans, games_played = _group_count(goalie_ids)
+        _, goals_allowed_totals = _group_count(goalie_ids, goals_allowed)
+        _, shots_totals = _group_count(
+            goalie_ids, saves["shots_against"][rows].astype(np.int64)
+        )
+        first_last = self._bounds_to_ids(_group_bounds(goalie_ids, game_indexes))
+
+        # A decision needs both final scores and the goalie on either side
+        home_score = games["home_final_score"][game_indexes]
+        visitor_score = games["visitor_final_score"][game_indexes]
+        is_home = goalie_ids == games["home_goalie_id"][game_indexes]
+        is_visitor = goalie_ids == games["visitor_goalie_id"][game_indexes]
+        decided = (
+            (home_score != MISSING_ID)
+            & (visitor_score != MISSING_ID)
+            & (is_home | is_visitor)
+        )
+        my_score = np.where(is_home, home_score, visitor_score)
+        opponent_score = np.where(is_home, visitor_score, home_score)
+        is_ot = games["went_to_ot"][game_indexes] | np.isin(
+            games["status_id"][game_indexes], [StatusId.FINAL_OT, StatusId.FINAL_SO]
+        )
+        outcomes = {
+            "wins": decided & (my_score > opponent_score),
+            "losses": decided & (my_score < opponent_score) & ~is_ot,
+            "ot_losses": decided & (my_score < opponent_score) & is_ot,
+            "ties": decided & (my_score == opponent_score),
+            "shutouts": decided & (goals_allowed == 0),
+        }
+        outcome_counts = {}
+        for outcome, flags in outcomes.items():
+            outcome_humans, counts = _group_count(goalie_ids[flags])
+            outcome_counts[outcome] = dict(
+                zip(outcome_humans.tolist(), counts.tolist())
+            )
+
+        stats = {}
+        for human_id, count, allowed, shots in zip(
+            humans.tolist(),
+            games_played.tolist(),
+            goals_allowed_totals.tolist(),
+            shots_totals.tolist(),
+        ):
+            stats[human_id] = {
+                "games_played": count,
+                "goals_allowed": allowed,
+                "shots_faced": shots,
+                "first_game_id": first_last[human_id][0],
+                "last_game_id": first_last[human_id][1],
+            }
+            for outcome in outcomes:
+                stats[human_id][outcome] = outcome_counts[outcome].get(human_id, 0)
+        return stats
+
+    def referee_stats(self):
+        """
+        Referee counters as computed by aggregate_referee_stats.
+
+        Games reffed come from participated games. Penalties are counted in
+        every game of the scope regardless of status and each of the game's
+        two referees is credited with half of them; those games also count
+        towards the referee's first and last game.
+
+        Returns:
+            Dict human_id -> {"games_reffed", "penalties_given", "gm_given",
+            "first_game_id", "last_game_id"}
+        """
+        games, penalties = self.cache.games, self.cache.penalties
+        reffed_games = np.flatnonzero(self.participated_mask)
+        rows = self._rows_in(penalties["game"], self.game_mask)
+        penalty_games, penalty_counts = _group_count(penalties["game"][rows])
+        _, gm_counts = _group_count(
+            penalties["game"][rows], penalties["is_gm_any_case"][rows].astype(np.int64)
+        )
+
+        stats = {}
+        bound_humans, bound_games = [], []
+        for column in ("referee_1_id", "referee_2_id"):
+            referees = games[column][reffed_games]
+            known = referees != MISSING_ID
+            humans, counts = _group_count(referees[known])
+            for human_id, count in zip(humans.tolist(), counts.tolist()):
+                stat = stats.setdefault(
+                    human_id, {"games_reffed": 0, "penalties_given": 0, "gm_given": 0}
+                )
+                stat["games_reffed"] += count
+            bound_humans.append(referees[known])
+            bound_games.append(reffed_games[known])
+
+        for column in ("referee_1_id", "referee_2_id"):
+            referees = games[column][penalty_games]
+            for human_id, count, gm in zip(
+                referees.tolist(), penalty_counts.tolist(), gm_counts.tolist()
+            ):
+                if human_id in stats:
+                    stats[human_id]["penalties_given"] += count / 2
+                    stats[human_id]["gm_given"] += gm / 2
+            known = np.isin(referees, list(stats))
+            bound_humans.append(referees[known])
+            bound_games.append(penalty_games[known])
+
+        first_last = self._bounds_to_ids(
+            _group_bounds(np.concatenate(bound_humans), np.concatenate(bound_games))
+        )
+        for human_id, stat in stats.items():
+            stat["first_game_id"], stat["last_game_id"] = first_last[human_id]
+        return stats
+
+    def human_stats(self):
+        """
+        Distinct participated games per human and role, as computed by
+        aggregate_human_stats.
+
+        Returns:
+            Dict human_id -> {"games_skater", "games_goalie", "games_referee",
+            "games_scorekeeper"} plus first_game_id_<role> and
+            last_game_id_<role> for every role the human has games in, and
+            first_game_id / last_game_id across all roles.
+        """
+        games = self.cache.games
+        participated_games = np.flatnonzero(self.participated_mask)
+        role_rows = {"skater": [], "goalie": [], "referee": [], "scorekeeper": []}
+        for role_name, role in (("skater", ROLE_SKATER), ("goalie", ROLE_GOALIE)):
+            game_indexes, humans = self._roster_rows(role, self.participated_mask)
+            keys = np.unique(_pack(game_indexes, humans))
+            role_rows[role_name].append((keys & 0xFFFFFFFF, keys >> 32))
+        for column, role_name in (
+            ("referee_1_id", "referee"),
+            ("referee_2_id", "referee"),
+            ("scorekeeper_id", "scorekeeper"),
+        ):
+            humans = games[column][participated_games]
+            known = humans != MISSING_ID
+            role_rows[role_name].append((humans[known], participated_games[known]))
+
+        stats = {}
+        for role_name, parts in role_rows.items():
+            humans = np.concatenate([part[0] for part in parts]).astype(np.int64)
+            game_indexes = np.concatenate([part[1] for part in parts])
+            counted_humans, counts = _group_count(humans)
+            bounds = _group_bounds(humans, game_indexes)
+            for human_id, count in zip(counted_humans.tolist(), counts.tolist()):
+                stat = stats.setdefault(
+                    human_id,
+                    {
+                        "games_skater": 0,
+                        "games_goalie": 0,
+                        "games_referee": 0,
+                        "games_scorekeeper": 0,
+                        "first_index": self.cache.num_games,
+                        "last_index": -1,
+                    },
+                )
+                first, last = bounds[human_id]
+                stat[f"games_{role_name}"] = count
+                stat[f"first_game_id_{role_name}"] = self.cache.game_id(first)
+                stat[f"last_game_id_{role_name}"] = self.cache.game_id(last)
+                stat["first_index"] = min(stat["first_index"], first)
+                stat["last_index"] = max(stat["last_index"], last)
+
+        for stat in stats.values():
+            stat["first_game_id"] = self.cache.game_id(stat.pop("first_index"))
+            stat["last_game_id"] = self.cache.game_id(stat.pop("last_index"))
+        return stats
+
+    def _team_roster_rows(self, role, game_mask):
+        """(game indexes, team ids, human ids) of the role's roster rows with a team."""
+        rosters = self.cache.rosters
+        rows = (
+            self._rows_in(rosters["game"], game_mask)
+            & (rosters["role"] == role)
+            & (rosters["team_id"] != MISSING_ID)
+        )
+        return (
+            rosters["game"][rows],
+            rosters["team_id"][rows],
+            rosters["human_id"][rows],
+        )
+
+    def _team_event_totals(self, roster_rows, event_games, event_humans, values=None):
+        """
+        Count events (or sum their values) per packed (team_id, human_id) key
+        as if each event were joined to the given roster rows on
+        (game_id, human_id): an event counts once per matching roster row.
+        """
+        roster_games, roster_teams, roster_humans = roster_rows
+        rows = self._rows_in(event_games, self.game_mask)
+        event_keys, totals = _group_count(
+            _pack(event_games[rows], event_humans[rows]),
+            None if values is None else values[rows].astype(np.int64),
+        )
+        if len(event_keys) == 0 or len(roster_games) == 0:
+            return {}
+        roster_keys = _pack(roster_games, roster_humans)
+        positions = np.minimum(
+            np.searchsorted(event_keys, roster_keys), len(event_keys) - 1
+        )
+        row_totals = np.where(
+            event_keys[positions] == roster_keys, totals[positions], 0
+        )
+        keys, sums = _group_count(_pack(roster_teams, roster_humans), row_totals)
+        return {k: t for k, t in zip(keys.tolist(), sums.tolist()) if t}
+
+    def _team_games(self, role):
+        """
+        Dict packed (team_id, human_id) -> games counters of the role's roster
+        rows in participated games, as the team aggregators count them.
+        """
+        games, teams, humans = self._team_roster_rows(role, self.participated_mask)
+        keys = _pack(teams, humans)
+        unique_keys, games_played = _group_count(keys)
+        first_last = self._bounds_to_ids(_group_bounds(keys, games))
+        return {
+            key: {
+                "games_played": count,
+                "games_participated": count,
+                "games_with_stats": count,
+                "first_game_id": first_last[key][0],
+                "last_game_id": first_last[key][1],
+            }
+            for key, count in zip(unique_keys.tolist(), games_played.tolist())
+        }
+
+    def _final_mask(self):
+        return self.game_mask & np.isin(
+            self.cache.games["status_id"], list(FINAL_STATUS_IDS)
+        )
+
+    @staticmethod
+    def _by_team(stats):
+        """Split packed (team_id, human_id) keys into team_id -> human_id -> stat."""
+        teams = {}
+        for key, stat in stats.items():
+            teams.setdefault(key >> 32, {})[key & 0xFFFFFFFF] = stat
+        return teams
+
+    def team_skater_stats(self):
+        """
+        Team skater counters as computed by aggregate_team_skater_stats.
+
+        Games count non-goalie roster rows on the team in participated games.
+        Goals and assists are the distinct goals of final games in which the
+        human was rostered on the team; penalties are counted per roster row
+        in participated games.
+
+        Returns:
+            Dict team_id -> human_id -> {"games_played", "games_participated",
+            "games_with_stats", "goals", "assists", "points", "penalties",
+            "gm_penalties", "first_game_id", "last_game_id"}
+        """
+        stats = self._team_games(ROLE_SKATER)
+
+        # One row per (game, team, human), so that a goal is counted once
+        final_rows = tuple(
+            np.unique(
+                np.stack(self._team_roster_rows(ROLE_SKATER, self._final_mask())),
+                axis=1,
+            )
+        )
+        goals = self.cache.goals
+        goal_counts = self._team_event_totals(
+            final_rows, goals["game"], goals["scorer_id"]
+        )
+        # A goal credits its assister once even if both assists name them
+        second_assist = goals["assist_2_id"] != goals["assist_1_id"]
+        assist_counts = self._team_event_totals(
+            final_rows,
+            np.concatenate([goals["game"], goals["game"][second_assist]]),
+            np.concatenate([goals["assist_1_id"], goals["assist_2_id"][second_assist]]),
+        )
+
+        participated_rows = self._team_roster_rows(ROLE_SKATER, self.participated_mask)
+        penalties = self.cache.penalties
+        penalty_counts = self._team_event_totals(
+            participated_rows, penalties["game"], penalties["human_id"]
+        )
+        gm_counts = self._team_event_totals(
+            participated_rows,
+            penalties["game"],
+            penalties["human_id"],
+            penalties["is_gm"],
+        )
+
+        for key, stat in stats.items():
+            stat["goals"] = goal_counts.get(key, 0)
+            stat["assists"] = assist_counts.get(key, 0)
+            stat["points"] = stat["goals"] + stat["assists"]
+            stat["penalties"] = penalty_counts.get(key, 0)
+            stat["gm_penalties"] = gm_counts.get(key, 0)
+        return self._by_team(stats)
+
+    def team_goalie_stats(self):
+        """
+        Team goalie counters as computed by aggregate_team_goalie_stats.
+
+        Games count goalie roster rows on the team in participated games;
+        goals allowed and shots faced sum the goalie saves of final games per
+        roster row.
+
+        Returns:
+            Dict team_id -> human_id -> {"games_played", "games_participated",
+            "games_with_stats", "goals_allowed", "shots_faced",
+            "first_game_id", "last_game_id"}
+        """
+        stats = self._team_games(ROLE_GOALIE)
+        final_rows = self._team_roster_rows(ROLE_GOALIE, self._final_mask())
+        saves = self.cache.goalie_saves
+        goals_allowed = self._team_event_totals(
+            final_rows, saves["game"], saves["goalie_id"], saves["goals_allowed"]
+        )
+        shots_faced = self._team_event_totals(
+            final_rows, saves["game"], saves["goalie_id"], saves["shots_against"]
+        )
+        for key, stat in stats.items():
+            stat["goals_allowed"] = goals_allowed.get(key, 0)
+            stat["shots_faced"] = shots_faced.get(key, 0)
+        return self._by_team(stats)
+
+
+def get_game_fact_cache(session):
+    """
+    Return this process's GameFactCache, loading it on first use.
+
+    Pool workers get theirs from open_game_fact_cache() in the pool
+    initializer, so they never reload the facts from the database.
+    """
+    if _process_cache is None:
+        return load_game_fact_cache(session)
+    return _process_cache
+
+
+def load_game_fact_cache(session):
+    """(Re)load this process's GameFactCache from the database."""
+    global _process_cache
+    _process_cache = GameFactCache.load(session)
+    return _process_cache
+
+
+def open_game_fact_cache(directory):
+    """Make the cache saved in directory this process's GameFactCache."""
+    global _process_cache
+    _process_cache = GameFactCache.open(directory)
+    return _process_cache
+
+
+def clear_game_fact_cache():
+    """Drop this process's GameFactCache."""
+    global _process_cache
+    _process_cache = None
@@ -0,0 +1,101 @@
+"""
+Chronological game ordinals.
+
+games.chronological_ordinal numbers every game 1..N in (date, time, id)
+order. Aggregators take min()/max() of the ordinal in their GROUP BY queries
+to find a human's first and last game, then turn the ordinals back into game
+ids with one query per scope, instead of collecting every game id with
+array_agg and issuing two ORDER BY queries per human.
+
+Ordinals change whenever a game is added or rescheduled, so the nightly run
+renumbers them in its refresh_game_ordinals stage, which every other stage
+depends on. The aggregators never refresh them themselves: running one on
+its own requires calling refresh_game_ordinals() first.
+"""
+
+from sqlalchemy import text
+
+
+def refresh_game_ordinals(session):
+    """
+    Renumber games.chronological_ordinal in (date, time, id) order.
+
+    Only rows whose ordinal changed are written, so a refresh after adding
+    games at the end of the schedule touches just the new games.
+
+    Returns:
+        Number of games whose ordinal was updated
+    """
+    result = session.execute(
+        text(
+            """
+            UPDATE games
+            SET chronological_ordinal = ordered.ordinal
+            FROM (
+                SELECT id, row_number() OVER (ORDER BY date, time, id) AS ordinal
+                FROM games
+            ) AS ordered
+            WHERE games.id = ordered.id
+              AND games.chronological_ordinal IS DISTINCT FROM ordered.ordinal
+        """
+        )
+    )
+    session.commit()
+    return result.rowcount
+
+
+def earliest(*ordinals):
+    """Smallest ordinal, ignoring None (None if there is none)."""
+    return min((o for o in ordinals if o is not None), default=None)
+
+
+def latest(*ordinals):
+    """Largest ordinal, ignoring None (None if there is none)."""
+    return max((o for o in ordinals if o is not None), default=None)
+
+
+def get_game_ids_by_ordinal(session, ordinals):
+    """Return {ordinal: game_id} for the given ordinals in one query."""
+    ordinals = list({o for o in ordinals if o is not None})
+    if not ordinals:
+        return {}
+    rows = session.execute(
+        text(
+            """
+            SELECT chronological_ordinal, id
+            FROM games
+            WHERE chronological_ordinal = ANY(:ordinals)
+        """
+        ),
+        {"ordinals": ordinals},
+    )
+    return dict(rows.fetchall())
+
+
+def resolve_first_last_games(session, stats, suffixes=("",)):
+    """
+    Replace first/last ordinals in stats dicts with first/last game ids.
+
+    For each suffix, every stat's "first_ordinal<suffix>" and
+    "last_ordinal<suffix>" entries are removed and stored as
+    "first_game_id<suffix>" and "last_game_id<suffix>".
+
+    Args:
+        session: Database session
+        stats: Iterable of stat dicts
+        suffixes: Key suffixes to resolve, e.g. ("", "_skater", "_goalie")
+    """
+    stats = list(stats)
+    ordinals = [
+        stat.get(f"{bound}_ordinal{suffix}")
+        for stat in stats
+        for suffix in suffixes
+        for bound in ("first", "last")
+    ]
+    game_ids = get_game_ids_by_ordinal(session, ordinals)
+    for stat in stats:
+        for suffix in suffixes:
+            for bound in ("first", "last"):
+                stat[f"{bound}_game_id{suffix}"] = game_ids.get(
+                    stat.pop(f"{bound}_ordinal{suffix}", None)
+                )
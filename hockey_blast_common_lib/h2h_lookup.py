@@ -0,0 +1,90 @@
+"""
+On-demand head-to-head stats for a single pair of humans.
+
+Instead of reading a precomputed h2h_stats row, get_pair_stats() intersects
+the two humans' human_games.game_ids arrays and runs the H2H pair query over
+just their common games, so rarely viewed pairs do not have to be stored.
+
+human_games is built from game rosters, so games in which one of the two
+only appears on the game sheet (as referee, or as a goalie without a roster
+entry) are not part of the intersection.
+"""
+
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from hockey_blast_common_lib.aggregate_h2h_stats import h2h_pairs_query
+from hockey_blast_common_lib.options import PAIR_STATS_CACHE_SIZE
+
+# {(database url, human1_id, human2_id): ((games_count1, games_count2), stats)}
+# in least recently used order
+_pair_stats_cache = OrderedDict()
+
+PAIR_GAME_COUNTS_QUERY = """
+    SELECT hg1.games_count, hg2.games_count, hg1.game_ids && hg2.game_ids
+    FROM human_games hg1, human_games hg2
+    WHERE hg1.human_id = :human1_id AND hg2.human_id = :human2_id
+"""
+
+PAIR_COMMON_GAMES_FILTER = """
+    WHERE id IN (
+        SELECT unnest(game_ids) FROM human_games WHERE human_id = :human1_id
+        INTERSECT
+        SELECT unnest(game_ids) FROM human_games WHERE human_id = :human2_id
+    )
+"""
+
+
+def get_pair_stats(session, human1_id, human2_id):
+    """
+    Head-to-head stats of two humans over their common games.
+
+    Results are cached per process (PAIR_STATS_CACHE_SIZE pairs) and
+    recomputed once either human's games_count changes.
+
+    Args:
+        session: Database session
+        human1_id, human2_id: The two humans, in any order
+
+    Returns:
+        Dict of h2h_stats columns (without id) with human1_id < human2_id,
+        or None if the humans have no game in common
+    """
+    if human1_id == human2_id:
+        return None
+    human1_id, human2_id = sorted((human1_id, human2_id))
+    params = {"human1_id": human1_id, "human2_id": human2_id}
+
+    row = session.execute(text(PAIR_GAME_COUNTS_QUERY), params).first()
+    if row is None or not row[2]:
+        return None
+    games_counts = (row[0], row[1])
+
+    key = (
+        session.get_bind().url.render_as_string(hide_password=True),
+        human1_id,
+        human2_id,
+    )
+    cached = _pair_stats_cache.get(key)
+    if cached is not None and cached[0] == games_counts:
+        _pair_stats_cache.move_to_end(key)
+        stats = cached[1]
+        return dict(stats) if stats is not None else None
+
+    query = h2h_pairs_query(
+        PAIR_COMMON_GAMES_FILTER,
+        " AND p1.human_id = :human1_id AND p2.human_id = :human2_id",
+    )
+    result = session.execute(text(query), params).mappings().first()
+    stats = dict(result) if result is not None else None
+
+    _pair_stats_cache[key] = (games_counts, stats)
+    _pair_stats_cache.move_to_end(key)
+    while len(_pair_stats_cache) > PAIR_STATS_CACHE_SIZE:
+        _pair_stats_cache.popitem(last=False)
+    return dict(stats) if stats is not None else None
+
+
+def clear_pair_stats_cache():
+    _pair_stats_cache.clear()
@@ -6,14 +6,15 @@ class H2HStats(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     human1_id = db.Column(db.Integer, db.ForeignKey("humans.id"), nullable=False)
     human2_id = db.Column(db.Integer, db.ForeignKey("humans.id"), nullable=False)
-    # Always store with human1_id < human2_id for uniqueness
+    # Always store with human1_id < human2_id for uniqueness. The unique
+    # constraint's index also serves pair lookups.
     __table_args__ = (
         db.UniqueConstraint("human1_id", "human2_id", name="_h2h_human_pair_uc"),
-        db.Index(
-            "ix_h2h_human_pair", "human1_id", "human2_id"
-        ),  # Composite index for fast lookup
     )
 
+    # Counters are cumulative over every game the pair shares and have no
+    # upper bound, so they stay integer (smallint would overflow at 32767).
+
     # General
     games_together = db.Column(
         db.Integer, default=0, nullable=False
@@ -169,6 +170,21 @@ class H2HStatsMeta(db.Model):
     )  # Game.id of the latest processed game
 
 
+class PairStatsProcessedGame(db.Model):
+    """
+    Games already counted in a pair stats table. Incremental runs process
+    the played games that are not listed here for their table yet, and
+    rebuild the table if a listed game changed since it was counted.
+    """
+
+    __tablename__ = "pair_stats_processed_games"
+    stats_table = db.Column(db.String(50), primary_key=True)  # e.g. "h2h_stats"
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"), primary_key=True)
+    processed_at = db.Column(db.DateTime, nullable=False)
+    # games.last_update_ts when the game was counted
+    game_last_update_ts = db.Column(db.DateTime, nullable=True)
+
+
 class SkaterToSkaterStats(db.Model):
     __tablename__ = "skater_to_skater_stats"
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,39 @@
+"""Add games.chronological_ordinal
+
+Revision ID: 3b8e1f4c2a7d
+Revises: 2fd628dbd505
+Create Date: 2026-10-18 10:12:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1f4c2a7d'
+down_revision = '2fd628dbd505'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('games', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chronological_ordinal', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_games_chronological_ordinal'), ['chronological_ordinal'], unique=False)
+
+    # Number existing games; aggregate_all_stats keeps the ordinals current
+    op.execute("""
+        UPDATE games
+        SET chronological_ordinal = ordered.ordinal
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY date, time, id) AS ordinal
+            FROM games
+        ) AS ordered
+        WHERE games.id = ordered.id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('games', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_games_chronological_ordinal'))
+        batch_op.drop_column('chronological_ordinal')
@@ -0,0 +1,54 @@
+"""Add indexes on the roster, goal, penalty and game columns the aggregators filter on
+
+Indexes are built CONCURRENTLY so that the frontend keeps reading and the
+indexer keeps writing these tables during the migration. game_id lookups of
+game_rosters, goals and penalties already use the unique constraints leading
+with game_id.
+
+Revision ID: 3e7b1c9d5f28
+Revises: 6b3f9d2e4a17
+Create Date: 2026-10-18 19:12:40.518327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e7b1c9d5f28'
+down_revision = '6b3f9d2e4a17'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns, partial index condition)
+HOT_PATH_INDEXES = [
+    ('ix_games_division_id_status_id', 'games', ['division_id', 'status_id'], None),
+    ('ix_game_rosters_human_id_game_id', 'game_rosters', ['human_id', 'game_id'], None),
+    ('ix_goals_goal_scorer_id_game_id', 'goals', ['goal_scorer_id', 'game_id'], None),
+    ('ix_goals_assist_1_id_game_id', 'goals', ['assist_1_id', 'game_id'], 'assist_1_id IS NOT NULL'),
+    ('ix_goals_assist_2_id_game_id', 'goals', ['assist_2_id', 'game_id'], 'assist_2_id IS NOT NULL'),
+    ('ix_penalties_penalized_player_id_game_id', 'penalties', ['penalized_player_id', 'game_id'], None),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. if_not_exists
+    # lets a rerun finish after an interrupted build (drop an index left
+    # INVALID by a failed build before rerunning)
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in HOT_PATH_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(HOT_PATH_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
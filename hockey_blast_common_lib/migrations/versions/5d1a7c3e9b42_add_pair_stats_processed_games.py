@@ -0,0 +1,30 @@
+"""Add pair_stats_processed_games ledger for incremental pair stats
+
+Revision ID: 5d1a7c3e9b42
+Revises: 8c2d5e9a1f36
+Create Date: 2026-10-18 14:26:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1a7c3e9b42'
+down_revision = '8c2d5e9a1f36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pair_stats_processed_games',
+    sa.Column('stats_table', sa.String(length=50), nullable=False),
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['game_id'], ['games.id'], ),
+    sa.PrimaryKeyConstraint('stats_table', 'game_id')
+    )
+
+
+def downgrade():
+    op.drop_table('pair_stats_processed_games')
@@ -0,0 +1,27 @@
+"""Drop duplicate h2h_stats pair index
+
+Revision ID: 6b3f9d2e4a17
+Revises: 5d1a7c3e9b42
+Create Date: 2026-10-18 16:48:52.903617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b3f9d2e4a17'
+down_revision = '5d1a7c3e9b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('h2h_stats', schema=None) as batch_op:
+        # _h2h_human_pair_uc already indexes (human1_id, human2_id)
+        batch_op.drop_index('ix_h2h_human_pair')
+
+
+def downgrade():
+    with op.batch_alter_table('h2h_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_h2h_human_pair', ['human1_id', 'human2_id'], unique=False)
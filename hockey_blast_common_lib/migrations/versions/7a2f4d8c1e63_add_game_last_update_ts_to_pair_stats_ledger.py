@@ -0,0 +1,29 @@
+"""Record each counted game's last_update_ts in pair_stats_processed_games
+
+Existing ledger rows get NULL, so the next incremental H2H and S2S runs
+rebuild in full once and record it.
+
+Revision ID: 7a2f4d8c1e63
+Revises: 3e7b1c9d5f28
+Create Date: 2026-10-19 10:04:52.731640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2f4d8c1e63'
+down_revision = '3e7b1c9d5f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pair_stats_processed_games', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('game_last_update_ts', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('pair_stats_processed_games', schema=None) as batch_op:
+        batch_op.drop_column('game_last_update_ts')
@@ -0,0 +1,49 @@
+"""Add aggregation_runs table for aggregation pipeline metrics
+
+Revision ID: 8c2d5e9a1f36
+Revises: 3b8e1f4c2a7d
+Create Date: 2026-10-18 11:02:17.204611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d5e9a1f36'
+down_revision = '3b8e1f4c2a7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('aggregation_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.String(length=40), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('stage', sa.String(length=100), nullable=True),
+    sa.Column('scope_type', sa.String(length=20), nullable=True),
+    sa.Column('scope_id', sa.Integer(), nullable=True),
+    sa.Column('aggregation_window', sa.String(length=10), nullable=True),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('wall_time_s', sa.Float(), nullable=False),
+    sa.Column('sql_statements', sa.Integer(), nullable=False),
+    sa.Column('rows_read', sa.BigInteger(), nullable=False),
+    sa.Column('rows_written', sa.BigInteger(), nullable=False),
+    sa.Column('rows_deleted', sa.BigInteger(), nullable=False),
+    sa.Column('peak_rss_mb', sa.Float(), nullable=True),
+    sa.Column('pid', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('aggregation_runs', schema=None) as batch_op:
+        batch_op.create_index('idx_aggregation_runs_run_id', ['run_id'], unique=False)
+        batch_op.create_index('idx_aggregation_runs_stage_started_at', ['stage', 'started_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('aggregation_runs', schema=None) as batch_op:
+        batch_op.drop_index('idx_aggregation_runs_stage_started_at')
+        batch_op.drop_index('idx_aggregation_runs_run_id')
+
+    op.drop_table('aggregation_runs')
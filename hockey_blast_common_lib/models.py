@@ -96,8 +96,12 @@ class Game(db.Model):
     last_fetch_error = db.Column(db.String(50), nullable=True)  # e.g., "connection_reset", "http_403", "timeout"
     last_fetch_error_detail = db.Column(db.String(255), nullable=True)  # Truncated error message
     last_fetch_error_time = db.Column(db.DateTime, nullable=True)  # When the error occurred
+    # Position in (date, time, id) order, maintained by game_ordinals.refresh_game_ordinals()
+    chronological_ordinal = db.Column(db.Integer, nullable=True, index=True)
     __table_args__ = (
         db.UniqueConstraint("org_id", "game_number", name="_org_game_number_uc"),
+        # Division scopes of the aggregators, restricted to game statuses
+        db.Index("ix_games_division_id_status_id", "division_id", "status_id"),
     )
 
 
@@ -115,6 +119,8 @@ class GameRoster(db.Model):
         db.UniqueConstraint(
             "game_id", "team_id", "human_id", name="_game_team_human_uc"
         ),
+        # Lookups by game use _game_team_human_uc
+        db.Index("ix_game_rosters_human_id_game_id", "human_id", "game_id"),
     )
 
 
@@ -151,6 +157,20 @@ class Goal(db.Model):
             "scoring_team_id",
             name="uq_goals_no_duplicates",
         ),
+        # Lookups by game use _goal_team_sequence_uc
+        db.Index("ix_goals_goal_scorer_id_game_id", "goal_scorer_id", "game_id"),
+        db.Index(
+            "ix_goals_assist_1_id_game_id",
+            "assist_1_id",
+            "game_id",
+            postgresql_where=db.text("assist_1_id IS NOT NULL"),
+        ),
+        db.Index(
+            "ix_goals_assist_2_id_game_id",
+            "assist_2_id",
+            "game_id",
+            postgresql_where=db.text("assist_2_id IS NOT NULL"),
+        ),
     )
 
 
@@ -422,6 +442,12 @@ class Penalty(db.Model):
             "penalty_sequence_number",
             name="_game_team_penalty_sequence_uc",
         ),
+        # Lookups by game use _game_team_penalty_sequence_uc
+        db.Index(
+            "ix_penalties_penalized_player_id_game_id",
+            "penalized_player_id",
+            "game_id",
+        ),
     )
 
 
@@ -568,6 +594,36 @@ class RequestLog(db.Model):
     )  # Response time in milliseconds
 
 
+class AggregationRun(db.Model):
+    """
+    Metrics of one stats aggregation stage or scope, written by
+    aggregation_metrics when options.PERSIST_AGGREGATION_METRICS (or
+    aggregate_all_stats.py --persist-metrics) is set.
+    """
+    __tablename__ = "aggregation_runs"
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.String(40), nullable=False)  # Shared by all records of a run
+    kind = db.Column(db.String(10), nullable=False)  # "stage" or "scope"
+    stage = db.Column(db.String(100), nullable=True)
+    scope_type = db.Column(db.String(20), nullable=True)  # org, division, level, ...
+    scope_id = db.Column(db.Integer, nullable=True)
+    aggregation_window = db.Column(db.String(10), nullable=True)  # Weekly, Daily, Combined or NULL (all-time)
+    status = db.Column(db.String(10), nullable=False)  # "ok" or "failed"
+    started_at = db.Column(db.DateTime, nullable=False)
+    wall_time_s = db.Column(db.Float, nullable=False)
+    sql_statements = db.Column(db.Integer, nullable=False, default=0)
+    rows_read = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_written = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_deleted = db.Column(db.BigInteger, nullable=False, default=0)
+    peak_rss_mb = db.Column(db.Float, nullable=True)
+    pid = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index("idx_aggregation_runs_run_id", "run_id"),
+        db.Index("idx_aggregation_runs_stage_started_at", "stage", "started_at"),
+    )
+
+
 class GoalieSaves(db.Model):
     __tablename__ = "goalie_saves"
     id = db.Column(db.Integer, primary_key=True)
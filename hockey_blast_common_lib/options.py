@@ -13,6 +13,67 @@ MIN_GAMES_FOR_LEVEL_STATS = 1
 # Set to 0 to disable and always recalculate all divisions.
 SKIP_STATS_INACTIVE_DIVISION_MONTHS = 6
 
+# Number of worker processes used by aggregate_all_stats.py to run independent
+# aggregation stages concurrently. Set to 1 to run every stage serially in-process.
+AGGREGATION_STAGE_WORKERS = 4
+
+# Number of worker processes the skater, goalie and referee drivers use to
+# aggregate divisions concurrently. Set to 1 to process divisions serially.
+DIVISION_AGGREGATION_WORKERS = 4
+
+# Number of worker processes full rebuilds of h2h_stats and
+# skater_to_skater_stats split the pairs across, by human1_id / skater1_id
+# modulo the shard count. Set to 1 to rebuild in a single process and transaction.
+PAIR_STATS_SHARDS = 4
+
+# Incremental H2H and S2S runs only add games missing from their ledger. A
+# counted game whose last_update_ts changed since (rosters, goals or status
+# corrected) triggers a full rebuild instead, and so does a ledger whose last
+# full rebuild is older than this many days, which also picks up corrections
+# that did not touch last_update_ts. 0 disables the periodic rebuild.
+PAIR_STATS_FULL_REBUILD_DAYS = 7
+
+# Number of pairs h2h_lookup.get_pair_stats keeps in its per-process LRU cache.
+# Entries are dropped as soon as either human's human_games.games_count changes.
+PAIR_STATS_CACHE_SIZE = 4096
+
+# h2h_stats only stores pairs with at least this many games together; rarer
+# pairs are served live by h2h_lookup.get_pair_stats. 1 stores every pair.
+H2H_MIN_GAMES_TOGETHER = 1
+
+# aggregate_h2h_stats.py --prune deletes cold pairs: at most
+# H2H_COLD_PAIR_MAX_GAMES games together, the last one older than
+# H2H_COLD_PAIR_DAYS days.
+H2H_COLD_PAIR_MAX_GAMES = 1
+H2H_COLD_PAIR_DAYS = 365
+
+# Load games, rosters, goals, penalties and goalie saves into an in-memory
+# columnar cache (game_fact_cache.py) once per aggregation run and compute
+# skater, goalie, referee and human stats from it instead of querying the
+# database for every org/division/level scope and window.
+USE_GAME_FACT_CACHE = True
+
+# Recompute all-time skater stats only for humans with new games (per
+# human_games) and upsert their rows plus any rows whose ranks moved, instead
+# of rewriting every row of each affected org, division and level. Rows of
+# humans who no longer play in a scope are deleted. Changes are only detected
+# through human_games.games_count growing, so a correction that leaves it as
+# is (a goal reassigned within a game, a game moved to another division) is
+# missed until the next full run. Off until a periodic full pass exists.
+INCREMENTAL_SKATER_STATS = False
+
+# Without the fact cache, query skater, goalie and referee counters once per
+# (org, division, level, human) and roll the all-time stats of org, level and
+# All Orgs scopes up from those partials instead of rescanning their games.
+ROLLUP_SCOPE_STATS = True
+
+# Per-stage and per-scope aggregation metrics (wall time, SQL statements, rows
+# read/written, peak RSS). aggregate_all_stats.py appends them as JSON lines to
+# this file and, if PERSIST_AGGREGATION_METRICS is set, to the aggregation_runs
+# table. None and False disable them; --metrics-file / --persist-metrics override.
+AGGREGATION_METRICS_FILE = None
+PERSIST_AGGREGATION_METRICS = False
+
 orgs = {"caha", "sharksice", "tvice"}
 
 
@@ -0,0 +1,186 @@
+"""
+Ledger of the games counted in each pair stats table (h2h_stats,
+skater_to_skater_stats).
+
+Pair stats only count played games. A full rebuild records every game it
+counted; incremental runs then add the played games that are missing from
+the ledger, which also picks up games that were scheduled during an earlier
+run and have been played since, whatever their date.
+
+Counters of a game already counted cannot be taken back out of the stored
+pairs, so a correction to such a game (rosters, goals, penalties or status)
+is only picked up by a full rebuild. full_rebuild_reason() asks for one when
+a counted game's last_update_ts differs from the one recorded with it or it
+is no longer a played game, and once the last full rebuild is older than
+PAIR_STATS_FULL_REBUILD_DAYS, for corrections that were made without
+updating last_update_ts.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from hockey_blast_common_lib.game_status import PARTICIPATED_STATUS_IDS
+from hockey_blast_common_lib.options import PAIR_STATS_FULL_REBUILD_DAYS
+
+# Games whose participants are counted in pair stats
+PAIR_STATS_STATUS_IDS = sorted(PARTICIPATED_STATUS_IDS)
+
+
+def get_pair_stats_game_ids(session, stats_table=None, limit=None):
+    """
+    Played game ids in chronological order.
+
+    Args:
+        session: Database session
+        stats_table: If given, only games not yet recorded for this table
+        limit: Maximum number of games (None for all)
+    """
+    query = """
+        SELECT g.id
+        FROM games g
+        WHERE g.status_id = ANY(:status_ids)
+    """
+    params = {"status_ids": PAIR_STATS_STATUS_IDS}
+    if stats_table is not None:
+        query += """
+          AND NOT EXISTS (
+              SELECT 1 FROM pair_stats_processed_games p
+              WHERE p.stats_table = :stats_table AND p.game_id = g.id
+          )
+        """
+        params["stats_table"] = stats_table
+    query += " ORDER BY g.date, g.time, g.id"
+    if limit is not None:
+        query += " LIMIT :limit"
+        params["limit"] = limit
+    return [row[0] for row in session.execute(text(query), params)]
+
+
+def has_processed_games(session, stats_table):
+    return (
+        session.execute(
+            text(
+                "SELECT 1 FROM pair_stats_processed_games WHERE stats_table = :t LIMIT 1"
+            ),
+            {"t": stats_table},
+        ).first()
+        is not None
+    )
+
+
+def full_rebuild_reason(
+    session, stats_table, max_age_days=PAIR_STATS_FULL_REBUILD_DAYS
+):
+    """
+    Why stats_table needs a full rebuild rather than an incremental run, or
+    None if it does not: a counted game changed since it was counted, or the
+    last full rebuild is older than max_age_days days (0 = never too old).
+    """
+    changed_games = session.execute(
+        text(
+            """
+            SELECT COUNT(*)
+            FROM pair_stats_processed_games p
+            JOIN games g ON g.id = p.game_id
+            WHERE p.stats_table = :stats_table
+              AND (g.last_update_ts IS DISTINCT FROM p.game_last_update_ts
+                   OR g.status_id <> ALL(:status_ids))
+        """
+        ),
+        {"stats_table": stats_table, "status_ids": PAIR_STATS_STATUS_IDS},
+    ).scalar()
+    if changed_games:
+        return f"{changed_games} counted games changed since they were counted"
+
+    if max_age_days > 0:
+        # A full rebuild records all games at once and incremental runs only
+        # add newer ones, so the oldest entry dates the last full rebuild
+        last_rebuild = session.execute(
+            text(
+                "SELECT MIN(processed_at) FROM pair_stats_processed_games"
+                " WHERE stats_table = :stats_table"
+            ),
+            {"stats_table": stats_table},
+        ).scalar()
+        if last_rebuild is not None and last_rebuild < datetime.utcnow() - timedelta(
+            days=max_age_days
+        ):
+            return f"last full rebuild on {last_rebuild:%Y-%m-%d}"
+    return None
+
+
+def record_processed_games(session, stats_table, game_ids):
+    """Add games to the ledger with their last_update_ts (in the caller's transaction)."""
+    session.execute(
+        text(
+            """
+            INSERT INTO pair_stats_processed_games
+                (stats_table, game_id, processed_at, game_last_update_ts)
+            SELECT :stats_table, g.id, :processed_at, g.last_update_ts
+            FROM games g
+            WHERE g.id = ANY(CAST(:game_ids AS integer[]))
+            ON CONFLICT DO NOTHING
+        """
+        ),
+        {
+            "stats_table": stats_table,
+            "game_ids": list(game_ids),
+            "processed_at": datetime.utcnow(),
+        },
+    )
+
+
+def reset_processed_games(session, stats_table):
+    """Forget every game recorded for a table (in the caller's transaction)."""
+    session.execute(
+        text("DELETE FROM pair_stats_processed_games WHERE stats_table = :t"),
+        {"t": stats_table},
+    )
+
+
+def create_rebuild_table(session, stats_table, columns):
+    """
+    Create an empty unlogged table with the given columns of stats_table,
+    for the worker processes of a sharded full rebuild to write into while
+    readers keep seeing the stored pairs. Commits, so that the workers'
+    sessions see it; a table left over by an earlier failed rebuild is
+    replaced.
+
+    Returns the rebuild table's name.
+    """
+    rebuild_table = f"{stats_table}_rebuild"
+    session.execute(text(f"DROP TABLE IF EXISTS {rebuild_table}"))
+    session.execute(
+        text(
+            f"CREATE UNLOGGED TABLE {rebuild_table} AS "
+            f"SELECT {columns} FROM {stats_table} WITH NO DATA"
+        )
+    )
+    session.commit()
+    return rebuild_table
+
+
+def swap_rebuild_table(session, stats_table, rebuild_table, columns):
+    """
+    Replace the rows of stats_table by those of the rebuild table and drop
+    it, in the caller's transaction: until it commits, readers see the old
+    pairs, and if it fails they keep them.
+
+    Returns the number of rows inserted.
+    """
+    session.execute(text(f"DELETE FROM {stats_table}"))
+    inserted = session.execute(
+        text(
+            f"INSERT INTO {stats_table} ({columns}) SELECT {columns} FROM {rebuild_table}"
+        )
+    ).rowcount
+    session.execute(text(f"DROP TABLE {rebuild_table}"))
+    return inserted
+
+
+def drop_rebuild_table(session, rebuild_table):
+    """Drop the rebuild table of a failed rebuild, leaving the stored pairs as they are."""
+    session.rollback()
+    session.execute(text(f"DROP TABLE IF EXISTS {rebuild_table}"))
+    session.commit()
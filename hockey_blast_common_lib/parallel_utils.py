@@ -0,0 +1,147 @@
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+
+from hockey_blast_common_lib.db_connection import create_session, dispose_engines
+from hockey_blast_common_lib.game_fact_cache import open_game_fact_cache
+from hockey_blast_common_lib.progress_utils import create_progress_tracker
+
+# Each worker receives several small chunks rather than one large one, so a
+# worker that drew the big divisions does not hold up the whole pool and the
+# progress display keeps moving.
+CHUNKS_PER_WORKER = 4
+
+
+def init_worker_process(fact_cache_dir=None):
+    """
+    Initializer for aggregation worker processes.
+
+    On platforms that fork, the child inherits the parent's cached engines
+    together with their pooled connections. Sharing a connection between
+    processes corrupts the protocol stream, so drop the inherited pools
+    (without closing the parent's sockets) and let the first create_session()
+    in the child build a fresh engine via db_connection._get_engine().
+
+    Spawned children (the default on macOS) inherit nothing, so the game fact
+    cache is opened from the snapshot in fact_cache_dir when one is given.
+    """
+    dispose_engines(close=False)
+    if fact_cache_dir is not None:
+        open_game_fact_cache(fact_cache_dir)
+
+
+def create_process_pool(max_workers, fact_cache_dir=None):
+    """
+    Create a process pool whose workers each own their database engine.
+
+    Args:
+        max_workers: Number of worker processes
+        fact_cache_dir: Directory written by GameFactCache.save() that every
+            worker opens as its game fact cache
+
+    Returns:
+        ProcessPoolExecutor initialized with init_worker_process()
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker_process,
+        initargs=(fact_cache_dir,),
+    )
+
+
+def partition(items, num_chunks):
+    """Split items round-robin into at most num_chunks non-empty lists."""
+    num_chunks = max(1, min(num_chunks, len(items)))
+    return [items[i::num_chunks] for i in range(num_chunks)]
+
+
+def _aggregate_division_chunk(aggregate_division, division_ids, kwargs):
+    """Worker entry point: aggregate a chunk of divisions with a private session.
+
+    Every division is committed by the aggregator itself, so a failure only
+    loses the division being processed, never the ones already written."""
+    session = create_session("boss")
+    try:
+        for division_id in division_ids:
+            aggregate_division(session, division_id, **kwargs)
+    finally:
+        session.close()
+    return len(division_ids)
+
+
+def run_division_aggregations(
+    session,
+    aggregate_division,
+    division_ids,
+    workers=1,
+    description=None,
+    fact_cache=None,
+    **kwargs,
+):
+    """
+    Run aggregate_division(session, division_id, **kwargs) for every division.
+
+    With workers > 1 the division IDs are partitioned across a process pool
+    and each worker aggregates its chunks with its own session, so divisions
+    are processed concurrently. Scopes that span divisions (org, level,
+    All Orgs) must be aggregated after this returns.
+
+    Args:
+        session: Session used when running serially in this process
+        aggregate_division: Module-level function (session, division_id, **kwargs)
+        division_ids: Division IDs to aggregate
+        workers: Number of worker processes; 1 runs serially in this process
+        description: Progress tracker description (no progress output if None)
+        fact_cache: GameFactCache the workers should use; it is saved to a
+            temporary directory that each worker memory-maps once
+        **kwargs: Extra arguments for aggregate_division; must be picklable
+    """
+    division_ids = list(division_ids)
+    if not division_ids:
+        return
+    progress = (
+        create_progress_tracker(len(division_ids), description) if description else None
+    )
+
+    if workers <= 1:
+        for i, division_id in enumerate(division_ids):
+            aggregate_division(session, division_id, **kwargs)
+            if progress:
+                progress.update(i + 1)
+        return
+
+    chunks = partition(division_ids, workers * CHUNKS_PER_WORKER)
+    processed = 0
+    with ExitStack() as stack:
+        fact_cache_dir = None
+        if fact_cache is not None:
+            fact_cache_dir = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="game_fact_cache_")
+            )
+            fact_cache.save(fact_cache_dir)
+        pool = stack.enter_context(
+            create_process_pool(min(workers, len(chunks)), fact_cache_dir)
+        )
+        futures = [
+            pool.submit(_aggregate_division_chunk, aggregate_division, chunk, kwargs)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            processed += future.result()
+            if progress:
+                progress.update(processed)
+
+
+def run_shards(run_shard, shards, *args):
+    """
+    Run run_shard(shard, shards, *args) for every shard in 0..shards-1, each
+    in its own worker process, and return the results in shard order.
+
+    run_shard must be a module-level function that opens its own session.
+    An exception raised by any shard is re-raised here once all are done.
+    """
+    with create_process_pool(shards) as pool:
+        futures = [
+            pool.submit(run_shard, shard, shards, *args) for shard in range(shards)
+        ]
+        return [future.result() for future in futures]
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import synonym
 
+from hockey_blast_common_lib.bulk_writer import StatsBulkWriter
 from hockey_blast_common_lib.models import db
 
 
@@ -9,6 +10,13 @@ class AggregationTimestampMixin:
     aggregation_started_at = db.Column(db.DateTime, nullable=True)
     aggregation_completed_at = db.Column(db.DateTime, nullable=True)
 
+    @classmethod
+    def bulk_writer(cls, session, aggregation_id, started_at=None):
+        """Return a StatsBulkWriter that replaces this table's rows for aggregation_id."""
+        return StatsBulkWriter(
+            session, cls, {cls.get_aggregation_column(): aggregation_id}, started_at
+        )
+
 
 class BaseStatsHuman(AggregationTimestampMixin, db.Model):
     __abstract__ = True
@@ -0,0 +1,93 @@
+"""
+Org, level and All Orgs stats rolled up from per-division partials.
+
+The counters of the skater, goalie and referee stats (games, goals, assists,
+penalties, goals allowed, shots faced, penalties given, ...) of an org, level
+or the All Orgs scope are exact sums of the same counters per division, and a
+human's first and last game are the earliest and latest of their divisions'.
+Instead of rescanning games, rosters and events for each of those scopes, an
+aggregator queries its all-time counters once grouped by (org, division,
+level, human) into a ScopePartials and sums the partials of every scope in
+memory. Ranks, per-game rates and first/last game ids are then derived from
+the rolled-up counters exactly as from a scan of the scope.
+
+Partials hold raw counters: no min_games threshold and no filtering of
+humans, which only apply to a scope's totals.
+"""
+
+from hockey_blast_common_lib.game_ordinals import earliest, latest
+from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+
+
+class ScopePartials:
+    """Per-(org, division, level, human) counters of one aggregator."""
+
+    def __init__(
+        self,
+        sum_fields,
+        min_fields=("first_ordinal",),
+        max_fields=("last_ordinal",),
+        scope_types=("org", "level"),
+    ):
+        """
+        Args:
+            sum_fields: Counters summed over the divisions of a scope
+            min_fields, max_fields: Ordinals combined with earliest/latest
+            scope_types: Scope types whose games are exactly the games of
+                their divisions (not e.g. levels restricted to recent games)
+        """
+        self.scope_types = tuple(scope_types)
+        self.sum_fields = tuple(sum_fields)
+        self.min_fields = tuple(min_fields)
+        self.max_fields = tuple(max_fields)
+        # {(org_id, division_id, level_id): {human_id: counters}}
+        self._partials = {}
+
+    def add(self, org_id, division_id, level_id, human_id, counters):
+        """Add one human's counters in one division (ignored without a human)."""
+        if human_id is None:
+            return
+        self._partials.setdefault((org_id, division_id, level_id), {})[
+            human_id
+        ] = counters
+
+    def covers(self, aggregation_type):
+        """Whether scopes of aggregation_type can be rolled up."""
+        return aggregation_type in self.scope_types
+
+    def rollup(self, aggregation_type, aggregation_id):
+        """
+        All-time counters of an org (or ALL_ORGS_ID) or level scope.
+
+        Returns:
+            Dict human_id -> counters, in human id order
+        """
+        if not self.covers(aggregation_type):
+            raise ValueError(f"Cannot roll up {aggregation_type} scopes")
+        if aggregation_type == "org":
+            partitions = [
+                humans
+                for (org_id, _, _), humans in self._partials.items()
+                if aggregation_id == ALL_ORGS_ID or org_id == aggregation_id
+            ]
+        else:
+            partitions = [
+                humans
+                for (_, _, level_id), humans in self._partials.items()
+                if level_id == aggregation_id
+            ]
+
+        totals = {}
+        for humans in partitions:
+            for human_id, counters in humans.items():
+                total = totals.get(human_id)
+                if total is None:
+                    totals[human_id] = dict(counters)
+                    continue
+                for field in self.sum_fields:
+                    total[field] += counters[field]
+                for field in self.min_fields:
+                    total[field] = earliest(total[field], counters[field])
+                for field in self.max_fields:
+                    total[field] = latest(total[field], counters[field])
+        return {human_id: totals[human_id] for human_id in sorted(totals)}
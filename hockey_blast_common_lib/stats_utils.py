@@ -1,9 +1,118 @@
-def assign_ranks(stats_dict, field, reverse_rank=False):
-    sorted_stats = sorted(
-        stats_dict.items(), key=lambda x: x[1][field], reverse=not reverse_rank
+import numpy as np
+
+ALL_ORGS_ID = -1
+
+# Percentiles stored as marker rows in every stats scope
+PERCENTILES = (25, 50, 75, 90, 95)
+
+# Tie semantics of compute_ranks / assign_rank_columns, e.g. for 30, 20, 20, 10:
+#   ordinal:     1, 2, 3, 4  (ties broken by stats_dict order, as sorted() did)
+#   competition: 1, 2, 2, 4
+#   dense:       1, 2, 2, 3
+RANK_ORDINAL = "ordinal"
+RANK_COMPETITION = "competition"
+RANK_DENSE = "dense"
+RANK_METHODS = (RANK_ORDINAL, RANK_COMPETITION, RANK_DENSE)
+
+
+def compute_ranks(values, descending=True, method=RANK_ORDINAL):
+    """
+    Rank every column of a (rows, metrics) matrix in one argsort.
+
+    Args:
+        values: 2-D array-like; each column is ranked independently
+        descending: True (highest value ranks 1) for every column, or a
+            per-column sequence of booleans
+        method: One of RANK_METHODS
+
+    Returns:
+        int64 array of the same shape with ranks starting at 1
+    """
+    if method not in RANK_METHODS:
+        raise ValueError(
+            f"Unknown rank method {method!r}; expected one of {RANK_METHODS}"
+        )
+    values = np.asarray(values, dtype=np.float64)
+    rows, columns = values.shape
+    ranks = np.empty((rows, columns), dtype=np.int64)
+    if rows == 0:
+        return ranks
+
+    descending = np.broadcast_to(np.asarray(descending, dtype=bool), (columns,))
+    keys = np.where(descending, -values, values)
+    # A stable sort keeps ties in row order, like sorted(..., reverse=True) did
+    order = np.argsort(keys, axis=0, kind="stable")
+    if method == RANK_ORDINAL:
+        positions = np.arange(1, rows + 1)[:, None]
+    else:
+        sorted_keys = np.take_along_axis(keys, order, axis=0)
+        new_value = np.ones((rows, columns), dtype=bool)
+        new_value[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        if method == RANK_DENSE:
+            positions = np.cumsum(new_value, axis=0)
+        else:
+            row_numbers = np.arange(1, rows + 1)[:, None]
+            positions = np.maximum.accumulate(
+                np.where(new_value, row_numbers, 0), axis=0
+            )
+    np.put_along_axis(ranks, order, np.broadcast_to(positions, (rows, columns)), axis=0)
+    return ranks
+
+
+def assign_rank_columns(stats_dict, fields, ascending_fields=(), method=RANK_ORDINAL):
+    """
+    Set "<field>_rank" on every stat of stats_dict for all fields at once.
+
+    Args:
+        stats_dict: {key: stat dict}
+        fields: Fields to rank; higher values rank first
+        ascending_fields: Fields where lower values rank first (e.g. goals_allowed)
+        method: Tie semantics, one of RANK_METHODS
+    """
+    fields = list(fields) + [f for f in ascending_fields if f not in fields]
+    if not stats_dict or not fields:
+        return
+    stats = list(stats_dict.values())
+    values = np.array(
+        [[stat[field] for field in fields] for stat in stats], dtype=np.float64
+    )
+    ranks = compute_ranks(
+        values,
+        descending=[field not in ascending_fields for field in fields],
+        method=method,
     )
-    for rank, (key, stat) in enumerate(sorted_stats, start=1):
-        stats_dict[key][f"{field}_rank"] = rank
+    rank_keys = [f"{field}_rank" for field in fields]
+    for stat, stat_ranks in zip(stats, ranks.tolist()):
+        stat.update(zip(rank_keys, stat_ranks))
 
 
-ALL_ORGS_ID = -1
+def assign_ranks(stats_dict, field, reverse_rank=False):
+    if reverse_rank:
+        assign_rank_columns(stats_dict, [], ascending_fields=[field])
+    else:
+        assign_rank_columns(stats_dict, [field])
+
+
+def compute_percentile_values(stats_dict, fields, percentiles=PERCENTILES):
+    """
+    Compute every percentile of every field with one numpy.percentile call.
+
+    Uses linear interpolation between closest ranks, like
+    utils.calculate_percentile_value.
+
+    Returns:
+        {percentile: {field: value}}; all values are 0 if stats_dict is empty
+    """
+    if not stats_dict or not fields:
+        return {
+            percentile: {field: 0 for field in fields} for percentile in percentiles
+        }
+    values = np.array(
+        [[stat[field] for field in fields] for stat in stats_dict.values()],
+        dtype=np.float64,
+    )
+    markers = np.percentile(values, percentiles, axis=0)
+    return {
+        percentile: dict(zip(fields, row))
+        for percentile, row in zip(percentiles, markers.tolist())
+    }
@@ -0,0 +1,611 @@
+import os
+import sys
+
+# Add the package directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import io
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import text
+
+from hockey_blast_common_lib import (  # noqa: F401 (register tables)
+    h2h_models,
+    stats_models,
+)
+from hockey_blast_common_lib.game_status import STATUS_NAMES, StatusId
+from hockey_blast_common_lib.models import db
+from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+
+NUM_ORGS = 3
+LEVELS_PER_ORG = 6
+TEAMS_PER_DIVISION = 8
+SKATERS_PER_TEAM = 12
+GAMES_PER_DIVISION = TEAMS_PER_DIVISION * (TEAMS_PER_DIVISION - 1)  # double round robin
+ROSTER_CHURN = 0.2  # share of a team's skaters replaced every season
+REFEREES_PER_ORG = 40
+SCOREKEEPERS_PER_ORG = 10
+SEASON_WEEKS = 12
+DEFAULT_END_DATE = date(2025, 3, 1)
+
+# Status mix for played games. The most recent season is left partly
+# scheduled so that window and pending-game code paths see realistic data.
+PLAYED_STATUS_WEIGHTS = [
+    (StatusId.FINAL, 80),
+    (StatusId.FINAL_OT, 6),
+    (StatusId.FINAL_SO, 4),
+    (StatusId.FORFEIT, 2),
+    (StatusId.NOEVENTS, 4),
+    (StatusId.CANCELED, 4),
+]
+SKATER_ROLES = ["", "", "", "", "", "", "C", "A", "A", None]
+PENALTY_MINUTES = ["2", "2", "2", "2", "2", "4", "5", "10", "GM"]
+INFRACTIONS = ["Tripping", "Hooking", "Slashing", "Roughing", "Interference", "Holding"]
+FIRST_NAMES = [
+    "Alex",
+    "Sam",
+    "Chris",
+    "Jordan",
+    "Taylor",
+    "Casey",
+    "Jamie",
+    "Morgan",
+    "Riley",
+    "Drew",
+]
+LAST_NAMES = [
+    "Smith",
+    "Ivanov",
+    "Garcia",
+    "Nguyen",
+    "Kowalski",
+    "Brown",
+    "Silva",
+    "Muller",
+    "Sato",
+    "Olsen",
+]
+
+
+class _TableBuffer:
+    """Accumulates rows for one table and flushes them with COPY."""
+
+    def __init__(self, session, table_name, columns, on_full, flush_every=50000):
+        self.session = session
+        self.table_name = table_name
+        self.columns = columns
+        self.on_full = on_full
+        self.flush_every = flush_every
+        self.rows = []
+        self.next_id = 1
+        self.total = 0
+
+    def add(self, *values):
+        row_id = self.next_id
+        self.next_id += 1
+        self.rows.append((row_id,) + values)
+        if len(self.rows) >= self.flush_every:
+            self.on_full()
+        return row_id
+
+    def flush(self):
+        if not self.rows:
+            return
+        buffer = io.StringIO()
+        for row in self.rows:
+            buffer.write(
+                "\t".join(r"\N" if value is None else str(value) for value in row)
+            )
+            buffer.write("\n")
+        buffer.seek(0)
+        column_list = ", ".join(["id"] + self.columns)
+        cursor = self.session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {self.table_name} ({column_list}) FROM STDIN",
+            buffer,
+        )
+        self.total += len(self.rows)
+        self.rows = []
+
+
+def _pick_status(rng):
+    roll = rng.uniform(0, sum(weight for _, weight in PLAYED_STATUS_WEIGHTS))
+    for status_id, weight in PLAYED_STATUS_WEIGHTS:
+        roll -= weight
+        if roll <= 0:
+            return status_id
+    return StatusId.FINAL
+
+
+def _round_robin(num_teams):
+    """Return (home, visitor) index pairs for a double round robin."""
+    teams = list(range(num_teams))
+    rounds = []
+    for _ in range(num_teams - 1):
+        rounds.append([(teams[i], teams[-1 - i]) for i in range(num_teams // 2)])
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    return [pair for r in rounds for pair in r] + [
+        (visitor, home) for r in rounds for home, visitor in r
+    ]
+
+
+def create_schema(session):
+    """Create every table of the library's models that does not exist yet."""
+    db.metadata.create_all(session.get_bind())
+    session.commit()
+
+
+def reset_synthetic_tables(session):
+    """Empty every table the generator fills (and the stats derived from them)."""
+    table_names = ", ".join(table.name for table in db.metadata.sorted_tables)
+    session.execute(text(f"TRUNCATE TABLE {table_names} RESTART IDENTITY CASCADE"))
+    session.commit()
+
+
+def generate_synthetic_league(
+    session, num_games=10000, seed=42, end_date=DEFAULT_END_DATE
+):
+    """
+    Fill an empty database with a deterministic synthetic league.
+
+    The same (num_games, seed) pair always produces identical rows, so
+    benchmark and query-plan results are comparable between runs. Divisions
+    are double round robins of TEAMS_PER_DIVISION teams; team rosters carry
+    over between seasons with ROSTER_CHURN turnover so humans accumulate
+    realistic multi-season histories, and referees also play occasionally.
+
+    Args:
+        session: Database session (boss) on a database with the schema created
+        num_games: Approximate number of games to generate
+        seed: Random seed
+        end_date: Date of the last played games. Pass date.today() to exercise
+            the Daily and Weekly windows; keep the default for reproducible runs.
+
+    Returns:
+        Dict of table name -> number of rows generated
+    """
+    rng = random.Random(seed)
+    num_divisions = max(1, round(num_games / GAMES_PER_DIVISION))
+    seasons_per_level = max(1, -(-num_divisions // (NUM_ORGS * LEVELS_PER_ORG)))
+
+    buffers = []
+
+    def flush_all():
+        # Flush every table in foreign key order whenever one fills up
+        for table in buffers:
+            table.flush()
+
+    def buffer(table_name, columns):
+        table = _TableBuffer(session, table_name, columns, flush_all)
+        buffers.append(table)
+        return table
+
+    statuses = buffer("game_statuses", ["name"])
+    orgs = buffer("organizations", ["alias", "organization_name"])
+    levels = buffer("levels", ["org_id", "skill_value", "level_name", "short_name"])
+    leagues = buffer("leagues", ["org_id", "league_number", "league_name"])
+    seasons = buffer(
+        "seasons",
+        [
+            "season_number",
+            "season_name",
+            "start_date",
+            "end_date",
+            "league_number",
+            "league_id",
+            "org_id",
+        ],
+    )
+    divisions = buffer(
+        "divisions",
+        ["league_number", "season_number", "season_id", "level", "level_id", "org_id"],
+    )
+    teams = buffer("teams", ["name", "org_id"])
+    humans = buffer(
+        "humans",
+        ["first_name", "middle_name", "last_name", "suffix", "first_date", "last_date"],
+    )
+    games = buffer(
+        "games",
+        [
+            "status",
+            "status_id",
+            "division_id",
+            "game_number",
+            "date",
+            "time",
+            "day_of_week",
+            "period_length",
+            "scorekeeper_id",
+            "referee_1_id",
+            "referee_2_id",
+            "home_goalie_id",
+            "visitor_goalie_id",
+            "visitor_team_id",
+            "home_team_id",
+            "visitor_final_score",
+            "home_final_score",
+            "home_ot_score",
+            "visitor_ot_score",
+            "went_to_ot",
+            "org_id",
+            "last_update_ts",
+        ],
+    )
+    rosters = buffer(
+        "game_rosters", ["game_id", "team_id", "human_id", "role", "jersey_number"]
+    )
+    goals = buffer(
+        "goals",
+        [
+            "game_id",
+            "scoring_team_id",
+            "opposing_team_id",
+            "period",
+            "time",
+            "goal_scorer_id",
+            "assist_1_id",
+            "assist_2_id",
+            "goalie_id",
+            "sequence_number",
+        ],
+    )
+    penalties = buffer(
+        "penalties",
+        [
+            "game_id",
+            "team_id",
+            "period",
+            "time",
+            "penalized_player_id",
+            "infraction",
+            "penalty_minutes",
+            "penalty_sequence_number",
+        ],
+    )
+    saves = buffer(
+        "goalie_saves",
+        ["game_id", "goalie_id", "saves_count", "shots_against", "goals_allowed"],
+    )
+    quality = buffer(
+        "scorekeeper_save_quality",
+        [
+            "game_id",
+            "scorekeeper_id",
+            "total_saves_recorded",
+            "max_saves_per_5sec",
+            "max_saves_per_20sec",
+            "saves_timestamps",
+        ],
+    )
+    shootouts = buffer(
+        "shootout",
+        [
+            "game_id",
+            "shooting_team_id",
+            "shooter_id",
+            "goalie_id",
+            "has_scored",
+            "sequence_number",
+        ],
+    )
+
+    for status_id in sorted(STATUS_NAMES):
+        statuses.next_id = status_id
+        statuses.add(STATUS_NAMES[status_id])
+
+    # "All Orgs" stats rows reference this organization
+    orgs.next_id = ALL_ORGS_ID
+    orgs.add("all", "All Orgs")
+    orgs.next_id = 1
+
+    def new_human():
+        return humans.add(
+            rng.choice(FIRST_NAMES),
+            "",
+            f"{rng.choice(LAST_NAMES)}{humans.next_id}",
+            "",
+            None,
+            None,
+        )
+
+    # The last season has been played for three quarters of its rounds by end_date
+    played_rounds = (GAMES_PER_DIVISION * 3 // 4 - 1) // (TEAMS_PER_DIVISION // 2)
+    last_season_start = end_date - timedelta(days=played_rounds * 5)
+    first_season_start = last_season_start - timedelta(
+        weeks=SEASON_WEEKS * (seasons_per_level - 1)
+    )
+    divisions_left = num_divisions
+    for org_index in range(NUM_ORGS):
+        org_id = orgs.add(f"synth{org_index}", f"Synthetic Org {org_index}")
+        league_id = leagues.add(org_id, 1, "Adult League")
+        org_game_number = 0
+        referees = [new_human() for _ in range(REFEREES_PER_ORG)]
+        scorekeepers = [new_human() for _ in range(SCOREKEEPERS_PER_ORG)]
+        season_ids = []
+        for season_number in range(1, seasons_per_level + 1):
+            start = first_season_start + timedelta(
+                weeks=SEASON_WEEKS * (season_number - 1)
+            )
+            season_ids.append(
+                seasons.add(
+                    season_number,
+                    f"Season {season_number}",
+                    start,
+                    start + timedelta(weeks=SEASON_WEEKS),
+                    1,
+                    league_id,
+                    org_id,
+                )
+            )
+
+        for level_index in range(LEVELS_PER_ORG):
+            level_name = f"Level {level_index + 1}"
+            level_id = levels.add(
+                org_id, 10.0 * (level_index + 1), level_name, f"L{level_index + 1}"
+            )
+            team_ids = [
+                teams.add(f"{level_name} Team {t}", org_id)
+                for t in range(TEAMS_PER_DIVISION)
+            ]
+            team_skaters = [
+                [new_human() for _ in range(SKATERS_PER_TEAM)] for _ in team_ids
+            ]
+            team_goalies = [new_human() for _ in team_ids]
+
+            for season_number, season_id in enumerate(season_ids, start=1):
+                if divisions_left <= 0:
+                    break
+                divisions_left -= 1
+                division_id = divisions.add(
+                    1, season_number, season_id, level_name, level_id, org_id
+                )
+                season_start = first_season_start + timedelta(
+                    weeks=SEASON_WEEKS * (season_number - 1)
+                )
+                is_last_season = season_start == last_season_start
+
+                # Season-to-season turnover
+                for skaters in team_skaters:
+                    for i in range(len(skaters)):
+                        if rng.random() < ROSTER_CHURN:
+                            skaters[i] = new_human()
+                for t in range(len(team_goalies)):
+                    if rng.random() < ROSTER_CHURN / 2:
+                        team_goalies[t] = new_human()
+
+                for game_number, (home, visitor) in enumerate(
+                    _round_robin(TEAMS_PER_DIVISION), start=1
+                ):
+                    game_date = season_start + timedelta(
+                        days=(game_number - 1) // (TEAMS_PER_DIVISION // 2) * 5
+                        + rng.randint(0, 2)
+                    )
+                    game_time = time(rng.randint(17, 23), rng.choice([0, 15, 30, 45]))
+                    if is_last_season and game_number > GAMES_PER_DIVISION * 3 // 4:
+                        status_id = StatusId.SCHEDULED
+                    else:
+                        status_id = _pick_status(rng)
+                    played = status_id in (
+                        StatusId.FINAL,
+                        StatusId.FINAL_OT,
+                        StatusId.FINAL_SO,
+                        StatusId.NOEVENTS,
+                    )
+                    home_team_id, visitor_team_id = team_ids[home], team_ids[visitor]
+                    home_goalie, visitor_goalie = (
+                        team_goalies[home],
+                        team_goalies[visitor],
+                    )
+                    ref_1, ref_2 = rng.sample(referees, 2)
+                    # Occasionally a regular player referees another division's game
+                    if rng.random() < 0.05:
+                        ref_2 = rng.choice(rng.choice(team_skaters))
+                        if ref_2 == ref_1:
+                            ref_2 = None
+                    with_events = played and status_id != StatusId.NOEVENTS
+
+                    home_score = rng.randint(0, 7) if with_events else None
+                    visitor_score = rng.randint(0, 7) if with_events else None
+                    if status_id in (StatusId.FINAL_OT, StatusId.FINAL_SO):
+                        visitor_score = home_score + rng.choice([-1, 1])
+                        visitor_score = max(visitor_score, 0)
+                        if visitor_score == home_score:
+                            visitor_score += 1
+                    if status_id == StatusId.FORFEIT:
+                        home_score, visitor_score = rng.choice([(1, 0), (0, 1)])
+
+                    org_game_number += 1
+                    scorekeeper = rng.choice(scorekeepers)
+                    game_id = games.add(
+                        STATUS_NAMES[status_id],
+                        status_id,
+                        division_id,
+                        org_game_number,
+                        game_date,
+                        game_time,
+                        game_date.isoweekday(),
+                        15,
+                        scorekeeper,
+                        ref_1,
+                        ref_2,
+                        home_goalie if played else None,
+                        visitor_goalie if played else None,
+                        visitor_team_id,
+                        home_team_id,
+                        visitor_score,
+                        home_score,
+                        0,
+                        0,
+                        status_id in (StatusId.FINAL_OT, StatusId.FINAL_SO),
+                        org_id,
+                        datetime.combine(game_date, game_time),
+                    )
+                    if not played and status_id != StatusId.FORFEIT:
+                        continue
+
+                    sides = [
+                        (
+                            home_team_id,
+                            visitor_team_id,
+                            team_skaters[home],
+                            home_goalie,
+                            visitor_goalie,
+                            home_score,
+                        ),
+                        (
+                            visitor_team_id,
+                            home_team_id,
+                            team_skaters[visitor],
+                            visitor_goalie,
+                            home_goalie,
+                            visitor_score,
+                        ),
+                    ]
+                    for team_id, _, skaters, goalie, _, _ in sides:
+                        present = [h for h in skaters if rng.random() < 0.85]
+                        for jersey, human_id in enumerate(present, start=2):
+                            rosters.add(
+                                game_id,
+                                team_id,
+                                human_id,
+                                rng.choice(SKATER_ROLES),
+                                str(jersey),
+                            )
+                        rosters.add(game_id, team_id, goalie, "G", "1")
+                        side_present = present
+                        if not with_events:
+                            continue
+                        score = home_score if team_id == home_team_id else visitor_score
+                        opposing_team_id = (
+                            visitor_team_id if team_id == home_team_id else home_team_id
+                        )
+                        opposing_goalie = (
+                            visitor_goalie if team_id == home_team_id else home_goalie
+                        )
+                        for sequence in range(1, (score or 0) + 1):
+                            if not side_present:
+                                break
+                            scorer = rng.choice(side_present)
+                            helpers = rng.sample(
+                                [h for h in side_present if h != scorer],
+                                min(rng.choice([0, 1, 2, 2]), len(side_present) - 1),
+                            )
+                            goals.add(
+                                game_id,
+                                team_id,
+                                opposing_team_id,
+                                str(rng.randint(1, 3)),
+                                f"{rng.randint(0, 14):02d}:{sequence:02d}",
+                                scorer,
+                                helpers[0] if helpers else None,
+                                helpers[1] if len(helpers) > 1 else None,
+                                opposing_goalie,
+                                sequence,
+                            )
+                        for sequence in range(1, rng.randint(0, 4) + 1):
+                            if not side_present:
+                                break
+                            penalties.add(
+                                game_id,
+                                team_id,
+                                str(rng.randint(1, 3)),
+                                f"{rng.randint(0, 14):02d}:00",
+                                rng.choice(side_present),
+                                rng.choice(INFRACTIONS),
+                                rng.choice(PENALTY_MINUTES),
+                                sequence,
+                            )
+                    if with_events:
+                        total_saves = 0
+                        for _, _, _, goalie, _, _ in sides:
+                            allowed = (
+                                visitor_score if goalie == home_goalie else home_score
+                            )
+                            shots = allowed + rng.randint(12, 35)
+                            saves.add(game_id, goalie, shots - allowed, shots, allowed)
+                            total_saves += shots - allowed
+                        # A few scorekeepers tap saves in bursts, which the quality score flags
+                        burst = rng.random() < 0.1
+                        quality.add(
+                            game_id,
+                            scorekeeper,
+                            total_saves,
+                            rng.randint(3, 6) if burst else rng.randint(1, 2),
+                            rng.randint(6, 12) if burst else rng.randint(2, 4),
+                            None,
+                        )
+                    if status_id == StatusId.FINAL_SO:
+                        for sequence in range(1, 7):
+                            team_id, _, skaters, _, opposing_goalie, _ = sides[
+                                sequence % 2
+                            ]
+                            shootouts.add(
+                                game_id,
+                                team_id,
+                                rng.choice(skaters),
+                                opposing_goalie,
+                                rng.random() < 0.35,
+                                sequence,
+                            )
+
+    flush_all()
+    counts = {}
+    for table in buffers:
+        counts[table.table_name] = table.total
+        # Keep serial sequences ahead of the explicit ids
+        session.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.table_name}', 'id'), "
+                f"GREATEST((SELECT MAX(id) FROM {table.table_name}), 1))"
+            )
+        )
+    session.execute(text("ANALYZE"))
+    session.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    from hockey_blast_common_lib.db_connection import create_session
+
+    parser = argparse.ArgumentParser(
+        description="Generate a deterministic synthetic league."
+    )
+    parser.add_argument(
+        "--games", type=int, default=10000, help="Approximate number of games."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="Create missing tables first (for a new, empty database).",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Truncate every table first. Required if the database already has games.",
+    )
+    parser.add_argument(
+        "--today",
+        action="store_true",
+        help="End the league today instead of on a fixed date (populates Daily/Weekly windows).",
+    )
+    args = parser.parse_args()
+
+    session = create_session("boss")
+    if args.create_schema:
+        create_schema(session)
+    existing_games = session.execute(text("SELECT COUNT(*) FROM games")).scalar()
+    if existing_games and not args.reset:
+        sys.exit(
+            f"Database already has {existing_games} games; refusing to add synthetic data (use --reset)."
+        )
+    if args.reset:
+        reset_synthetic_tables(session)
+    for table_name, count in generate_synthetic_league(
+        session, args.games, args.seed, date.today() if args.today else DEFAULT_END_DATE
+    ).items():
+        print(f"{table_name}: {count:,}")
+    session.close()
@@ -5,9 +5,34 @@ from datetime import datetime, timedelta
 # Add the package directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql import func
 
-from hockey_blast_common_lib.models import Division, Human, HumanAlias, Level, Organization
+from hockey_blast_common_lib.models import (
+    Division,
+    Game,
+    Human,
+    HumanAlias,
+    Level,
+    Organization,
+)
+
+# The ranking engine lives in stats_utils; re-exported for existing importers
+from hockey_blast_common_lib.stats_utils import (  # noqa: F401
+    PERCENTILES,
+    assign_rank_columns,
+    assign_ranks,
+    compute_percentile_values,
+    compute_ranks,
+)
+
+# Windows aggregated together by the aggregate_*_scope() functions:
+# all-time (None), weekly and daily
+AGGREGATION_WINDOWS = (None, "Weekly", "Daily")
+
+# {(database url, entity type): {percentile: human_id}}, filled once per process
+_percentile_human_ids = {}
 
 
 def get_org_id_from_alias(session, org_alias):
@@ -224,12 +249,41 @@ def get_start_datetime(last_game_datetime_str, aggregation_window):
     return None
 
 
-def assign_ranks(stats_dict, field, reverse_rank=False):
-    sorted_stats = sorted(
-        stats_dict.items(), key=lambda x: x[1][field], reverse=not reverse_rank
-    )
-    for rank, (key, stat) in enumerate(sorted_stats, start=1):
-        stats_dict[key][f"{field}_rank"] = rank
+def get_window_starts(last_game_datetime_str, aggregation_windows):
+    """
+    Start of each aggregation window of a scope, as get_start_datetime.
+
+    The all-time window (None) maps to None. Windows without recent games are
+    left out, so that their stored stats are kept.
+    """
+    window_starts = {}
+    for aggregation_window in aggregation_windows:
+        if aggregation_window is None:
+            window_starts[None] = None
+            continue
+        start_datetime = get_start_datetime(last_game_datetime_str, aggregation_window)
+        if start_datetime:
+            window_starts[aggregation_window] = start_datetime
+    return window_starts
+
+
+def get_game_window_condition(start_datetime, last_game_datetime_str):
+    """Condition selecting the games of a window (None for all-time)."""
+    if start_datetime is None:
+        return None
+    return func.cast(
+        func.concat(Game.date, " ", Game.time), sqlalchemy.types.TIMESTAMP
+    ).between(start_datetime, last_game_datetime_str)
+
+
+def windowed(aggregate, condition):
+    """aggregate FILTER (WHERE condition), or aggregate itself if condition is None."""
+    return aggregate if condition is None else aggregate.filter(condition)
+
+
+def in_window(condition):
+    """Boolean column telling whether a row falls in a window."""
+    return sqlalchemy.true() if condition is None else condition
 
 
 def get_fake_level(session):
@@ -275,12 +329,50 @@ def get_percentile_human(session, entity_type, percentile):
     if existing_human:
         return existing_human.id
 
-    # Create a new human
-    human = Human(first_name=first_name, middle_name=middle_name, last_name=last_name)
-    session.add(human)
+    # Create it; division workers may race to create the same marker
+    session.execute(
+        insert(Human)
+        .values(
+            first_name=first_name, middle_name=middle_name, last_name=last_name, suffix=""
+        )
+        .on_conflict_do_nothing(constraint="_human_name_uc")
+    )
     session.commit()
 
-    return human.id
+    return (
+        session.query(Human.id)
+        .filter_by(first_name=first_name, middle_name=middle_name, last_name=last_name)
+        .scalar()
+    )
+
+
+def get_percentile_human_ids(session, entity_type):
+    """Get (or create) all percentile marker humans of an entity type.
+
+    The IDs are looked up once per process and database and then served
+    from a registry, so aggregators can ask for them in every scope.
+
+    Args:
+        session: Database session
+        entity_type: One of "Skater", "Goalie", "Ref", "Scorekeeper"
+
+    Returns:
+        {percentile: human_id} for every percentile in PERCENTILES
+    """
+    key = (session.get_bind().url.render_as_string(hide_password=True), entity_type)
+    if key not in _percentile_human_ids:
+        rows = (
+            session.query(Human.middle_name, Human.id)
+            .filter_by(first_name=entity_type, last_name="Percentile")
+            .all()
+        )
+        human_ids = {int(middle): human_id for middle, human_id in rows if middle.isdigit()}
+        _percentile_human_ids[key] = {
+            percentile: human_ids.get(percentile)
+            or get_percentile_human(session, entity_type, percentile)
+            for percentile in PERCENTILES
+        }
+    return _percentile_human_ids[key]
 
 
 def calculate_percentile_value(values, percentile):
@@ -0,0 +1,184 @@
+"""
+Benchmark the stats aggregators on synthetic leagues of increasing size.
+
+For every scale this script:
+1. Truncates the benchmark database and fills it with
+   synthetic_league.generate_synthetic_league(games, seed)
+2. Runs the aggregation stages of aggregate_all_stats.py one at a time
+   (process_hb_claims excluded), each run_aggregate_* entry point measured
+   by aggregation_metrics
+3. Appends one JSON line per (scale, stage) to the results file
+
+and finally prints each stage's wall time per scale together with its scaling
+exponent (slope of log(wall time) over log(games) between consecutive scales;
+1.0 is linear).
+
+The benchmark database is truncated, so it must be a dedicated one:
+
+    createdb hockey_blast_bench
+    python scripts/benchmark_aggregators.py --database hockey_blast_bench \\
+        --games 10000 30000 100000 --results /tmp/aggregator_benchmark.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+from collections import defaultdict
+
+# Add the package directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRODUCTION_DATABASE = "hockey_blast"
+SKIPPED_STAGES = {"process_hb_claims"}
+
+
+def benchmark_stages():
+    """Aggregation stages without the ones that need external services."""
+    from hockey_blast_common_lib.aggregate_all_stats import AGGREGATION_STAGES
+
+    return {
+        name: dict(
+            stage,
+            depends_on=[d for d in stage["depends_on"] if d not in SKIPPED_STAGES],
+        )
+        for name, stage in AGGREGATION_STAGES.items()
+        if name not in SKIPPED_STAGES
+    }
+
+
+def run_scale(session, games, seed, metrics_file):
+    """
+    Generate a league of the given size, run every stage and return its metrics.
+
+    Returns:
+        (row counts by table, list of stage metric records)
+    """
+    from hockey_blast_common_lib.aggregate_all_stats import run_stages
+    from hockey_blast_common_lib.aggregation_metrics import configure_metrics
+    from hockey_blast_common_lib.synthetic_league import (
+        generate_synthetic_league,
+        reset_synthetic_tables,
+    )
+
+    print(
+        f"\nGenerating synthetic league with ~{games:,} games (seed {seed})...",
+        flush=True,
+    )
+    reset_synthetic_tables(session)
+    counts = generate_synthetic_league(session, games, seed)
+    print(
+        f"Generated {counts['games']:,} games, {counts['game_rosters']:,} roster rows",
+        flush=True,
+    )
+
+    run_id = configure_metrics(
+        metrics_file=metrics_file, run_id=f"bench-{games}-{seed}"
+    )
+    results = run_stages(benchmark_stages(), max_workers=1)
+    failed = [name for name, result in results.items() if result != "ok"]
+    if failed:
+        raise RuntimeError(f"Stages failed at {games:,} games: {', '.join(failed)}")
+
+    with open(metrics_file) as f:
+        records = [json.loads(line) for line in f]
+    stage_records = [
+        r for r in records if r["run_id"] == run_id and r["kind"] == "stage"
+    ]
+    return counts, stage_records
+
+
+def scaling_exponent(points):
+    """Slope of log(wall time) over log(games) between the last two points."""
+    if len(points) < 2:
+        return None
+    (games_a, time_a), (games_b, time_b) = points[-2], points[-1]
+    if min(games_a, games_b, time_a, time_b) <= 0 or games_a == games_b:
+        return None
+    return math.log(time_b / time_a) / math.log(games_b / games_a)
+
+
+def print_scaling_table(curves, scales):
+    """Print wall time per stage and scale, followed by the last scaling exponent."""
+    header = (
+        f"{'stage':<36}" + "".join(f"{g:>12,}" for g in scales) + f"{'exponent':>10}"
+    )
+    print("\n" + header)
+    print("-" * len(header))
+    for stage, points in curves.items():
+        times = dict(points)
+        row = f"{stage:<36}" + "".join(
+            f"{times[g]:>11.1f}s" if g in times else f"{'-':>12}" for g in scales
+        )
+        exponent = scaling_exponent(sorted(points))
+        row += f"{exponent:>10.2f}" if exponent is not None else f"{'-':>10}"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the stats aggregators.")
+    parser.add_argument(
+        "--database",
+        required=True,
+        help="Dedicated benchmark database (truncated for every scale).",
+    )
+    parser.add_argument(
+        "--games",
+        type=int,
+        nargs="+",
+        default=[10000, 30000, 100000],
+        help="League sizes to benchmark, in approximate number of games.",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    parser.add_argument(
+        "--results",
+        default="aggregator_benchmark.jsonl",
+        help="JSON lines file the per-stage results are appended to.",
+    )
+    args = parser.parse_args()
+
+    if args.database == PRODUCTION_DATABASE:
+        sys.exit(
+            f"Refusing to truncate {PRODUCTION_DATABASE}; use a dedicated database."
+        )
+    # db_connection reads DB_NAME when it is first imported
+    os.environ["DB_NAME"] = args.database
+
+    from hockey_blast_common_lib.db_connection import create_session
+    from hockey_blast_common_lib.synthetic_league import create_schema
+
+    session = create_session("boss")
+    create_schema(session)
+
+    scales = sorted(args.games)
+    curves = defaultdict(list)
+    metrics_file = os.path.join(tempfile.mkdtemp(), "metrics.jsonl")
+    with open(args.results, "a") as results_file:
+        for games in scales:
+            counts, records = run_scale(session, games, args.seed, metrics_file)
+            for record in records:
+                curves[record["stage"]].append((games, record["wall_time_s"]))
+                results_file.write(
+                    json.dumps(
+                        {
+                            "target_games": games,
+                            "seed": args.seed,
+                            "games": counts["games"],
+                            "game_rosters": counts["game_rosters"],
+                            "stage": record["stage"],
+                            "wall_time_s": record["wall_time_s"],
+                            "sql_statements": record["sql_statements"],
+                            "rows_read": record["rows_read"],
+                            "rows_written": record["rows_written"],
+                            "peak_rss_mb": record["peak_rss_mb"],
+                        }
+                    )
+                    + "\n"
+                )
+            results_file.flush()
+
+    print_scaling_table(curves, scales)
+    print(f"\nResults appended to {args.results}")
+    session.close()
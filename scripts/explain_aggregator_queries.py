@@ -0,0 +1,345 @@
+"""
+Check the query plans of the stats aggregators' hot paths on a synthetic league.
+
+This script:
+1. Fills a dedicated database with
+   synthetic_league.generate_synthetic_league(games, seed) (unless
+   --reuse-data) and creates the models' indexes missing from it
+2. Runs, on the SQL path (no game fact cache), capturing every SELECT they
+   send to the database:
+   - the per-division skater, goalie and referee aggregations of a current
+     division and a skater's point streak (calculate_point_streaks)
+   - the skater, goalie and referee partials queries and the org, level and
+     All Orgs scopes rolled up from them
+3. Runs EXPLAIN (ANALYZE, BUFFERS) on each distinct captured SELECT and
+   appends the plans as JSON lines to the plans file
+4. Exits with status 1 if a plan of a selective workload (division or single
+   skater) reads games, game_rosters, goals or penalties with a sequential
+   scan, which on these scopes means a missing or unusable index. The
+   partials queries and the rollups read all or a large part of the league,
+   so their sequential scans are reported but expected
+
+The database is truncated unless --reuse-data is given, so it must be a
+dedicated one:
+
+    createdb hockey_blast_bench
+    python scripts/explain_aggregator_queries.py --database hockey_blast_bench \\
+        --games 30000 --plans /tmp/aggregator_plans.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+# Add the package directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRODUCTION_DATABASE = "hockey_blast"
+HOT_TABLES = ("games", "game_rosters", "goals", "penalties")
+
+
+def prepare_database(session, games, seed, reuse_data):
+    """Generate the league if asked to, create missing indexes and analyze."""
+    from sqlalchemy import text
+
+    from hockey_blast_common_lib.game_ordinals import refresh_game_ordinals
+    from hockey_blast_common_lib.models import db
+    from hockey_blast_common_lib.synthetic_league import (
+        create_schema,
+        generate_synthetic_league,
+        reset_synthetic_tables,
+    )
+
+    create_schema(session)
+    if not reuse_data:
+        print(
+            f"Generating synthetic league with ~{games:,} games (seed {seed})...",
+            flush=True,
+        )
+        reset_synthetic_tables(session)
+        # Games up to today: the division aggregators skip inactive
+        # divisions and the Daily and Weekly windows would be empty otherwise
+        counts = generate_synthetic_league(session, games, seed, end_date=date.today())
+        print(
+            f"Generated {counts['games']:,} games, {counts['game_rosters']:,} roster rows",
+            flush=True,
+        )
+        refresh_game_ordinals(session)
+        session.commit()
+
+    # create_all() skips tables that already exist, so indexes added to the
+    # models since the database was created are built here
+    bind = session.get_bind()
+    for table_name in HOT_TABLES:
+        for index in db.metadata.tables[table_name].indexes:
+            index.create(bind, checkfirst=True)
+    for table_name in HOT_TABLES:
+        session.execute(text(f"ANALYZE {table_name}"))
+    session.commit()
+
+
+def pick_scopes(session):
+    """
+    Dict with the busiest of the divisions with the latest games
+    ("division_id"), its org and level ("org_id", "level_id") and the skater
+    with the median number of roster rows ("human_id").
+    """
+    from sqlalchemy import func
+
+    from hockey_blast_common_lib.models import Division, Game, GameRoster
+
+    # Older divisions are skipped as inactive by the division aggregators
+    division_id = (
+        session.query(Game.division_id)
+        .group_by(Game.division_id)
+        .order_by(func.max(Game.date).desc(), func.count().desc(), Game.division_id)
+        .limit(1)
+        .scalar()
+    )
+    skaters = (
+        session.query(GameRoster.human_id)
+        .filter(~GameRoster.role.ilike("g"))
+        .group_by(GameRoster.human_id)
+        .order_by(func.count(), GameRoster.human_id)
+    )
+    human_id = skaters.offset(skaters.count() // 2).limit(1).scalar()
+    org_id, level_id = (
+        session.query(Division.org_id, Division.level_id)
+        .filter(Division.id == division_id)
+        .one()
+    )
+    return {
+        "division_id": division_id,
+        "org_id": org_id,
+        "level_id": level_id,
+        "human_id": human_id,
+    }
+
+
+def hot_path_workloads(scopes):
+    """
+    Name -> (function(session) running one aggregator hot path, whether it
+    is selective). Rollup workloads use the partials of the workload before
+    them.
+    """
+    from sqlalchemy import true
+
+    from hockey_blast_common_lib.aggregate_goalie_stats import (
+        aggregate_goalie_division,
+        aggregate_goalie_scope,
+        query_goalie_partials,
+    )
+    from hockey_blast_common_lib.aggregate_referee_stats import (
+        aggregate_referee_division,
+        aggregate_referee_scope,
+        query_referee_partials,
+    )
+    from hockey_blast_common_lib.aggregate_skater_stats import (
+        aggregate_skater_division,
+        aggregate_skater_scope,
+        calculate_point_streaks,
+        query_skater_partials,
+    )
+    from hockey_blast_common_lib.stats_utils import ALL_ORGS_ID
+
+    division_id, human_id = scopes["division_id"], scopes["human_id"]
+    partials = {}
+
+    def collect_partials(role, query_partials):
+        def workload(session):
+            partials[role] = query_partials(session)
+
+        return workload
+
+    def rollup(role, aggregate_scope, aggregation_type, aggregation_id):
+        return lambda session: aggregate_scope(
+            session,
+            aggregation_type=aggregation_type,
+            aggregation_id=aggregation_id,
+            partials=partials[role],
+        )
+
+    workloads = {
+        "skater_division": (
+            lambda session: aggregate_skater_division(session, division_id),
+            True,
+        ),
+        "goalie_division": (
+            lambda session: aggregate_goalie_division(session, division_id),
+            True,
+        ),
+        "referee_division": (
+            lambda session: aggregate_referee_division(session, division_id),
+            True,
+        ),
+        "skater_point_streak": (
+            lambda session: calculate_point_streaks(session, [human_id], true()),
+            True,
+        ),
+    }
+    rollup_scopes = (
+        ("org", "org", scopes["org_id"]),
+        ("level", "level", scopes["level_id"]),
+        ("all_orgs", "org", ALL_ORGS_ID),
+    )
+    # Goalie levels are not rolled up (see query_goalie_partials)
+    rollups = (
+        ("skater", query_skater_partials, aggregate_skater_scope, ("org", "level")),
+        ("goalie", query_goalie_partials, aggregate_goalie_scope, ("org",)),
+        ("referee", query_referee_partials, aggregate_referee_scope, ("org", "level")),
+    )
+    for role, query_partials, aggregate_scope, aggregation_types in rollups:
+        workloads[f"{role}_partials"] = (collect_partials(role, query_partials), False)
+        for scope_name, aggregation_type, aggregation_id in rollup_scopes:
+            if aggregation_type in aggregation_types:
+                workloads[f"{role}_{scope_name}_rollup"] = (
+                    rollup(role, aggregate_scope, aggregation_type, aggregation_id),
+                    False,
+                )
+    return workloads
+
+
+def capture_selects(session, workload):
+    """
+    Run workload(session) and return the distinct SELECTs it executed, with
+    their parameters inlined.
+    """
+    from sqlalchemy import event
+
+    statements = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+        sql = cursor.mogrify(statement, parameters).decode()
+        if sql not in statements:
+            statements.append(sql)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        workload(session)
+        session.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(session, sql):
+    """EXPLAIN (ANALYZE, BUFFERS) plan of sql as a dict."""
+    # Through the DBAPI cursor, so that the inlined statement is not parsed
+    # for bind parameters again
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+        return cursor.fetchone()[0][0]
+    finally:
+        cursor.close()
+        session.rollback()
+
+
+def sequential_scans(plan_node):
+    """Seq Scan nodes of a plan on HOT_TABLES."""
+    scans = []
+    if (
+        plan_node.get("Node Type") == "Seq Scan"
+        and plan_node.get("Relation Name") in HOT_TABLES
+    ):
+        scans.append(plan_node)
+    for child in plan_node.get("Plans", []):
+        scans += sequential_scans(child)
+    return scans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fail when an aggregator hot path query plan uses sequential scans."
+    )
+    parser.add_argument(
+        "--database",
+        required=True,
+        help="Dedicated benchmark database (truncated unless --reuse-data).",
+    )
+    parser.add_argument(
+        "--games",
+        type=int,
+        default=30000,
+        help="League size, in approximate number of games.",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    parser.add_argument(
+        "--reuse-data",
+        action="store_true",
+        help="Keep the league already in the database instead of generating one.",
+    )
+    parser.add_argument(
+        "--plans",
+        default="aggregator_plans.jsonl",
+        help="JSON lines file the captured plans are appended to.",
+    )
+    args = parser.parse_args()
+
+    if args.database == PRODUCTION_DATABASE:
+        sys.exit(
+            f"Refusing to truncate {PRODUCTION_DATABASE}; use a dedicated database."
+        )
+    # db_connection reads DB_NAME when it is first imported
+    os.environ["DB_NAME"] = args.database
+
+    from hockey_blast_common_lib.db_connection import create_session
+
+    session = create_session("boss")
+    prepare_database(session, args.games, args.seed, args.reuse_data)
+    scopes = pick_scopes(session)
+    print(
+        "Division {division_id} (org {org_id}, level {level_id}), human {human_id}".format(
+            **scopes
+        ),
+        flush=True,
+    )
+
+    regressions = []
+    with open(args.plans, "a") as plans_file:
+        for name, (workload, selective) in hot_path_workloads(scopes).items():
+            statements = capture_selects(session, workload)
+            print(f"\n{name}: {len(statements)} distinct SELECTs")
+            for i, sql in enumerate(statements):
+                plan = explain(session, sql)
+                scans = sequential_scans(plan["Plan"])
+                plans_file.write(
+                    json.dumps(
+                        {
+                            "workload": name,
+                            "statement": i,
+                            "games": args.games,
+                            "seed": args.seed,
+                            "sql": sql,
+                            "plan": plan,
+                        }
+                    )
+                    + "\n"
+                )
+                status = "ok"
+                if scans:
+                    status = "SEQ SCAN " + ", ".join(s["Relation Name"] for s in scans)
+                    if not selective:
+                        status += " (whole-scope query)"
+                print(
+                    f"  #{i:<3} {plan['Execution Time']:>10.1f} ms"
+                    f"  shared hit {plan['Plan'].get('Shared Hit Blocks', 0):>8,}"
+                    f"  read {plan['Plan'].get('Shared Read Blocks', 0):>8,}  {status}"
+                )
+                if scans and selective:
+                    regressions.append((name, i, sql))
+
+    session.close()
+    print(f"\nPlans appended to {args.plans}")
+    if regressions:
+        print(f"\n{len(regressions)} plan(s) scan hot tables sequentially:")
+        for name, i, sql in regressions:
+            print(f"\n{name} #{i}:\n{sql}")
+        sys.exit(1)
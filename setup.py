@@ -13,6 +13,10 @@ setup(
         "Flask-SQLAlchemy",  # For Flask database interactions
         "SQLAlchemy",  # For database interactions
         "requests",  # For HTTP requests
+        "numpy",  # For the in-memory game fact cache used by the aggregators
     ],
+    extras_require={
+        "async": ["asyncpg"],  # For db_connection.create_async_session
+    },
     python_requires=">=3.7",  # Specify the Python version compatibility
 )
@@ -0,0 +1,169 @@
+import numpy as np
+import pytest
+
+from hockey_blast_common_lib import aggregate_s2s_stats
+from hockey_blast_common_lib.aggregate_s2s_stats import (
+    S2S_COUNTER_COLUMNS,
+    S2S_SKATER_FIELDS,
+    PairAccumulator,
+    build_game_pairs,
+)
+
+
+def skaters(*rows):
+    """
+    Column arrays like iter_game_skaters() yields, from (game_id, human_id,
+    is_home, goals, assists, penalties, is_tie, home_won, visitor_won) rows
+    grouped by game with home skaters first.
+    """
+    block = np.array(rows, dtype=np.int64).reshape(-1, len(S2S_SKATER_FIELDS))
+    return dict(zip(S2S_SKATER_FIELDS, block.T))
+
+
+def pair_counters(skater1_ids, skater2_ids, counters):
+    """{(skater1_id, skater2_id): {column: value}}"""
+    return {
+        (skater1, skater2): dict(zip(S2S_COUNTER_COLUMNS, row))
+        for skater1, skater2, row in zip(
+            skater1_ids.tolist(), skater2_ids.tolist(), counters.tolist()
+        )
+    }
+
+
+# Home (2, 5) beat visitors (3) 3-1: 5 scored twice assisted by 2 and 3
+# scored; 2 took a penalty
+HOME_WIN_ROWS = (
+    (1, 2, 1, 0, 2, 1, 0, 1, 0),
+    (1, 5, 1, 2, 0, 0, 0, 1, 0),
+    (1, 3, 0, 1, 0, 0, 0, 1, 0),
+)
+# Home (3) tied visitors (5) 1-1; 5 took two penalties
+TIE_ROWS = (
+    (2, 3, 1, 1, 0, 0, 1, 0, 0),
+    (2, 5, 0, 1, 0, 2, 1, 0, 0),
+)
+HOME_WIN = skaters(*HOME_WIN_ROWS)
+TIE = skaters(*TIE_ROWS)
+
+
+def test_build_game_pairs_pairs_opponents_only():
+    pairs = pair_counters(*build_game_pairs(HOME_WIN))
+    # 2 and 5 are teammates
+    assert set(pairs) == {(2, 3), (3, 5)}
+    assert all(pair["games_against"] == 1 for pair in pairs.values())
+
+
+def test_build_game_pairs_orients_counters_by_skater_id():
+    pairs = pair_counters(*build_game_pairs(HOME_WIN))
+    # Home skater 2 is skater1 of (2, 3)
+    assert pairs[(2, 3)] == {
+        "games_against": 1,
+        "games_tied_against": 0,
+        "skater1_wins_vs_skater2": 1,
+        "skater2_wins_vs_skater1": 0,
+        "skater1_goals_against_skater2": 0,
+        "skater2_goals_against_skater1": 1,
+        "skater1_assists_against_skater2": 2,
+        "skater2_assists_against_skater1": 0,
+        "skater1_penalties_against_skater2": 1,
+        "skater2_penalties_against_skater1": 0,
+    }
+    # Visiting skater 3 is skater1 of (3, 5)
+    assert pairs[(3, 5)] == {
+        "games_against": 1,
+        "games_tied_against": 0,
+        "skater1_wins_vs_skater2": 0,
+        "skater2_wins_vs_skater1": 1,
+        "skater1_goals_against_skater2": 1,
+        "skater2_goals_against_skater1": 2,
+        "skater1_assists_against_skater2": 0,
+        "skater2_assists_against_skater1": 0,
+        "skater1_penalties_against_skater2": 0,
+        "skater2_penalties_against_skater1": 0,
+    }
+
+
+def test_build_game_pairs_tie():
+    pairs = pair_counters(*build_game_pairs(TIE))
+    assert pairs[(3, 5)]["games_tied_against"] == 1
+    assert pairs[(3, 5)]["skater1_wins_vs_skater2"] == 0
+    assert pairs[(3, 5)]["skater2_wins_vs_skater1"] == 0
+    assert pairs[(3, 5)]["skater2_penalties_against_skater1"] == 2
+
+
+def test_build_game_pairs_skips_self_pairs_and_other_shards():
+    # Human 4 is on both rosters
+    game = skaters(
+        (1, 4, 1, 0, 0, 0, 0, 1, 0),
+        (1, 4, 0, 0, 0, 0, 0, 1, 0),
+        (1, 7, 0, 0, 0, 0, 0, 1, 0),
+    )
+    assert set(pair_counters(*build_game_pairs(game))) == {(4, 7)}
+    assert set(pair_counters(*build_game_pairs(game, shard=0, shards=2))) == {(4, 7)}
+    assert pair_counters(*build_game_pairs(game, shard=1, shards=2)) == {}
+
+
+def test_build_game_pairs_empty():
+    skater1_ids, skater2_ids, counters = build_game_pairs(skaters())
+    assert len(skater1_ids) == len(skater2_ids) == 0
+    assert counters.shape == (0, len(S2S_COUNTER_COLUMNS))
+
+
+def test_build_game_pairs_several_games_in_one_block():
+    skater1_ids, skater2_ids, _ = build_game_pairs(skaters(*HOME_WIN_ROWS, *TIE_ROWS))
+    assert sorted(zip(skater1_ids.tolist(), skater2_ids.tolist())) == [
+        (2, 3),
+        (3, 5),
+        (3, 5),
+    ]
+
+
+@pytest.mark.parametrize("stream_rows", [1, 100000])
+def test_pair_accumulator_sums_repeated_games(monkeypatch, stream_rows):
+    # With 1 row, every add() coalesces into the already coalesced pairs
+    monkeypatch.setattr(aggregate_s2s_stats, "S2S_STREAM_ROWS", stream_rows)
+    accumulator = PairAccumulator(len(S2S_COUNTER_COLUMNS))
+    for game in (HOME_WIN, TIE, HOME_WIN):
+        accumulator.add(*build_game_pairs(game))
+
+    assert len(accumulator) == 2
+    skater1_ids, skater2_ids, counters = accumulator.pairs()
+    # Coalesced pairs come out ordered by (skater1_id, skater2_id)
+    assert list(zip(skater1_ids.tolist(), skater2_ids.tolist())) == [(2, 3), (3, 5)]
+    pairs = pair_counters(skater1_ids, skater2_ids, counters)
+    assert pairs[(2, 3)]["games_against"] == 2
+    assert pairs[(2, 3)]["skater1_wins_vs_skater2"] == 2
+    assert pairs[(2, 3)]["skater1_assists_against_skater2"] == 4
+    assert pairs[(3, 5)] == {
+        "games_against": 3,
+        "games_tied_against": 1,
+        "skater1_wins_vs_skater2": 0,
+        "skater2_wins_vs_skater1": 2,
+        "skater1_goals_against_skater2": 3,
+        "skater2_goals_against_skater1": 5,
+        "skater1_assists_against_skater2": 0,
+        "skater2_assists_against_skater1": 0,
+        "skater1_penalties_against_skater2": 0,
+        "skater2_penalties_against_skater1": 2,
+    }
+
+
+def test_pair_accumulator_keeps_large_ids_apart():
+    # Human ids are 32-bit integer columns
+    max_id = 2**31 - 1
+    accumulator = PairAccumulator(1)
+    accumulator.add(
+        np.array([1, max_id - 1]), np.array([max_id, max_id]), np.array([[1], [2]])
+    )
+    skater1_ids, skater2_ids, counters = accumulator.pairs()
+    assert skater1_ids.tolist() == [1, max_id - 1]
+    assert skater2_ids.tolist() == [max_id, max_id]
+    assert counters.tolist() == [[1], [2]]
+
+
+def test_pair_accumulator_empty():
+    accumulator = PairAccumulator(len(S2S_COUNTER_COLUMNS))
+    assert len(accumulator) == 0
+    skater1_ids, skater2_ids, counters = accumulator.pairs()
+    assert len(skater1_ids) == len(skater2_ids) == 0
+    assert counters.shape == (0, len(S2S_COUNTER_COLUMNS))
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from hockey_blast_common_lib.stats_utils import (
+    PERCENTILES,
+    RANK_COMPETITION,
+    RANK_DENSE,
+    RANK_ORDINAL,
+    assign_rank_columns,
+    compute_percentile_values,
+    compute_ranks,
+)
+
+
+def column(ranks):
+    return ranks[:, 0].tolist()
+
+
+@pytest.mark.parametrize(
+    "method, expected",
+    [
+        (RANK_ORDINAL, [1, 2, 3, 4]),
+        (RANK_COMPETITION, [1, 2, 2, 4]),
+        (RANK_DENSE, [1, 2, 2, 3]),
+    ],
+)
+def test_compute_ranks_ties(method, expected):
+    assert column(compute_ranks([[30], [20], [20], [10]], method=method)) == expected
+
+
+def test_compute_ranks_ordinal_breaks_ties_in_row_order():
+    assert column(compute_ranks([[5], [7], [5], [7]])) == [3, 1, 4, 2]
+    assert column(compute_ranks([[5], [7], [5], [7]], descending=False)) == [1, 3, 2, 4]
+
+
+def test_compute_ranks_ties_on_unsorted_rows():
+    values = [[10], [30], [20], [30], [10]]
+    assert column(compute_ranks(values, method=RANK_COMPETITION)) == [4, 1, 3, 1, 4]
+    assert column(compute_ranks(values, method=RANK_DENSE)) == [3, 1, 2, 1, 3]
+
+
+def test_compute_ranks_per_column_direction():
+    ranks = compute_ranks([[1, 1], [3, 3], [2, 2]], descending=[True, False])
+    assert ranks.tolist() == [[3, 1], [1, 3], [2, 2]]
+
+
+def test_compute_ranks_all_equal():
+    values = [[4], [4], [4]]
+    assert column(compute_ranks(values, method=RANK_ORDINAL)) == [1, 2, 3]
+    assert column(compute_ranks(values, method=RANK_COMPETITION)) == [1, 1, 1]
+    assert column(compute_ranks(values, method=RANK_DENSE)) == [1, 1, 1]
+
+
+def test_compute_ranks_empty():
+    ranks = compute_ranks(np.empty((0, 3)))
+    assert ranks.shape == (0, 3)
+    assert ranks.dtype == np.int64
+
+
+def test_compute_ranks_unknown_method():
+    with pytest.raises(ValueError):
+        compute_ranks([[1]], method="average")
+
+
+def test_assign_rank_columns():
+    stats = {
+        1: {"points": 10, "goals_allowed": 3},
+        2: {"points": 20, "goals_allowed": 1},
+        3: {"points": 10, "goals_allowed": 2},
+    }
+    assign_rank_columns(stats, ["points"], ascending_fields=["goals_allowed"])
+    assert {key: stat["points_rank"] for key, stat in stats.items()} == {
+        1: 2,
+        2: 1,
+        3: 3,
+    }
+    assert {key: stat["goals_allowed_rank"] for key, stat in stats.items()} == {
+        1: 3,
+        2: 1,
+        3: 2,
+    }
+
+
+def test_assign_rank_columns_competition_ties():
+    stats = {1: {"points": 10}, 2: {"points": 20}, 3: {"points": 10}}
+    assign_rank_columns(stats, ["points"], method=RANK_COMPETITION)
+    assert [stat["points_rank"] for stat in stats.values()] == [2, 1, 2]
+
+
+def test_assign_rank_columns_empty_inputs():
+    stats = {}
+    assign_rank_columns(stats, ["points"])
+    assert stats == {}
+
+    stats = {1: {"points": 10}}
+    assign_rank_columns(stats, [])
+    assert stats == {1: {"points": 10}}
+
+
+def test_compute_percentile_values_interpolates():
+    stats = {i: {"points": value} for i, value in enumerate([40, 10, 30, 20])}
+    markers = compute_percentile_values(
+        stats, ["points"], percentiles=(0, 25, 50, 75, 90, 100)
+    )
+    assert {p: markers[p]["points"] for p in markers} == pytest.approx(
+        {0: 10, 25: 17.5, 50: 25, 75: 32.5, 90: 37, 100: 40}
+    )
+
+
+def test_compute_percentile_values_single_stat():
+    markers = compute_percentile_values(
+        {1: {"points": 7, "goals": 2}}, ["points", "goals"]
+    )
+    assert list(markers) == list(PERCENTILES)
+    assert all(marker == {"points": 7, "goals": 2} for marker in markers.values())
+
+
+def test_compute_percentile_values_empty():
+    assert compute_percentile_values({}, ["points"]) == {
+        percentile: {"points": 0} for percentile in PERCENTILES
+    }
+    assert compute_percentile_values({1: {"points": 7}}, []) == {
+        percentile: {} for percentile in PERCENTILES
+    }